@@ -31,6 +31,7 @@ os.environ["VNPY_TESTING"] = "1"
 from vnpy.trader.utility import load_json, save_json, append_data
 from vnpy.data.stock.adjust_factor import download_adjust_factor, get_adjust_factor, get_stock_base
 from vnpy.trader.util_wechat import send_wx_msg
+from vnpy.component.cta_state_store import JournalStore
 
 if __name__ == "__main__":
 
@@ -74,8 +75,11 @@ if __name__ == "__main__":
 
         setting = strategy_setting.get('setting', {})
 
-        grids = load_json(os.path.abspath(os.path.join(account_folder, 'data', f'{strategy_name}_Grids.json')),
-                          auto_save=False)
+        # 网格文件 = 快照 + 追加日志
+        grids_store = JournalStore(os.path.abspath(os.path.join(account_folder, 'data', f'{strategy_name}_Grids.json')))
+        if not grids_store.exists():
+            continue
+        grids = grids_store.load()
 
         changed = False
 
@@ -146,4 +150,5 @@ if __name__ == "__main__":
 
         if changed:
             print('保存更新后的Grids.json文件')
-            save_json(os.path.abspath(os.path.join(account_folder, 'data', f'{strategy_name}_Grids.json')), grids)
+            grids_store.save(grids)
+            grids_store.compact()
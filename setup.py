@@ -61,6 +61,7 @@ def get_install_requires():
         "PyQt5",
         "qdarkstyle",
         "requests",
+        "aiohttp",
         "websocket-client",
         "peewee",
         "pymysql",
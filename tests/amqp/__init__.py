@@ -0,0 +1 @@
+from .test_tick_codec import *
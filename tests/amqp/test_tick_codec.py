@@ -0,0 +1,85 @@
+"""
+Test binary tick encoding used for AMQP tick publishing
+"""
+import json
+import unittest
+from datetime import datetime
+
+from vnpy.amqp.tick_codec import (
+    CONTENT_TYPE_TICK,
+    NUMBER_FIELDS,
+    decode_ticks,
+    encode_ticks,
+    is_binary_tick,
+    tick_to_json
+)
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+
+def make_tick(symbol, i):
+    tick = TickData(
+        gateway_name='tdx',
+        symbol=symbol,
+        exchange=Exchange.SSE,
+        datetime=datetime(2021, 3, 1, 9, 30, 1, 500000 + i),
+        trading_day='2021-03-01',
+        name='浦发银行'
+    )
+    for n, field in enumerate(NUMBER_FIELDS):
+        setattr(tick, field, 10.25 + n + i)
+    return tick
+
+
+class TestTickCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        ticks = [make_tick('600000', i) for i in range(3)]
+        body = encode_ticks(ticks)
+        decoded = decode_ticks(body)
+
+        self.assertEqual(len(decoded), 3)
+        for tick, result in zip(ticks, decoded):
+            self.assertEqual(result.symbol, tick.symbol)
+            self.assertEqual(result.exchange, Exchange.SSE)
+            self.assertEqual(result.vt_symbol, '600000.SSE')
+            self.assertEqual(result.datetime, tick.datetime)
+            self.assertEqual(result.trading_day, tick.trading_day)
+            self.assertEqual(result.name, tick.name)
+            self.assertEqual(result.gateway_name, 'tdx')
+            self.assertEqual(result.date, '2021-03-01')
+            for field in NUMBER_FIELDS:
+                self.assertEqual(getattr(result, field), getattr(tick, field))
+
+        # the binary message is much smaller than the json messages
+        self.assertLess(len(body), sum(len(tick_to_json(t)) for t in ticks) / 2)
+
+    def test_gateway_name_and_missing_values(self):
+        tick = TickData(gateway_name='tdx', symbol='RB99', exchange=Exchange.SHFE,
+                        datetime=datetime(2021, 3, 1, 21, 0, 0))
+        tick.open_interest = None
+        result = decode_ticks(encode_ticks([tick]), gateway_name='CTP')[0]
+        self.assertEqual(result.gateway_name, 'CTP')
+        self.assertEqual(result.open_interest, 0)
+        # trading day of the night session
+        self.assertEqual(result.trading_day, '2021-03-02')
+
+    def test_json_compatible(self):
+        tick = make_tick('600000', 0)
+        d = json.loads(tick_to_json(tick))
+        self.assertEqual(d['datetime'], '2021-03-01 09:30:01.500000')
+        self.assertEqual(d['exchange'], 'SSE')
+        # the tick itself is not modified
+        self.assertIsInstance(tick.datetime, datetime)
+
+    def test_content_type(self):
+        self.assertTrue(is_binary_tick(CONTENT_TYPE_TICK))
+        self.assertTrue(is_binary_tick(f'{CONTENT_TYPE_TICK};v=1'))
+        self.assertFalse(is_binary_tick('application/json'))
+        self.assertFalse(is_binary_tick(None))
+        with self.assertRaises(ValueError):
+            decode_ticks(b'{"symbol": "RB99"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,2 @@
+from .test_async_rest_client import *
+from .test_async_websocket_client import *
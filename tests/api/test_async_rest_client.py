@@ -0,0 +1,153 @@
+"""
+Test asyncio rest client with a local http server
+"""
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from vnpy.api.rest import RequestStatus
+from vnpy.api.rest.async_rest_client import AsyncRestClient, TokenBucket
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = {}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, code, data):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with self.lock:
+            self.hits[url.path] = self.hits.get(url.path, 0) + 1
+        if url.path == '/slow':
+            time.sleep(0.3)
+            self.send_json(200, {'query': parse_qs(url.query)})
+        elif url.path == '/stream':
+            body = b'{"i": 0}\n{"i": 1}\n\n{"i": 2}\n'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path == '/missing':
+            self.send_json(404, {'error': 'missing'})
+        else:
+            self.send_json(200, {'path': url.path, 'query': parse_qs(url.query)})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        data = self.rfile.read(length).decode()
+        self.send_json(200, {'data': data, 'sign': self.headers.get('X-Sign')})
+
+
+class Server(ThreadingHTTPServer):
+    request_queue_size = 64
+    daemon_threads = True
+
+
+class Client(AsyncRestClient):
+
+    def sign(self, request):
+        request.headers = dict(request.headers or {}, **{'X-Sign': 'signed'})
+        return request
+
+
+class TestAsyncRestClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = Server(('127.0.0.1', 0), Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        Handler.hits.clear()
+        self.client = Client()
+        self.client.init(f'http://127.0.0.1:{self.server.server_address[1]}')
+        self.client.start()
+        self.results = []
+
+    def tearDown(self):
+        self.client.stop()
+
+    def callback(self, data, request):
+        self.results.append((data, request))
+
+    def test_get_and_post(self):
+        request = self.client.add_request('GET', '/query', self.callback, params={'symbol': 'BTC', 'limit': 5,
+                                                                                  'flag': True, 'none': None})
+        self.client.add_request('POST', '/order', self.callback, data='price=1')
+        self.client.join()
+        self.assertEqual(request.status, RequestStatus.success)
+        self.assertEqual(request.response.status_code, 200)
+        data = {r[0].get('path', 'post'): r[0] for r in self.results}
+        self.assertEqual(data['/query']['query'], {'symbol': ['BTC'], 'limit': ['5'], 'flag': ['True']})
+        self.assertEqual(data['post'], {'data': 'price=1', 'sign': 'signed'})
+
+    def test_failed(self):
+        failed = []
+        request = self.client.add_request('GET', '/missing', self.callback,
+                                          on_failed=lambda code, req: failed.append(code))
+        self.client.join()
+        self.assertEqual(failed, [404])
+        self.assertEqual(request.status, RequestStatus.failed)
+        self.assertEqual(request.response.json(), {'error': 'missing'})
+
+    def test_coalesce_identical_queries(self):
+        requests = [self.client.add_request('GET', '/slow', self.callback, params={'a': 1}) for _ in range(5)]
+        self.client.add_request('GET', '/slow', self.callback, params={'a': 2})
+        self.client.join()
+        self.assertEqual(Handler.hits['/slow'], 2)
+        self.assertEqual(len(self.results), 6)
+        self.assertTrue(all(r.status == RequestStatus.success for r in requests))
+        self.assertEqual([r[0]['query']['a'] for r in self.results].count(['1']), 5)
+
+    def test_rate_limit(self):
+        self.client.add_rate_limit('weight', rate=20, capacity=1, weights={'GET /heavy': 2, '/free': 0})
+        start = time.time()
+        for _ in range(4):
+            self.client.add_request('GET', '/heavy', self.callback, params={'t': time.time()})
+        self.client.join()
+        # weights above the capacity wait for a full bucket: 3 waits of 1/20 second
+        self.assertGreaterEqual(time.time() - start, 0.14)
+
+        start = time.time()
+        for i in range(10):
+            self.client.add_request('GET', '/free', self.callback, params={'i': i})
+        self.client.join()
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual(len(self.results), 14)
+
+    def test_streaming(self):
+        connected = []
+        self.client.add_streaming_request('GET', '/stream', self.callback,
+                                          on_connected=lambda req: connected.append(req))
+        self.client.join()
+        self.assertEqual(len(connected), 1)
+        self.assertEqual([r[0]['i'] for r in self.results], [0, 1, 2])
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.try_acquire(2), 0)
+        self.assertGreater(bucket.try_acquire(1), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
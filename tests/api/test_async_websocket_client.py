@@ -0,0 +1,161 @@
+"""
+Test asyncio websocket client multiplexed on the shared event loop
+"""
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from aiohttp import web
+
+from vnpy.api.websocket.async_websocket_client import AsyncWebsocketClient, get_websocket_hub
+
+
+class Server(object):
+    """websocket server on its own event loop thread"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.connections = []
+        self.received = []
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait(5)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_get('/ws', self.handle)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.ready.set()
+        self.loop.run_forever()
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections.append(ws)
+        async for msg in ws:
+            packet = json.loads(msg.data)
+            self.received.append(packet)
+            if packet.get('op') == 'close':
+                await ws.close()
+            else:
+                for i in range(packet.get('count', 1)):
+                    await ws.send_str(json.dumps({'channel': packet['channel'], 'i': i, 'ts': time.time()}))
+        return ws
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+class Client(AsyncWebsocketClient):
+
+    def __init__(self, channel):
+        super().__init__()
+        self.channel = channel
+        self.packets = []
+        self.raw = []
+        self.connected = threading.Event()
+        self.connect_count = 0
+        self.reconnect_interval = 0.1
+
+    def on_connected(self):
+        self.connect_count += 1
+        self.connected.set()
+
+    def on_packet(self, packet):
+        self.packets.append(packet)
+
+    def get_packet_timestamp(self, packet):
+        return packet.get('ts')
+
+
+class RawClient(Client):
+
+    def on_raw_data(self, data):
+        # depth updates are handled without decoding the whole message
+        if '"depth"' in data:
+            self.raw.append(data)
+            return True
+        return False
+
+
+def wait_until(func, timeout=3):
+    end = time.time() + timeout
+    while time.time() < end:
+        if func():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestAsyncWebsocketClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server()
+        self.url = f'ws://127.0.0.1:{self.server.port}/ws'
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.stop()
+            client.join()
+        self.server.close()
+
+    def make_client(self, channel, cls=Client):
+        client = cls(channel)
+        client.init(self.url, ping_interval=10)
+        client.start()
+        self.assertTrue(client.connected.wait(3))
+        self.clients.append(client)
+        return client
+
+    def test_multiplexed_connections(self):
+        thread_count = threading.active_count()
+        clients = [self.make_client(f'ch{i}') for i in range(5)]
+        # all connections share one event loop thread
+        self.assertLessEqual(threading.active_count(), thread_count + 1)
+        for client in clients:
+            client.send_packet({'channel': client.channel, 'count': 20})
+        self.assertTrue(wait_until(lambda: all(len(c.packets) == 20 for c in clients)))
+        for client in clients:
+            self.assertEqual({p['channel'] for p in client.packets}, {client.channel})
+            self.assertEqual([p['i'] for p in client.packets], list(range(20)))
+
+        metrics = get_websocket_hub().get_metrics()
+        stats = metrics[clients[0].stats.name]
+        self.assertEqual(stats['recv_count'], 20)
+        self.assertGreater(stats['recv_bytes'], 0)
+        self.assertGreater(stats['msg_rate'], 0)
+        self.assertGreaterEqual(stats['avg_latency_ms'], 0)
+
+    def test_raw_fast_path(self):
+        client = self.make_client('depth', RawClient)
+        client.send_packet({'channel': 'depth', 'count': 3})
+        client.send_packet({'channel': 'trade', 'count': 2})
+        self.assertTrue(wait_until(lambda: len(client.raw) == 3 and len(client.packets) == 2))
+        self.assertEqual(client.stats.raw_count, 3)
+
+    def test_reconnect_and_stop(self):
+        client = self.make_client('ch')
+        client.connected.clear()
+        client.send_packet({'op': 'close'})
+        self.assertTrue(client.connected.wait(3))
+        self.assertEqual(client.connect_count, 2)
+
+        client.stop()
+        client.join()
+        self.assertNotIn(client, get_websocket_hub().clients)
+        self.assertIsNone(client._ws)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,5 @@
 from .test_csv_loader import *
+from .test_index_aggregator import *
+from .test_column_recorder import *
+from .test_option_pricing import *
+from .test_portfolio_optimize import *
@@ -0,0 +1,94 @@
+"""
+Benchmark of option chain pricing on underlying tick.
+
+Compares the scalar pricing models (implied volatility and greeks calculated
+option by option) against the vectorized chain-wide calculation.
+
+    python tests/app/benchmark_option_pricing.py --strikes 40 --ticks 50
+    python tests/app/benchmark_option_pricing.py --model black_scholes
+"""
+import argparse
+import time
+
+import numpy as np
+
+from vnpy.app.option_master.pricing import black_76, black_scholes, vectorized
+
+from test_option_pricing import make_portfolio, make_tick, random_options
+
+MODELS = {
+    "black_76": (black_76, vectorized.BLACK_76),
+    "black_scholes": (black_scholes, vectorized.BLACK_SCHOLES),
+}
+
+
+def run(name: str, func, count: int, unit: str):
+    start = time.perf_counter()
+    func()
+    cost = time.perf_counter() - start
+    print(f"{name:<32}{count:>10}{cost:>12.3f}{cost / count * 1e6:>14.1f} us/{unit}")
+
+
+def make_chain_portfolio(pricing_model, strikes: int, vectorize: bool):
+    """portfolio with price ticks of all options"""
+    portfolio = make_portfolio(pricing_model, strikes=strikes)
+    chain = list(portfolio.chains.values())[0]
+
+    if not vectorize:
+        chain.vectorized_model = ""
+        for option in chain.options.values():
+            option.vectorized_model = ""
+
+    for option in portfolio.options.values():
+        price = vectorized.calculate_price(
+            4200, option.strike_price, 0.03, option.time_to_expiry, 0.2, option.option_type
+        ).item()
+        option.update_tick(make_tick(option.vt_symbol, price * 0.98, price * 1.02))
+    return portfolio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="option chain pricing benchmark")
+    parser.add_argument("--model", default="black_76", choices=list(MODELS))
+    parser.add_argument("--strikes", type=int, default=40, help="strikes in chain, 2 options each")
+    parser.add_argument("--ticks", type=int, default=20, help="underlying ticks")
+    parser.add_argument("--options", type=int, default=2000, help="options for function benchmark")
+    args = parser.parse_args()
+
+    pricing_model, model_name = MODELS[args.model]
+    print(f"model={args.model} strikes={args.strikes} ticks={args.ticks}")
+    print(f"{'case':<32}{'count':>10}{'seconds':>12}{'average':>14}")
+
+    # Pricing functions
+    s, k, r, t, v, cp = random_options(args.options)
+    price = vectorized.calculate_price(s, k, r, t, v, cp, model_name)
+    single = min(args.options, 200)
+
+    run("scalar impv",
+        lambda: [pricing_model.calculate_impv(*a) for a in zip(price[:single], s, k, r, t, cp.astype(int))],
+        single, "option")
+    run("vectorized impv",
+        lambda: vectorized.calculate_impv(price, s, k, r, t, cp, model_name),
+        args.options, "option")
+    run("scalar greeks",
+        lambda: [pricing_model.calculate_greeks(*a) for a in zip(s[:single], k, r, t, v, cp.astype(int))],
+        single, "option")
+    run("vectorized greeks",
+        lambda: vectorized.calculate_greeks(s, k, r, t, v, cp, model_name),
+        args.options, "option")
+
+    # Underlying tick of whole chain
+    for name, vectorize in (("scalar chain tick", False), ("vectorized chain tick", True)):
+        portfolio = make_chain_portfolio(pricing_model, args.strikes, vectorize)
+        prices = 4200 + np.random.default_rng(0).normal(0, 5, args.ticks)
+        ticks = [make_tick("IF2012.CFFEX", p - 0.2, p + 0.2) for p in prices]
+
+        def update_ticks():
+            for tick in ticks:
+                portfolio.update_tick(tick)
+
+        run(name, update_ticks, args.ticks, "tick")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Test buffered columnar tick recorder and its csv export
+"""
+import csv
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from vnpy.app.tick_recorder.column_recorder import (
+    CHUNK_HEADER_STRUCT,
+    FILE_HEADER_STRUCT,
+    TickColumnRecorder,
+    export_tick_csv,
+    load_column_file
+)
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+
+def make_tick(symbol, i, trading_day='2021-03-01'):
+    tick = TickData(
+        gateway_name='CTP',
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        datetime=datetime(2021, 3, 1, 9, 0, 0) + timedelta(milliseconds=500 * i),
+        trading_day=trading_day
+    )
+    tick.last_price = 3500 + i
+    tick.volume = i
+    tick.ask_price_1 = 3501 + i
+    return tick
+
+
+class TestTickColumnRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_record_and_load(self):
+        recorder = TickColumnRecorder(self.folder.name, flush_rows=10)
+        ticks = [make_tick('rb2105', i) for i in range(25)] + [make_tick('hc2105', i) for i in range(3)]
+        recorder.save_tick_data(ticks)
+        recorder.close()
+
+        metrics = recorder.get_metrics()
+        self.assertEqual(metrics['recorded'], 28)
+        self.assertEqual(metrics['written'], 28)
+        self.assertEqual(metrics['open_files'], 0)
+
+        file_name = recorder.get_file_name('rb2105.SHFE', '2021-03-01')
+        self.assertTrue(file_name.endswith(os.path.join('2021', '03', '01', 'rb2105.SHFE_2021-03-01.tcol')))
+        loaded = load_column_file(file_name)
+        self.assertEqual(len(loaded), 25)
+        for tick, result in zip(ticks, loaded):
+            self.assertEqual(result.vt_symbol, tick.vt_symbol)
+            self.assertEqual(result.datetime, tick.datetime)
+            self.assertEqual(result.last_price, tick.last_price)
+            self.assertEqual(result.volume, tick.volume)
+            self.assertEqual(result.ask_price_1, tick.ask_price_1)
+
+        # appending to an existing file after restart
+        recorder = TickColumnRecorder(self.folder.name)
+        recorder.save_tick_data([make_tick('rb2105', 25)])
+        recorder.close()
+        self.assertEqual(len(load_column_file(file_name)), 26)
+
+    def test_trading_day_switch(self):
+        recorder = TickColumnRecorder(self.folder.name)
+        recorder.save_tick_data([make_tick('rb2105', 0), make_tick('rb2105', 1, trading_day='2021-03-02')])
+        recorder.close()
+        self.assertEqual(len(load_column_file(recorder.get_file_name('rb2105.SHFE', '2021-03-01'))), 1)
+        self.assertEqual(len(load_column_file(recorder.get_file_name('rb2105.SHFE', '2021-03-02'))), 1)
+
+    def test_torn_chunk_and_csv_export(self):
+        recorder = TickColumnRecorder(self.folder.name, flush_rows=5)
+        recorder.save_tick_data([make_tick('rb2105', i) for i in range(10)])
+        recorder.close()
+        file_name = recorder.get_file_name('rb2105.SHFE', '2021-03-01')
+        # simulate a crash in the middle of the last chunk
+        with open(file_name, 'rb+') as f:
+            f.truncate(os.path.getsize(file_name) - 3)
+        self.assertEqual(len(load_column_file(file_name)), 5)
+
+        csv_file = export_tick_csv(file_name)
+        self.assertTrue(csv_file.endswith('.csv'))
+        with open(csv_file, encoding='utf8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(list(rows[0].keys())[0], 'datetime')
+        self.assertEqual(rows[1]['datetime'], '2021-03-01 09:00:00.500000')
+        self.assertEqual(float(rows[1]['last_price']), 3501)
+        # int fields are exported as int
+        self.assertEqual(rows[1]['volume'], '1')
+        self.assertEqual(rows[1]['bid_volume_1'], '0')
+
+    def test_write_after_crash(self):
+        recorder = TickColumnRecorder(self.folder.name, flush_rows=5)
+        recorder.save_tick_data([make_tick('rb2105', i) for i in range(10)])
+        recorder.close()
+        file_name = recorder.get_file_name('rb2105.SHFE', '2021-03-01')
+        with open(file_name, 'rb+') as f:
+            f.truncate(os.path.getsize(file_name) - 3)
+
+        # restart: torn chunk is truncated before appending
+        recorder = TickColumnRecorder(self.folder.name)
+        recorder.save_tick_data([make_tick('rb2105', i) for i in range(10, 12)])
+        recorder.close()
+        loaded = load_column_file(file_name)
+        self.assertEqual([t.volume for t in loaded], [0, 1, 2, 3, 4, 10, 11])
+
+    def test_skip_bad_chunk(self):
+        recorder = TickColumnRecorder(self.folder.name, flush_rows=5)
+        recorder.save_tick_data([make_tick('rb2105', i) for i in range(10)])
+        recorder.close()
+        file_name = recorder.get_file_name('rb2105.SHFE', '2021-03-01')
+        with open(file_name, 'rb') as f:
+            content = f.read()
+        # torn first chunk followed by a complete one, appended by an old version
+        header_size = FILE_HEADER_STRUCT.size + FILE_HEADER_STRUCT.unpack_from(content)[2]
+        rows, length = CHUNK_HEADER_STRUCT.unpack_from(content, header_size)
+        second = header_size + CHUNK_HEADER_STRUCT.size + length
+        with open(file_name, 'wb') as f:
+            f.write(content[:second - 3] + content[second:])
+        self.assertEqual([t.volume for t in load_column_file(file_name)], [5, 6, 7, 8, 9])
+
+    def test_close_idle_file(self):
+        recorder = TickColumnRecorder(self.folder.name, flush_rows=1, close_idle=0.1)
+        recorder.save_tick_data([make_tick('rb2105', 0)])
+        for _ in range(50):
+            if recorder.get_metrics()['written'] == 1:
+                break
+            time.sleep(0.02)
+        self.assertEqual(recorder.get_metrics()['open_files'], 1)
+        time.sleep(0.3)
+        self.assertEqual(recorder.get_metrics()['open_files'], 0)
+
+        # reopened on next write
+        recorder.save_tick_data([make_tick('rb2105', 1)])
+        recorder.close()
+        self.assertEqual(len(load_column_file(recorder.get_file_name('rb2105.SHFE', '2021-03-01'))), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Test incremental index tick aggregation against a full recalculation
+"""
+import json
+import random
+import sys
+import types
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+
+def get_ctp_stub():
+    """the app package imports the CTP md api, stubbed when its native library is not installed"""
+    try:
+        import vnpy.gateway.ctp.ctp_gateway  # noqa: F401
+        return {}
+    except ImportError:
+        stub = types.ModuleType('vnpy.gateway.ctp.ctp_gateway')
+        stub.CtpGateway = stub.CtpMdApi = object
+        stub.symbol_exchange_map = {}
+        return {stub.__name__: stub}
+
+
+try:
+    # modules imported with the stub are removed again, other tests import the real ones
+    with mock.patch.dict(sys.modules, get_ctp_stub()):
+        from vnpy.app.index_tick_publisher.aggregator import IndexAggregator, IndexTickEncoder
+    _import_error = ''
+except ImportError as ex:
+    # index_tick_publisher depends on optional packages (e.g. pytdx)
+    _import_error = str(ex)
+
+
+def full_index(ticks):
+    """the original loop over all contracts"""
+    all_amount = all_interest = all_volume = all_ask1 = all_bid1 = 0
+    last_price = ask_price_1 = bid_price_1 = 0
+    mi_tick = None
+    for t in ticks.values():
+        all_interest += t.open_interest
+        all_amount += t.last_price * t.open_interest
+        all_volume += t.volume
+        all_ask1 += t.ask_price_1 * t.open_interest
+        all_bid1 += t.bid_price_1 * t.open_interest
+        if mi_tick is None or mi_tick.open_interest < t.open_interest:
+            mi_tick = t
+    if all_interest > 0 and all_amount > 0:
+        last_price = round(float(all_amount / all_interest), 4)
+    if all_ask1 > 0 and all_interest > 0:
+        ask_price_1 = round(float(all_ask1 / all_interest), 4)
+    if all_bid1 > 0 and all_interest > 0:
+        bid_price_1 = round(float(all_bid1 / all_interest), 4)
+    return mi_tick, all_interest, all_volume, last_price, ask_price_1, bid_price_1
+
+
+def make_tick(symbol, open_interest, price, volume):
+    return TickData(
+        gateway_name='CTP',
+        symbol=symbol,
+        exchange=Exchange.SHFE,
+        datetime=datetime(2021, 1, 4, 9, 0, 1, 500000),
+        open_interest=open_interest,
+        last_price=price,
+        volume=volume,
+        ask_price_1=price + 1,
+        bid_price_1=price - 1
+    )
+
+
+@unittest.skipIf(_import_error, f'index_tick_publisher not importable: {_import_error}')
+class TestIndexAggregator(unittest.TestCase):
+
+    def test_matches_full_recalculation(self):
+        rnd = random.Random(7)
+        symbols = ['rb2101', 'rb2102', 'rb2105', 'rb2110']
+        aggregator = IndexAggregator()
+        ticks = {}
+        for i in range(5000):
+            symbol = rnd.choice(symbols)
+            # small open interest range to produce ties and drops of the main contract
+            tick = make_tick(symbol, rnd.randint(0, 5) * 100, 3500 + rnd.randint(-50, 50), i)
+            aggregator.update(tick)
+            ticks[symbol] = tick
+
+            mi_tick, *values = aggregator.get_index()
+            expected_mi, *expected = full_index(ticks)
+            self.assertIs(mi_tick, expected_mi)
+            self.assertEqual(values[:2], expected[:2])
+            for value, expected_value in zip(values[2:], expected[2:]):
+                self.assertAlmostEqual(value, expected_value, places=4)
+
+        self.assertEqual(list(aggregator.ticks.keys()), list(ticks.keys()))
+
+    def test_encoder_matches_json_dumps(self):
+        tick = make_tick('rb2101', 100, 3500, 10)
+        encoder = IndexTickEncoder()
+        text = encoder.encode('RB', tick, 300, 30, 3501.5, 3502.5, 3500.5)
+
+        d = dict(tick.__dict__)
+        d.update({'datetime': tick.datetime.strftime('%Y-%m-%d %H:%M:%S.%f')})
+        d.update({'exchange': tick.exchange.value})
+        d.update({'symbol': 'RB99', 'vt_symbol': 'RB99.SHFE'})
+        d.update({'open_interest': 300, 'volume': 30,
+                  'last_price': 3501.5, 'ask_price_1': 3502.5, 'bid_price_1': 3500.5})
+        self.assertEqual(text, json.dumps(d))
+        # the source tick is not modified
+        self.assertEqual(tick.symbol, 'rb2101')
+
+
+if __name__ == '__main__':
+    unittest.main()
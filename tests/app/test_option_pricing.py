@@ -0,0 +1,198 @@
+"""
+Test vectorized option pricing against the scalar pricing models
+"""
+import random
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from vnpy.app.option_master.base import PortfolioData
+from vnpy.app.option_master.pricing import black_76, black_scholes, binomial_tree, vectorized
+from vnpy.trader.constant import Exchange, OptionType, Product
+from vnpy.trader.object import ContractData, TickData
+
+
+def random_options(count, seed=1):
+    """random options with volatility and price well defined"""
+    rng = np.random.default_rng(seed)
+    s = rng.uniform(2.8, 3.2, count)
+    k = rng.uniform(2.6, 3.4, count)
+    r = rng.uniform(0, 0.05, count)
+    t = rng.uniform(5, 240, count) / 240
+    v = rng.uniform(0.1, 0.8, count)
+    cp = rng.choice([-1, 1], count)
+    return s, k, r, t, v, cp
+
+
+def make_contract(symbol, product, **kwargs):
+    return ContractData(
+        gateway_name="CTP",
+        symbol=symbol,
+        exchange=Exchange.CFFEX,
+        name=symbol,
+        product=product,
+        size=100,
+        pricetick=0.2,
+        **kwargs
+    )
+
+
+def make_tick(vt_symbol, bid_price, ask_price):
+    symbol, exchange = vt_symbol.rsplit(".", 1)
+    return TickData(
+        gateway_name="CTP",
+        symbol=symbol,
+        exchange=Exchange(exchange),
+        datetime=datetime.now(),
+        last_price=(bid_price + ask_price) / 2,
+        bid_price_1=bid_price,
+        ask_price_1=ask_price
+    )
+
+
+def make_portfolio(pricing_model, interest_rate=0.03, strikes=15):
+    """portfolio with one chain, strikes between 3500 and 5000"""
+    portfolio = PortfolioData("IO.CFFEX")
+    expiry = datetime.now() + timedelta(days=60)
+
+    for strike in np.linspace(3500, 5000, strikes, endpoint=False).round(1).tolist():
+        for option_type, cp in ((OptionType.CALL, "C"), (OptionType.PUT, "P")):
+            portfolio.add_option(make_contract(
+                f"IO2012-{cp}-{strike}",
+                Product.OPTION,
+                option_strike=strike,
+                option_underlying="IO2012",
+                option_type=option_type,
+                option_expiry=expiry,
+                option_index=str(strike)
+            ))
+
+    portfolio.set_chain_underlying("IO2012.CFFEX", make_contract("IF2012", Product.FUTURES))
+    portfolio.set_interest_rate(interest_rate)
+    portfolio.set_pricing_model(pricing_model)
+    return portfolio
+
+
+class VectorizedPricingTest(unittest.TestCase):
+
+    def test_greeks(self):
+        s, k, r, t, v, cp = random_options(500)
+        for model, name in ((black_76, vectorized.BLACK_76), (black_scholes, vectorized.BLACK_SCHOLES)):
+            result = vectorized.calculate_greeks(s, k, r, t, v, cp, name)
+            for i in range(len(s)):
+                expected = model.calculate_greeks(s[i], k[i], r[i], t[i], v[i], int(cp[i]))
+                for a, b in zip(result, expected):
+                    self.assertAlmostEqual(a[i], b, places=10)
+
+            price = vectorized.calculate_price(s, k, r, t, v, cp, name)
+            np.testing.assert_allclose(price, result[0])
+
+    def test_greeks_without_volatility(self):
+        price, delta, gamma, theta, vega = vectorized.calculate_greeks(3, [2.5, 3.5], 0.03, [0.5, 0], 0, [1, -1])
+        self.assertEqual(price.tolist(), [0.5, 0.5])
+        for greek in (delta, gamma, theta, vega):
+            self.assertEqual(greek.tolist(), [0, 0])
+
+    def test_impv(self):
+        s, k, r, t, v, cp = random_options(500)
+        for model, name in ((black_76, vectorized.BLACK_76), (black_scholes, vectorized.BLACK_SCHOLES)):
+            price = vectorized.calculate_price(s, k, r, t, v, cp, name)
+            impv = vectorized.calculate_impv(price, s, k, r, t, cp, name)
+            np.testing.assert_allclose(impv, v, atol=0.0001)
+
+            # Scalar model where it converges
+            for i in range(0, len(s), 10):
+                scalar_impv = model.calculate_impv(price[i], s[i], k[i], r[i], t[i], int(cp[i]))
+                if abs(scalar_impv - v[i]) < 0.0002:
+                    self.assertAlmostEqual(impv[i], scalar_impv, delta=0.0002)
+
+    def test_impv_no_solution(self):
+        s = 3.0
+        k = np.array([2.5, 2.5, 3.5, 3.0, 3.0, 3.0])
+        price = np.array([0.4, 0, 0.4, 3.1, 0.1, 0.1])
+        t = np.array([0.5, 0.5, 0.5, 0.5, 0.5, 0])
+        cp = np.array([1, 1, -1, 1, 1, 1])
+        impv = vectorized.calculate_impv(price, s, k, 0.03, t, cp)
+        # Below exercise value, not positive, above upper bound, expired
+        self.assertEqual(impv[[0, 1, 2, 3, 5]].tolist(), [0, 0, 0, 0, 0])
+        self.assertGreater(impv[4], 0)
+
+    def test_model_name(self):
+        self.assertEqual(vectorized.get_model_name(black_76), vectorized.BLACK_76)
+        self.assertEqual(vectorized.get_model_name(black_scholes), vectorized.BLACK_SCHOLES)
+        self.assertEqual(vectorized.get_model_name(binomial_tree), "")
+
+
+class ChainGreeksTest(unittest.TestCase):
+
+    def check_chain(self, pricing_model, inverse=False):
+        chain_portfolio = make_portfolio(pricing_model)
+        option_portfolio = make_portfolio(pricing_model)
+        for portfolio in (chain_portfolio, option_portfolio):
+            portfolio.set_inverse(inverse)
+        for chain in option_portfolio.chains.values():
+            chain.vectorized_model = ""
+        self.assertTrue(all(chain.vectorized_model for chain in chain_portfolio.chains.values()))
+
+        random.seed(0)
+        underlying_price = 4200
+        ticks = []
+        for vt_symbol, option in chain_portfolio.options.items():
+            # Skip some options to leave them without tick
+            if random.random() < 0.1:
+                continue
+            price = vectorized.calculate_price(
+                underlying_price, option.strike_price, 0.03, option.time_to_expiry,
+                random.uniform(0.15, 0.35), option.option_type
+            ).item()
+            if inverse:
+                price /= underlying_price
+            ticks.append(make_tick(vt_symbol, price * 0.98, price * 1.02))
+
+        for portfolio in (chain_portfolio, option_portfolio):
+            for tick in ticks:
+                portfolio.update_tick(tick)
+            portfolio.calculate_atm_price()
+            for option in list(portfolio.options.values())[:4]:
+                option.net_pos = 2
+            portfolio.update_tick(make_tick("IF2012.CFFEX", underlying_price - 0.2, underlying_price + 0.2))
+
+        # Chain calculation is the same as option one by one
+        names = (
+            "underlying_adjustment", "ask_impv", "bid_impv", "mid_impv",
+            "cash_delta", "cash_gamma", "cash_theta", "cash_vega", "pos_delta", "pos_vega"
+        )
+        for vt_symbol, option in chain_portfolio.options.items():
+            expected = option_portfolio.options[vt_symbol]
+            for name in names:
+                self.assertAlmostEqual(getattr(option, name), getattr(expected, name), places=9)
+        self.assertNotEqual(chain_portfolio.pos_delta, 0)
+        self.assertAlmostEqual(chain_portfolio.pos_delta, option_portfolio.pos_delta, places=6)
+
+        # Cash greeks are the same as scalar model with the same volatility
+        for chain in option_portfolio.chains.values():
+            for option in chain.options.values():
+                option.vectorized_model = ""
+                option.calculate_cash_greeks()
+        for vt_symbol, option in chain_portfolio.options.items():
+            expected = option_portfolio.options[vt_symbol]
+            for name in ("cash_delta", "cash_gamma", "cash_theta", "cash_vega"):
+                self.assertAlmostEqual(getattr(option, name), getattr(expected, name), places=6)
+
+    def test_black_76(self):
+        self.check_chain(black_76)
+
+    def test_black_scholes(self):
+        self.check_chain(black_scholes)
+
+    def test_inverse(self):
+        self.check_chain(black_76, inverse=True)
+
+    def test_scalar_model(self):
+        portfolio = make_portfolio(binomial_tree)
+        self.assertTrue(all(not chain.vectorized_model for chain in portfolio.chains.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
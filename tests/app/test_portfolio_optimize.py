@@ -0,0 +1,152 @@
+"""
+Test result keys and resume of the portfolio parameter sweep
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+try:
+    from vnpy.app.cta_strategy_pro.portfolio_optimize import (
+        PortfolioSweepRunner,
+        SweepSetting,
+        get_params_key,
+        get_setting_key
+    )
+    _import_error = ''
+except ImportError as ex:
+    # cta_strategy_pro depends on optional extensions (e.g. chanlun)
+    _import_error = str(ex)
+
+
+class FakePool(object):
+    """runs jobs in the test process, returning the summary of a successful backtest"""
+    jobs = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def imap_unordered(self, func, job_list):
+        for job in job_list:
+            self.jobs.append(job)
+            key, params, _, _, setting_key = job
+            yield {'key': key, 'setting_key': setting_key, 'params': params, 'net_capital': params['para_a']}
+
+
+@unittest.skipIf(_import_error, f'cta_strategy_pro not importable: {_import_error}')
+class SweepKeyTest(unittest.TestCase):
+
+    def test_params_key(self):
+        key = get_params_key({'para_a': 1, 'para_b': 2.5})
+        self.assertEqual(key, get_params_key({'para_b': 2.5, 'para_a': 1}))
+        self.assertEqual(key, get_params_key({'para_a': np.int64(1), 'para_b': np.float64(2.5)}))
+        self.assertNotEqual(key, get_params_key({'para_a': 2, 'para_b': 2.5}))
+        self.assertNotEqual(key, get_params_key({'para_a': 1, 'para_b': 2.5}, 'setting'))
+
+    def test_setting_key(self):
+        test_setting = {'name': 'a', 'start_date': '20200101', 'init_capital': 1000000}
+        strategy_setting = {'s1': {'class_name': 'Strategy', 'setting': {'para_a': 1}}}
+        key = get_setting_key(test_setting, strategy_setting)
+
+        # name only changes the log folder
+        self.assertEqual(key, get_setting_key(dict(test_setting, name='b'), strategy_setting))
+        self.assertNotEqual(key, get_setting_key(dict(test_setting, start_date='20200201'), strategy_setting))
+        self.assertNotEqual(key, get_setting_key(test_setting, {'s1': {'class_name': 'Strategy', 'setting': {}}}))
+
+
+@unittest.skipIf(_import_error, f'cta_strategy_pro not importable: {_import_error}')
+class SweepResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sweep_path = tempfile.mkdtemp()
+        self.test_setting = {'name': 'sweep', 'start_date': '20200101', 'init_capital': 1000000}
+        self.strategy_setting = {'s1': {'class_name': 'Strategy', 'setting': {}}}
+        self.sweep_setting = SweepSetting()
+        self.sweep_setting.add_values('para_a', [1, 2, 3])
+
+    def tearDown(self):
+        shutil.rmtree(self.sweep_path, ignore_errors=True)
+        FakePool.jobs = []
+
+    def make_runner(self, test_setting=None):
+        return PortfolioSweepRunner(test_setting or self.test_setting, self.strategy_setting,
+                                    self.sweep_setting, sweep_path=self.sweep_path, processes=1)
+
+    def save_results(self, runner, settings, errors=()):
+        for params in settings:
+            summary = {
+                'key': get_params_key(params, runner.setting_key),
+                'setting_key': runner.setting_key,
+                'params': params
+            }
+            if params['para_a'] in errors:
+                summary['error'] = 'backtest failed'
+            else:
+                summary['net_capital'] = params['para_a']
+            runner.save_result(summary)
+
+    def run_settings(self, runner, settings):
+        with mock.patch('multiprocessing.get_context') as get_context, \
+                mock.patch.object(runner, 'prepare_bars'):
+            get_context.return_value.Pool = FakePool
+            return runner.run_settings(settings)
+
+    def test_skip_completed(self):
+        settings = self.sweep_setting.generate_setting()
+        self.save_results(self.make_runner(), settings)
+        # half written line of an interrupted run
+        with open(os.path.join(self.sweep_path, 'results.jsonl'), 'a', encoding='utf-8') as f:
+            f.write('{"key": "')
+
+        runner = self.make_runner()
+        self.assertEqual(len(runner.results), 3)
+        with mock.patch('multiprocessing.get_context') as get_context, \
+                mock.patch.object(runner, 'prepare_bars') as prepare_bars:
+            summaries = runner.run_settings(settings)
+        get_context.assert_not_called()
+        prepare_bars.assert_not_called()
+        self.assertEqual([s['params'] for s in summaries], settings)
+
+        df = runner.get_result_table()
+        self.assertEqual(df['para_a'].tolist(), [3, 2, 1])
+        self.assertNotIn('setting_key', df.columns)
+
+    def test_setting_changed(self):
+        settings = self.sweep_setting.generate_setting()
+        self.save_results(self.make_runner(), settings)
+
+        runner = self.make_runner(dict(self.test_setting, start_date='20200201'))
+        self.assertEqual(runner.results, {})
+
+        self.run_settings(runner, settings)
+        self.assertEqual(len(FakePool.jobs), 3)
+
+        with open(os.path.join(self.sweep_path, 'results.jsonl'), encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 6)
+
+    def test_retry_errors(self):
+        settings = self.sweep_setting.generate_setting()
+        self.save_results(self.make_runner(), settings, errors=[2])
+
+        # the errored backtest is not completed, run again on resume
+        runner = self.make_runner()
+        self.assertEqual(len(runner.results), 2)
+        summaries = self.run_settings(runner, settings)
+        self.assertEqual([job[1] for job in FakePool.jobs], [{'para_a': 2}])
+        self.assertEqual([s['net_capital'] for s in summaries], [1, 2, 3])
+        self.assertEqual(len(self.make_runner().results), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,7 @@
+from .test_ring_buffer import *
+from .test_stream_indicator import *
+from .test_tick_loader import *
+from .test_order_book import *
+from .test_position_queue import *
+from .test_state_store import *
+from .test_chan_window import *
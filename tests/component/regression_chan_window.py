@@ -0,0 +1,75 @@
+"""
+Regression of incremental chanlun calculation (ChanWindowGraph) against full ChanGraph calculation.
+
+Replays the bars of a csv file (datetime, high, low columns) one by one, keeping the
+last max_hold_bars bars like CtaLineBar, and compares fenxing / bi / zhongshu / duan
+of both calculations after each bar. Structures starting in the first skip bars of
+the cache are not compared: full calculation has no bars before them.
+Needs the chanlun extension (vnpy.component.chanlun).
+
+    python tests/component/regression_chan_window.py bars.csv --window 4
+    python tests/component/regression_chan_window.py bars.csv --max-hold-bars 1000 --skip 100
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from vnpy.component.chanlun import ChanGraph, ChanLibrary
+from vnpy.component.cta_chan_window import CHAN_LIST_NAMES, ChanWindowGraph, get_chan_key, get_chan_start
+
+
+def get_keys(items, first_index):
+    return [get_chan_key(item) for item in items if get_chan_start(item) >= first_index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="incremental chanlun regression")
+    parser.add_argument("csv_file", help="bar csv file with datetime, high, low columns")
+    parser.add_argument("--window", type=int, default=4, help="recalculate from the start of the nth last duan")
+    parser.add_argument("--max-hold-bars", type=int, default=2000, help="bars kept in cache")
+    parser.add_argument("--skip", type=int, default=200, help="bars at the start of the cache not compared")
+    parser.add_argument("--bi-style", type=int, default=2)
+    parser.add_argument("--duan-style", type=int, default=1)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv_file, parse_dates=["datetime"])
+    index = df["datetime"].dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+
+    chan_lib = ChanLibrary(bi_style=args.bi_style, duan_style=args.duan_style, debug=False)
+    chan = ChanWindowGraph(ChanGraph, chan_lib, window_duan=args.window)
+    full_cost = window_cost = 0
+    mismatches = {name: 0 for name in CHAN_LIST_NAMES}
+
+    for n in range(4, len(index) + 1):
+        start = max(0, n - args.max_hold_bars)
+        bar_index, bar_high, bar_low = index[start:n], high[start:n], low[start:n]
+
+        begin = time.perf_counter()
+        graph = ChanGraph(chan_lib=chan_lib, index=bar_index, high=bar_high, low=bar_low)
+        full_cost += time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        chan.update(bar_index, bar_high, bar_low)
+        window_cost += time.perf_counter() - begin
+
+        first_index = bar_index[min(args.skip, len(bar_index) - 1)] if start > 0 else bar_index[0]
+        for name in CHAN_LIST_NAMES:
+            if get_keys(getattr(graph, name), first_index) != get_keys(chan.lists[name], first_index):
+                if mismatches[name] == 0:
+                    print(f"{name} first mismatch at bar {index[n - 1]}")
+                mismatches[name] += 1
+
+    bars = len(index) - 3
+    print(f"bars={bars} window calculations={chan.window_count} full calculations={chan.full_count}")
+    print(f"full {full_cost / bars * 1e3:.3f} ms/bar, incremental {window_cost / bars * 1e3:.3f} ms/bar")
+    for name, count in mismatches.items():
+        print(f"{name:<20}{count:>10} mismatched bars")
+    return 1 if any(mismatches.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
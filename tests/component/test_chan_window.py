@@ -0,0 +1,96 @@
+"""
+Test incremental (window + splice) chanlun calculation against full calculation
+"""
+import random
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from vnpy.component.cta_chan_window import CHAN_LIST_NAMES, ChanWindowGraph, get_chan_key, get_chan_start
+
+
+class ToyGraph(object):
+    """
+    Simplified ChanGraph with local rules (the chanlun extension is not needed):
+    fenxing is the extreme of the 2 bars on each side (fewer at the right edge),
+    bi joins fenxing of opposite direction, duan / zhongshu are bi / duan over or under a height.
+    """
+
+    def __init__(self, chan_lib, index, high, low):
+        self.fenxing_list = []
+        for i in range(1, len(index)):
+            left = slice(max(0, i - 2), i)
+            right = slice(i + 1, i + 3)
+            if high[i] > max(high[left]) and (i + 1 == len(index) or high[i] >= max(high[right])):
+                direction = 1
+            elif low[i] < min(low[left]) and (i + 1 == len(index) or low[i] <= min(low[right])):
+                direction = -1
+            else:
+                continue
+            if self.fenxing_list and self.fenxing_list[-1].direction == direction:
+                continue
+            self.fenxing_list.append(SimpleNamespace(index=index[i], direction=direction, is_rt=i + 3 > len(index),
+                                                     high=high[i], low=low[i]))
+
+        self.bi_list = []
+        for pre, cur in zip(self.fenxing_list[:-1], self.fenxing_list[1:]):
+            high_price, low_price = (cur.high, pre.low) if cur.direction == 1 else (pre.high, cur.low)
+            self.bi_list.append(SimpleNamespace(start=pre.index, end=cur.index, direction=cur.direction,
+                                                high=high_price, low=low_price, height=high_price - low_price))
+        self.bi_zhongshu_list = [bi for bi in self.bi_list if bi.height < 4]
+        self.duan_list = [bi for bi in self.bi_list if bi.height > 8]
+        self.duan_zhongshu_list = [duan for duan in self.duan_list if duan.height > 12]
+
+
+def make_bars(count, seed=0):
+    rng = random.Random(seed)
+    index, high, low = [], [], []
+    price = 3500
+    for i in range(count):
+        price += rng.randint(-4, 4)
+        index.append((datetime(2021, 3, 1) + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S'))
+        high.append(price + rng.randint(0, 3))
+        low.append(price - rng.randint(0, 3))
+    return index, high, low
+
+
+class TestChanWindowGraph(unittest.TestCase):
+
+    def check_same(self, chan, index, high, low, skip=0):
+        """same structures as full calculation, except those starting in the first skip bars"""
+        full = ToyGraph(None, index, high, low)
+        for name in CHAN_LIST_NAMES:
+            expected = [get_chan_key(item) for item in getattr(full, name) if get_chan_start(item) >= index[skip]]
+            result = [get_chan_key(item) for item in chan.lists[name] if get_chan_start(item) >= index[skip]]
+            self.assertEqual(result, expected, name)
+
+    def test_growing_bars(self):
+        index, high, low = make_bars(600)
+        chan = ChanWindowGraph(ToyGraph, None, window_duan=3)
+        for n in range(5, len(index) + 1):
+            chan.update(index[:n], high[:n], low[:n])
+            self.check_same(chan, index[:n], high[:n], low[:n])
+        self.assertGreater(chan.window_count, chan.full_count * 4)
+
+    def test_sliding_window(self):
+        index, high, low = make_bars(800, seed=1)
+        chan = ChanWindowGraph(ToyGraph, None, window_duan=3)
+        for n in range(5, len(index) + 1):
+            start = max(0, n - 300)
+            chan.update(index[start:n], high[start:n], low[start:n])
+            self.assertGreaterEqual(get_chan_start(chan.lists['fenxing_list'][0]), index[start])
+            # structures at the start of the cache are calculated without left bars by full calculation
+            self.check_same(chan, index[start:n], high[start:n], low[start:n], skip=min(40, n - start - 1))
+        self.assertGreater(chan.window_count, chan.full_count)
+
+    def test_full_calculation(self):
+        index, high, low = make_bars(200)
+        chan = ChanWindowGraph(ToyGraph, None, window_duan=0)
+        for n in range(5, len(index) + 1):
+            chan.update(index[:n], high[:n], low[:n])
+        self.assertEqual(chan.window_count, 0)
+        self.check_same(chan, index, high, low)
+
+
+if __name__ == '__main__':
+    unittest.main()
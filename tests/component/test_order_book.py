@@ -0,0 +1,61 @@
+"""
+Test if OrderBookDict keeps its price index in sync with the dict
+"""
+import pickle
+import random
+import unittest
+from types import SimpleNamespace
+
+from vnpy.component.cta_order_book import OrderBookDict
+
+
+def make_order(vt_symbol, direction, price):
+    return SimpleNamespace(vt_symbol=vt_symbol, direction=direction, price=price)
+
+
+class TestOrderBook(unittest.TestCase):
+
+    def test_random_operations(self):
+        rnd = random.Random(3)
+        book, plain = OrderBookDict(), {}
+        for i in range(3000):
+            if plain and rnd.random() < 0.4:
+                key = rnd.choice(list(plain.keys()))
+                if rnd.random() < 0.5:
+                    self.assertIs(book.pop(key), plain.pop(key))
+                else:
+                    del book[key]
+                    del plain[key]
+            else:
+                order = make_order(rnd.choice(['a', 'b']), rnd.choice(['long', 'short']), rnd.randint(0, 50))
+                book[str(i)] = order
+                plain[str(i)] = order
+            low, high = sorted([rnd.randint(0, 50), rnd.randint(0, 50)])
+            for vt_symbol in ['a', 'b']:
+                for direction in ['long', 'short']:
+                    expected = [k for k, o in plain.items()
+                                if o.vt_symbol == vt_symbol and o.direction == direction and low <= o.price <= high]
+                    orders = book.get_orders(vt_symbol, direction, min_price=low, max_price=high)
+                    self.assertEqual(book.merge_orders(orders, []), expected)
+        self.assertEqual(list(book.keys()), list(plain.keys()))
+
+    def test_merge_in_order(self):
+        book = OrderBookDict()
+        book['1'] = make_order('a', 'long', 10)
+        book['2'] = make_order('a', 'short', 5)
+        book['3'] = make_order('a', 'long', 8)
+        keys = book.merge_orders(book.get_orders('a', 'long', min_price=8),
+                                 book.get_orders('a', 'short', max_price=5))
+        self.assertEqual(keys, ['1', '2', '3'])
+        self.assertEqual(book.get_orders('a', 'long', min_price=float('nan')), [])
+
+        copied = pickle.loads(pickle.dumps(book))
+        self.assertEqual(list(copied.keys()), ['1', '2', '3'])
+        self.assertEqual(len(copied.get_orders('a', 'long')), 2)
+
+        book.clear()
+        self.assertEqual(book.get_orders('a', 'long'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
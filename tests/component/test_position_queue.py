@@ -0,0 +1,45 @@
+"""
+Test if PositionQueue matches the old list-based FIFO position matching
+"""
+import random
+import unittest
+from types import SimpleNamespace
+
+from vnpy.component.cta_position_queue import PositionQueue
+
+
+class TestPositionQueue(unittest.TestCase):
+
+    def test_same_as_list(self):
+        rnd = random.Random(5)
+        queue, plain = PositionQueue(), []
+        for i in range(3000):
+            strategy_name, vt_symbol = rnd.choice(['s1', 's2']), rnd.choice(['a', 'b', 'c'])
+            if rnd.random() < 0.5:
+                trade = SimpleNamespace(strategy_name=strategy_name, vt_symbol=vt_symbol, volume=rnd.randint(1, 5))
+                queue.append(trade)
+                plain.append(trade)
+            else:
+                pop_indexs = [i for i, t in enumerate(plain)
+                              if t.vt_symbol == vt_symbol and t.strategy_name == strategy_name]
+                open_trade = queue.popleft(strategy_name, vt_symbol)
+                if not pop_indexs:
+                    self.assertIsNone(open_trade)
+                    continue
+                self.assertIs(open_trade, plain.pop(pop_indexs[0]))
+                # partially closed trades go back to the end of the queue
+                if open_trade.volume > 1 and rnd.random() < 0.5:
+                    open_trade.volume -= 1
+                    queue.append(open_trade)
+                    plain.append(open_trade)
+            self.assertEqual(len(queue), len(plain))
+        self.assertEqual(list(queue), plain)
+        self.assertEqual(queue.get_volumes('a'), [t.volume for t in plain if t.vt_symbol == 'a'])
+
+        queue.clear()
+        self.assertFalse(queue)
+        self.assertIsNone(queue.popleft('s1', 'a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Test if ring buffer series behave like the shifted numpy arrays / lists they replace
+"""
+import unittest
+
+import numpy as np
+
+from vnpy.component.cta_ring_buffer import RingArray, RingList
+
+
+class TestRingArray(unittest.TestCase):
+
+    def test_append(self):
+        size = 5
+        ring = RingArray(size)
+        shifted = np.zeros(size)
+        shifted[:] = np.nan
+        for i in range(23):
+            ring.append(i)
+            shifted[:-1] = shifted[1:]
+            shifted[-1] = i
+            np.testing.assert_array_equal(ring.array, shifted)
+        self.assertEqual(ring[-1], 22)
+        self.assertEqual(len(ring[-3:]), 3)
+
+    def test_from_array(self):
+        ring = RingArray.from_array(np.arange(4, dtype=float))
+        ring.append(4)
+        np.testing.assert_array_equal(ring.array, [1, 2, 3, 4])
+
+
+class TestRingList(unittest.TestCase):
+
+    def test_keep_len(self):
+        ring = RingList()
+        data = []
+        for i in range(100):
+            for seq in (ring, data):
+                seq.append(i)
+                if len(seq) > 10:
+                    del seq[0]
+            self.assertEqual(len(ring), len(data))
+            self.assertEqual(ring[-1], data[-1])
+            self.assertEqual(ring[0], data[0])
+            self.assertEqual(ring[-3:], data[-3:])
+            self.assertEqual(ring[2:5], data[2:5])
+            self.assertEqual(list(ring), data)
+            self.assertEqual(list(reversed(ring)), data[::-1])
+
+    def test_list_ops(self):
+        ring = RingList([1, 2, 3, 4])
+        self.assertEqual(ring.pop(0), 1)
+        self.assertEqual(ring.pop(), 4)
+        ring[0] = 5
+        self.assertEqual(ring, [5, 3])
+        self.assertEqual([0] + ring, [0, 5, 3])
+        self.assertIn(3, ring)
+        with self.assertRaises(IndexError):
+            ring[2]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+"""
+Test JournalStore snapshot + journal persistence and KlineCacheWriter
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+from vnpy.component.cta_state_store import (
+    FSYNC_ALWAYS,
+    FSYNC_BACKGROUND,
+    JournalStore,
+    KlineCacheWriter,
+    journal_syncer
+)
+from vnpy.trader.setting import SETTINGS
+from vnpy.trader.utility import load_data_from_pkb2
+
+
+class TestJournalStore(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.folder.name, 'test_Grids.json')
+        # fsync in the calling thread, no background syncer thread
+        self.settings = mock.patch.dict(SETTINGS, {'state_store.fsync': FSYNC_ALWAYS})
+        self.settings.start()
+
+    def tearDown(self):
+        self.settings.stop()
+        self.folder.cleanup()
+
+    def read_journal(self):
+        with open(self.file_name + '.journal', encoding='utf8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_first_save_writes_snapshot(self):
+        store = JournalStore(self.file_name)
+        data = {'up_grids': [], 'dn_grids': [{'id': '1', 'volume': 1}]}
+        store.save(data)
+        with open(self.file_name, encoding='utf8') as f:
+            self.assertEqual(json.load(f), data)
+        self.assertFalse(os.path.exists(store.journal_file))
+
+    def test_journal_replay(self):
+        store = JournalStore(self.file_name)
+        store.save({'up_grids': [], 'dn_grids': [], 'note': 'a'})
+
+        store = JournalStore(self.file_name)
+        data = store.load()
+        # unchanged saves do not write anything
+        self.assertEqual(store.save(data), 0)
+        self.assertFalse(os.path.exists(store.journal_file))
+
+        for i in range(5):
+            data['dn_grids'].append({'id': str(i), 'volume': i})
+            self.assertEqual(store.save(data), 1)
+        data.pop('note')
+        data['new_key'] = 1
+        self.assertEqual(store.save(data), 2)
+        self.assertTrue(os.path.exists(store.journal_file))
+
+        # snapshot is still the old one, journal holds the changes
+        with open(self.file_name, encoding='utf8') as f:
+            self.assertEqual(json.load(f)['dn_grids'], [])
+
+        loaded = JournalStore(self.file_name).load()
+        self.assertEqual(loaded, data)
+        self.assertEqual(list(loaded.keys()), ['up_grids', 'dn_grids', 'new_key'])
+        # journal has been compacted into the snapshot after loading
+        self.assertFalse(os.path.exists(store.journal_file))
+        with open(self.file_name, encoding='utf8') as f:
+            self.assertEqual(json.load(f), data)
+
+    def test_torn_journal_line(self):
+        store = JournalStore(self.file_name)
+        store.save({'a': 1})
+        store = JournalStore(self.file_name)
+        store.load()
+        store.save({'a': 2})
+        store.save({'a': 3})
+        # simulate a crash in the middle of the last record
+        with open(store.journal_file, 'rb+') as f:
+            f.truncate(os.path.getsize(store.journal_file) - 5)
+
+        errors = []
+        self.assertEqual(JournalStore(self.file_name, on_error=errors.append).load(), {'a': 2})
+        self.assertEqual(len(errors), 1)
+
+    def test_snapshot_replaced_externally(self):
+        store = JournalStore(self.file_name)
+        store.save({'a': 1})
+        store = JournalStore(self.file_name)
+        store.load()
+        store.save({'a': 2})
+
+        # another program rewrites the snapshot, the old journal is stale
+        with open(self.file_name, 'w', encoding='utf8') as f:
+            json.dump({'a': 100, 'b': 1}, f)
+
+        self.assertEqual(JournalStore(self.file_name).load(), {'a': 100, 'b': 1})
+        self.assertFalse(os.path.exists(store.journal_file))
+
+    def test_folder_copied(self):
+        store = JournalStore(self.file_name)
+        store.save({'a': 1})
+        store = JournalStore(self.file_name)
+        store.load()
+        store.save({'a': 2})
+
+        # copy without timestamps (e.g. restored from backup)
+        copied = os.path.join(self.folder.name, 'copied')
+        os.mkdir(copied)
+        for name in os.listdir(self.folder.name):
+            if name != 'copied':
+                shutil.copyfile(os.path.join(self.folder.name, name), os.path.join(copied, name))
+        self.assertEqual(JournalStore(os.path.join(copied, 'test_Grids.json')).load(), {'a': 2})
+
+    def test_legacy_journal_header(self):
+        store = JournalStore(self.file_name)
+        store.save({'a': 1})
+        stat = os.stat(self.file_name)
+        with open(store.journal_file, 'w', encoding='utf8') as f:
+            f.write(json.dumps({'snapshot': [stat.st_size, stat.st_mtime_ns]}) + '\n')
+            f.write(json.dumps({'set': {'a': 2}, 'del': []}) + '\n')
+        self.assertEqual(JournalStore(self.file_name).load(), {'a': 2})
+
+    def test_list_items(self):
+        grids = [{'id': str(i), 'volume': 0} for i in range(10)]
+        store = JournalStore(self.file_name)
+        store.save({'up_grids': [], 'dn_grids': grids})
+        store = JournalStore(self.file_name)
+        data = store.load()
+
+        # one grid changed: only this grid is journaled
+        data['dn_grids'][3]['volume'] = 1
+        self.assertEqual(store.save(data), 1)
+        self.assertEqual(self.read_journal()[-1]['items'], {'dn_grids': [10, {'3': {'id': '3', 'volume': 1}}]})
+
+        # appended and removed at the end
+        data['dn_grids'].append({'id': '10', 'volume': 0})
+        store.save(data)
+        self.assertEqual(self.read_journal()[-1]['items'], {'dn_grids': [11, {'10': {'id': '10', 'volume': 0}}]})
+        data['dn_grids'] = data['dn_grids'][:8]
+        store.save(data)
+        self.assertEqual(self.read_journal()[-1]['items'], {'dn_grids': [8, {}]})
+
+        # removed at the front: most items shift, whole list is journaled
+        data['dn_grids'].pop(0)
+        store.save(data)
+        self.assertEqual(len(self.read_journal()[-1]['set']['dn_grids']), 7)
+
+        self.assertEqual(store.get_changed_keys(data), [])
+        loaded = JournalStore(self.file_name).load()
+        self.assertEqual(loaded, data)
+
+    def test_background_fsync(self):
+        store = JournalStore(self.file_name, fsync=FSYNC_BACKGROUND)
+        store.save({'a': 1})
+        store.load()
+        store.save({'a': 2})
+        self.assertIn(store.journal_file, journal_syncer.pending)
+        thread = journal_syncer.thread
+        self.assertIsNotNone(thread)
+        # syncer thread exits when nothing is pending
+        thread.join()
+        self.assertEqual(journal_syncer.pending, set())
+        self.assertIsNone(journal_syncer.thread)
+        self.assertEqual(JournalStore(self.file_name).load(), {'a': 2})
+
+    def test_auto_compact(self):
+        store = JournalStore(self.file_name, compact_ratio=2, compact_min_size=1024)
+        store.save({'value': 0})
+        store = JournalStore(self.file_name, compact_ratio=2, compact_min_size=1024)
+        store.load()
+        for i in range(200):
+            store.save({'value': i, 'text': 'x' * 20})
+            self.assertLessEqual(store.journal_size, 1024 + 200)
+        self.assertEqual(JournalStore(self.file_name).load(), {'value': 199, 'text': 'x' * 20})
+
+    def test_no_tmp_files_left(self):
+        store = JournalStore(self.file_name)
+        store.save({'time': datetime(2020, 1, 1)})
+        store.compact()
+        self.assertEqual(sorted(os.listdir(self.folder.name)), ['test_Grids.json'])
+        self.assertEqual(JournalStore(self.file_name).load(), {'time': '2020-01-01 00:00:00'})
+
+
+class TestKlineCacheWriter(unittest.TestCase):
+
+    def test_skip_without_new_bar(self):
+        with tempfile.TemporaryDirectory() as folder:
+            file_name = os.path.join(folder, 's_klines.pkb2')
+            bars = [SimpleNamespace(datetime=datetime(2020, 1, 1, 9, i)) for i in range(3)]
+            kline = SimpleNamespace(line_bar=bars[:2], cur_price=1)
+            writer = KlineCacheWriter()
+
+            self.assertTrue(writer.save({'M1': kline}, file_name))
+            kline.cur_price = 2
+            self.assertFalse(writer.save({'M1': kline}, file_name))
+            self.assertEqual(load_data_from_pkb2(file_name)['M1'].cur_price, 1)
+
+            kline.line_bar.append(bars[2])
+            self.assertTrue(writer.save({'M1': kline}, file_name))
+            self.assertEqual(load_data_from_pkb2(file_name)['M1'].cur_price, 2)
+
+            # removed cache files are rewritten
+            os.remove(file_name)
+            self.assertTrue(writer.save({'M1': kline}, file_name))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Test if incremental indicator kernels match talib / pandas on the same windows
+"""
+import random
+import unittest
+
+import numpy as np
+import pandas as pd
+import talib as ta
+
+from vnpy.component.cta_stream_indicator import (
+    chained_ema,
+    RollingMean,
+    RollingStd,
+    RollingExtreme,
+    WindowSmoother,
+    WindowAtr,
+    WindowRsi,
+    Macd,
+    WindowMacd,
+)
+
+
+def make_prices(n=300, seed=7):
+    rnd = random.Random(seed)
+    close, high, low = [], [], []
+    price = 3000.0
+    for _ in range(n):
+        price = round(price + rnd.gauss(0, 5))
+        close.append(price)
+        high.append(price + rnd.randint(0, 5))
+        low.append(price - rnd.randint(0, 5))
+    return np.array(high, dtype=float), np.array(low, dtype=float), np.array(close, dtype=float)
+
+
+class TestStreamIndicator(unittest.TestCase):
+
+    def setUp(self):
+        self.high, self.low, self.close = make_prices()
+
+    def test_rolling_mean_std(self):
+        mean, std = RollingMean(20), RollingStd(20)
+        sample_std = RollingStd(40, ddof=1)
+        for i, c in enumerate(self.close):
+            self.assertAlmostEqual(mean.peek(c), np.mean(self.close[max(0, i - 19):i + 1]), places=6)
+            mean.update(c)
+            std.update(c)
+            sample_std.update(c)
+            if i >= 19:
+                self.assertAlmostEqual(std.value[1], np.std(self.close[i - 19:i + 1]), places=6)
+            if i >= 39:
+                self.assertAlmostEqual(sample_std.value[1], np.std(self.close[i - 39:i + 1], ddof=1), places=6)
+
+    def test_window_ema(self):
+        period, window = 7, 28
+        ema = WindowSmoother(period, window)
+        for i, c in enumerate(self.close):
+            ema.update(c)
+            if i >= window:
+                expected = ta.EMA(self.close[i + 1 - window:i + 1], period)[-1]
+                self.assertAlmostEqual(ema.value, expected, places=6)
+
+    def test_window_atr_rsi(self):
+        period, window = 14, 28
+        atr, rsi = WindowAtr(period, window), WindowRsi(period, window)
+        for i in range(len(self.close)):
+            atr.update(self.high[i], self.low[i], self.close[i])
+            rsi.update(self.close[i])
+            if i >= window:
+                s = slice(i + 1 - window, i + 1)
+                self.assertAlmostEqual(atr.value, ta.ATR(self.high[s], self.low[s], self.close[s], period)[-1],
+                                       places=6)
+                self.assertAlmostEqual(rsi.value, ta.RSI(self.close[s], period)[-1], places=6)
+
+    def test_macd(self):
+        macd = Macd(12, 26, 9)
+        window_macd = WindowMacd(12, 26, 9, 36)
+        for i, c in enumerate(self.close):
+            macd.update(c)
+            if i >= 36:
+                rt_dif, rt_dea, rt_macd = window_macd.peek(c)
+                dif, dea, bar = ta.MACD(self.close[i - 35:i + 1], 12, 26, 9)
+                self.assertAlmostEqual(rt_dif, dif[-1], places=6)
+                self.assertAlmostEqual(rt_macd, bar[-1], places=6)
+            window_macd.update(c)
+        dif, dea, bar = ta.MACD(self.close, 12, 26, 9)
+        for value, expected in zip(macd.value, (dif[-1], dea[-1], bar[-1])):
+            self.assertAlmostEqual(value, expected, places=6)
+
+    def test_rolling_extreme(self):
+        hhv, llv = RollingExtreme(9), RollingExtreme(9, is_max=False)
+        for i in range(len(self.close)):
+            if i >= 8:
+                self.assertEqual(hhv.peek(self.high[i]), max(self.high[i - 8:i + 1]))
+                self.assertEqual(llv.peek(self.low[i]), min(self.low[i - 8:i + 1]))
+            hhv.update(self.high[i])
+            llv.update(self.low[i])
+            self.assertEqual(hhv.value, max(self.high[max(0, i - 8):i + 1]))
+            self.assertEqual(llv.value, min(self.low[max(0, i - 8):i + 1]))
+
+    def test_chained_ema(self):
+        data = self.close[-30:]
+        expected = data
+        for span in (3, 2, 2):
+            expected = pd.Series(expected).ewm(span=span, adjust=False).mean().values
+        self.assertAlmostEqual(chained_ema(data, (3, 2, 2)), expected[-1], places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
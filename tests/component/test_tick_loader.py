@@ -0,0 +1,65 @@
+"""
+Test if DayTickLoader prefetches days in order within its budget
+"""
+import threading
+import time
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+from vnpy.component.cta_tick_loader import DayTickLoader, get_test_days
+
+
+class TestTickLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.days = get_test_days(datetime(2020, 1, 1), datetime(2020, 1, 15))
+        self.loaded = []
+
+    def load(self, day):
+        self.loaded.append(day)
+        time.sleep(0.01)
+        if day.day == 3:
+            return None
+        return pd.DataFrame({'price': [float(day.day)] * 1000})
+
+    def test_test_days(self):
+        self.assertEqual(len(self.days), 10)
+        self.assertTrue(all(d.isoweekday() <= 5 for d in self.days))
+        days = get_test_days(datetime(2020, 1, 1), datetime(2020, 1, 15), {'20200102', '20200106', '20200111'})
+        self.assertEqual(days, [datetime(2020, 1, 2), datetime(2020, 1, 6)])
+
+    def test_prefetch_order(self):
+        for prefetch_days in (0, 1, 3):
+            result = [(day, None if df is None else df['price'][0])
+                      for day, df in DayTickLoader(self.load, self.days, prefetch_days=prefetch_days)]
+            expected = [(day, None if day.day == 3 else float(day.day)) for day in self.days]
+            self.assertEqual(result, expected)
+
+    def test_budget_and_stop(self):
+        loader = DayTickLoader(self.load, self.days, prefetch_days=5, max_memory_mb=0.001)
+        for day, df in loader:
+            time.sleep(0.05)
+            # budget fits one day: at most one queued day and one waiting to be queued
+            self.assertLessEqual(len(self.loaded), self.days.index(day) + 3)
+            if day.day == 7:
+                break
+        self.assertIsNone(loader.thread)
+        self.assertEqual(threading.active_count(), 1)
+
+    def test_error(self):
+        def load(day):
+            if day.day == 6:
+                raise ValueError('bad day')
+            return None
+
+        days = []
+        with self.assertRaises(ValueError):
+            for day, df in DayTickLoader(load, self.days):
+                days.append(day)
+        self.assertEqual(days, self.days[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
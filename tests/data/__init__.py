@@ -0,0 +1 @@
+from .test_tick_cache import *
@@ -0,0 +1,76 @@
+"""
+Test if the columnar tick cache round-trips tdx transaction lists and old .pkb2 files
+"""
+import bz2
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from vnpy.data.tick_cache import (
+    CODECS,
+    TICK_CACHE_SUFFIX,
+    save_tick_cache,
+    load_tick_cache_df,
+    load_tick_cache_list,
+    read_tick_cache_header,
+    get_cache_file,
+    convert_pickle_cache_folder,
+)
+
+
+def make_ticks(n=500):
+    start = datetime(2020, 1, 2, 21, 0, 0)
+    return [{'datetime': start + timedelta(seconds=i),
+             'time': (start + timedelta(seconds=i)).strftime('%H:%M'),
+             'price': 3000.0 + i % 7,
+             'volume': i % 13,
+             'buyorsell': i % 2,
+             'trading_date': '2020-01-03'} for i in range(n)]
+
+
+class TestTickCache(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.ticks = make_ticks()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_round_trip(self):
+        for codec in CODECS:
+            file_path = os.path.join(self.folder, f'rb2005_20200103_{codec}{TICK_CACHE_SUFFIX}')
+            save_tick_cache(file_path, self.ticks, symbol='rb2005', trading_day='20200103', codec=codec)
+            header = read_tick_cache_header(file_path)
+            self.assertEqual(header['rows'], len(self.ticks))
+            self.assertEqual(header['symbol'], 'rb2005')
+            self.assertEqual(load_tick_cache_list(file_path), self.ticks)
+            pd.testing.assert_frame_equal(load_tick_cache_df(file_path), pd.DataFrame(self.ticks),
+                                          check_dtype=False)
+
+    def test_empty(self):
+        file_path = os.path.join(self.folder, f'empty{TICK_CACHE_SUFFIX}')
+        save_tick_cache(file_path, pd.DataFrame({'price': []}))
+        self.assertEqual(len(load_tick_cache_df(file_path)), 0)
+
+    def test_convert_pickle(self):
+        month_folder = os.path.join(self.folder, '202001')
+        os.makedirs(month_folder)
+        with bz2.BZ2File(os.path.join(month_folder, 'rb2005_20200103.pkb2'), 'wb') as f:
+            pickle.dump(self.ticks, f)
+        self.assertTrue(get_cache_file(self.folder, 'rb2005', '20200103').endswith('.pkb2'))
+        self.assertEqual(convert_pickle_cache_folder(self.folder), 1)
+        cache_file = get_cache_file(self.folder, 'rb2005', '20200103')
+        self.assertTrue(cache_file.endswith(TICK_CACHE_SUFFIX))
+        self.assertEqual(load_tick_cache_list(cache_file), self.ticks)
+        self.assertEqual(read_tick_cache_header(cache_file)['trading_day'], '20200103')
+        self.assertEqual(convert_pickle_cache_folder(self.folder), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
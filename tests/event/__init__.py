@@ -0,0 +1,3 @@
+from .test_sharded_engine import *
+from .test_conflation import *
+from .test_profiler import *
@@ -0,0 +1,79 @@
+"""
+Test latest-value (conflating) handlers of EventEngine
+"""
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from vnpy.event import Event, EventEngine, ShardedEventEngine
+
+
+def tick_event(vt_symbol, n):
+    return Event("eTick.", SimpleNamespace(vt_symbol=vt_symbol, n=n))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline and not condition():
+        time.sleep(0.01)
+
+
+class TestLatestValueHandler(unittest.TestCase):
+
+    def check_engine(self, engine):
+        release = threading.Event()
+        strict, latest = [], []
+
+        def on_tick_strict(event):
+            strict.append((event.data.vt_symbol, event.data.n))
+
+        def on_tick_latest(event):
+            # slow consumer: blocks until all ticks have been put
+            release.wait(5)
+            latest.append((event.data.vt_symbol, event.data.n))
+
+        engine.register("eTick.", on_tick_strict)
+        latest_handler = engine.register_latest("eTick.", on_tick_latest)
+        engine.start()
+        try:
+            engine.put(tick_event("a", -1))
+            wait_for(lambda: len(strict) == 1)
+            for i in range(100):
+                engine.put(tick_event("a", i))
+                engine.put(tick_event("b", i))
+            wait_for(lambda: len(strict) == 201)
+            release.set()
+            wait_for(lambda: latest_handler.processed_count == len(latest) and not latest_handler.latest
+                     and ("a", 99) in latest and ("b", 99) in latest)
+        finally:
+            engine.stop()
+
+        # strict handler receives every tick
+        self.assertEqual(len(strict), 201)
+        # latest-value handler only receives the newest tick of each symbol once it falls behind
+        self.assertEqual(latest, [("a", -1), ("a", 99), ("b", 99)])
+        metrics = engine.get_latest_metrics()[0]
+        self.assertEqual(metrics["received"], 201)
+        self.assertEqual(metrics["processed"], 3)
+        self.assertEqual(metrics["conflated"], 198)
+        self.assertEqual(latest_handler.conflated_counts, {"a": 99, "b": 99})
+
+    def test_event_engine(self):
+        self.check_engine(EventEngine())
+
+    def test_sharded_event_engine(self):
+        self.check_engine(ShardedEventEngine(tick_lanes=1))
+
+    def test_unregister(self):
+        engine = EventEngine()
+        handler = lambda event: None  # noqa
+        latest_handler = engine.register_latest("eTick.", handler)
+        self.assertIn(latest_handler, engine._handlers["eTick."])
+        engine.unregister_latest("eTick.", handler)
+        self.assertNotIn("eTick.", engine._handlers)
+        self.assertEqual(engine.get_latest_metrics(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Test EventEngine latency profiler
+"""
+import csv
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from vnpy.event import Event, EventEngine, EVENT_PROFILE
+from vnpy.event.profiler import LatencyHistogram
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        for us in [3] * 90 + [150] * 9 + [3000]:
+            histogram.add(us * 1000)
+        d = histogram.to_dict()
+        self.assertEqual(d["count"], 100)
+        self.assertEqual(d["p50_us"], 5)
+        self.assertEqual(d["p90_us"], 5)
+        self.assertEqual(d["p99_us"], 200)
+        self.assertEqual(d["max_us"], 3000)
+        self.assertEqual(d["buckets"], {"5": 90, "200": 9, "5000": 1})
+
+
+class TestEventProfiler(unittest.TestCase):
+
+    def test_profiling(self):
+        folder = tempfile.TemporaryDirectory()
+        csv_file = os.path.join(folder.name, "profile.csv")
+        json_file = os.path.join(folder.name, "profile.json")
+
+        engine = EventEngine(interval=1)
+        snapshots = []
+
+        def slow_handler(event):
+            time.sleep(0.002)
+
+        def fast_handler(event):
+            pass
+
+        engine.register("eTest", slow_handler)
+        engine.register("eTest", fast_handler)
+        engine.register(EVENT_PROFILE, lambda event: snapshots.append(event.data))
+        engine.enable_profiling(interval=1, csv_file=csv_file, json_file=json_file)
+        engine.start()
+        try:
+            for i in range(20):
+                engine.put(Event("eTest", i))
+            deadline = time.time() + 5
+            while time.time() < deadline and not snapshots:
+                time.sleep(0.05)
+        finally:
+            engine.stop()
+
+        self.assertTrue(snapshots)
+        rows = {(r["kind"], r["type"], r["handler"]): r for r in snapshots[0]}
+        slow = rows[("handler", "eTest", "TestEventProfiler.test_profiling.<locals>.slow_handler")]
+        fast = rows[("handler", "eTest", "TestEventProfiler.test_profiling.<locals>.fast_handler")]
+        self.assertEqual(slow["count"], 20)
+        self.assertGreaterEqual(slow["mean_us"], 2000)
+        self.assertLess(fast["mean_us"], slow["mean_us"])
+        event_row = rows[("event", "eTest", "")]
+        self.assertEqual(event_row["count"], 20)
+        # events queue up behind the slow handler
+        self.assertGreater(event_row["max_us"], 10000)
+
+        # json file holds the latest snapshot
+        with open(json_file, encoding="utf8") as f:
+            self.assertEqual(set(json.load(f)[0].keys()), set(snapshots[0][0].keys()))
+        with open(csv_file, encoding="utf8") as f:
+            self.assertTrue(any(r["type"] == "eTest" for r in csv.DictReader(f)))
+
+        engine.disable_profiling()
+        self.assertEqual(engine.get_profile_snapshot(), [])
+        folder.cleanup()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Test ShardedEventEngine routing, ordering and tick lane policies
+"""
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from vnpy.event import Event, ShardedEventEngine
+from vnpy.event.sharded import EventLane, POLICY_COALESCE, POLICY_DROP_NEWEST, POLICY_DROP_OLDEST
+
+
+def tick_event(vt_symbol, n):
+    return Event("eTick.", SimpleNamespace(vt_symbol=vt_symbol, n=n))
+
+
+class TestEventLane(unittest.TestCase):
+
+    def get_all(self, lane):
+        events = []
+        while lane.queue:
+            events.append(lane.get())
+        return events
+
+    def test_drop_policies(self):
+        lane = EventLane("t", maxsize=3, policy=POLICY_DROP_OLDEST)
+        for i in range(5):
+            lane.put(tick_event("a", i))
+        self.assertEqual([e.data.n for e in self.get_all(lane)], [2, 3, 4])
+        self.assertEqual(lane.dropped_count, 2)
+
+        lane = EventLane("t", maxsize=3, policy=POLICY_DROP_NEWEST)
+        for i in range(5):
+            lane.put(tick_event("a", i))
+        self.assertEqual([e.data.n for e in self.get_all(lane)], [0, 1, 2])
+
+    def test_coalesce(self):
+        lane = EventLane("t", maxsize=10, policy=POLICY_COALESCE)
+        for i in range(3):
+            lane.put(tick_event("a", i), key="a")
+            lane.put(tick_event("b", i), key="b")
+        # the latest tick of each symbol, in the order the symbols were queued
+        self.assertEqual([(e.data.vt_symbol, e.data.n) for e in self.get_all(lane)], [("a", 2), ("b", 2)])
+        self.assertEqual(lane.coalesced_count, 4)
+
+        # once dispatched, a new tick is queued again
+        lane.put(tick_event("a", 3), key="a")
+        self.assertEqual(lane.get().data.n, 3)
+
+
+class TestShardedEventEngine(unittest.TestCase):
+
+    def test_routing_and_ordering(self):
+        engine = ShardedEventEngine(tick_lanes=3)
+        received = {}
+        threads = {}
+        lock = threading.Lock()
+
+        def on_tick(event):
+            with lock:
+                received.setdefault(event.data.vt_symbol, []).append(event.data.n)
+                threads.setdefault(("tick", event.data.vt_symbol), set()).add(threading.current_thread().name)
+
+        def on_order(event):
+            with lock:
+                received.setdefault("order", []).append(event.data)
+                threads.setdefault("order", set()).add(threading.current_thread().name)
+
+        engine.register("eTick.", on_tick)
+        engine.register("eOrder.", on_order)
+        engine.start()
+        try:
+            symbols = ["a.SHFE", "b.DCE", "c.CZCE", "d.CFFEX"]
+            for i in range(200):
+                for vt_symbol in symbols:
+                    engine.put(tick_event(vt_symbol, i))
+                engine.put(Event("eOrder.", i))
+
+            deadline = time.time() + 5
+            while time.time() < deadline and sum(m["processed"] for m in engine.get_metrics()) < 1000:
+                time.sleep(0.01)
+        finally:
+            engine.stop()
+
+        for vt_symbol in symbols:
+            self.assertEqual(received[vt_symbol], list(range(200)))
+            self.assertEqual(len(threads[("tick", vt_symbol)]), 1)
+        self.assertEqual(received["order"], list(range(200)))
+        self.assertEqual(threads["order"], {"EventLane_priority"})
+        depths = engine.get_queue_depths()
+        self.assertEqual(depths["priority"], 0)
+        self.assertEqual(sum(depths[f"tick_{i}"] for i in range(3)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
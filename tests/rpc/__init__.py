@@ -0,0 +1,2 @@
+from .test_event_codec import *
+from .test_rpc import *
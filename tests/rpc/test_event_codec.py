@@ -0,0 +1,129 @@
+"""
+Test rpc event codec and topic-filtered publishing
+"""
+import queue
+import time
+import unittest
+from datetime import datetime
+
+import zmq
+
+from vnpy.event import Event
+from vnpy.rpc import PUB_CODECS, PickleCodec, RpcClient, RpcServer, get_codec
+from vnpy.rpc.event_codec import EventCodec
+from vnpy.trader.constant import Direction, Exchange, Offset, Status
+from vnpy.trader.event import EVENT_ACCOUNT, EVENT_LOG, EVENT_ORDER, EVENT_TICK
+from vnpy.trader.object import AccountData, LogData, OrderData, TickData
+
+
+def make_tick(symbol, price):
+    tick = TickData(gateway_name='CTP', symbol=symbol, exchange=Exchange.SHFE,
+                    datetime=datetime(2021, 3, 1, 9, 0, 0, 500000), trading_day='2021-03-01')
+    tick.last_price = price
+    tick.bid_price_1 = price - 1
+    return tick
+
+
+class QueueClient(RpcClient):
+
+    def __init__(self):
+        super().__init__()
+        self.queue = queue.Queue()
+
+    def callback(self, topic, data):
+        self.queue.put((topic, data))
+
+
+class TestEventCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = EventCodec()
+
+    def test_registered(self):
+        self.assertIs(get_codec(b'E'), PUB_CODECS[b'E'])
+        self.assertIsInstance(get_codec(b'P'), PickleCodec)
+
+    def test_tick_event(self):
+        event = Event(EVENT_TICK, make_tick('rb2105', 3500))
+        result = self.codec.decode('', self.codec.encode('', event))
+        self.assertEqual(result.type, EVENT_TICK)
+        self.assertIsInstance(result.data, TickData)
+        self.assertEqual(result.data.__dict__, event.data.__dict__)
+
+        events = [Event(EVENT_TICK, make_tick('rb2105', 3500 + i)) for i in range(5)]
+        results = self.codec.decode_batch('', self.codec.encode_batch('', events))
+        self.assertEqual([e.data.last_price for e in results], [3500 + i for i in range(5)])
+
+    def test_object_events(self):
+        order = OrderData(gateway_name='CTP', symbol='rb2105', exchange=Exchange.SHFE, orderid='1',
+                          direction=Direction.LONG, offset=Offset.OPEN, price=3500, volume=2,
+                          status=Status.NOTTRADED, datetime=datetime(2021, 3, 1, 9, 0))
+        order.vt_orderid = 'RPC.1'
+        result = self.codec.decode('', self.codec.encode('', Event(EVENT_ORDER, order)))
+        self.assertEqual(result.type, EVENT_ORDER)
+        self.assertIsInstance(result.data, OrderData)
+        self.assertEqual(result.data.__dict__, order.__dict__)
+
+        account = AccountData(gateway_name='CTP', accountid='001', balance=100, frozen=10)
+        account.available = 50
+        result = self.codec.decode('', self.codec.encode('', Event(EVENT_ACCOUNT, account)))
+        self.assertEqual(result.data.__dict__, account.__dict__)
+
+        # objects with extra attributes and other payloads fall back to pickle
+        account.extra = 1
+        self.assertEqual(self.codec.decode('', self.codec.encode('', Event(EVENT_ACCOUNT, account))).data.extra, 1)
+        log = LogData(gateway_name='CTP', msg='hello')
+        self.assertEqual(self.codec.decode('', self.codec.encode('', Event(EVENT_LOG, log))).data.msg, 'hello')
+        self.assertEqual(self.codec.decode('', self.codec.encode('', [1, 'a'])), [1, 'a'])
+
+        mixed = [Event(EVENT_TICK, make_tick('rb2105', 1)), Event(EVENT_ORDER, order)]
+        results = self.codec.decode_batch('', self.codec.encode_batch('', mixed))
+        self.assertEqual([e.type for e in results], [EVENT_TICK, EVENT_ORDER])
+
+
+class TestTopicPublish(unittest.TestCase):
+
+    def setUp(self):
+        self.server = RpcServer()
+        self.server.set_publish(codec='E', batch_interval=0.05)
+        self.server.start('tcp://127.0.0.1:*', 'tcp://127.0.0.1:*')
+        time.sleep(0.1)
+        self.pub_address = self.server._RpcServer__socket_pub.getsockopt_string(zmq.LAST_ENDPOINT)
+        self.rep_address = self.server._RpcServer__socket_rep.getsockopt_string(zmq.LAST_ENDPOINT)
+        self.client = QueueClient()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        self.server.join()
+        self.server = None
+
+    def start_client(self, *topics):
+        for topic in topics:
+            self.client.subscribe_topic(topic)
+        self.client.start(self.rep_address, self.pub_address)
+        # wait for the subscription to reach the publisher
+        time.sleep(0.3)
+
+    def test_topic_filter_and_batch(self):
+        self.start_client(f'{EVENT_TICK}rb2105.SHFE', EVENT_ORDER)
+        for i in range(3):
+            for symbol in ['rb2105', 'hc2105']:
+                tick = make_tick(symbol, 3500 + i)
+                self.server.publish(f'{EVENT_TICK}{tick.vt_symbol}', Event(EVENT_TICK, tick), batch=True)
+        order = OrderData(gateway_name='CTP', symbol='hc2105', exchange=Exchange.SHFE, orderid='1')
+        self.server.publish(f'{EVENT_ORDER}{order.vt_symbol}', Event(EVENT_ORDER, order))
+
+        results = [self.client.queue.get(timeout=2) for _ in range(4)]
+        time.sleep(0.2)
+        self.assertTrue(self.client.queue.empty())
+
+        # the order is sent at once, the ticks after the batch interval
+        self.assertEqual(results[0][0], f'{EVENT_ORDER}hc2105.SHFE')
+        ticks = [event.data for topic, event in results[1:]]
+        self.assertEqual([t.vt_symbol for t in ticks], ['rb2105.SHFE'] * 3)
+        self.assertEqual([t.last_price for t in ticks], [3500, 3501, 3502])
+
+
+if __name__ == '__main__':
+    unittest.main()
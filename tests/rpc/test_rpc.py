@@ -0,0 +1,105 @@
+"""
+Test concurrent ROUTER/DEALER rpc transport
+"""
+import threading
+import time
+import unittest
+from concurrent.futures import TimeoutError
+
+import zmq
+
+from vnpy.rpc import RemoteException, RpcClient, RpcServer
+
+
+class TestClient(RpcClient):
+
+    def callback(self, topic, data):
+        pass
+
+
+class TestRpc(unittest.TestCase):
+
+    def setUp(self):
+        self.event = threading.Event()
+        self.server = RpcServer(worker_count=2, fast_functions=['send_order'])
+        self.server.register(self.add)
+        self.server.register(self.slow_query)
+        self.server.register(self.send_order)
+        self.server.register(self.fail)
+
+        self.server.start('tcp://127.0.0.1:*', 'tcp://127.0.0.1:*')
+        time.sleep(0.1)
+        rep_address = self.get_endpoint('_RpcServer__socket_rep')
+        pub_address = self.get_endpoint('_RpcServer__socket_pub')
+        self.client = TestClient()
+        self.client.start(rep_address, pub_address)
+        self.rep_address = rep_address
+
+    def tearDown(self):
+        self.event.set()
+        self.client.close()
+        self.server.stop()
+        self.server.join()
+        # the server holds bound methods of the test case, release it before the next test
+        self.server = None
+
+    def get_endpoint(self, name):
+        return getattr(self.server, name).getsockopt_string(zmq.LAST_ENDPOINT)
+
+    def add(self, a, b=0):
+        return a + b
+
+    def slow_query(self):
+        self.event.wait(5)
+        return 'slow'
+
+    def send_order(self, price):
+        return f'order_{price}'
+
+    def fail(self):
+        raise ValueError('bad request')
+
+    def test_blocking_call(self):
+        self.assertEqual(self.client.add(1, b=2), 3)
+        with self.assertRaises(RemoteException) as cm:
+            self.client.fail()
+        self.assertIn('bad request', str(cm.exception))
+
+    def test_slow_call_does_not_block_orders(self):
+        slow_future = self.client.call_async('slow_query')
+        # both the fast lane and the other worker answer while slow_query is running
+        self.assertEqual(self.client.call_timeout('send_order', 2, 100), 'order_100')
+        self.assertEqual(self.client.call_timeout('add', 2, 1, 1), 2)
+        self.assertFalse(slow_future.done())
+        self.event.set()
+        self.assertEqual(slow_future.result(2), 'slow')
+
+    def test_pipelined_futures(self):
+        futures = [self.client.call_async('add', i, 1) for i in range(100)]
+        self.assertEqual([f.result(5) for f in futures], [i + 1 for i in range(100)])
+
+    def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            self.client.call_timeout('slow_query', 0.1)
+        self.event.set()
+        # the late reply is discarded and later calls still match their own replies
+        self.assertEqual(self.client.add(2, 3), 5)
+
+    def test_req_client_compatible(self):
+        context = zmq.Context()
+        socket = context.socket(zmq.REQ)
+        socket.connect(self.rep_address)
+        socket.send_pyobj(['add', (4, 5), {}])
+        self.assertTrue(socket.poll(2000))
+        self.assertEqual(socket.recv_pyobj(), [True, 9])
+        socket.close(linger=0)
+        context.term()
+
+    def test_stopped_client(self):
+        self.client.close()
+        with self.assertRaises(ConnectionError):
+            self.client.add(1, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,2 +1,4 @@
 from .test_database import *
 from .test_settings import *
+from .test_bar_loader import *
+from .test_append_log import *
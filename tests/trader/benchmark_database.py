@@ -0,0 +1,116 @@
+"""
+Throughput benchmark for database save paths.
+
+Compares saving rows one by one (the old behaviour: one upsert per bar/tick)
+against the batched bulk upsert and the streaming save_*_stream variant.
+
+    python tests/trader/benchmark_database.py --rows 20000
+    python tests/trader/benchmark_database.py --driver mongodb --database bench --host localhost --port 27017
+    python tests/trader/benchmark_database.py --driver postgresql --database bench --user postgres --port 5432
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData, TickData
+
+os.environ["VNPY_TESTING"] = "1"
+
+SYMBOL = "benchmark_symbol"
+
+
+def gen_bars(count: int, volume: float = 1):
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        yield BarData(
+            gateway_name="DB",
+            symbol=SYMBOL,
+            exchange=Exchange.SHFE,
+            datetime=start + timedelta(minutes=i),
+            interval=Interval.MINUTE,
+            volume=volume + i,
+            open_price=100 + i % 10,
+            high_price=101 + i % 10,
+            low_price=99 + i % 10,
+            close_price=100 + i % 7,
+        )
+
+
+def gen_ticks(count: int, volume: float = 1):
+    start = datetime(2020, 1, 1)
+    for i in range(count):
+        yield TickData(
+            gateway_name="DB",
+            symbol=SYMBOL,
+            exchange=Exchange.SHFE,
+            datetime=start + timedelta(milliseconds=500 * i),
+            name=SYMBOL,
+            volume=volume + i,
+            last_price=100 + i % 10,
+            bid_price_1=99 + i % 10,
+            ask_price_1=101 + i % 10,
+            bid_volume_1=10,
+            ask_volume_1=10,
+        )
+
+
+def run(name: str, func, rows: int):
+    start = time.perf_counter()
+    func()
+    cost = time.perf_counter() - start
+    print(f"{name:<28}{rows:>10}{cost:>12.3f}{rows / cost:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="database save throughput benchmark")
+    parser.add_argument("--driver", default="sqlite")
+    parser.add_argument("--database", default="benchmark_db.db")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--user", default="")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--authentication_source", default="admin")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--single_rows", type=int, default=2000, help="rows for the one-by-one baseline")
+    parser.add_argument("--batch_size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from vnpy.trader.database.initialize import init
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("rows", "single_rows")}
+    manager = init(settings)
+    manager.clean(SYMBOL)
+
+    print(f"driver={args.driver} batch_size={args.batch_size}")
+    print(f"{'case':<28}{'rows':>10}{'seconds':>12}{'rows/s':>14}")
+
+    def save_one_by_one(datas, save_func):
+        for d in datas:
+            save_func([d])
+
+    try:
+        run("bar one by one",
+            lambda: save_one_by_one(gen_bars(args.single_rows), manager.save_bar_data),
+            args.single_rows)
+        manager.clean(SYMBOL)
+        run("bar bulk insert", lambda: manager.save_bar_data(list(gen_bars(args.rows))), args.rows)
+        run("bar bulk upsert", lambda: manager.save_bar_data(list(gen_bars(args.rows, 10))), args.rows)
+        manager.clean(SYMBOL)
+        run("bar stream", lambda: manager.save_bar_data_stream(gen_bars(args.rows)), args.rows)
+
+        run("tick one by one",
+            lambda: save_one_by_one(gen_ticks(args.single_rows), manager.save_tick_data),
+            args.single_rows)
+        manager.clean(SYMBOL)
+        run("tick bulk insert", lambda: manager.save_tick_data(list(gen_ticks(args.rows))), args.rows)
+        run("tick bulk upsert", lambda: manager.save_tick_data(list(gen_ticks(args.rows, 10))), args.rows)
+        manager.clean(SYMBOL)
+        run("tick stream", lambda: manager.save_tick_data_stream(gen_ticks(args.rows)), args.rows)
+    finally:
+        manager.clean(SYMBOL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Test csv append-log service and reverse tail reading
+"""
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from vnpy.trader.util_append_log import AppendLogService, get_append_log_service, get_last_line_dt, read_last_line
+from vnpy.trader.utility import append_data, get_csv_last_dt
+
+
+class TestAppendLog(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.folder.name, 'bi.csv')
+        self.service = AppendLogService(flush_rows=10, flush_interval=60, max_open=2)
+
+    def tearDown(self):
+        self.service.stop()
+        self.folder.cleanup()
+
+    def read_rows(self, file_name=None):
+        with open(file_name or self.file_name, encoding='utf8', newline='') as f:
+            return list(csv.DictReader(f))
+
+    def test_read_last_line(self):
+        self.assertEqual(read_last_line(self.file_name), '')
+        long_value = 'x' * 10000
+        with open(self.file_name, 'w', encoding='utf8') as f:
+            f.write('datetime,value\n2021-01-04 09:00:00,1\n')
+            f.write(f'2021-01-04 09:01:00,{long_value}\n\n')
+        self.assertEqual(read_last_line(self.file_name, block_size=64), f'2021-01-04 09:01:00,{long_value}')
+        self.assertEqual(get_last_line_dt(self.file_name), datetime(2021, 1, 4, 9, 1))
+        self.assertEqual(get_csv_last_dt(self.file_name), datetime(2021, 1, 4, 9, 1))
+
+    def test_batched_flush_and_order_check(self):
+        start = datetime(2021, 1, 4, 9, 0)
+        fields = ['datetime', 'price']
+        for i in range(2):
+            self.service.append(self.file_name, {'datetime': start + timedelta(minutes=i), 'price': i}, fields,
+                                dt_field='datetime')
+        # header + 2 rows are still buffered
+        self.assertEqual(os.path.getsize(self.file_name), 0)
+        self.service.flush_file(self.file_name)
+        self.assertEqual(len(self.read_rows()), 2)
+
+        # rows older than the last written one are skipped
+        self.assertFalse(self.service.append(self.file_name, {'datetime': start, 'price': -1}, fields,
+                                             dt_field='datetime'))
+        rows = [{'datetime': start + timedelta(minutes=i), 'price': i} for i in range(2, 5)]
+        self.assertEqual(self.service.append_rows(self.file_name, rows, fields, dt_field='datetime'), 3)
+        self.assertEqual(self.service.get_last_dt(self.file_name), start + timedelta(minutes=4))
+        self.service.close_all()
+        self.assertEqual([r['price'] for r in self.read_rows()], ['0', '1', '2', '3', '4'])
+
+        # a new service recovers the last time from the file
+        service = AppendLogService()
+        self.assertFalse(service.append(self.file_name, {'datetime': start, 'price': -1}, fields,
+                                        dt_field='datetime'))
+        self.assertEqual(service.get_last_dt(self.file_name), start + timedelta(minutes=4))
+        service.stop()
+        self.assertEqual(len(self.read_rows()), 5)
+
+    def test_max_open_files(self):
+        files = [os.path.join(self.folder.name, f'{i}.csv') for i in range(3)]
+        for file_name in files:
+            self.service.append(file_name, {'a': 1})
+        self.assertEqual(len(self.service.writers), 2)
+        # the least recently used file was closed and flushed
+        self.assertEqual(self.read_rows(files[0]), [{'a': '1'}])
+
+    def test_utility_append_data(self):
+        # written and closed on every call, not buffered by the service
+        append_data(self.file_name, {'b': 2, 'a': 1})
+        self.assertEqual(self.read_rows(), [{'a': '1', 'b': '2'}])
+        append_data(self.file_name, {'b': 4, 'a': 3})
+        self.assertEqual(self.read_rows(), [{'a': '1', 'b': '2'}, {'a': '3', 'b': '4'}])
+        self.assertEqual(get_append_log_service().get_last_dt(self.file_name), None)
+        self.assertEqual(get_csv_last_dt(self.file_name), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Test cached bar csv loading
+"""
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from vnpy.trader import util_bar_loader
+from vnpy.trader.constant import Exchange
+from vnpy.trader.util_bar_loader import CACHE_FOLDER_NAME, clear_memory_cache, load_bar_df
+from vnpy.trader.utility import get_bars
+
+HEADER = "datetime,open,high,low,close,volume,open_interest,symbol,trading_day\n"
+
+
+def write_csv(file_name, start, count):
+    with open(file_name, 'w', encoding='utf8') as f:
+        f.write(HEADER)
+        for i in range(count):
+            dt = start + timedelta(minutes=i)
+            f.write(f"{dt.strftime('%Y-%m-%d %H:%M:%S')},{i},{i + 2},{i - 1},{i + 1},{i * 10},100,rb99,"
+                    f"{dt.strftime('%Y-%m-%d')}\n")
+
+
+class TestBarLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.csv_file = os.path.join(self.folder.name, 'RB99_1m.csv')
+        write_csv(self.csv_file, datetime(2021, 1, 4, 9, 0), 3000)
+        clear_memory_cache()
+
+    def tearDown(self):
+        clear_memory_cache()
+        self.folder.cleanup()
+
+    def test_slice_matches_loc(self):
+        df = load_bar_df(self.csv_file, start='2021-01-05', end='2021-01-05')
+        self.assertEqual(df.index[0], datetime(2021, 1, 5))
+        self.assertEqual(df.index[-1], datetime(2021, 1, 5, 23, 59))
+        self.assertEqual(df['symbol'].iloc[0], 'rb99')
+
+        df = load_bar_df(self.csv_file, start=datetime(2021, 1, 4, 9, 10), end=datetime(2021, 1, 4, 9, 19))
+        self.assertEqual(len(df), 10)
+        self.assertEqual(df['close'].tolist(), [float(i + 1) for i in range(10, 20)])
+
+        # returned frames are copies
+        df['close'] = 0
+        self.assertEqual(load_bar_df(self.csv_file)['close'].iloc[10], 11)
+
+    def test_cache_file_and_invalidation(self):
+        load_bar_df(self.csv_file)
+        cache_folder = os.path.join(self.folder.name, CACHE_FOLDER_NAME)
+        self.assertEqual(len(os.listdir(cache_folder)), 1)
+
+        # the sidecar is used instead of parsing the csv again
+        clear_memory_cache()
+        parse = util_bar_loader.parse_bar_csv
+        util_bar_loader.parse_bar_csv = None
+        try:
+            self.assertEqual(len(load_bar_df(self.csv_file)), 3000)
+        finally:
+            util_bar_loader.parse_bar_csv = parse
+
+        # a rewritten csv is parsed again and replaces the old sidecar
+        time.sleep(0.01)
+        write_csv(self.csv_file, datetime(2021, 2, 1, 9, 0), 5)
+        self.assertEqual(len(load_bar_df(self.csv_file)), 5)
+        self.assertEqual(len(os.listdir(cache_folder)), 1)
+
+    def test_cache_per_data_types(self):
+        cache_folder = os.path.join(self.folder.name, CACHE_FOLDER_NAME)
+        data_types = dict(util_bar_loader.BAR_DATA_TYPES, volume=str)
+        load_bar_df(self.csv_file)
+        load_bar_df(self.csv_file, data_types)
+        self.assertEqual(len(os.listdir(cache_folder)), 2)
+
+        # callers with different data types do not evict each other
+        clear_memory_cache()
+        parse = util_bar_loader.parse_bar_csv
+        util_bar_loader.parse_bar_csv = None
+        try:
+            self.assertEqual(load_bar_df(self.csv_file)['volume'].iloc[1], 10)
+            self.assertEqual(load_bar_df(self.csv_file, data_types)['volume'].iloc[1], '10')
+        finally:
+            util_bar_loader.parse_bar_csv = parse
+
+        # both are stale after the csv is rewritten
+        time.sleep(0.01)
+        write_csv(self.csv_file, datetime(2021, 2, 1, 9, 0), 5)
+        self.assertEqual(len(load_bar_df(self.csv_file)), 5)
+        self.assertEqual(len(os.listdir(cache_folder)), 1)
+
+    def test_get_bars(self):
+        bars = get_bars(self.csv_file, 'RB99', Exchange.SHFE,
+                        start_date=datetime(2021, 1, 4, 9, 1), end_date=datetime(2021, 1, 4, 9, 3))
+        self.assertEqual(len(bars), 3)
+        bar = bars[0]
+        self.assertEqual(bar.datetime, datetime(2021, 1, 4, 9, 1))
+        self.assertIsInstance(bar.datetime, datetime)
+        self.assertEqual(bar.open_price, 1)
+        self.assertEqual(bar.high_price, 3)
+        self.assertEqual(bar.volume, 10)
+        self.assertEqual(bar.trading_day, '2021-01-04')
+        self.assertEqual(bar.vt_symbol, 'RB99.SHFE')
+
+
+if __name__ == '__main__':
+    unittest.main()
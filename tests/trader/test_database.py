@@ -192,6 +192,51 @@ class TestDatabase(unittest.TestCase):
                 got = self.manager.get_newest_tick_data(tick.symbol, tick.exchange)
                 self.assertEqual(got.volume, newer_one.volume, "the newest tick we got mismatched")
 
+    def test_save_bar_stream(self):
+        for driver, settings in profiles.items():
+            with self.subTest(driver=driver, settings=settings):
+                self.connect(settings)
+                start = now() - timedelta(hours=1)
+
+                def gen_bars(volume):
+                    for i in range(25):
+                        b = copy(bar)
+                        b.datetime = start + timedelta(minutes=i)
+                        b.volume = volume + i
+                        yield b
+
+                count = self.manager.save_bar_data_stream(gen_bars(1), batch_size=10)
+                self.assertEqual(count, 25)
+                self.assertBarCount(25, "all bars in the stream should be saved")
+
+                # upsert in batches
+                self.manager.save_bar_data_stream(gen_bars(100), batch_size=7)
+                self.assertBarCount(25, "bars should be updated, not duplicated")
+                got = self.manager.get_newest_bar_data(bar.symbol, bar.exchange, bar.interval)
+                self.assertEqual(got.volume, 124)
+
+    def test_save_tick_batch_mixed_depth(self):
+        for driver, settings in profiles.items():
+            with self.subTest(driver=driver, settings=settings):
+                self.connect(settings)
+                self.manager.batch_size = 4
+                start = now() - timedelta(hours=1)
+                ticks = []
+                for i in range(10):
+                    t = copy(tick)
+                    t.datetime = start + timedelta(seconds=i)
+                    t.volume = i
+                    # only later ticks have level 2 quotes
+                    if i >= 5:
+                        t.bid_price_2 = 10.0 + i
+                    ticks.append(t)
+                self.manager.save_tick_data(ticks)
+                self.assertTickCount(10, "all ticks should be saved")
+
+                got = self.manager.get_newest_tick_data(tick.symbol, tick.exchange)
+                self.assertEqual(got.volume, 9)
+                self.assertEqual(got.bid_price_2, 19.0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -7,6 +7,15 @@ import traceback
 from threading import Thread
 from uuid import uuid1
 from vnpy.amqp.base import base_broker
+from vnpy.amqp.tick_codec import (
+    FORMAT_JSON,
+    FORMAT_BINARY,
+    CONTENT_TYPE_TICK,
+    TICK_VERSION,
+    MAX_BATCH_SIZE,
+    encode_ticks,
+    tick_to_json
+)
 
 
 #  模式1：发送者
@@ -147,12 +156,14 @@ class publisher(base_broker):
                                       durable=False,
                                       auto_delete=False)
 
-    def pub(self, text, routing_key=None):
+    def pub(self, text, routing_key=None, content_type=None):
         # channel.basic_publish向队列中发送信息
         # exchange -- 它使我们能够确切地指定消息应该到哪个队列去。
         # routing_key 指定向哪个队列中发送消息
         # body是要插入的内容, 字符串格式
-        content_type = 'application/json' if isinstance(text, dict) else 'text/plain'
+        # content_type 消息格式，接收端根据它解码
+        if content_type is None:
+            content_type = 'application/json' if isinstance(text, dict) else 'text/plain'
         if routing_key is None:
             routing_key = self.routing_key
         try:
@@ -172,6 +183,23 @@ class publisher(base_broker):
                                                                                    delivery_mode=1))
             except Exception as ex:
                 print(f're pub ex:{ex}')
+
+    def pub_ticks(self, ticks, tick_format=FORMAT_JSON, routing_key=None):
+        """
+        发布多个tick
+        :param ticks: [TickData]
+        :param tick_format: FORMAT_BINARY: 每条消息包含多个tick的二进制格式
+                            FORMAT_JSON: 每个tick一条json消息(兼容旧的订阅端)
+        """
+        if tick_format == FORMAT_BINARY:
+            for i in range(0, len(ticks), MAX_BATCH_SIZE):
+                self.pub(encode_ticks(ticks[i:i + MAX_BATCH_SIZE]),
+                         routing_key=routing_key,
+                         content_type=f'{CONTENT_TYPE_TICK};v={TICK_VERSION}')
+        else:
+            for tick in ticks:
+                self.pub(tick_to_json(tick), routing_key=routing_key)
+
     def exit(self):
         self.connection.close()
 
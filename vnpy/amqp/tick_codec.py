@@ -0,0 +1,137 @@
+# encoding: UTF-8
+# tick的消息编码
+# 原来tick以json字符串发布：字段名全称、时间为字符串，发布/接收两端都要格式化、解析，消息体积也较大。
+# 二进制格式(content_type = application/x-vnpy-tick)：
+#   消息头: 'VT' + 版本号(1字节) + 保留(1字节) + tick数量(2字节)，一条消息可以包含多个tick
+#   每个tick: 时间(int64, 1970-01-01起的纳秒，不含时区) + 固定顺序的30个数值字段(double)
+#            + 字符串字段(symbol, exchange, gateway_name, trading_day, name，长度2字节 + utf8)
+# json格式(content_type = application/json)保持原来的字段和时间格式，旧的订阅端可以继续使用。
+# 接收端根据消息的content_type解码，直接生成TickData
+
+import json
+import struct
+from copy import copy
+from datetime import datetime, timedelta
+from typing import List
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+from vnpy.trader.utility import get_trading_date
+
+FORMAT_JSON = 'json'
+FORMAT_BINARY = 'binary'
+
+CONTENT_TYPE_JSON = 'application/json'
+CONTENT_TYPE_TICK = 'application/x-vnpy-tick'
+
+TICK_MAGIC = b'VT'
+TICK_VERSION = 1
+
+# 批量发布时，一条消息最多包含的tick数量
+MAX_BATCH_SIZE = 1000
+
+# 数值字段，顺序即编码顺序，只能在末尾追加并升级版本号
+NUMBER_FIELDS = [
+    'volume', 'open_interest', 'last_price', 'last_volume', 'limit_up', 'limit_down',
+    'open_price', 'high_price', 'low_price', 'pre_close',
+    'bid_price_1', 'bid_price_2', 'bid_price_3', 'bid_price_4', 'bid_price_5',
+    'ask_price_1', 'ask_price_2', 'ask_price_3', 'ask_price_4', 'ask_price_5',
+    'bid_volume_1', 'bid_volume_2', 'bid_volume_3', 'bid_volume_4', 'bid_volume_5',
+    'ask_volume_1', 'ask_volume_2', 'ask_volume_3', 'ask_volume_4', 'ask_volume_5',
+]
+STRING_FIELDS = ['symbol', 'exchange', 'gateway_name', 'trading_day', 'name']
+
+HEADER_STRUCT = struct.Struct('<2sBBH')
+NUMBER_STRUCT = struct.Struct('<q%dd' % len(NUMBER_FIELDS))
+LENGTH_STRUCT = struct.Struct('<H')
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def datetime_to_ns(dt: datetime) -> int:
+    """时间 => 纳秒(按本地时间，不做时区转换)"""
+    return (dt.replace(tzinfo=None) - EPOCH) // ONE_MICROSECOND * 1000
+
+
+def ns_to_datetime(ns: int) -> datetime:
+    return EPOCH + timedelta(microseconds=ns // 1000)
+
+
+def tick_to_dict(tick: TickData) -> dict:
+    """tick => 可json序列化的dict(与原来发布的json格式一致)"""
+    d = copy(tick.__dict__)
+    # 时间 =》 字符串
+    if isinstance(tick.datetime, datetime):
+        d.update({'datetime': tick.datetime.strftime('%Y-%m-%d %H:%M:%S.%f')})
+    # 变量 => 字符串
+    d.update({'exchange': tick.exchange.value})
+    return d
+
+
+def tick_to_json(tick: TickData) -> str:
+    return json.dumps(tick_to_dict(tick))
+
+
+def encode_ticks(ticks: List[TickData]) -> bytes:
+    """多个tick => 二进制消息"""
+    if len(ticks) > 0xFFFF:
+        raise ValueError(f'一条消息最多{0xFFFF}个tick,当前:{len(ticks)}')
+
+    parts = [HEADER_STRUCT.pack(TICK_MAGIC, TICK_VERSION, 0, len(ticks))]
+    for tick in ticks:
+        d = tick.__dict__
+        parts.append(NUMBER_STRUCT.pack(
+            datetime_to_ns(tick.datetime),
+            *[float(d.get(k) or 0) for k in NUMBER_FIELDS]))
+        for k in STRING_FIELDS:
+            value = d.get(k) or ''
+            if isinstance(value, Exchange):
+                value = value.value
+            b = value.encode('utf-8')
+            parts.append(LENGTH_STRUCT.pack(len(b)))
+            parts.append(b)
+    return b''.join(parts)
+
+
+def decode_ticks(body: bytes, gateway_name: str = None) -> List[TickData]:
+    """
+    二进制消息 => 多个tick
+    :param gateway_name: 不为空时，替换tick的gateway_name
+    """
+    magic, version, _, count = HEADER_STRUCT.unpack_from(body, 0)
+    if magic != TICK_MAGIC:
+        raise ValueError(f'不是tick消息:{body[:2]}')
+    if version != TICK_VERSION:
+        raise ValueError(f'不支持的tick消息版本:{version}')
+
+    pos = HEADER_STRUCT.size
+    ticks = []
+    for _ in range(count):
+        values = NUMBER_STRUCT.unpack_from(body, pos)
+        pos += NUMBER_STRUCT.size
+        strings = []
+        for _k in STRING_FIELDS:
+            length, = LENGTH_STRUCT.unpack_from(body, pos)
+            pos += LENGTH_STRUCT.size
+            strings.append(body[pos:pos + length].decode('utf-8'))
+            pos += length
+        symbol, exchange, tick_gateway_name, trading_day, name = strings
+
+        dt = ns_to_datetime(values[0])
+        tick = TickData(gateway_name=gateway_name or tick_gateway_name,
+                        symbol=symbol,
+                        exchange=Exchange(exchange),
+                        datetime=dt,
+                        date=dt.strftime('%Y-%m-%d'),
+                        time=dt.strftime('%H:%M:%S.%f'),
+                        trading_day=trading_day or get_trading_date(dt),
+                        name=name)
+        tick.__dict__.update(zip(NUMBER_FIELDS, values[1:]))
+        ticks.append(tick)
+    return ticks
+
+
+def is_binary_tick(content_type: str) -> bool:
+    """消息的content_type是否为二进制tick"""
+    return bool(content_type) and content_type.split(';')[0].strip() == CONTENT_TYPE_TICK
@@ -0,0 +1,464 @@
+"""
+基于asyncio的RestClient
+RestClient 每个客户端创建 cpu_count * 20 个线程的线程池，每个流式请求一个线程，限流由各个gateway自行处理。
+AsyncRestClient:
+    所有客户端共享一个事件循环线程(vnpy.trader.util_async)，请求不占用线程；
+    每个客户端一个aiohttp会话，按主机保持长连接(keep-alive)连接池；
+    令牌桶限流，可以按接口设置权重，可以设置多个限流(如 请求权重/分钟、委托数/秒)；
+    相同的查询请求(缺省GET)仍在执行时，后续的相同请求不再发送，共用第一个请求的结果；
+    add_request(callback=...)等接口与RestClient一致，gateway把父类换成AsyncRestClient即可。
+回调在事件循环线程中执行，不能长时间阻塞；回调中不能调用同步的 request()。
+"""
+import asyncio
+import json
+import sys
+import uuid
+from concurrent.futures import Future
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import aiohttp
+
+from vnpy.trader.util_async import run_coroutine
+
+from .rest_client import (
+    CALLBACK_TYPE,
+    CONNECTED_TYPE,
+    ON_ERROR_TYPE,
+    ON_FAILED_TYPE,
+    Request,
+    RequestStatus,
+    RestClient
+)
+
+
+class TokenBucket(object):
+    """
+    令牌桶限流
+    每秒补充rate个令牌，最多累计capacity个；请求按权重消耗令牌，令牌不足时等待
+    如 1200权重/分钟: TokenBucket(rate=20, capacity=1200)
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity else rate
+        self.tokens = self.capacity
+        self.last_time = monotonic()
+
+    def refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+        self.last_time = now
+
+    def try_acquire(self, weight: float = 1) -> float:
+        """
+        尝试消耗令牌
+        :return: 0: 成功；>0: 令牌不足，需要等待的秒数
+        """
+        weight = min(weight, self.capacity)
+        self.refill()
+        if self.tokens >= weight:
+            self.tokens -= weight
+            return 0
+        return (weight - self.tokens) / self.rate
+
+    async def acquire(self, weight: float = 1) -> None:
+        """消耗令牌，不足时等待(在事件循环线程中调用)"""
+        while True:
+            wait = self.try_acquire(weight)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class RateLimit(object):
+    """按接口权重的限流"""
+
+    def __init__(self, bucket: TokenBucket, weights: Dict[str, float] = None, default_weight: float = 1):
+        """
+        :param weights: 接口权重，key为 "METHOD path" 或 path，权重为0的接口不受限制
+        :param default_weight: 未设置权重的接口的权重
+        """
+        self.bucket = bucket
+        self.weights = weights or {}
+        self.default_weight = default_weight
+
+    def get_weight(self, method: str, path: str) -> float:
+        weight = self.weights.get(f"{method} {path}", None)
+        if weight is None:
+            weight = self.weights.get(path, self.default_weight)
+        return weight
+
+
+class AsyncResponse(object):
+    """
+    请求的应答，提供与requests.Response相同的常用属性
+    """
+
+    def __init__(self, status_code: int, headers: Any, content: bytes, url: str = "", encoding: str = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncRestClient(RestClient):
+    """
+    asyncio的RestClient
+
+    * Reimplement sign function to add signature function.
+    * Reimplement on_failed function to handle Non-2xx responses.
+    * Reimplement on_error function to handle exception msg.
+    * Use add_rate_limit to limit request rate.
+    """
+
+    def __init__(self):
+        """"""
+        super().__init__()
+
+        self.proxy: Optional[str] = None
+
+        # 连接池: 连接总数上限，每个主机的连接数上限，空闲连接保持时间(秒)
+        self.pool_size: int = 100
+        self.pool_size_per_host: int = 20
+        self.keepalive_timeout: float = 30
+        # 请求超时时间(秒)
+        self.timeout: float = 30
+
+        # 合并进行中的相同请求的请求方式
+        self.coalesce_methods: Set[str] = {"GET"}
+
+        self.rate_limits: Dict[str, RateLimit] = {}
+
+        # 以下只在事件循环线程中使用
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[Tuple, List[Request]] = {}
+
+        self._futures_lock = Lock()
+        self._futures: Set[Future] = set()
+
+    def init(self,
+             url_base: str,
+             proxy_host: str = "",
+             proxy_port: int = 0,
+             log_path: Optional[str] = None,
+             ):
+        """"""
+        super().init(url_base, proxy_host, proxy_port, log_path)
+        if proxy_host and proxy_port:
+            self.proxy = f"http://{proxy_host}:{proxy_port}"
+
+    def add_rate_limit(
+        self,
+        name: str,
+        rate: float,
+        capacity: float = None,
+        weights: Dict[str, float] = None,
+        default_weight: float = 1
+    ) -> None:
+        """
+        增加限流，请求需要同时满足所有的限流
+        :param name: 限流名称，如 "weight", "order"
+        :param rate: 每秒补充的令牌数
+        :param capacity: 令牌上限(可突发的请求权重)，缺省为rate
+        :param weights: 接口权重，key为 "METHOD path" 或 path，如 {"POST /api/v3/order": 1}
+        :param default_weight: 未设置权重的接口的权重，0: 只限制weights中的接口
+        """
+        self.rate_limits[name] = RateLimit(TokenBucket(rate, capacity), weights, default_weight)
+
+    def start(self, n: int = 3):
+        """
+        Start rest client.
+        """
+        if self._active:
+            return
+        self._active = True
+
+    def stop(self):
+        """
+        Stop rest client, close connections.
+        """
+        self._active = False
+        if self._session is not None:
+            run_coroutine(self._close_session())
+
+    def join(self):
+        """
+        Wait till all requests are processed.
+        """
+        with self._futures_lock:
+            futures = list(self._futures)
+        for future in futures:
+            try:
+                future.result()
+            except Exception:  # noqa
+                pass
+
+    async def _close_session(self):
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        """aiohttp会话(在事件循环线程中调用)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def _submit(self, coro) -> Future:
+        future = run_coroutine(coro)
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(self._remove_future)
+        return future
+
+    def _remove_future(self, future: Future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    def add_streaming_request(
+        self,
+        method: str,
+        path: str,
+        callback: CALLBACK_TYPE,
+        params: dict = None,
+        data: Union[dict, str, bytes] = None,
+        headers: dict = None,
+        on_connected: CONNECTED_TYPE = None,
+        on_failed: ON_FAILED_TYPE = None,
+        on_error: ON_ERROR_TYPE = None,
+        extra: Any = None,
+    ):
+        """
+        See add_request for usage.
+        """
+        request = Request(
+            method=method,
+            path=path,
+            params=params,
+            data=data,
+            headers=headers,
+            callback=callback,
+            on_failed=on_failed,
+            on_error=on_error,
+            extra=extra,
+            client=self,
+            stream=True,
+            on_connected=on_connected,
+        )
+        self._submit(self._process_async_request(request))
+        return request
+
+    def add_request(
+        self,
+        method: str,
+        path: str,
+        callback: CALLBACK_TYPE,
+        params: dict = None,
+        data: Union[dict, str, bytes] = None,
+        headers: dict = None,
+        cookies: dict = None,
+        on_failed: ON_FAILED_TYPE = None,
+        on_error: ON_ERROR_TYPE = None,
+        extra: Any = None,
+    ):
+        """
+        Add a new request.
+        See RestClient.add_request for usage.
+        """
+        request = Request(
+            method=method,
+            path=path,
+            params=params,
+            data=data,
+            headers=headers,
+            cookies=cookies,
+            callback=callback,
+            on_failed=on_failed,
+            on_error=on_error,
+            extra=extra,
+            client=self,
+        )
+        self._submit(self._run_request(request))
+        return request
+
+    def get_coalesce_key(self, request: Request) -> Optional[Tuple]:
+        """
+        相同请求的key(签名之前)，返回None时不合并
+        """
+        if request.stream or request.method.upper() not in self.coalesce_methods:
+            return None
+        return (
+            request.method.upper(),
+            request.path,
+            repr(sorted(request.params.items())) if isinstance(request.params, dict) else repr(request.params),
+            repr(request.data),
+            repr(sorted(request.headers.items())) if isinstance(request.headers, dict) else repr(request.headers),
+        )
+
+    async def _run_request(self, request: Request):
+        """执行请求，合并进行中的相同请求"""
+        key = self.get_coalesce_key(request)
+        if key is not None:
+            followers = self._inflight.get(key, None)
+            if followers is not None:
+                followers.append(request)
+                return
+            self._inflight[key] = []
+
+        leader = request
+        try:
+            leader = await self._process_async_request(request)
+        finally:
+            followers = self._inflight.pop(key, []) if key is not None else []
+
+        for follower in followers:
+            self._replay(leader, follower)
+
+    def _replay(self, leader: Request, follower: Request):
+        """使用相同请求的结果处理请求"""
+        follower.response = leader.response
+        try:
+            # 请求出错时没有应答；第一个请求的回调出错不影响后续的请求
+            if leader.response is None:
+                exc_info = getattr(leader, "exc_info", None) or (None, None, None)
+                follower.status = RequestStatus.error
+                if follower.on_error:
+                    follower.on_error(*exc_info, follower)
+                else:
+                    self.on_error(*exc_info, follower)
+            elif leader.response.status_code // 100 == 2:
+                self._process_json_body(leader.json_body, follower)
+            else:
+                follower.status = RequestStatus.failed
+                if follower.on_failed:
+                    follower.on_failed(leader.response.status_code, follower)
+                else:
+                    self.on_failed(leader.response.status_code, follower)
+        except Exception:
+            follower.status = RequestStatus.error
+            t, v, tb = sys.exc_info()
+            if follower.on_error:
+                follower.on_error(t, v, tb, follower)
+            else:
+                self.on_error(t, v, tb, follower)
+
+    async def _acquire(self, request: Request):
+        """限流"""
+        method = request.method.upper()
+        for rate_limit in self.rate_limits.values():
+            weight = rate_limit.get_weight(method, request.path)
+            if weight > 0:
+                await rate_limit.bucket.acquire(weight)
+
+    @staticmethod
+    def _convert_params(params: Any) -> Any:
+        """与requests一致: 忽略None，bool转为字符串"""
+        if not isinstance(params, dict):
+            return params
+        return {k: (str(v) if isinstance(v, bool) else v) for k, v in params.items() if v is not None}
+
+    async def _process_async_request(self, request: Request) -> Request:
+        """
+        Sending request to server and get result.
+        """
+        try:
+            await self._acquire(request)
+
+            request = self.sign(request)
+            if request.path.startswith('http'):
+                url = request.path
+            else:
+                url = self.make_full_url(request.path)
+
+            # send request
+            uid = uuid.uuid4() if self.logger else None
+            self._log("[%s] sending request %s %s, headers:%s, params:%s, data:%s",
+                      uid, request.method, url,
+                      request.headers, request.params, request.data)
+
+            kwargs = {}
+            if request.stream:
+                # 流式请求不限制总时间
+                kwargs["timeout"] = aiohttp.ClientTimeout(total=None)
+
+            session = self._get_async_session()
+            async with session.request(
+                request.method,
+                url,
+                headers=request.headers,
+                params=self._convert_params(request.params),
+                data=request.data,
+                cookies=request.cookies,
+                proxy=self.proxy,
+                **kwargs
+            ) as resp:
+                status_code = resp.status
+                if resp.cookies:
+                    self.cookies.update({k: v.value for k, v in resp.cookies.items()})
+
+                if not request.stream:
+                    content = await resp.read()
+                    response = AsyncResponse(status_code, resp.headers, content, url, resp.charset)
+                    request.response = response
+                    self._log("[%s] received response from %s:%s", uid, request.method, url)
+
+                    # check result & call corresponding callbacks
+                    if status_code // 100 == 2:  # 2xx codes are all successful
+                        if status_code == 204:
+                            json_body = None
+                        else:
+                            try:
+                                json_body = response.json()
+                            except Exception:  # noqa
+                                json_body = response.text
+                        request.json_body = json_body
+                        self._process_json_body(json_body, request)
+                    else:
+                        request.status = RequestStatus.failed
+                        if request.on_failed:
+                            request.on_failed(status_code, request)
+                        else:
+                            self.on_failed(status_code, request)
+                else:  # streaming API:
+                    request.response = AsyncResponse(status_code, resp.headers, b"", url, resp.charset)
+                    if request.on_connected:
+                        request.on_connected(request)
+                    # split response by lines, and call one callback for each line.
+                    async for line in resp.content:
+                        line = line.strip()
+                        if line:
+                            request.processing_line = line
+                            json_body = json.loads(line)
+                            self._process_json_body(json_body, request)
+                    request.status = RequestStatus.success
+        except Exception:
+            request.status = RequestStatus.error
+            t, v, tb = sys.exc_info()
+            request.exc_info = (t, v, tb)
+            if request.on_error:
+                request.on_error(t, v, tb, request)
+            else:
+                self.on_error(t, v, tb, request)
+        return request
@@ -1,6 +1,7 @@
 import json
 import logging
 import multiprocessing
+import multiprocessing.pool
 import os
 import sys
 import traceback
@@ -26,7 +27,19 @@ class RequestStatus(Enum):
     error = 3  # Exception raised
 
 
-pool: multiprocessing.pool.Pool = Pool(os.cpu_count() * 20)
+# windows下使用的线程池，首次使用时创建
+pool: multiprocessing.pool.Pool = None
+pool_lock = Lock()
+
+
+def get_pool() -> multiprocessing.pool.Pool:
+    global pool
+    if pool is None:
+        with pool_lock:
+            if pool is None:
+                pool = Pool(os.cpu_count() * 20)
+    return pool
+
 
 CALLBACK_TYPE = Callable[[dict, "Request"], Any]
 ON_FAILED_TYPE = Callable[[int, "Request"], Any]
@@ -291,7 +304,7 @@ class RestClient(object):
             client=self,
         )
         if str(platform.system()) == 'Windows':
-            task = pool.apply_async(
+            task = get_pool().apply_async(
                 self._process_request,
                 args=[request, ],
                 callback=self._clean_finished_tasks,
@@ -0,0 +1,381 @@
+"""
+基于asyncio的WebsocketClient
+WebsocketClient 每个连接一个接收线程、一个ping线程，每条消息都 json.loads、截取保存最后收到的文本、调用日志。
+AsyncWebsocketClient:
+    所有连接在共享的事件循环线程(vnpy.trader.util_async)中多路复用，ping使用websocket心跳，不再创建线程；
+    json解码可替换(缺省依次使用已安装的 orjson、ujson、json)；
+    on_raw_data: 解码之前处理原始数据(如深度行情只解析需要的部分)，返回True时不再解码；
+    日志只在logger开启DEBUG时调用，最后收到的数据只保存引用，出错时才截取；
+    每个连接统计消息数量、字节数、解码/处理耗时、交易所推送延时，WebsocketHub.get_metrics() 汇总所有连接。
+接口与WebsocketClient一致，gateway把父类换成AsyncWebsocketClient即可。
+回调在事件循环线程中执行，不能长时间阻塞。
+"""
+import asyncio
+import gzip
+import json
+import logging
+import sys
+from threading import Lock
+from time import perf_counter, time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import aiohttp
+
+from vnpy.trader.util_async import get_event_loop, in_loop_thread, run_coroutine
+
+from .websocket_client import WebsocketClient
+
+
+def get_fast_json_loads() -> Callable[[Union[str, bytes]], Any]:
+    """已安装的最快的json解码"""
+    try:
+        import orjson
+        return orjson.loads
+    except ImportError:
+        pass
+    try:
+        import ujson
+        return ujson.loads
+    except ImportError:
+        pass
+    return json.loads
+
+
+class ConnectionStats(object):
+    """单个连接的统计"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.connect_count = 0
+        self.recv_count = 0
+        self.recv_bytes = 0
+        self.raw_count = 0              # on_raw_data处理的消息数量
+        self.decode_time = 0.0          # 解码累计耗时(秒)
+        self.handle_time = 0.0          # on_packet累计耗时(秒)
+        self.max_handle_time = 0.0
+        self.last_recv_time = 0.0
+        self.latency_count = 0          # 交易所推送延时(秒)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+        # 上次get_metrics时的数量，用于计算频率
+        self.last_metrics_time = time()
+        self.last_metrics_count = 0
+
+    def get_metrics(self) -> dict:
+        """统计结果，消息频率为距上次调用的平均值"""
+        now = time()
+        interval = now - self.last_metrics_time
+        rate = (self.recv_count - self.last_metrics_count) / interval if interval > 0 else 0
+        self.last_metrics_time = now
+        self.last_metrics_count = self.recv_count
+
+        decoded = self.recv_count - self.raw_count
+        return {
+            "connect_count": self.connect_count,
+            "recv_count": self.recv_count,
+            "recv_bytes": self.recv_bytes,
+            "raw_count": self.raw_count,
+            "msg_rate": rate,
+            "avg_decode_us": self.decode_time / decoded * 1e6 if decoded else 0,
+            "avg_handle_us": self.handle_time / decoded * 1e6 if decoded else 0,
+            "max_handle_us": self.max_handle_time * 1e6,
+            "avg_latency_ms": self.latency_sum / self.latency_count * 1000 if self.latency_count else 0,
+            "max_latency_ms": self.latency_max * 1000,
+            "last_recv_time": self.last_recv_time,
+        }
+
+
+class WebsocketHub(object):
+    """
+    进程内所有AsyncWebsocketClient的登记、统计
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.clients: List["AsyncWebsocketClient"] = []
+        self.json_loads: Callable[[Union[str, bytes]], Any] = get_fast_json_loads()
+
+    def set_json_decoder(self, loads: Callable[[Union[str, bytes]], Any]) -> None:
+        """替换json解码(对之后启动的连接生效)"""
+        self.json_loads = loads
+
+    def add_client(self, client: "AsyncWebsocketClient") -> None:
+        with self.lock:
+            if client not in self.clients:
+                self.clients.append(client)
+
+    def remove_client(self, client: "AsyncWebsocketClient") -> None:
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def get_metrics(self) -> Dict[str, dict]:
+        """所有连接的统计: 连接名称 => 统计结果"""
+        with self.lock:
+            clients = list(self.clients)
+        return {client.stats.name: client.stats.get_metrics() for client in clients}
+
+
+_hub: WebsocketHub = None
+_hub_lock = Lock()
+
+
+def get_websocket_hub() -> WebsocketHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = WebsocketHub()
+    return _hub
+
+
+class AsyncWebsocketClient(WebsocketClient):
+    """
+    asyncio的WebsocketClient
+
+    Callbacks to overrides:
+    * unpack_data
+    * on_raw_data
+    * get_packet_timestamp
+    * on_connected
+    * on_disconnected
+    * on_packet
+    * on_error
+    """
+
+    def __init__(self):
+        """Constructor"""
+        super().__init__()
+
+        self.name: str = type(self).__name__
+        self.stats: ConnectionStats = ConnectionStats(self.name)
+
+        # 断开后重新连接的间隔(秒)
+        self.reconnect_interval: float = 1
+
+        self.json_loads: Callable[[Union[str, bytes]], Any] = None
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._future = None
+
+        # start时确定，避免每条消息判断
+        self._debug: bool = False
+        self._use_raw: bool = False
+        self._use_timestamp: bool = False
+
+    def init(self,
+             host: str,
+             proxy_host: str = "",
+             proxy_port: int = 0,
+             ping_interval: int = 60,
+             header: dict = None,
+             log_path: Optional[str] = None,
+             ):
+        """"""
+        super().init(host, proxy_host, proxy_port, ping_interval, header, log_path)
+        self.stats.name = f"{self.name}:{host}"
+
+    def start(self):
+        """
+        Start the client and on_connected function is called after webscoket
+        is connected succesfully.
+        """
+        if self._active:
+            return
+        self._active = True
+
+        hub = get_websocket_hub()
+        if self.json_loads is None:
+            self.json_loads = hub.json_loads
+        self._debug = self.logger is not None and self.logger.isEnabledFor(logging.DEBUG)
+        self._use_raw = type(self).on_raw_data is not AsyncWebsocketClient.on_raw_data
+        self._use_timestamp = type(self).get_packet_timestamp is not AsyncWebsocketClient.get_packet_timestamp
+
+        hub.add_client(self)
+        self._future = run_coroutine(self._run_async())
+
+    def stop(self):
+        """
+        Stop the client.
+        """
+        self._active = False
+        get_websocket_hub().remove_client(self)
+        self._call_in_loop(self._close_async())
+
+    def join(self):
+        """
+        Wait till the connection coroutine finishes.
+
+        This function cannot be called from callback function.
+        """
+        future = self._future
+        if future is not None and not in_loop_thread():
+            try:
+                future.result()
+            except Exception:  # noqa
+                pass
+
+    def _call_in_loop(self, coro):
+        """在事件循环中执行协程，当前在事件循环线程中时不等待"""
+        if in_loop_thread():
+            return get_event_loop().create_task(coro)
+        return run_coroutine(coro)
+
+    def _log(self, msg, *args):
+        if self._debug:
+            self.logger.debug(msg, *args)
+
+    def _send_text(self, text: str):
+        """
+        Send a text string to server.
+        """
+        ws = self._ws
+        if ws is not None and not ws.closed:
+            self._call_in_loop(ws.send_str(text))
+            if self._debug:
+                self._log('sent text: %s', text)
+
+    def _send_binary(self, data: bytes):
+        """
+        Send bytes data to server.
+        """
+        ws = self._ws
+        if ws is not None and not ws.closed:
+            self._call_in_loop(ws.send_bytes(data))
+            if self._debug:
+                self._log('sent binary: %s', data)
+
+    def _record_last_sent_text(self, text: str):
+        """只保存引用，出错时截取"""
+        self._last_sent_text = text
+
+    def _record_last_received_text(self, text: Union[str, bytes]):
+        """只保存引用，出错时截取"""
+        self._last_received_text = text
+
+    def exception_detail(self, exception_type: type, exception_value: Exception, tb):
+        """"""
+        self._last_sent_text = self._last_sent_text[:1000] if self._last_sent_text else self._last_sent_text
+        self._last_received_text = self._last_received_text[:1000] \
+            if self._last_received_text else self._last_received_text
+        return super().exception_detail(exception_type, exception_value, tb)
+
+    async def _close_async(self):
+        ws = self._ws
+        if ws is not None:
+            await ws.close()
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+    async def _run_async(self):
+        """
+        Keep running till stop is called.
+        """
+        while self._active:
+            try:
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession()
+                ws = await self._session.ws_connect(
+                    self.host,
+                    headers=self.header,
+                    proxy=f"http://{self.proxy_host}:{self.proxy_port}" if self.proxy_host else None,
+                    ssl=False,
+                    heartbeat=self.ping_interval or None,
+                    max_msg_size=0
+                )
+                self._ws = ws
+                self.stats.connect_count += 1
+                self.on_connected()
+
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT or msg.type == aiohttp.WSMsgType.BINARY:
+                        self._on_message(msg.data)
+                    elif msg.type == aiohttp.WSMsgType.ERROR:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+                pass
+            # other internal exception raised in on_packet
+            except Exception:  # noqa
+                et, ev, tb = sys.exc_info()
+                self.on_error(et, ev, tb)
+
+            await self._disconnect_async()
+            if self._active:
+                await asyncio.sleep(self.reconnect_interval)
+
+        await self._close_async()
+
+    async def _disconnect_async(self):
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            await ws.close()
+            self.on_disconnected()
+
+    def _on_message(self, data: Union[str, bytes]):
+        """处理收到的一条消息"""
+        stats = self.stats
+        stats.recv_count += 1
+        stats.recv_bytes += len(data)
+        stats.last_recv_time = time()
+        self._last_received_text = data
+
+        if self._use_raw and self.on_raw_data(data):
+            stats.raw_count += 1
+            return
+
+        t0 = perf_counter()
+        if isinstance(data, bytes):
+            data = self.decompress_data(data)
+        try:
+            packet = self.unpack_data(data)
+        except ValueError as e:
+            print("websocket unable to parse data: {}".format(data[:1000]), file=sys.stderr)
+            raise e
+        t1 = perf_counter()
+
+        if self._debug:
+            self._log('recv data: %s', packet)
+        if self._use_timestamp:
+            timestamp = self.get_packet_timestamp(packet)
+            if timestamp:
+                latency = stats.last_recv_time - timestamp
+                stats.latency_count += 1
+                stats.latency_sum += latency
+                if latency > stats.latency_max:
+                    stats.latency_max = latency
+
+        self.on_packet(packet)
+        t2 = perf_counter()
+
+        stats.decode_time += t1 - t0
+        handle_time = t2 - t1
+        stats.handle_time += handle_time
+        if handle_time > stats.max_handle_time:
+            stats.max_handle_time = handle_time
+
+    @staticmethod
+    def decompress_data(data: bytes) -> Union[str, bytes]:
+        """二进制消息的解压，与WebsocketClient一致"""
+        return gzip.decompress(data)
+
+    def unpack_data(self, data: Union[str, bytes]):
+        """
+        Default serialization format is json.
+
+        override this method if you want to use other serialization format.
+        """
+        return self.json_loads(data)
+
+    def on_raw_data(self, data: Union[str, bytes]) -> bool:
+        """
+        解码之前处理原始数据，返回True时不再解码、调用on_packet
+        """
+        return False
+
+    def get_packet_timestamp(self, packet: Any) -> Optional[float]:
+        """
+        数据包中交易所的推送时间(秒，时间戳)，用于统计推送延时
+        """
+        return None
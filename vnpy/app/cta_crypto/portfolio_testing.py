@@ -28,6 +28,7 @@ from vnpy.trader.constant import (
 from vnpy.trader.utility import (
     extract_vt_symbol,
 )
+from vnpy.trader.util_bar_loader import load_bar_df
 
 from .back_testing import BackTestingEngine
 
@@ -81,15 +82,8 @@ class PortfolioTestingEngine(BackTestingEngine):
                 "date": str,
                 "time": str
             }
-            # 加载csv文件 =》 dateframe
-            symbol_df = pd.read_csv(bar_file, dtype=data_types)
-            # 转换时间，str =》 datetime
-            symbol_df["datetime"] = pd.to_datetime(symbol_df["datetime"], format="%Y-%m-%d %H:%M:%S")
-            # 设置时间为索引
-            symbol_df = symbol_df.set_index("datetime")
-
-            # 裁剪数据
-            symbol_df = symbol_df.loc[self.test_start_date:self.test_end_date]
+            # 加载csv文件 =》 dateframe(解析结果有缓存，csv文件不变时不再重新解析)，裁剪数据
+            symbol_df = load_bar_df(bar_file, data_types, self.test_start_date, self.test_end_date)
 
             self.bar_df_dict.update({vt_symbol: symbol_df})
         except Exception as ex:
@@ -20,6 +20,7 @@ from .base import StopOrder
 from vnpy.component.cta_grid_trade import CtaGrid, CtaGridTrade
 from vnpy.component.cta_position import CtaPosition
 from vnpy.component.cta_policy import CtaPolicy
+from vnpy.component.cta_state_store import KlineCacheWriter
 from vnpy.component.base import MyEncoder
 
 class CtaTemplate(ABC):
@@ -451,6 +452,7 @@ class CtaFutureTemplate(CtaTemplate):
         self.policy = None  # 事务执行组件
         self.gt = None  # 网格交易组件
         self.klines = {}  # K线组件字典: kline_name: kline
+        self.kline_cache_writer = KlineCacheWriter()  # K线缓存写入
 
         self.price_tick = 1  # 商品的最小价格跳动
         self.symbol_size = 10  # 商品得合约乘数
@@ -527,15 +529,15 @@ class CtaFutureTemplate(CtaTemplate):
         save_path = self.cta_engine.get_data_path()
         # 保存缓存的文件名
         file_name = os.path.abspath(os.path.join(save_path, f'{self.strategy_name}_klines.pkb2'))
-        with bz2.BZ2File(file_name, 'wb') as f:
-            klines = {}
-            for kline_name in kline_names:
-                kline = self.klines.get(kline_name, None)
-                # if kline:
-                #    kline.strategy = None
-                #    kline.cb_on_bar = None
-                klines.update({kline_name: kline})
-            pickle.dump(klines, f)
+        klines = {}
+        for kline_name in kline_names:
+            kline = self.klines.get(kline_name, None)
+            # if kline:
+            #    kline.strategy = None
+            #    kline.cb_on_bar = None
+            klines.update({kline_name: kline})
+        # 原子写入，没有新的bar时不重写
+        self.kline_cache_writer.save(klines, file_name)
 
     def load_klines_from_cache(self, kline_names: list = []):
         """
@@ -1462,6 +1464,7 @@ class CtaSpotTemplate(CtaTemplate):
         self.policy = None  # 事务执行组件
         self.gt = None  # 网格交易组件
         self.klines = {}  # K线组件字典: kline_name: kline
+        self.kline_cache_writer = KlineCacheWriter()  # K线缓存写入
 
         self.price_tick = 0.01  # 商品的最小价格跳动
         self.symbol_size = 1  # 商品得合约乘数
@@ -1539,15 +1542,15 @@ class CtaSpotTemplate(CtaTemplate):
         save_path = self.cta_engine.get_data_path()
         # 保存缓存的文件名
         file_name = os.path.abspath(os.path.join(save_path, f'{self.strategy_name}_klines.pkb2'))
-        with bz2.BZ2File(file_name, 'wb') as f:
-            klines = {}
-            for kline_name in kline_names:
-                kline = self.klines.get(kline_name, None)
-                # if kline:
-                #    kline.strategy = None
-                #    kline.cb_on_bar = None
-                klines.update({kline_name: kline})
-            pickle.dump(klines, f)
+        klines = {}
+        for kline_name in kline_names:
+            kline = self.klines.get(kline_name, None)
+            # if kline:
+            #    kline.strategy = None
+            #    kline.cb_on_bar = None
+            klines.update({kline_name: kline})
+        # 原子写入，没有新的bar时不重写
+        self.kline_cache_writer.save(klines, file_name)
 
     def load_klines_from_cache(self, kline_names: list = []):
         """
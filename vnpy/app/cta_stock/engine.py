@@ -64,6 +64,7 @@ from vnpy.trader.utility import (
     append_data,
     import_module_by_str,
 get_csv_last_dt)
+from vnpy.trader.util_bar_loader import load_bar_df
 
 from vnpy.trader.util_logger import setup_logger, logging
 from vnpy.trader.util_wechat import send_wx_msg
@@ -1129,19 +1130,12 @@ class CtaEngine(BaseEngine):
 
             if use_qfq_file:
                 self.write_log(f'使用前复权文件:{qfq_bar_file_path}')
-                symbol_df = pd.read_csv(qfq_bar_file_path, dtype=data_types)
+                # 加载并裁剪数据(解析结果有缓存，csv文件不变时不再重新解析)
+                symbol_df = load_bar_df(qfq_bar_file_path, data_types, start, end)
             else:
                 # 加载csv文件 =》 dateframe
                 self.write_log(f'使用未复权文件:{bar_file_path}')
-                symbol_df = pd.read_csv(bar_file_path, dtype=data_types)
-
-            # 转换时间，str =》 datetime
-            symbol_df["datetime"] = pd.to_datetime(symbol_df["datetime"], format="%Y-%m-%d %H:%M:%S")
-            # 设置时间为索引
-            symbol_df = symbol_df.set_index("datetime")
-
-            # 裁剪数据
-            symbol_df = symbol_df.loc[start:end]
+                symbol_df = load_bar_df(bar_file_path, data_types, start, end)
 
             if resample_day:
                 self.write_log(f'{vt_symbol} resample:{file_interval_num}m => {interval}day')
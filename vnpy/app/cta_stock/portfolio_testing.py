@@ -34,7 +34,14 @@ from vnpy.trader.utility import (
     extract_vt_symbol,
     get_csv_last_dt
 )
+from vnpy.trader.util_bar_loader import load_bar_df
 from vnpy.data.common import stock_to_adj
+from vnpy.data.tick_cache import (
+    TICK_CACHE_SUFFIX,
+    load_tick_cache_df,
+    get_cache_file,
+    get_cache_dates)
+from vnpy.component.cta_tick_loader import DayTickLoader, get_test_days
 from .back_testing import BackTestingEngine, stock_to_adj
 
 
@@ -58,6 +65,8 @@ class PortfolioTestingEngine(BackTestingEngine):
         self.bar_interval_seconds = 60  # bar csv文件，属于K线类型，K线的周期（秒数）,缺省是1分钟
 
         self.tick_path = None  # tick级别回测， 路径
+        self.prefetch_days = 2  # tick回测，后台预加载的交易日数量，0: 不预加载
+        self.prefetch_memory_mb = 1024  # tick回测，预加载数据的内存上限
 
     def load_bar_csv_to_df(self, vt_symbol, bar_file, data_start_date=None, data_end_date=None, qfq=True):
         """
@@ -108,26 +117,14 @@ class PortfolioTestingEngine(BackTestingEngine):
                 if isinstance(last_dt, datetime):
                     if last_dt.strftime('%Y-%m-%d') < self.test_end_date:
                         self.write_log(f'加载数据[{vt_symbol}], 使用{fq_name}文件:{fq_bar_file}')
-                        symbol_df = pd.read_csv(fq_bar_file, dtype=data_types)
-                        # 转换时间，str =》 datetime
-                        symbol_df["datetime"] = pd.to_datetime(symbol_df["datetime"], format="%Y-%m-%d %H:%M:%S")
-                        # 设置时间为索引
-                        symbol_df = symbol_df.set_index("datetime")
-                        # 裁剪数据
-                        symbol_df = symbol_df.loc[self.test_start_date:self.test_end_date]
+                        # 加载并裁剪数据(解析结果有缓存)
+                        symbol_df = load_bar_df(fq_bar_file, data_types, self.test_start_date, self.test_end_date)
                         # 不再产生复权文件
                         auto_generate_fq = False
 
             if not isinstance(symbol_df, pd.DataFrame):
-                # 加载csv文件 =》 dateframe
-                symbol_df = pd.read_csv(bar_file, dtype=data_types)
-                # 转换时间，str =》 datetime
-                symbol_df["datetime"] = pd.to_datetime(symbol_df["datetime"], format="%Y-%m-%d %H:%M:%S")
-                # 设置时间为索引
-                symbol_df = symbol_df.set_index("datetime")
-
-                # 裁剪数据
-                symbol_df = symbol_df.loc[self.test_start_date:self.test_end_date]
+                # 加载csv文件 =》 dateframe(解析结果有缓存，csv文件不变时不再重新解析)，裁剪数据
+                symbol_df = load_bar_df(bar_file, data_types, self.test_start_date, self.test_end_date)
 
                 # 复权转换
                 adj_list = self.adjust_factors.get(vt_symbol, [])
@@ -184,6 +181,9 @@ class PortfolioTestingEngine(BackTestingEngine):
         # 调用父类回测环境
         super().prepare_env(test_setting)
 
+        self.prefetch_days = test_setting.get('prefetch_days', 2)
+        self.prefetch_memory_mb = test_setting.get('prefetch_memory_mb', 1024)
+
     def prepare_data(self, data_dict):
         """
         准备组合数据
@@ -400,19 +400,40 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         return None
 
+    def load_columnar_cache(self, cache_folder, cache_symbol, cache_date):
+        """
+        加载列式缓存数据(.tkc)，直接返回DataFrame
+        不存在时返回None，由调用方回退到bz2缓存
+        """
+        cache_file = get_cache_file(cache_folder, cache_symbol, cache_date)
+        if cache_file is None or not cache_file.endswith(TICK_CACHE_SUFFIX):
+            return None
+        try:
+            return load_tick_cache_df(cache_file)
+        except Exception as ex:
+            self.write_error(u'列式缓存文件:{}读取异常:{}'.format(cache_file, str(ex)))
+            return None
+
     def get_day_tick_df(self, test_day):
         """获取某一天得所有合约tick"""
         tick_data_dict = {}
 
         for vt_symbol in list(self.symbol_strategy_map.keys()):
             symbol, exchange = extract_vt_symbol(vt_symbol)
-            tick_list = self.load_bz2_cache(cache_folder=self.tick_path,
-                                            cache_symbol=symbol,
-                                            cache_date=test_day.strftime('%Y%m%d'))
-            if not tick_list or len(tick_list) == 0:
-                continue
+            # 优先使用列式缓存
+            symbol_tick_df = self.load_columnar_cache(cache_folder=self.tick_path,
+                                                      cache_symbol=symbol,
+                                                      cache_date=test_day.strftime('%Y%m%d'))
+            if symbol_tick_df is None:
+                tick_list = self.load_bz2_cache(cache_folder=self.tick_path,
+                                                cache_symbol=symbol,
+                                                cache_date=test_day.strftime('%Y%m%d'))
+                if not tick_list or len(tick_list) == 0:
+                    continue
+                symbol_tick_df = pd.DataFrame(tick_list)
 
-            symbol_tick_df = pd.DataFrame(tick_list)
+            if len(symbol_tick_df) == 0:
+                continue
             # 缓存文件中，datetime字段，已经是datetime格式
             # 暂时根据时间去重，没有汇总volume
             symbol_tick_df.drop_duplicates(subset=['datetime'], keep='first', inplace=True)
@@ -427,6 +448,25 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         return tick_df
 
+    def get_tick_test_days(self):
+        """
+        tick回测需要加载的日期
+        剔除周末，以及缓存目录中所有合约都没有数据的日期(节假日)
+        """
+        trading_dates = None
+        if self.tick_path:
+            symbols = [extract_vt_symbol(vt_symbol)[0] for vt_symbol in self.symbol_strategy_map.keys()]
+            trading_dates = get_cache_dates(cache_folder=self.tick_path,
+                                            symbols=symbols,
+                                            start_date=self.data_start_date,
+                                            end_date=self.data_end_date,
+                                            suffixes=None)
+            # 目录结构不匹配时，仍按日期逐个加载
+            if len(trading_dates) == 0:
+                trading_dates = None
+
+        return get_test_days(self.data_start_date, self.data_end_date, trading_dates)
+
     def run_tick_test(self):
         """运行tick级别组合回测"""
         testdays = (self.data_end_date - self.data_start_date).days
@@ -437,12 +477,14 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         gc_collect_days = 0
 
-        # 循环每一天
-        for i in range(0, testdays):
-            test_day = self.data_start_date + timedelta(days=i)
-
-            combined_df = self.get_day_tick_df(test_day)
+        # 后台预加载后续交易日的tick
+        loader = DayTickLoader(load_func=self.get_day_tick_df,
+                               days=self.get_tick_test_days(),
+                               prefetch_days=self.prefetch_days,
+                               max_memory_mb=self.prefetch_memory_mb)
 
+        # 循环每一天
+        for test_day, combined_df in loader:
             if combined_df is None:
                 continue
 
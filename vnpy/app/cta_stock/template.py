@@ -22,6 +22,7 @@ from .base import StopOrder,EngineType
 from vnpy.component.cta_grid_trade import CtaGrid, CtaGridTrade
 from vnpy.component.cta_position import CtaPosition
 from vnpy.component.cta_policy import CtaPolicy
+from vnpy.component.cta_state_store import KlineCacheWriter
 from vnpy.component.base import MyEncoder
 
 class CtaTemplate(ABC):
@@ -445,6 +446,7 @@ class CtaStockTemplate(CtaTemplate):
         self.policy = None  # 事务执行组件
         self.gt = None  # 网格交易组件（使用了dn_grids，作为买入/持仓/卖出任务）
         self.klines = {}  # K线组件字典: kline_name: kline
+        self.kline_cache_writer = KlineCacheWriter()  # K线缓存写入
         self.positions = {}     # 策略内持仓记录，  vt_symbol: PositionData
         self.order_type = OrderType.LIMIT
         self.cancel_seconds = 120  # 撤单时间(秒)
@@ -513,15 +515,15 @@ class CtaStockTemplate(CtaTemplate):
                 # 保存缓存的文件名
                 file_name = os.path.abspath(os.path.join(save_path, f'{self.strategy_name}_klines.pkb2'))
 
-            with bz2.BZ2File(file_name, 'wb') as f:
-                klines = {}
-                for kline_name in kline_names:
-                    kline = self.klines.get(kline_name, None)
-                    # if kline:
-                    #    kline.strategy = None
-                    #    kline.cb_on_bar = None
-                    klines.update({kline_name: kline})
-                pickle.dump(klines, f)
+            klines = {}
+            for kline_name in kline_names:
+                kline = self.klines.get(kline_name, None)
+                # if kline:
+                #    kline.strategy = None
+                #    kline.cb_on_bar = None
+                klines.update({kline_name: kline})
+            # 原子写入，没有新的bar时不重写
+            self.kline_cache_writer.save(klines, file_name)
             self.write_log(f'保存{vt_symbol} K线数据成功=>{file_name}')
         except Exception as ex:
             self.write_error(f'保存k线数据异常:{str(ex)}')
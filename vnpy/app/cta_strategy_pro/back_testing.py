@@ -35,6 +35,8 @@ from .base import (
 from .template import CtaTemplate
 
 from vnpy.component.cta_fund_kline import FundKline
+from vnpy.component.cta_order_book import OrderBookDict
+from vnpy.component.cta_position_queue import PositionQueue
 
 from vnpy.trader.object import (
     BarData,
@@ -120,11 +122,11 @@ class BackTestingEngine(object):
 
         self.stop_order_count = 0  # 本地停止单编号
         self.stop_orders = {}  # 本地停止单
-        self.active_stop_orders = {}  # 活动本地停止单
+        self.active_stop_orders = OrderBookDict()  # 活动本地停止单(按合约、方向、价格索引)
 
         self.limit_order_count = 0  # 限价单编号
         self.limit_orders = OrderedDict()  # 限价单字典
-        self.active_limit_orders = OrderedDict()  # 活动限价单字典，用于进行撮合用
+        self.active_limit_orders = OrderBookDict()  # 活动限价单字典，用于进行撮合用(按合约、方向、价格索引)
 
         self.order_strategy_dict = {}  # orderid 与 strategy的映射
 
@@ -137,8 +139,8 @@ class BackTestingEngine(object):
         self.trades = OrderedDict()  # 记录所有得成交记录
         self.trade_pnl_list = []  # 交易记录列表
 
-        self.long_position_list = []  # 多单持仓
-        self.short_position_list = []  # 空单持仓
+        self.long_position_list = PositionQueue()  # 多单持仓(按策略、合约先进先出)
+        self.short_position_list = PositionQueue()  # 空单持仓(按策略、合约先进先出)
 
         self.holdings = {}  # 多空持仓
 
@@ -198,6 +200,7 @@ class BackTestingEngine(object):
         self.logger = None
         self.strategy_loggers = {}
         self.debug = False
+        self.log_trade_detail = True  # 记录realtime_calculate逐笔撮合的详细日志，批量回测时可关闭
 
         self.is_7x24 = False
         self.logs_path = None
@@ -573,6 +576,7 @@ class BackTestingEngine(object):
         self.output(f'测试合约主要为{self.contract_type}')
 
         self.debug = test_setting.get('debug', False)
+        self.log_trade_detail = test_setting.get('log_trade_detail', True)
 
         if 'using_99_contract' in test_setting:
             self.using_99_contract = test_setting.get('using_99_contract')
@@ -1171,32 +1175,37 @@ class BackTestingEngine(object):
         """
         vt_symbol = bar.vt_symbol if bar else tick.vt_symbol
 
-        for stop_orderid in list(self.active_stop_orders.keys()):
-            stop_order = self.active_stop_orders[stop_orderid]
+        if bar:
+            # 若买入方向停止单价格高于等于该价格，则会触发
+            long_cross_price = round_to(value=bar.low_price, target=self.get_price_tick(vt_symbol))
+            long_cross_price -= self.get_price_tick(vt_symbol)
+            # 若卖出方向停止单价格低于等于该价格，则会触发
+            short_cross_price = round_to(value=bar.high_price, target=self.get_price_tick(vt_symbol))
+            short_cross_price += self.get_price_tick(vt_symbol)
+            # 在当前时间点前发出的买入委托可能的最优成交价
+            long_best_price = round_to(value=bar.open_price,
+                                       target=self.get_price_tick(vt_symbol)) + self.get_price_tick(vt_symbol)
+
+            # 在当前时间点前发出的卖出委托可能的最优成交价
+            short_best_price = round_to(value=bar.open_price,
+                                        target=self.get_price_tick(vt_symbol)) - self.get_price_tick(vt_symbol)
+        else:
+            long_cross_price = tick.last_price
+            short_cross_price = tick.last_price
+            long_best_price = tick.last_price
+            short_best_price = tick.last_price
+
+        # 只取出该合约价格会触发的停止单，按下单顺序撮合
+        stop_orderids = self.active_stop_orders.merge_orders(
+            self.active_stop_orders.get_orders(vt_symbol, Direction.LONG, max_price=long_cross_price),
+            self.active_stop_orders.get_orders(vt_symbol, Direction.SHORT, min_price=short_cross_price))
+
+        for stop_orderid in stop_orderids:
+            stop_order = self.active_stop_orders.get(stop_orderid, None)
             strategy = self.order_strategy_dict.get(stop_orderid, None)
-            if stop_order.vt_symbol != vt_symbol or stop_order is None or strategy is None:
+            if stop_order is None or strategy is None:
                 continue
 
-            # 若买入方向停止单价格高于等于该价格，则会触发
-            if bar:
-                long_cross_price = round_to(value=bar.low_price, target=self.get_price_tick(vt_symbol))
-                long_cross_price -= self.get_price_tick(vt_symbol)
-                # 若卖出方向停止单价格低于等于该价格，则会触发
-                short_cross_price = round_to(value=bar.high_price, target=self.get_price_tick(vt_symbol))
-                short_cross_price += self.get_price_tick(vt_symbol)
-                # 在当前时间点前发出的买入委托可能的最优成交价
-                long_best_price = round_to(value=bar.open_price,
-                                           target=self.get_price_tick(vt_symbol)) + self.get_price_tick(vt_symbol)
-
-                # 在当前时间点前发出的卖出委托可能的最优成交价
-                short_best_price = round_to(value=bar.open_price,
-                                            target=self.get_price_tick(vt_symbol)) - self.get_price_tick(vt_symbol)
-            else:
-                long_cross_price = tick.last_price
-                short_cross_price = tick.last_price
-                long_best_price = tick.last_price
-                short_best_price = tick.last_price
-
             # Check whether stop order can be triggered.
             long_cross = stop_order.direction == Direction.LONG and stop_order.price <= long_cross_price
 
@@ -1269,34 +1278,42 @@ class BackTestingEngine(object):
 
         vt_symbol = bar.vt_symbol if bar else tick.vt_symbol
 
-        # 遍历限价单字典中的所有限价单
-        for vt_orderid in list(self.active_limit_orders.keys()):
+        if bar:
+            buy_cross_price = round_to(value=bar.low_price,
+                                       target=self.get_price_tick(vt_symbol)) + self.get_price_tick(
+                vt_symbol)  # 若买入方向限价单价格高于该价格，则会成交
+            sell_cross_price = round_to(value=bar.high_price,
+                                        target=self.get_price_tick(vt_symbol)) - self.get_price_tick(
+                vt_symbol)  # 若卖出方向限价单价格低于该价格，则会成交
+            buy_best_cross_price = round_to(value=bar.open_price,
+                                            target=self.get_price_tick(vt_symbol)) + self.get_price_tick(
+                vt_symbol)  # 在当前时间点前发出的买入委托可能的最优成交价
+            sell_best_cross_price = round_to(value=bar.open_price,
+                                             target=self.get_price_tick(vt_symbol)) - self.get_price_tick(
+                vt_symbol)  # 在当前时间点前发出的卖出委托可能的最优成交价
+        else:
+            buy_cross_price = tick.last_price if not tick.ask_price_1 else tick.ask_price_1
+            sell_cross_price = tick.last_price if not tick.bid_price_1 else tick.bid_price_1
+            buy_best_cross_price = tick.last_price
+            sell_best_cross_price = tick.last_price
+
+        # 只取出该合约价格会成交的限价单(强制成交时为该合约所有限价单)，按下单顺序撮合
+        if self.force_cross:
+            long_orders = self.active_limit_orders.get_orders(vt_symbol, Direction.LONG)
+            short_orders = self.active_limit_orders.get_orders(vt_symbol, Direction.SHORT)
+        else:
+            long_orders = self.active_limit_orders.get_orders(vt_symbol, Direction.LONG, min_price=buy_cross_price)
+            short_orders = self.active_limit_orders.get_orders(vt_symbol, Direction.SHORT, max_price=sell_cross_price)
+
+        for vt_orderid in self.active_limit_orders.merge_orders(long_orders, short_orders):
             order = self.active_limit_orders.get(vt_orderid, None)
-            if order.vt_symbol != vt_symbol:
+            if order is None:
                 continue
 
             strategy = self.order_strategy_dict.get(order.vt_orderid, None)
             if strategy is None:
                 self.write_error(u'找不到vt_orderid:{}对应的策略'.format(order.vt_orderid))
                 continue
-            if bar:
-                buy_cross_price = round_to(value=bar.low_price,
-                                           target=self.get_price_tick(vt_symbol)) + self.get_price_tick(
-                    vt_symbol)  # 若买入方向限价单价格高于该价格，则会成交
-                sell_cross_price = round_to(value=bar.high_price,
-                                            target=self.get_price_tick(vt_symbol)) - self.get_price_tick(
-                    vt_symbol)  # 若卖出方向限价单价格低于该价格，则会成交
-                buy_best_cross_price = round_to(value=bar.open_price,
-                                                target=self.get_price_tick(vt_symbol)) + self.get_price_tick(
-                    vt_symbol)  # 在当前时间点前发出的买入委托可能的最优成交价
-                sell_best_cross_price = round_to(value=bar.open_price,
-                                                 target=self.get_price_tick(vt_symbol)) - self.get_price_tick(
-                    vt_symbol)  # 在当前时间点前发出的卖出委托可能的最优成交价
-            else:
-                buy_cross_price = tick.last_price if not tick.ask_price_1 else tick.ask_price_1
-                sell_cross_price = tick.last_price if not tick.bid_price_1 else tick.bid_price_1
-                buy_best_cross_price = tick.last_price
-                sell_best_cross_price = tick.last_price
 
             # 判断是否会成交
             buy_cross = order.direction == Direction.LONG and (order.price >= buy_cross_price or self.force_cross)
@@ -1552,6 +1569,9 @@ class BackTestingEngine(object):
         if len(self.trade_dict) < 1:
             return
 
+        # 逐笔撮合的详细日志，批量回测时可关闭
+        write_log = self.write_log if self.log_trade_detail else lambda *args, **kwargs: None
+
         # 获取所有未处理得成交单
         vt_tradeids = list(self.trade_dict.keys())
 
@@ -1570,7 +1590,7 @@ class BackTestingEngine(object):
                 continue
             # buy trade
             if trade.direction == Direction.LONG and trade.offset == Offset.OPEN:
-                self.write_log(f'{trade.vt_symbol} buy, price:{trade.price},volume:{trade.volume}')
+                write_log(f'{trade.vt_symbol} buy, price:{trade.price},volume:{trade.volume}')
                 # 放入多单仓位队列
                 self.long_position_list.append(trade)
 
@@ -1580,7 +1600,7 @@ class BackTestingEngine(object):
                 g_result = None  # 组合的交易结果
 
                 cover_volume = trade.volume
-                self.write_log(f'{trade.vt_symbol} cover:{cover_volume}')
+                write_log(f'{trade.vt_symbol} cover:{cover_volume}')
                 while cover_volume > 0:
                     # 如果当前没有空单，属于异常行为
                     if len(self.short_position_list) == 0:
@@ -1588,16 +1608,14 @@ class BackTestingEngine(object):
                         # raise Exception(u'异常!没有空单持仓，不能cover')
                         return
 
-                    cur_short_pos_list = [s_pos.volume for s_pos in self.short_position_list if
-                                          s_pos.vt_symbol == trade.vt_symbol]
+                    if self.log_trade_detail:
+                        cur_short_pos_list = self.short_position_list.get_volumes(trade.vt_symbol)
+                        write_log(u'{}当前空单:{}'.format(trade.vt_symbol, cur_short_pos_list))
 
-                    self.write_log(u'{}当前空单:{}'.format(trade.vt_symbol, cur_short_pos_list))
+                    # 来自同一策略，同一合约才能撮合(先进先出)
+                    open_trade = self.short_position_list.popleft(trade.strategy_name, trade.vt_symbol)
 
-                    # 来自同一策略，同一合约才能撮合
-                    pop_indexs = [i for i, val in enumerate(self.short_position_list) if
-                                  val.vt_symbol == trade.vt_symbol and val.strategy_name == trade.strategy_name]
-
-                    if len(pop_indexs) < 1:
+                    if open_trade is None:
                         if 'spd' in vt_tradeid:
                             self.write_error(f'没有{trade.strategy_name}对应的symbol:{trade.vt_symbol}的空单持仓, 继续')
                             break
@@ -1607,18 +1625,14 @@ class BackTestingEngine(object):
                             # raise Exception(u'realtimeCalculate2() Exception,没有对应symbol:{0}的空单持仓'.format(trade.vt_symbol))
                             return
 
-                    pop_index = pop_indexs[0]
-                    # 从未平仓的空头交易
-                    open_trade = self.short_position_list.pop(pop_index)
-
                     # 开空volume，不大于平仓volume
                     if cover_volume >= open_trade.volume:
-                        self.write_log(f'cover volume:{cover_volume}, 满足:{open_trade.volume}')
+                        write_log(f'cover volume:{cover_volume}, 满足:{open_trade.volume}')
                         cover_volume = cover_volume - open_trade.volume
                         if cover_volume > 0:
-                            self.write_log(u'剩余待平数量:{}'.format(cover_volume))
+                            write_log(u'剩余待平数量:{}'.format(cover_volume))
 
-                        self.write_log(
+                        write_log(
                             f'{open_trade.vt_symbol} coverd, price: {trade.price},volume:{open_trade.volume}')
 
                         result = TradingResult(open_price=open_trade.price,
@@ -1658,7 +1672,7 @@ class BackTestingEngine(object):
                                         trade.time, vt_tradeid, trade.price,
                                         open_trade.volume, result.pnl, result.commission)
 
-                            self.write_log(msg)
+                            write_log(msg)
 
                             # 添加到交易结果汇总
                             result_list.append(result)
@@ -1677,13 +1691,13 @@ class BackTestingEngine(object):
 
                             # 所有仓位平完
                             if cover_volume == 0:
-                                self.write_log(u'所有平空仓位撮合完毕')
+                                write_log(u'所有平空仓位撮合完毕')
                                 g_result.volume = abs(trade.volume)
 
                     # 开空volume,大于平仓volume，需要更新减少tradeDict的数量。
                     else:
                         remain_volume = open_trade.volume - cover_volume
-                        self.write_log(f'{open_trade.vt_symbol} short pos: {open_trade.volume} => {remain_volume}')
+                        write_log(f'{open_trade.vt_symbol} short pos: {open_trade.volume} => {remain_volume}')
 
                         result = TradingResult(open_price=open_trade.price,
                                                open_datetime=open_trade.datetime,
@@ -1722,17 +1736,18 @@ class BackTestingEngine(object):
                                         trade.time, vt_tradeid, trade.price,
                                         cover_volume, result.pnl, result.commission)
 
-                            self.write_log(msg)
+                            write_log(msg)
 
                             # 添加到交易结果汇总
                             result_list.append(result)
 
                         # 更新（减少）开仓单的volume,重新推进开仓单列表中
                         open_trade.volume = remain_volume
-                        self.write_log(u'更新（减少）开仓单的volume,重新推进开仓单列表中:{}'.format(open_trade.volume))
+                        write_log(u'更新（减少）开仓单的volume,重新推进开仓单列表中:{}'.format(open_trade.volume))
                         self.short_position_list.append(open_trade)
-                        cur_short_pos_list = [s_pos.volume for s_pos in self.short_position_list]
-                        self.write_log(u'当前空单:{}'.format(cur_short_pos_list))
+                        if self.log_trade_detail:
+                            cur_short_pos_list = self.short_position_list.get_volumes()
+                            write_log(u'当前空单:{}'.format(cur_short_pos_list))
 
                         cover_volume = 0
 
@@ -1745,11 +1760,11 @@ class BackTestingEngine(object):
                             g_result.volume = abs(trade.volume)
 
                 if g_result is not None:
-                    self.write_log(u'组合净盈亏:{0}'.format(g_result.pnl))
+                    write_log(u'组合净盈亏:{0}'.format(g_result.pnl))
 
             # Short Trade
             elif trade.direction == Direction.SHORT and trade.offset == Offset.OPEN:
-                self.write_log(f'{trade.vt_symbol}, short: price:{trade.price},volume{trade.volume}')
+                write_log(f'{trade.vt_symbol}, short: price:{trade.price},volume{trade.volume}')
                 self.short_position_list.append(trade)
                 continue
 
@@ -1766,9 +1781,12 @@ class BackTestingEngine(object):
                         # raise RuntimeError(u'realtimeCalculate2() Exception,没有开多单')
                         return
 
-                    pop_indexs = [i for i, val in enumerate(self.long_position_list) if
-                                  val.vt_symbol == trade.vt_symbol and val.strategy_name == trade.strategy_name]
-                    if len(pop_indexs) < 1:
+                    if self.log_trade_detail:
+                        cur_long_pos_list = self.long_position_list.get_volumes(trade.vt_symbol)
+
+                    # 来自同一策略，同一合约才能撮合(先进先出)
+                    open_trade = self.long_position_list.popleft(trade.strategy_name, trade.vt_symbol)
+                    if open_trade is None:
                         if 'spd' in vt_tradeid:
                             self.write_error(f'没有{trade.strategy_name}对应的symbol:{trade.vt_symbol}多单数据, 继续')
                             break
@@ -1777,19 +1795,15 @@ class BackTestingEngine(object):
                             # raise RuntimeError(f'realtimeCalculate2() Exception,没有对应的symbol:{trade.vt_symbol}多单数据,')
                             return
 
-                    cur_long_pos_list = [s_pos.volume for s_pos in self.long_position_list if
-                                         s_pos.vt_symbol == trade.vt_symbol]
-
-                    self.write_log(u'{}当前多单:{}'.format(trade.vt_symbol, cur_long_pos_list))
+                    if self.log_trade_detail:
+                        write_log(u'{}当前多单:{}'.format(trade.vt_symbol, cur_long_pos_list))
 
-                    pop_index = pop_indexs[0]
-                    open_trade = self.long_position_list.pop(pop_index)
                     # 开多volume，不大于平仓volume
                     if sell_volume >= open_trade.volume:
-                        self.write_log(f'{open_trade.vt_symbol},Sell Volume:{sell_volume} 满足:{open_trade.volume}')
+                        write_log(f'{open_trade.vt_symbol},Sell Volume:{sell_volume} 满足:{open_trade.volume}')
                         sell_volume = sell_volume - open_trade.volume
 
-                        self.write_log(f'{open_trade.vt_symbol},sell, price:{trade.price},volume:{open_trade.volume}')
+                        write_log(f'{open_trade.vt_symbol},sell, price:{trade.price},volume:{open_trade.volume}')
 
                         result = TradingResult(open_price=open_trade.price,
                                                open_datetime=open_trade.datetime,
@@ -1829,7 +1843,7 @@ class BackTestingEngine(object):
                                         trade.time, vt_tradeid, trade.price,
                                         open_trade.volume, result.pnl, result.commission)
 
-                            self.write_log(msg)
+                            write_log(msg)
 
                             # 添加到交易结果汇总
                             result_list.append(result)
@@ -1851,7 +1865,7 @@ class BackTestingEngine(object):
                     # 开多volume,大于平仓volume，需要更新减少tradeDict的数量。
                     else:
                         remain_volume = open_trade.volume - sell_volume
-                        self.write_log(f'{open_trade.vt_symbol} short pos: {open_trade.volume} => {remain_volume}')
+                        write_log(f'{open_trade.vt_symbol} short pos: {open_trade.volume} => {remain_volume}')
 
                         result = TradingResult(open_price=open_trade.price,
                                                open_datetime=open_trade.datetime,
@@ -1890,7 +1904,7 @@ class BackTestingEngine(object):
                                         trade.time, vt_tradeid, trade.price, sell_volume, result.pnl,
                                         result.commission)
 
-                            self.write_log(msg)
+                            write_log(msg)
                             # 添加到交易结果汇总
                             result_list.append(result)
 
@@ -1909,7 +1923,7 @@ class BackTestingEngine(object):
                             g_result.volume = abs(trade.volume)
 
                 if g_result is not None:
-                    self.write_log(u'组合净盈亏:{0}'.format(g_result.pnl))
+                    write_log(u'组合净盈亏:{0}'.format(g_result.pnl))
 
         # 计算仓位比例
         occupy_money = 0.0  # 保证金
@@ -1985,16 +1999,17 @@ class BackTestingEngine(object):
 
         # 检查是否有平交易
         if len(result_list) == 0:
-            msg = u''
-            if len(self.long_position_list) > 0:
-                msg += u'持多仓{0},'.format(str(long_pos_dict))
+            if self.log_trade_detail:
+                msg = u''
+                if len(self.long_position_list) > 0:
+                    msg += u'持多仓{0},'.format(str(long_pos_dict))
 
-            if len(self.short_position_list) > 0:
-                msg += u'持空仓{0},'.format(str(short_pos_dict))
+                if len(self.short_position_list) > 0:
+                    msg += u'持空仓{0},'.format(str(short_pos_dict))
 
-            msg += u'资金占用:{0},仓位:{1}%%'.format(occupy_money, self.percent)
+                msg += u'资金占用:{0},仓位:{1}%%'.format(occupy_money, self.percent)
 
-            self.write_log(msg)
+                write_log(msg)
             return
 
         # 对交易结果汇总统计
@@ -2028,7 +2043,7 @@ class BackTestingEngine(object):
                 .format(result.group_id, result.close_datetime, result.pnl, result.commission, drawdown,
                         drawdown_rate, self.cur_capital, self.net_capital, self.total_commission)
 
-            self.write_log(msg)
+            write_log(msg)
 
         # 重新计算一次avaliable
         self.available = self.net_capital - occupy_money
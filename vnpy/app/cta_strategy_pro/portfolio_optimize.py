@@ -0,0 +1,347 @@
+# encoding: UTF-8
+
+'''
+组合回测的本地多进程参数优化(无需celery/broker)
+- 参数组合：网格遍历 / 随机抽样 / 遗传算法
+- 各合约bar数据由主进程预先加载一次，生成bar csv的解析缓存文件(util_bar_loader)，
+  工作进程直接读取缓存文件，不再每个任务重复解析csv；csv变化后缓存自动重新生成
+- 每个参数组合的回测结果摘要(get_result())逐行写入results.jsonl，
+  中断后使用相同的目录重新运行，自动跳过已完成的参数组合(回测异常的参数组合重新运行)；
+  参数组合的标识包含回测设置、策略设置，设置变化后不会使用旧的结果
+'''
+from __future__ import division
+
+import os
+import sys
+import json
+import copy
+import random
+import hashlib
+import traceback
+import multiprocessing
+
+from functools import reduce
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from .portfolio_testing import PortfolioTestingEngine
+
+# get_result()中的序列字段，不进入结果摘要
+RESULT_LIST_FIELDS = ['time_list', 'pnl_list', 'capital_list', 'drawdown_list', 'drawdown_rate_list']
+
+
+class SweepSetting(object):
+    """
+    参数优化设置
+    参数名为 'para_xxx' 时，更新所有策略实例的setting；
+    参数名为 '策略实例名.para_xxx' 时，只更新该策略实例的setting
+    """
+
+    def __init__(self):
+        self.params = {}  # 参数名: 取值列表
+        self.target_name = 'net_capital'  # 排序目标，get_result()中的字段
+
+    def add_parameter(self, name: str, start, end=None, step=None):
+        """添加参数：单个取值，或者 start~end(含)、步长step 的取值范围"""
+        if end is None and step is None:
+            self.params[name] = [start]
+            return
+
+        if start >= end:
+            print(u'参数优化起始点必须小于终止点', file=sys.stderr)
+            return
+
+        if step is None or step <= 0:
+            print(u'参数优化步进必须大于0', file=sys.stderr)
+            return
+
+        value_list = []
+        value = start
+        while value <= end:
+            value_list.append(value)
+            value += step
+        self.params[name] = value_list
+
+    def add_values(self, name: str, values: list):
+        """添加参数：指定取值列表"""
+        self.params[name] = list(values)
+
+    def set_target(self, target_name: str):
+        self.target_name = target_name
+
+    @property
+    def total_count(self):
+        """参数空间的组合总数"""
+        return reduce(lambda x, y: x * len(y), self.params.values(), 1)
+
+    def generate_setting(self):
+        """网格：所有参数组合"""
+        keys = list(self.params.keys())
+        return [dict(zip(keys, values)) for values in product(*self.params.values())]
+
+    def generate_random_setting(self, count: int, seed=None):
+        """随机抽取count个不重复的参数组合"""
+        total = self.total_count
+        if count >= total:
+            return self.generate_setting()
+
+        rnd = random.Random(seed)
+        settings = []
+        for index in rnd.sample(range(total), count):
+            # 序号 => 各参数的取值(混合进制)
+            setting = {}
+            for name, values in reversed(list(self.params.items())):
+                index, i = divmod(index, len(values))
+                setting[name] = values[i]
+            settings.append({name: setting[name] for name in self.params})
+        return settings
+
+
+def apply_parameters(strategy_setting: dict, params: dict):
+    """把一组优化参数更新到策略配置中，返回新的策略配置"""
+    new_setting = copy.deepcopy(strategy_setting)
+    for key, value in params.items():
+        if '.' in key:
+            strategy_name, para_name = key.split('.', 1)
+            targets = [new_setting[strategy_name]]
+        else:
+            para_name = key
+            targets = new_setting.values()
+        for target in targets:
+            target.setdefault('setting', {})[para_name] = value
+    return new_setting
+
+
+def json_default(value):
+    """numpy数值等无法直接json序列化的对象"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def get_hash(data):
+    """dict/list等数据的md5摘要(前12位)"""
+    return hashlib.md5(json.dumps(data, sort_keys=True, default=json_default).encode('utf-8')).hexdigest()[:12]
+
+
+def get_setting_key(test_setting: dict, strategy_setting: dict):
+    """回测设置 + 策略设置的标识(回测名称只影响日志目录，不参与)"""
+    test_setting = {k: v for k, v in test_setting.items() if k != 'name'}
+    return get_hash([test_setting, strategy_setting])
+
+
+def get_params_key(params: dict, setting_key: str = ''):
+    """参数组合的唯一标识，setting_key: 回测设置、策略设置的标识"""
+    if setting_key:
+        return get_hash([setting_key, params])
+    return get_hash(params)
+
+
+def run_sweep_job(job: tuple):
+    """
+    工作进程：运行一个参数组合的组合回测
+    :param job: (key, params, test_setting, strategy_setting, setting_key)
+    :return: 结果摘要dict
+    """
+    key, params, test_setting, strategy_setting, setting_key = job
+    summary = {'key': key, 'setting_key': setting_key, 'params': params}
+
+    test_setting = copy.copy(test_setting)
+    # 每个参数组合使用独立的回测名称(日志目录)
+    test_setting['name'] = '{}_{}'.format(test_setting.get('name', 'sweep'), key)
+
+    engine = PortfolioTestingEngine()
+    try:
+        engine.prepare_env(test_setting)
+        engine.run_portfolio_test(apply_parameters(strategy_setting, params))
+        d, _, _ = engine.get_result()
+        if len(d) == 0:
+            summary['error'] = u'无交易结果'
+            return summary
+        summary.update({k: v for k, v in d.items() if k not in RESULT_LIST_FIELDS})
+        summary['max_drawdown'] = min(d['drawdown_list']) if d['drawdown_list'] else 0
+        summary['max_drawdown_rate'] = engine.daily_max_drawdown_rate
+    except Exception as ex:
+        print(u'参数组合{}回测异常:{}'.format(params, str(ex)), file=sys.stderr)
+        traceback.print_exc()
+        summary['error'] = str(ex)
+
+    return summary
+
+
+class PortfolioSweepRunner(object):
+    """
+    组合回测的本地多进程参数优化
+    sweep_path目录下：
+        results.jsonl  每个参数组合的结果摘要(一行一个)，用于中断后继续
+        results.csv    按目标排序的结果汇总
+    """
+
+    def __init__(self, test_setting: dict, strategy_setting: dict, sweep_setting: SweepSetting,
+                 sweep_path: str = None, processes: int = None, start_method: str = None):
+        self.test_setting = test_setting
+        self.strategy_setting = strategy_setting
+        self.sweep_setting = sweep_setting
+        self.sweep_path = sweep_path or os.path.abspath(
+            os.path.join(os.getcwd(), 'sweep', test_setting.get('name', 'portfolio')))
+        self.processes = processes or multiprocessing.cpu_count()
+        self.start_method = start_method  # None: 使用系统缺省(linux: fork, windows: spawn)
+
+        self.result_file = os.path.join(self.sweep_path, 'results.jsonl')
+        self.results = {}  # key: 结果摘要
+        self.setting_key = get_setting_key(test_setting, strategy_setting)
+
+        os.makedirs(self.sweep_path, exist_ok=True)
+        self.load_results()
+
+    def output(self, msg):
+        print(u'{}\t{}'.format(os.path.basename(self.sweep_path), msg))
+
+    def load_results(self):
+        """读取已完成的参数组合结果(断点续跑)"""
+        if not os.path.isfile(self.result_file):
+            return
+        with open(self.result_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    summary = json.loads(line)
+                except ValueError:
+                    # 中断时写了一半的行
+                    continue
+                # 回测设置、策略设置不同的结果不使用；回测异常的参数组合重新运行
+                if summary.get('setting_key') != self.setting_key or 'error' in summary:
+                    continue
+                self.results[summary['key']] = summary
+        self.output(u'已完成参数组合:{}'.format(len(self.results)))
+
+    def save_result(self, summary: dict):
+        with open(self.result_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(summary, ensure_ascii=False, default=json_default) + '\n')
+        self.results[summary['key']] = summary
+
+    def prepare_bars(self):
+        """主进程加载一次所有合约的bar csv，生成解析缓存文件，工作进程不再各自解析csv"""
+        if self.test_setting.get('mode', 'bar') != 'bar':
+            return
+
+        engine = PortfolioTestingEngine()
+        engine.prepare_env(copy.copy(self.test_setting))
+        for symbol, bar_file in engine.bar_csv_file.items():
+            vt_symbol = '{}.{}'.format(symbol, engine.get_exchange(symbol).value)
+            engine.load_bar_csv_to_df(vt_symbol, bar_file)
+            engine.bar_df_dict.pop(vt_symbol, None)
+
+    def run_settings(self, settings: list):
+        """多进程运行一批参数组合(跳过已完成的)，返回这批参数组合的结果摘要"""
+        jobs = {}
+        keys = []
+        for params in settings:
+            key = get_params_key(params, self.setting_key)
+            keys.append(key)
+            if key in self.results or key in jobs:
+                continue
+            jobs[key] = (key, params, self.test_setting, self.strategy_setting, self.setting_key)
+        jobs = list(jobs.values())
+
+        self.output(u'参数组合:{}，待运行:{}，进程数:{}'.format(len(settings), len(jobs), self.processes))
+        if jobs:
+            self.prepare_bars()
+            ctx = multiprocessing.get_context(self.start_method)
+            with ctx.Pool(processes=min(self.processes, len(jobs))) as pool:
+                for n, summary in enumerate(pool.imap_unordered(run_sweep_job, jobs), 1):
+                    self.save_result(summary)
+                    self.output(u'完成{}/{}:{} {}={}'.format(
+                        n, len(jobs), summary['params'], self.sweep_setting.target_name,
+                        summary.get(self.sweep_setting.target_name, summary.get('error'))))
+
+        return [self.results[key] for key in keys if key in self.results]
+
+    def run_grid(self):
+        """网格遍历"""
+        self.run_settings(self.sweep_setting.generate_setting())
+        return self.get_result_table()
+
+    def run_random(self, count: int, seed=None):
+        """随机抽取count个参数组合"""
+        self.run_settings(self.sweep_setting.generate_random_setting(count, seed))
+        return self.get_result_table()
+
+    def run_ga(self, population_size: int = 40, ngen: int = 10, mutation_rate: float = 0.2, seed=None):
+        """
+        遗传算法：每代保留目标值靠前的一半作为父代，均匀交叉、按mutation_rate随机变异产生下一代
+        已计算过的参数组合直接使用结果，不重复回测
+        """
+        rnd = random.Random(seed)
+        params = self.sweep_setting.params
+        target_name = self.sweep_setting.target_name
+
+        def score(summary):
+            value = summary.get(target_name)
+            return value if isinstance(value, (int, float)) and not np.isnan(value) else -np.inf
+
+        population = self.sweep_setting.generate_random_setting(population_size, rnd.random())
+        for gen in range(ngen):
+            self.output(u'第{}代，个体数:{}'.format(gen + 1, len(population)))
+            summaries = self.run_settings(population)
+            summaries.sort(key=score, reverse=True)
+            parents = [s['params'] for s in summaries[:max(2, len(summaries) // 2)]]
+
+            children = {}
+            retry = 0
+            while len(children) < population_size and retry < population_size * 10:
+                retry += 1
+                father, mother = rnd.sample(parents, 2) if len(parents) > 1 else (parents[0], parents[0])
+                child = {}
+                for name, values in params.items():
+                    child[name] = father[name] if rnd.random() < 0.5 else mother[name]
+                    if rnd.random() < mutation_rate:
+                        child[name] = rnd.choice(values)
+                key = get_params_key(child, self.setting_key)
+                if key not in self.results:
+                    children[key] = child
+            if not children:
+                self.output(u'参数空间已搜索完毕')
+                break
+            population = list(children.values())
+
+        return self.get_result_table()
+
+    def get_result_table(self):
+        """所有已完成参数组合的结果，按目标降序排列，并保存为results.csv"""
+        rows = []
+        for summary in self.results.values():
+            row = dict(summary['params'])
+            row.update({k: v for k, v in summary.items() if k not in ('params', 'setting_key')})
+            rows.append(row)
+        if not rows:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(rows)
+        target_name = self.sweep_setting.target_name
+        if target_name in df.columns:
+            df = df.sort_values(by=target_name, ascending=False, na_position='last')
+        df = df.reset_index(drop=True)
+        df.to_csv(os.path.join(self.sweep_path, 'results.csv'), index=False, encoding='utf-8-sig')
+        return df
+
+
+def sweep_test(test_setting: dict, strategy_setting: dict, sweep_setting: SweepSetting,
+               method: str = 'grid', **kwargs):
+    """
+    参数优化(与single_test对应)
+    :param method: grid / random / ga
+    :param kwargs: sweep_path, processes, start_method；以及 run_random/run_ga 的参数
+    :return: 按目标排序的结果DataFrame
+    """
+    runner_kwargs = {k: kwargs.pop(k) for k in ['sweep_path', 'processes', 'start_method'] if k in kwargs}
+    runner = PortfolioSweepRunner(test_setting, strategy_setting, sweep_setting, **runner_kwargs)
+    if method == 'random':
+        return runner.run_random(**kwargs)
+    if method == 'ga':
+        return runner.run_ga(**kwargs)
+    return runner.run_grid()
@@ -35,6 +35,14 @@ from vnpy.trader.utility import (
     get_trading_date,
     import_module_by_str
 )
+from vnpy.trader.util_bar_loader import load_full_bar_df, slice_bar_df
+
+from vnpy.data.tick_cache import (
+    TICK_CACHE_SUFFIX,
+    load_tick_cache_df,
+    get_cache_file,
+    get_cache_dates)
+from vnpy.component.cta_tick_loader import DayTickLoader, get_test_days
 
 from .back_testing import BackTestingEngine
 
@@ -69,6 +77,9 @@ class PortfolioTestingEngine(BackTestingEngine):
         self.tick_path = None  # tick级别回测， 路径
         self.use_tq = False    # True:使用tq csv数据; False:使用淘宝购买的csv数据(19年之前)
         self.use_pkb2 = True  # 使用tdx下载的逐笔成交数据（pkb2压缩格式），模拟tick
+        self.random_seed = None  # 同一时间多个合约bar的推送顺序随机打乱，设置种子后可重现
+        self.prefetch_days = 2  # tick回测，后台预加载的交易日数量，0: 不预加载
+        self.prefetch_memory_mb = 1024  # tick回测，预加载数据的内存上限
 
     def load_bar_csv_to_df(self, vt_symbol, bar_file, data_start_date=None, data_end_date=None):
         """加载回测bar数据到DataFrame"""
@@ -110,25 +121,15 @@ class PortfolioTestingEngine(BackTestingEngine):
                     "low_time": str,
                     "high_time": str
                 })
-            # 加载csv文件 =》 dateframe
-            symbol_df = pd.read_csv(bar_file, dtype=data_types)
+            # 加载csv文件 =》 dateframe(解析结果有缓存，csv文件不变时不再重新解析)
+            symbol_df = load_full_bar_df(bar_file, data_types)
             if len(symbol_df)==0:
                 print(f'回测时加载{vt_symbol} csv文件{bar_file}失败。', file=sys.stderr)
                 self.write_error(f'回测时加载{vt_symbol} csv文件{bar_file}失败。')
                 return False
 
-            first_dt = symbol_df.iloc[0]['datetime']
-            if '.' in first_dt:
-                datetime_format = "%Y-%m-%d %H:%M:%S.%f"
-            else:
-                datetime_format = "%Y-%m-%d %H:%M:%S"
-            # 转换时间，str =》 datetime
-            symbol_df["datetime"] = pd.to_datetime(symbol_df["datetime"], format=datetime_format)
-            # 设置时间为索引
-            symbol_df = symbol_df.set_index("datetime")
-
             # 裁剪数据
-            symbol_df = symbol_df.loc[self.test_start_date:self.test_end_date]
+            symbol_df = slice_bar_df(symbol_df, self.test_start_date, self.test_end_date).copy()
 
             self.bar_df_dict.update({vt_symbol: symbol_df})
         except Exception as ex:
@@ -158,6 +159,9 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         self.use_tq = test_setting.get('use_tq', False)
         self.use_pkb2 = test_setting.get('use_pkb2', True)
+        self.random_seed = test_setting.get('random_seed', None)
+        self.prefetch_days = test_setting.get('prefetch_days', 2)
+        self.prefetch_memory_mb = test_setting.get('prefetch_memory_mb', 1024)
         if self.use_tq:
             self.use_pkb2 = False
             self.output(f'使用天勤数据')
@@ -235,6 +239,91 @@ class PortfolioTestingEngine(BackTestingEngine):
         else:
             self.run_tick_test()
 
+    def iter_bars(self):
+        """
+        按bar_df的顺序，逐根生成回放的bar
+        bar开始时间、交易日、日期/时间字符串等派生列，先对整个bar_df一次性向量化计算，
+        再按下标从各列读取生成bar，替代逐行iterrows()
+        :return: (dt, bar)，dt为csv中的时间(bar结束时间)
+        """
+        df = self.bar_df
+        if df is None or len(df) == 0:
+            return
+        count = len(df)
+
+        dt_index = df.index.get_level_values(0)
+        vt_symbol_index = df.index.get_level_values(1)
+        is_renko = np.asarray(vt_symbol_index.str.startswith('future_renko'), dtype=bool)
+
+        # 读取的bar是以bar结束时间作为datetime，vnpy是以bar开始时间作为bar datetime (renko bar除外)
+        bar_dt_index = dt_index.where(is_renko, dt_index - timedelta(seconds=self.bar_interval_seconds))
+        dt_strings = np.datetime_as_string(bar_dt_index.values.astype('datetime64[s]'), unit='s')
+        dates = dt_strings.astype('U10').tolist()
+        times = [s[11:] for s in dt_strings.tolist()]
+
+        # 交易日：csv中的yyyymmdd/yyyy-mm-dd，缺失时根据bar时间计算
+        trading_days = [None] * count
+        if 'trading_day' in df.columns:
+            str_td = df['trading_day'].astype(str)
+            td_len = str_td.str.len()
+            str_td = str_td.where(td_len != 8,
+                                  str_td.str.slice(0, 4) + '-' + str_td.str.slice(4, 6) + '-' + str_td.str.slice(6, 8))
+            trading_days = str_td.where((td_len == 8) | (td_len == 10), None).tolist()
+        missing = [i for i, td in enumerate(trading_days) if not isinstance(td, str)]
+        if missing:
+            # get_trading_date 只取决于日期和小时，按小时缓存
+            hours = bar_dt_index[missing].floor('h')
+            hour_trading_days = {h: get_trading_date(h) for h in hours.unique()}
+            for i, h in zip(missing, hours):
+                trading_days[i] = hour_trading_days[h]
+
+        def float_column(name):
+            if name in df.columns:
+                return df[name].astype(float).tolist()
+            return [0.0] * count
+
+        opens = float_column('open')
+        closes = float_column('close')
+        highs = float_column('high')
+        lows = float_column('low')
+        volumes = df['volume'].astype(np.int64).tolist()
+        open_interests = float_column('open_interest')
+
+        renko_columns = {}
+        if is_renko.any():
+            for name in ['seconds', 'high_seconds', 'low_seconds', 'height', 'up_band', 'down_band']:
+                renko_columns[name] = float_column(name)
+            for name in ['low_time', 'high_time']:
+                renko_columns[name] = df[name].tolist() if name in df.columns else [None] * count
+
+        symbol_exchanges = {vt_symbol: extract_vt_symbol(vt_symbol) for vt_symbol in vt_symbol_index.unique()}
+
+        for i, (dt, vt_symbol, bar_datetime) in enumerate(zip(dt_index.to_pydatetime(),
+                                                              vt_symbol_index,
+                                                              bar_dt_index.to_pydatetime())):
+            symbol, exchange = symbol_exchanges[vt_symbol]
+            bar_class = RenkoBarData if is_renko[i] else BarData
+            bar = bar_class(
+                gateway_name='backtesting',
+                symbol=symbol,
+                exchange=exchange,
+                datetime=bar_datetime,
+                trading_day=trading_days[i],
+                open_price=opens[i],
+                close_price=closes[i],
+                high_price=highs[i],
+                low_price=lows[i],
+                volume=volumes[i],
+                open_interest=open_interests[i]
+            )
+            if is_renko[i]:
+                for name, values in renko_columns.items():
+                    setattr(bar, name, values[i])
+            bar.date = dates[i]
+            bar.time = times[i]
+
+            yield dt, bar
+
     def run_bar_test(self):
         """使用bar进行组合回测"""
         testdays = (self.data_end_date - self.data_start_date).days
@@ -268,51 +357,12 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         gc_collect_days = 0
 
-        try:
-            for (dt, vt_symbol), bar_data in self.bar_df.iterrows():
-                symbol, exchange = extract_vt_symbol(vt_symbol)
-                if symbol.startswith('future_renko'):
-                    bar_datetime = dt
-                    bar = RenkoBarData(
-                        gateway_name='backtesting',
-                        symbol=symbol,
-                        exchange=exchange,
-                        datetime=bar_datetime
-                    )
-                    bar.seconds = float(bar_data.get('seconds', 0))
-                    bar.high_seconds = float(bar_data.get('high_seconds', 0))  # 当前Bar的上限秒数
-                    bar.low_seconds = float(bar_data.get('low_seconds', 0))  # 当前bar的下限秒数
-                    bar.height = float(bar_data.get('height', 0))  # 当前Bar的高度限制
-                    bar.up_band = float(bar_data.get('up_band', 0))  # 高位区域的基线
-                    bar.down_band = float(bar_data.get('down_band', 0))  # 低位区域的基线
-                    bar.low_time = bar_data.get('low_time', None)  # 最后一次进入低位区域的时间
-                    bar.high_time = bar_data.get('high_time', None)  # 最后一次进入高位区域的时间
-                else:
-                    # 读取的bar是以bar结束时间作为datetime，vnpy是以bar开始时间作为bar datetime
-                    bar_datetime = dt - timedelta(seconds=self.bar_interval_seconds)
+        # 同一时间bar的推送顺序
+        shuffle = random.shuffle if self.random_seed is None else random.Random(self.random_seed).shuffle
 
-                    bar = BarData(
-                        gateway_name='backtesting',
-                        symbol=symbol,
-                        exchange=exchange,
-                        datetime=bar_datetime
-                    )
-
-                bar.open_price = float(bar_data['open'])
-                bar.close_price = float(bar_data['close'])
-                bar.high_price = float(bar_data['high'])
-                bar.low_price = float(bar_data['low'])
-                bar.volume = int(bar_data['volume'])
-                bar.open_interest = float(bar_data.get('open_interest', 0))
-                bar.date = bar_datetime.strftime('%Y-%m-%d')
-                bar.time = bar_datetime.strftime('%H:%M:%S')
-                str_td = str(bar_data.get('trading_day', ''))
-                if len(str_td) == 8:
-                    bar.trading_day = str_td[0:4] + '-' + str_td[4:6] + '-' + str_td[6:8]
-                elif len(str_td) == 10:
-                    bar.trading_day = str_td
-                else:
-                    bar.trading_day = get_trading_date(bar_datetime)
+        try:
+            for dt, bar in self.iter_bars():
+                symbol = bar.symbol
 
                 if last_trading_day != bar.trading_day:
                     self.output(u'回测数据日期:{},资金:{}'.format(bar.trading_day, self.net_capital))
@@ -325,7 +375,7 @@ class PortfolioTestingEngine(BackTestingEngine):
                     continue
                 else:
                     # bar时间与队列时间不一致，先推送队列的bars
-                    random.shuffle(bars_same_dt)
+                    shuffle(bars_same_dt)
                     for _bar_ in bars_same_dt:
                         self.new_bar(_bar_)
 
@@ -532,25 +582,48 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         return None
 
+    def load_columnar_cache(self, cache_folder, cache_symbol, cache_date):
+        """
+        加载列式缓存数据(.tkc)，直接返回DataFrame
+        不存在时返回None，由调用方回退到bz2缓存
+        """
+        cache_file = get_cache_file(cache_folder, cache_symbol, cache_date)
+        if cache_file is None or not cache_file.endswith(TICK_CACHE_SUFFIX):
+            return None
+        try:
+            return load_tick_cache_df(cache_file)
+        except Exception as ex:
+            self.write_error(u'列式缓存文件:{}读取异常:{}'.format(cache_file, str(ex)))
+            return None
+
     def get_day_tick_df(self, test_day):
         """获取某一天得所有合约tick"""
         tick_data_dict = {}
 
         for vt_symbol in list(self.symbol_strategy_map.keys()):
             symbol, exchange = extract_vt_symbol(vt_symbol)
+            symbol_tick_df = None
             if self.use_pkb2:
-                tick_list = self.load_bz2_cache(cache_folder=self.tick_path,
-                                                cache_symbol=symbol,
-                                                cache_date=test_day.strftime('%Y%m%d'))
+                # 优先使用列式缓存
+                symbol_tick_df = self.load_columnar_cache(cache_folder=self.tick_path,
+                                                          cache_symbol=symbol,
+                                                          cache_date=test_day.strftime('%Y%m%d'))
+                if symbol_tick_df is None:
+                    tick_list = self.load_bz2_cache(cache_folder=self.tick_path,
+                                                    cache_symbol=symbol,
+                                                    cache_date=test_day.strftime('%Y%m%d'))
+                    if tick_list:
+                        symbol_tick_df = pd.DataFrame(tick_list)
             else:
                 tick_list = self.load_csv_file(tick_folder=self.tick_path,
                                                vt_symbol=vt_symbol,
                                                tick_date=test_day)
+                if tick_list:
+                    symbol_tick_df = pd.DataFrame(tick_list)
 
-            if not tick_list or len(tick_list) == 0:
+            if symbol_tick_df is None or len(symbol_tick_df) == 0:
                 continue
 
-            symbol_tick_df = pd.DataFrame(tick_list)
             # 缓存文件中，datetime字段，已经是datetime格式
             # 暂时根据时间去重，没有汇总volume
             symbol_tick_df.drop_duplicates(subset=['datetime'], keep='first', inplace=True)
@@ -565,6 +638,25 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         return tick_df
 
+    def get_tick_test_days(self):
+        """
+        tick回测需要加载的日期
+        剔除周末，以及缓存目录(pkb2/天勤csv)中所有合约都没有数据的日期(节假日)
+        """
+        trading_dates = None
+        if self.use_pkb2 or self.use_tq:
+            symbols = [extract_vt_symbol(vt_symbol)[0] for vt_symbol in self.symbol_strategy_map.keys()]
+            trading_dates = get_cache_dates(cache_folder=self.tick_path,
+                                            symbols=symbols,
+                                            start_date=self.data_start_date,
+                                            end_date=self.data_end_date,
+                                            suffixes=['.csv'] if self.use_tq else None)
+            # 目录结构不匹配时，仍按日期逐个加载
+            if len(trading_dates) == 0:
+                trading_dates = None
+
+        return get_test_days(self.data_start_date, self.data_end_date, trading_dates)
+
     def run_tick_test(self):
         """运行tick级别组合回测"""
         testdays = (self.data_end_date - self.data_start_date).days
@@ -575,12 +667,14 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         gc_collect_days = 0
 
-        # 循环每一天
-        for i in range(0, testdays):
-            test_day = self.data_start_date + timedelta(days=i)
-
-            combined_df = self.get_day_tick_df(test_day)
+        # 后台预加载后续交易日的tick
+        loader = DayTickLoader(load_func=self.get_day_tick_df,
+                               days=self.get_tick_test_days(),
+                               prefetch_days=self.prefetch_days,
+                               max_memory_mb=self.prefetch_memory_mb)
 
+        # 循环每一天
+        for test_day, combined_df in loader:
             if combined_df is None:
                 continue
 
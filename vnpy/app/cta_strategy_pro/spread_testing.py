@@ -33,7 +33,10 @@ from vnpy.trader.utility import (
     get_trading_date,
     import_module_by_str
 )
+from vnpy.trader.util_bar_loader import load_full_bar_df, slice_bar_df
 from vnpy.trader.gateway import TickCombiner
+from vnpy.data.tick_cache import get_cache_dates
+from vnpy.component.cta_tick_loader import DayTickLoader, get_test_days
 
 from .back_testing import BackTestingEngine
 
@@ -63,6 +66,8 @@ class SpreadTestingEngine(BackTestingEngine):
         super().__init__(event_engine)
         self.tick_path = None  # tick级别回测， 路径
         self.use_tq = False  # True:使用tq数据; False:使用淘宝购买的数据(19年之前)
+        self.prefetch_days = 2  # tick回测，后台预加载的交易日数量，0: 不预加载
+        self.prefetch_memory_mb = 1024  # tick回测，预加载数据的内存上限
         self.strategy_start_date_dict = {}
         self.strategy_end_date_dict = {}
         self.tick_combiner_dict = {}  # tick合成器
@@ -79,6 +84,8 @@ class SpreadTestingEngine(BackTestingEngine):
         super().prepare_env(test_setting)
 
         self.use_tq = test_setting.get('use_tq', False)
+        self.prefetch_days = test_setting.get('prefetch_days', 2)
+        self.prefetch_memory_mb = test_setting.get('prefetch_memory_mb', 1024)
 
     def prepare_data(self, data_dict):
         """
@@ -527,24 +534,14 @@ class SpreadTestingEngine(BackTestingEngine):
                 "time": str
             }
 
-            # 加载csv文件 =》 dateframe
-            symbol_df = pd.read_csv(bar_file, dtype=data_types)
+            # 加载csv文件 =》 dateframe(解析结果有缓存，csv文件不变时不再重新解析)
+            symbol_df = load_full_bar_df(bar_file, data_types)
             if len(symbol_df) == 0:
                 self.write_error(f'回测时加载{vt_symbol} csv文件{bar_file}失败。')
                 return False
 
-            first_dt = symbol_df.iloc[0]['datetime']
-            if '.' in first_dt:
-                datetime_format = "%Y-%m-%d %H:%M:%S.%f"
-            else:
-                datetime_format = "%Y-%m-%d %H:%M:%S"
-            # 转换时间，str =》 datetime
-            symbol_df["datetime"] = pd.to_datetime(symbol_df["datetime"], format=datetime_format)
-            # 设置时间为索引
-            symbol_df = symbol_df.set_index("datetime")
-
             # 裁剪数据
-            symbol_df = symbol_df.loc[self.test_start_date:self.test_end_date]
+            symbol_df = slice_bar_df(symbol_df, self.test_start_date, self.test_end_date).copy()
 
             self.bar_df_dict.update({vt_symbol: symbol_df})
 
@@ -678,6 +675,25 @@ class SpreadTestingEngine(BackTestingEngine):
             traceback.print_exc()
             return
 
+    def get_tick_test_days(self):
+        """
+        tick回测需要加载的日期
+        剔除周末，以及天勤csv目录中所有合约都没有数据的日期(节假日)
+        """
+        trading_dates = None
+        if self.use_tq:
+            symbols = [extract_vt_symbol(vt_symbol)[0] for vt_symbol in self.symbol_strategy_map.keys()]
+            trading_dates = get_cache_dates(cache_folder=os.path.join(self.tick_path, 'tq', 'future'),
+                                            symbols=symbols,
+                                            start_date=self.data_start_date,
+                                            end_date=self.data_end_date,
+                                            suffixes=['.csv'])
+            # 目录结构不匹配时，仍按日期逐个加载
+            if len(trading_dates) == 0:
+                trading_dates = None
+
+        return get_test_days(self.data_start_date, self.data_end_date, trading_dates)
+
     def run_tick_test(self):
         """运行tick级别组合回测"""
         testdays = (self.data_end_date - self.data_start_date).days
@@ -688,12 +704,14 @@ class SpreadTestingEngine(BackTestingEngine):
 
         gc_collect_days = 0
 
-        # 循环每一天
-        for i in range(0, testdays):
-            test_day = self.data_start_date + timedelta(days=i)
-
-            combined_df = self.get_day_tick_df(test_day)
+        # 后台预加载后续交易日的tick
+        loader = DayTickLoader(load_func=self.get_day_tick_df,
+                               days=self.get_tick_test_days(),
+                               prefetch_days=self.prefetch_days,
+                               max_memory_mb=self.prefetch_memory_mb)
 
+        # 循环每一天
+        for test_day, combined_df in loader:
             if combined_df is None:
                 continue
 
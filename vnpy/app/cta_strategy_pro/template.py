@@ -19,6 +19,7 @@ from .base import StopOrder, EngineType
 from vnpy.component.cta_grid_trade import CtaGrid, CtaGridTrade, LOCK_GRID
 from vnpy.component.cta_position import CtaPosition
 from vnpy.component.cta_policy import CtaPolicy  # noqa
+from vnpy.component.cta_state_store import KlineCacheWriter
 
 
 class CtaTemplate(ABC):
@@ -634,6 +635,7 @@ class CtaProTemplate(CtaTemplate):
         self.policy = None  # 事务执行组件
         self.gt = None  # 网格交易组件
         self.klines = {}  # K线组件字典: kline_name: kline
+        self.kline_cache_writer = KlineCacheWriter()  # K线缓存写入
 
         self.cur_datetime = None  # 当前Tick时间
         self.cur_mi_tick = None  # 最新的主力合约tick( vt_symbol)
@@ -701,15 +703,15 @@ class CtaProTemplate(CtaTemplate):
         save_path = self.cta_engine.get_data_path()
         # 保存缓存的文件名
         file_name = os.path.abspath(os.path.join(save_path, f'{self.strategy_name}_klines.pkb2'))
-        with bz2.BZ2File(file_name, 'wb') as f:
-            klines = {}
-            for kline_name in kline_names:
-                kline = self.klines.get(kline_name, None)
-                # if kline:
-                #    kline.strategy = None
-                #    kline.cb_on_bar = None
-                klines.update({kline_name: kline})
-            pickle.dump(klines, f)
+        klines = {}
+        for kline_name in kline_names:
+            kline = self.klines.get(kline_name, None)
+            # if kline:
+            #    kline.strategy = None
+            #    kline.cb_on_bar = None
+            klines.update({kline_name: kline})
+        # 原子写入，没有新的bar时不重写
+        self.kline_cache_writer.save(klines, file_name)
 
     def load_klines_from_cache(self, kline_names: list = []):
         """
@@ -8,6 +8,7 @@ import bz2
 import pickle
 import zlib
 from vnpy.trader.utility import append_data, extract_vt_symbol, get_months_diff
+from vnpy.component.cta_state_store import KlineCacheWriter
 from .template import (
     CtaPosition,
     CtaGridTrade,
@@ -67,6 +68,7 @@ class CtaSpreadTemplate(CtaTemplate):
         self.position = CtaPosition(strategy=self)
         self.gt = CtaGridTrade(strategy=self)
         self.klines = {}  # K线组件字典: kline_name: kline
+        self.kline_cache_writer = KlineCacheWriter()  # K线缓存写入
 
         self.cur_datetime = None  # 当前Tick时间
         self.cur_mi_tick = None  # 最新的主力合约tick( vt_symbol)
@@ -155,18 +157,18 @@ class CtaSpreadTemplate(CtaTemplate):
         save_path = self.cta_engine.get_data_path()
         # 保存缓存的文件名
         file_name = os.path.abspath(os.path.join(save_path, f'{self.strategy_name}_klines.pkb2'))
-        with bz2.BZ2File(file_name, 'wb') as f:
-            klines = {}
-            for kline_name in kline_names:
-                kline = self.klines.get(kline_name, None)
-                if kline:
-                    kline.strategy = None
-                    kline.cb_on_bar = None
-                    if kline.cb_on_period:
-                        kline.cb_on_period = None
-                    kline.cb_dict = {}
-                klines.update({kline_name: kline})
-            pickle.dump(klines, f)
+        klines = {}
+        for kline_name in kline_names:
+            kline = self.klines.get(kline_name, None)
+            if kline:
+                kline.strategy = None
+                kline.cb_on_bar = None
+                if kline.cb_on_period:
+                    kline.cb_on_period = None
+                kline.cb_dict = {}
+            klines.update({kline_name: kline})
+        # 原子写入，没有新的bar时不重写
+        self.kline_cache_writer.save(klines, file_name)
 
     def load_klines_from_cache(self, kline_names: list = []):
         """
@@ -0,0 +1,178 @@
+# encoding: UTF-8
+
+# 指数tick的增量合成
+# 原来每个合约的tick到达、跨秒时，遍历该品种所有合约，重新累加持仓量、价格*持仓量、成交量、买一/卖一*持仓量；
+# IndexAggregator 按品种维护累加值，合约tick更新时减去该合约上一个tick的贡献、加上新tick的贡献，O(1)；
+# 主力合约(持仓量最大，相同时取最先加入的合约)只在可能变化时重新查找
+# IndexTickEncoder 预先生成指数合约的名称、交易所等固定字段，发布时只做一次json编码
+
+import json
+from copy import copy
+from datetime import datetime
+
+from vnpy.trader.object import TickData
+
+# 累加的浮点误差，每更新N次重新完整累加一次
+RESYNC_COUNT = 10000
+
+
+class IndexAggregator(object):
+    """
+    单个品种的指数合成
+    """
+
+    def __init__(self):
+        self.ticks = {}  # symbol => 最新tick(按合约首次到达的顺序)
+
+        self.all_interest = 0
+        self.all_amount = 0
+        self.all_volume = 0
+        self.all_ask1 = 0
+        self.all_bid1 = 0
+
+        self.mi_symbol = None  # 主力合约
+        self.mi_dirty = False  # 主力合约需要重新查找
+        self.update_count = 0
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def update(self, tick: TickData):
+        """合约tick更新"""
+        old = self.ticks.get(tick.symbol, None)
+        oi = tick.open_interest
+        if old is not None:
+            old_oi = old.open_interest
+            self.all_interest -= old_oi
+            self.all_amount -= old.last_price * old_oi
+            self.all_volume -= old.volume
+            self.all_ask1 -= old.ask_price_1 * old_oi
+            self.all_bid1 -= old.bid_price_1 * old_oi
+        self.ticks[tick.symbol] = tick
+        self.all_interest += oi
+        self.all_amount += tick.last_price * oi
+        self.all_volume += tick.volume
+        self.all_ask1 += tick.ask_price_1 * oi
+        self.all_bid1 += tick.bid_price_1 * oi
+
+        # 主力合约
+        if not self.mi_dirty:
+            if self.mi_symbol is None:
+                self.mi_symbol = tick.symbol
+            elif self.mi_symbol == tick.symbol:
+                if old is not None and oi < old.open_interest:
+                    self.mi_dirty = True
+            else:
+                mi_oi = self.ticks[self.mi_symbol].open_interest
+                if oi > mi_oi:
+                    self.mi_symbol = tick.symbol
+                elif oi == mi_oi:
+                    # 持仓量相同时，取先加入的合约
+                    self.mi_dirty = True
+
+        self.update_count += 1
+        if self.update_count >= RESYNC_COUNT:
+            self.resync()
+
+    def resync(self):
+        """完整重新累加(消除浮点累计误差)，并重新查找主力合约"""
+        self.all_interest = 0
+        self.all_amount = 0
+        self.all_volume = 0
+        self.all_ask1 = 0
+        self.all_bid1 = 0
+        mi_tick = None
+        for t in self.ticks.values():
+            self.all_interest += t.open_interest
+            self.all_amount += t.last_price * t.open_interest
+            self.all_volume += t.volume
+            self.all_ask1 += t.ask_price_1 * t.open_interest
+            self.all_bid1 += t.bid_price_1 * t.open_interest
+            if mi_tick is None or mi_tick.open_interest < t.open_interest:
+                mi_tick = t
+        self.mi_symbol = mi_tick.symbol if mi_tick else None
+        self.mi_dirty = False
+        self.update_count = 0
+
+    def get_mi_tick(self):
+        """持仓量最大的主力合约tick"""
+        if self.mi_dirty:
+            mi_tick = None
+            for t in self.ticks.values():
+                if mi_tick is None or mi_tick.open_interest < t.open_interest:
+                    mi_tick = t
+            self.mi_symbol = mi_tick.symbol if mi_tick else None
+            self.mi_dirty = False
+        return self.ticks.get(self.mi_symbol, None) if self.mi_symbol else None
+
+    def get_index(self):
+        """
+        指数数据
+        :return: mi_tick, 持仓量, 成交量, 最新价, 卖一价, 买一价
+        """
+        all_interest = self.all_interest
+        last_price = 0
+        ask_price_1 = 0
+        bid_price_1 = 0
+        # 总量 > 0
+        if all_interest > 0 and self.all_amount > 0:
+            last_price = round(float(self.all_amount / all_interest), 4)
+        # 卖1价
+        if self.all_ask1 > 0 and all_interest > 0:
+            ask_price_1 = round(float(self.all_ask1 / all_interest), 4)
+        # 买1价
+        if self.all_bid1 > 0 and all_interest > 0:
+            bid_price_1 = round(float(self.all_bid1 / all_interest), 4)
+        return self.get_mi_tick(), all_interest, self.all_volume, last_price, ask_price_1, bid_price_1
+
+
+class IndexTickEncoder(object):
+    """
+    指数tick的json编码
+    与原来 copy(mi_tick.__dict__) + 修改字段 + json.dumps 的结果一致
+    """
+
+    def __init__(self):
+        self.encoder = json.JSONEncoder(check_circular=False)
+        self.templates = {}  # (short_symbol, exchange) => 固定字段
+
+    def get_template(self, short_symbol: str, exchange) -> dict:
+        key = (short_symbol, exchange)
+        template = self.templates.get(key, None)
+        if template is None:
+            template = {
+                'exchange': exchange.value,
+                'symbol': f'{short_symbol}99',
+                'vt_symbol': f'{short_symbol}99.{exchange.value}'
+            }
+            self.templates[key] = template
+        return template
+
+    def encode(self, short_symbol: str, mi_tick: TickData, all_interest, all_volume,
+               last_price, ask_price_1, bid_price_1) -> str:
+        d = mi_tick.__dict__.copy()
+        # 时间 =》 字符串
+        if isinstance(mi_tick.datetime, datetime):
+            d['datetime'] = mi_tick.datetime.strftime('%Y-%m-%d %H:%M:%S.%f')
+        d.update(self.get_template(short_symbol, mi_tick.exchange))
+        # 指数的持仓量、交易量，最后价格，ask1，bid1
+        d['open_interest'] = all_interest
+        d['volume'] = all_volume
+        d['last_price'] = last_price
+        d['ask_price_1'] = ask_price_1
+        d['bid_price_1'] = bid_price_1
+        return self.encoder.encode(d)
+
+    def make_tick(self, short_symbol: str, mi_tick: TickData, all_interest, all_volume,
+                  last_price, ask_price_1, bid_price_1) -> TickData:
+        """生成指数tick(用于二进制格式发布)"""
+        tick = copy(mi_tick)
+        template = self.get_template(short_symbol, mi_tick.exchange)
+        tick.symbol = template['symbol']
+        tick.vt_symbol = template['vt_symbol']
+        tick.open_interest = all_interest
+        tick.volume = all_volume
+        tick.last_price = last_price
+        tick.ask_price_1 = ask_price_1
+        tick.bid_price_1 = bid_price_1
+        return tick
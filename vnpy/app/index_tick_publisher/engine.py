@@ -26,8 +26,11 @@ from vnpy.component.base import (
     MARKET_DAY_ONLY)
 
 from vnpy.amqp.producer import publisher
+from vnpy.amqp.tick_codec import FORMAT_JSON, FORMAT_BINARY
 from vnpy.gateway.ctp.ctp_gateway import CtpMdApi, symbol_exchange_map
 
+from .aggregator import IndexAggregator, IndexTickEncoder
+
 APP_NAME = 'Idx_Publisher'
 
 
@@ -70,6 +73,12 @@ class IndexTickPublisherV2(BaseEngine):
         self.status = {}
         self.subscribed_symbols = set()  # 已订阅合约代码
         self.ticks = {}
+        # 短合约 => 指数增量合成
+        self.aggregators = {}
+        # 指数tick的json编码
+        self.encoder = IndexTickEncoder()
+        # 发布格式 json/binary，rabbit_config的tick_format配置项
+        self.tick_format = FORMAT_JSON
 
         self.dt = datetime.now()
         # 本地/vnpy/data/tdx/future_contracts.json
@@ -211,6 +220,7 @@ class IndexTickPublisherV2(BaseEngine):
         rabbit_config = kwargs.get('rabbit_config', {})
         self.write_log(f'创建rabbitMQ 消息推送桩,{rabbit_config}')
         self.conf.update(rabbit_config)
+        self.tick_format = self.conf.get('tick_format', FORMAT_JSON)
         self.create_publisher(self.conf)
 
     def subscribe(self, req: SubscribeRequest):
@@ -232,74 +242,41 @@ class IndexTickPublisherV2(BaseEngine):
 
         short_symbol = get_underlying_symbol(tick.symbol).upper()
         # 更新tick
-        tick_dict = self.ticks.get(short_symbol, None)
-        if tick_dict is None:
-            tick_dict = {tick.symbol: tick}
-            self.ticks.update({short_symbol: tick_dict})
+        aggregator = self.aggregators.get(short_symbol, None)
+        if aggregator is None:
+            aggregator = IndexAggregator()
+            aggregator.update(tick)
+            self.aggregators.update({short_symbol: aggregator})
+            self.ticks.update({short_symbol: aggregator.ticks})
             return
 
         # 与最后
         last_dt = self.last_tick_dt.get(short_symbol, tick.datetime)
 
-        # 进行指数合成
+        # 进行指数合成(累加值在合约tick更新时增量维护，此处不再遍历所有合约)
         if last_dt and tick.datetime.second != last_dt.second:
-            all_amount = 0
-            all_interest = 0
-            all_volume = 0
-            all_ask1 = 0
-            all_bid1 = 0
-            last_price = 0
-            ask_price_1 = 0
-            bid_price_1 = 0
-            mi_tick = None
-
             # 已经积累的行情tick数量，不足总数减1，不处理
             n = self.underly_symbols_num_dict.get(short_symbol, 1)
-            if len(tick_dict) < min(n*0.8, 3) :
-                self.write_log(f'{short_symbol}合约数据{len(tick_dict)}不足{n} 0.8,暂不合成指数')
+            if len(aggregator) < min(n*0.8, 3) :
+                self.write_log(f'{short_symbol}合约数据{len(aggregator)}不足{n} 0.8,暂不合成指数')
                 return
 
-            # 计算所有合约的累加持仓量、资金、成交量、找出最大持仓量的主力合约
-            for t in tick_dict.values():
-                all_interest += t.open_interest
-                all_amount += t.last_price * t.open_interest
-                all_volume += t.volume
-                all_ask1 += t.ask_price_1 * t.open_interest
-                all_bid1 += t.bid_price_1 * t.open_interest
-                if mi_tick is None or mi_tick.open_interest < t.open_interest:
-                    mi_tick = t
-
-            # 总量 > 0
-            if all_interest > 0 and all_amount > 0:
-                last_price = round(float(all_amount / all_interest), 4)
-            # 卖1价
-            if all_ask1 > 0 and all_interest > 0:
-                ask_price_1 = round(float(all_ask1 / all_interest), 4)
-            # 买1价
-            if all_bid1 > 0 and all_interest > 0:
-                bid_price_1 = round(float(all_bid1 / all_interest), 4)
-
-            if mi_tick and last_price > 0:
-                if self.pub:
-                    d = copy.copy(mi_tick.__dict__)
-                    # 时间 =》 字符串
-                    if isinstance(mi_tick.datetime, datetime):
-                        d.update({'datetime': mi_tick.datetime.strftime('%Y-%m-%d %H:%M:%S.%f')})
-                    # 变量 => 字符串
-                    d.update({'exchange': mi_tick.exchange.value})
-                    d.update({'symbol': f'{short_symbol}99', 'vt_symbol': f'{short_symbol}99.{mi_tick.exchange.value}'})
-                    # 更新未指数的持仓量、交易量，最后价格，ask1，bid1
-                    d.update({'open_interest': all_interest, 'volume': all_volume,
-                              'last_price': last_price, 'ask_price_1': ask_price_1, 'bid_price_1': bid_price_1})
-                    #print('{} {}:{}'.format(d.get('datetime'), d.get("vt_symbol"), d.get('last_price')))
-                    d = json.dumps(d)
-                    self.pub.pub(d)
+            if self.pub:
+                mi_tick, all_interest, all_volume, last_price, ask_price_1, bid_price_1 = aggregator.get_index()
+                if mi_tick and last_price > 0:
+                    if self.tick_format == FORMAT_BINARY:
+                        index_tick = self.encoder.make_tick(short_symbol, mi_tick, all_interest, all_volume,
+                                                            last_price, ask_price_1, bid_price_1)
+                        self.pub.pub_ticks([index_tick], tick_format=FORMAT_BINARY)
+                    else:
+                        d = self.encoder.encode(short_symbol, mi_tick, all_interest, all_volume,
+                                                last_price, ask_price_1, bid_price_1)
+                        self.pub.pub(d)
 
         # 更新时间
         self.last_tick_dt.update({short_symbol: tick.datetime})
 
-        tick_dict.update({tick.symbol: tick})
-        self.ticks.update({short_symbol: tick_dict})
+        aggregator.update(tick)
 
     def on_custom_tick(self, tick):
         pass
@@ -654,6 +631,9 @@ class IndexTickPublisher(BaseEngine):
         # 记录该接口的行情最后更新时间
         self.last_tick_dt = datetime.now()
 
+        # 二进制格式时，本次获取的所有tick合并为一条消息发布
+        binary_ticks = []
+
         for d in list(rt_list):
             tdx_symbol = d.get('code', None)
             if tdx_symbol.endswith('L9'):
@@ -758,9 +738,15 @@ class IndexTickPublisher(BaseEngine):
             self.symbol_tick_dict[tick.symbol] = tick
 
             if self.pub:
+                if self.conf.get('tick_format', FORMAT_JSON) == FORMAT_BINARY:
+                    binary_ticks.append(tick)
+                    continue
                 d = copy.copy(tick.__dict__)
                 if isinstance(tick.datetime, datetime):
                     d.update({'datetime': tick.datetime.strftime('%Y-%m-%d %H:%M:%S.%f')})
                 d.update({'exchange': tick.exchange.value})
                 d = json.dumps(d)
                 self.pub.pub(d)
+
+        if self.pub and binary_ticks:
+            self.pub.pub_ticks(binary_ticks, tick_format=FORMAT_BINARY)
@@ -2,11 +2,14 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Callable
 from types import ModuleType
 
+import numpy as np
+
 from vnpy.trader.object import ContractData, TickData, TradeData
 from vnpy.trader.constant import Exchange, OptionType, Direction, Offset
 from vnpy.trader.converter import PositionHolding
 
 from .time import calculate_days_to_expiry, ANNUAL_DAYS
+from .pricing import vectorized
 
 
 APP_NAME = "OptionMaster"
@@ -139,6 +142,7 @@ class OptionData(InstrumentData):
         self.calculate_price: Callable = None
         self.calculate_greeks: Callable = None
         self.calculate_impv: Callable = None
+        self.vectorized_model: str = ""
 
         # Implied volatility
         self.bid_impv: float = 0
@@ -176,6 +180,19 @@ class OptionData(InstrumentData):
             ask_price = self.tick.ask_price_1
             bid_price = self.tick.bid_price_1
 
+        if self.vectorized_model:
+            self.ask_impv, self.bid_impv = vectorized.calculate_impv(
+                [ask_price, bid_price],
+                underlying_price,
+                self.strike_price,
+                self.interest_rate,
+                self.time_to_expiry,
+                self.option_type,
+                self.vectorized_model
+            ).tolist()
+            self.mid_impv = (self.ask_impv + self.bid_impv) / 2
+            return
+
         self.ask_impv = self.calculate_impv(
             ask_price,
             underlying_price,
@@ -206,14 +223,27 @@ class OptionData(InstrumentData):
             return
         underlying_price += self.underlying_adjustment
 
-        price, delta, gamma, theta, vega = self.calculate_greeks(
-            underlying_price,
-            self.strike_price,
-            self.interest_rate,
-            self.time_to_expiry,
-            self.mid_impv,
-            self.option_type
-        )
+        if self.vectorized_model:
+            price, delta, gamma, theta, vega = (
+                greek.item() for greek in vectorized.calculate_greeks(
+                    underlying_price,
+                    self.strike_price,
+                    self.interest_rate,
+                    self.time_to_expiry,
+                    self.mid_impv,
+                    self.option_type,
+                    self.vectorized_model
+                )
+            )
+        else:
+            price, delta, gamma, theta, vega = self.calculate_greeks(
+                underlying_price,
+                self.strike_price,
+                self.interest_rate,
+                self.time_to_expiry,
+                self.mid_impv,
+                self.option_type
+            )
 
         self.cash_delta = delta * self.size
         self.cash_gamma = gamma * self.size
@@ -302,6 +332,7 @@ class OptionData(InstrumentData):
         self.calculate_greeks = pricing_model.calculate_greeks
         self.calculate_impv = pricing_model.calculate_impv
         self.calculate_price = pricing_model.calculate_price
+        self.vectorized_model = vectorized.get_model_name(pricing_model)
 
 
 class UnderlyingData(InstrumentData):
@@ -372,9 +403,17 @@ class ChainData:
         self.days_to_expiry: int = 0
         self.inverse: bool = False
 
+        # Vectorized pricing model name, empty for scalar calculation per option
+        self.vectorized_model: str = ""
+        self.option_list: List[OptionData] = []
+        self.strike_array: np.ndarray = None
+        self.type_array: np.ndarray = None
+        self.size_array: np.ndarray = None
+
     def add_option(self, option: OptionData) -> None:
         """"""
         self.options[option.vt_symbol] = option
+        self.option_list = []
 
         if option.option_type > 0:
             self.calls[option.chain_index] = option
@@ -429,11 +468,94 @@ class ChainData:
         """"""
         self.calculate_underlying_adjustment()
 
-        for option in self.options.values():
-            option.update_underlying_tick(self.underlying_adjustment)
+        if self.vectorized_model:
+            self.calculate_chain_greeks()
+        else:
+            for option in self.options.values():
+                option.update_underlying_tick(self.underlying_adjustment)
 
         self.calculate_pos_greeks()
 
+    def calculate_chain_greeks(self) -> None:
+        """
+        Calculate implied volatility and cash greeks of all options at once,
+        same result as OptionData.update_underlying_tick of every option.
+        """
+        if not self.option_list:
+            self.option_list = list(self.options.values())
+            self.strike_array = np.array([option.strike_price for option in self.option_list], dtype=float)
+            self.type_array = np.array([option.option_type for option in self.option_list], dtype=float)
+            self.size_array = np.array([option.size for option in self.option_list], dtype=float)
+
+        options = self.option_list
+        for option in options:
+            option.underlying_adjustment = self.underlying_adjustment
+
+        underlying_price = self.underlying.mid_price
+        if underlying_price:
+            underlying_price += self.underlying_adjustment
+
+            # Bid and ask implied volatility of options with tick
+            ticked = [i for i, option in enumerate(options) if option.tick]
+            if ticked:
+                count = len(ticked)
+                prices = np.empty(count * 2)
+                prices[:count] = [options[i].tick.ask_price_1 for i in ticked]
+                prices[count:] = [options[i].tick.bid_price_1 for i in ticked]
+
+                # Adjustment for crypto inverse option contract
+                if self.inverse:
+                    prices *= underlying_price
+
+                impvs = vectorized.calculate_impv(
+                    prices,
+                    underlying_price,
+                    np.tile(self.strike_array[ticked], 2),
+                    np.tile([options[i].interest_rate for i in ticked], 2),
+                    np.tile([options[i].time_to_expiry for i in ticked], 2),
+                    np.tile(self.type_array[ticked], 2),
+                    self.vectorized_model
+                ).tolist()
+
+                for n, i in enumerate(ticked):
+                    option = options[i]
+                    option.ask_impv = impvs[n]
+                    option.bid_impv = impvs[count + n]
+                    option.mid_impv = (option.ask_impv + option.bid_impv) / 2
+
+            # Cash greeks of options with implied volatility
+            priced = [i for i, option in enumerate(options) if option.mid_impv]
+            if priced:
+                _, delta, gamma, theta, vega = vectorized.calculate_greeks(
+                    underlying_price,
+                    self.strike_array[priced],
+                    [options[i].interest_rate for i in priced],
+                    [options[i].time_to_expiry for i in priced],
+                    [options[i].mid_impv for i in priced],
+                    self.type_array[priced],
+                    self.vectorized_model
+                )
+
+                size = self.size_array[priced]
+                if self.inverse:
+                    size = size / underlying_price
+
+                cash_greeks = zip(
+                    (delta * size).tolist(),
+                    (gamma * size).tolist(),
+                    (theta * size).tolist(),
+                    (vega * size).tolist()
+                )
+                for i, (cash_delta, cash_gamma, cash_theta, cash_vega) in zip(priced, cash_greeks):
+                    option = options[i]
+                    option.cash_delta = cash_delta
+                    option.cash_gamma = cash_gamma
+                    option.cash_theta = cash_theta
+                    option.cash_vega = cash_vega
+
+        for option in options:
+            option.calculate_pos_greeks()
+
     def update_trade(self, trade: TradeData) -> None:
         """"""
         option = self.options[trade.vt_symbol]
@@ -476,6 +598,8 @@ class ChainData:
 
     def set_pricing_model(self, pricing_model: ModuleType) -> None:
         """"""
+        self.vectorized_model = vectorized.get_model_name(pricing_model)
+
         for option in self.options.values():
             option.set_pricing_model(pricing_model)
 
@@ -0,0 +1,246 @@
+"""
+Vectorized Black-76 / Black-Scholes pricing for a whole option chain.
+
+All functions accept numpy arrays (or scalars that broadcast) and return
+arrays, greeks are scaled the same way as the scalar pricing modules.
+"""
+from types import ModuleType
+from typing import Tuple
+
+import numpy as np
+from scipy.special import ndtr
+
+BLACK_76 = "black_76"
+BLACK_SCHOLES = "black_scholes"
+
+# Scalar pricing modules with a vectorized equivalent (cython builds included)
+VECTORIZED_MODELS = {
+    "black_76": BLACK_76,
+    "black_76_cython": BLACK_76,
+    "black_scholes": BLACK_SCHOLES,
+    "black_scholes_cython": BLACK_SCHOLES,
+}
+
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 10.0
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def get_model_name(pricing_model: ModuleType) -> str:
+    """Vectorized model name of scalar pricing module, empty if not supported"""
+    module_name = pricing_model.__name__.rsplit(".", 1)[-1]
+    return VECTORIZED_MODELS.get(module_name, "")
+
+
+def pdf(x: np.ndarray) -> np.ndarray:
+    """Standard normal probability density"""
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def calculate_d1(
+    s: np.ndarray,
+    k: np.ndarray,
+    r: np.ndarray,
+    t: np.ndarray,
+    v: np.ndarray,
+    model: str = BLACK_76
+) -> np.ndarray:
+    """Calculate option D1 value (v and t must be positive)"""
+    if model == BLACK_76:
+        return (np.log(s / k) + (0.5 * v * v) * t) / (v * np.sqrt(t))
+    return (np.log(s / k) + (r + 0.5 * v * v) * t) / (v * np.sqrt(t))
+
+
+def _calculate_price_vega(
+    s: np.ndarray,
+    k: np.ndarray,
+    r: np.ndarray,
+    t: np.ndarray,
+    v: np.ndarray,
+    cp: np.ndarray,
+    model: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Option price and original vega, used by implied volatility iteration"""
+    sqrt_t = np.sqrt(t)
+    discount = np.exp(-r * t)
+    d1 = calculate_d1(s, k, r, t, v, model)
+    d2 = d1 - v * sqrt_t
+
+    if model == BLACK_76:
+        price = cp * (s * ndtr(cp * d1) - k * ndtr(cp * d2)) * discount
+        vega = s * discount * pdf(d1) * sqrt_t
+    else:
+        price = cp * (s * ndtr(cp * d1) - k * ndtr(cp * d2) * discount)
+        vega = s * pdf(d1) * sqrt_t
+    return price, vega
+
+
+def calculate_price(
+    s: np.ndarray,
+    k: np.ndarray,
+    r: np.ndarray,
+    t: np.ndarray,
+    v: np.ndarray,
+    cp: np.ndarray,
+    model: str = BLACK_76
+) -> np.ndarray:
+    """Calculate option price"""
+    s, k, r, t, v, cp = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (s, k, r, t, v, cp)))
+
+    # Return option space value if volatility or time not positive
+    valid = (v > 0) & (t > 0)
+    intrinsic = np.maximum(0, cp * (s - k))
+    if not valid.any():
+        return intrinsic
+
+    price, _ = _calculate_price_vega(
+        s, k, r, np.where(valid, t, 1), np.where(valid, v, 1), cp, model
+    )
+    return np.where(valid, price, intrinsic)
+
+
+def calculate_greeks(
+    s: np.ndarray,
+    k: np.ndarray,
+    r: np.ndarray,
+    t: np.ndarray,
+    v: np.ndarray,
+    cp: np.ndarray,
+    model: str = BLACK_76,
+    annual_days: int = 240
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Calculate option price and greeks arrays"""
+    s, k, r, t, v, cp = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (s, k, r, t, v, cp)))
+
+    valid = (v > 0) & (t > 0)
+    t_ = np.where(valid, t, 1)
+    v_ = np.where(valid, v, 1)
+
+    sqrt_t = np.sqrt(t_)
+    discount = np.exp(-r * t_)
+    d1 = calculate_d1(s, k, r, t_, v_, model)
+    d2 = d1 - v_ * sqrt_t
+    cdf_d1 = ndtr(cp * d1)
+    cdf_d2 = ndtr(cp * d2)
+    pdf_d1 = pdf(d1)
+
+    if model == BLACK_76:
+        price = cp * (s * cdf_d1 - k * cdf_d2) * discount
+        _delta = cp * discount * cdf_d1
+        _gamma = discount * pdf_d1 / (s * v_ * sqrt_t)
+        _theta = -s * discount * pdf_d1 * v_ / (2 * sqrt_t) \
+            + cp * r * s * discount * cdf_d1 \
+            - cp * r * k * discount * cdf_d2
+        _vega = s * discount * pdf_d1 * sqrt_t
+    else:
+        price = cp * (s * cdf_d1 - k * cdf_d2 * discount)
+        _delta = cp * cdf_d1
+        _gamma = pdf_d1 / (s * v_ * sqrt_t)
+        _theta = -s * pdf_d1 * v_ / (2 * sqrt_t) \
+            - cp * r * k * discount * cdf_d2
+        _vega = s * pdf_d1 * sqrt_t
+
+    price = np.where(valid, price, np.maximum(0, cp * (s - k)))
+    delta = np.where(valid, _delta * s * 0.01, 0)
+    gamma = np.where(valid, _gamma * s * s * 0.0001, 0)
+    theta = np.where(valid, _theta / annual_days, 0)
+    vega = np.where(valid, _vega / 100, 0)
+    return price, delta, gamma, theta, vega
+
+
+def calculate_impv(
+    price: np.ndarray,
+    s: np.ndarray,
+    k: np.ndarray,
+    r: np.ndarray,
+    t: np.ndarray,
+    cp: np.ndarray,
+    model: str = BLACK_76,
+    max_iterations: int = 100,
+    tolerance: float = 0.00001
+) -> np.ndarray:
+    """
+    Calculate option implied volatility array.
+
+    Newton's method runs on all options at once. Each option keeps a bracket
+    [low, high] around the solution, a Newton step leaving the bracket
+    (or with zero vega) falls back to bisection. Options which have no
+    solution (price not positive, below exercise value or above the
+    upper bound) get 0, same as the scalar model.
+    """
+    price, s, k, r, t, cp = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, s, k, r, t, cp)))
+    impv = np.zeros(price.shape)
+
+    # Price must be between minimum (exercise) value and maximum value
+    t_ = np.where(t > 0, t, 1)
+    discount = np.exp(-r * t_)
+    if model == BLACK_76:
+        lower = np.maximum(cp * (s - k), 0) * discount
+        upper = np.where(cp > 0, s, k) * discount
+    else:
+        lower = np.maximum(cp * (s - k * discount), 0)
+        upper = np.where(cp > 0, s, k * discount)
+
+    index = np.flatnonzero((t > 0) & (price > 0) & (price > lower) & (price < upper))
+    if not index.size:
+        return impv
+
+    target = price.ravel()[index]
+    s = s.ravel()[index]
+    k = k.ravel()[index]
+    r = r.ravel()[index]
+    t = t.ravel()[index]
+    cp = cp.ravel()[index]
+
+    # Start from inflection point of price on volatility,
+    # Newton's method converges monotonically from there.
+    if model == BLACK_76:
+        moneyness = np.log(s / k)
+    else:
+        moneyness = np.log(s / k) + r * t
+    v = np.clip(np.sqrt(2 * np.abs(moneyness) / t), 0.1, MAX_VOLATILITY)
+
+    low = np.zeros(v.shape)
+    high = np.full(v.shape, MAX_VOLATILITY)
+    result = impv.ravel()
+
+    for i in range(max_iterations):
+        p, vega = _calculate_price_vega(s, k, r, t, v, cp, model)
+
+        # Shrink bracket
+        above = p > target
+        high = np.where(above, v, high)
+        low = np.where(above, low, v)
+
+        # Newton step, bisection if step leaves bracket
+        with np.errstate(divide="ignore", invalid="ignore"):
+            new_v = v - (p - target) / vega
+        outside = ~((new_v > low) & (new_v < high))
+        new_v = np.where(outside, (low + high) / 2, new_v)
+
+        done = np.abs(new_v - v) < tolerance
+        v = new_v
+
+        if done.any():
+            result[index[done]] = v[done]
+
+            keep = ~done
+            if not keep.any():
+                break
+
+            index = index[keep]
+            target = target[keep]
+            s = s[keep]
+            k = k[keep]
+            r = r[keep]
+            t = t[keep]
+            cp = cp[keep]
+            v = v[keep]
+            low = low[keep]
+            high = high[keep]
+
+    # Volatility of solutions at the upper bound is invalid
+    result[(result < MIN_VOLATILITY) | (result >= MAX_VOLATILITY)] = 0
+
+    # Round to 4 decimal places
+    return np.round(impv, 4)
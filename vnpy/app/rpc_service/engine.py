@@ -4,8 +4,9 @@ import traceback
 from typing import Optional, Callable
 
 from vnpy.event import Event, EventEngine
-from vnpy.rpc import RpcServer
+from vnpy.rpc import RpcServer, DEFAULT_FAST_FUNCTIONS
 from vnpy.trader.engine import BaseEngine, MainEngine
+from vnpy.trader.event import EVENT_TICK
 from vnpy.trader.utility import load_json, save_json
 from vnpy.trader.object import LogData
 
@@ -24,6 +25,14 @@ class RpcEngine(BaseEngine):
 
         self.rep_address = "tcp://*:2014"
         self.pub_address = "tcp://*:4102"
+        # 工作线程数(缺省0: 逐个执行请求)，大于0时，快速通道的函数(委托、撤单)不会被耗时的查询阻塞
+        self.worker_count = 0
+        self.fast_functions = list(DEFAULT_FAST_FUNCTIONS)
+        # 发布的编码("E": 事件编码，"P": pickle)，tick批量发布的间隔(秒，0: 逐个发布)
+        # legacy_publish: 旧版本的发布格式，兼容未升级的订阅端
+        self.publish_codec = "E"
+        self.tick_batch_interval = 0
+        self.legacy_publish = False
 
         self.server: Optional[RpcServer] = None
 
@@ -69,12 +78,27 @@ class RpcEngine(BaseEngine):
         setting = load_json(self.setting_filename)
         self.rep_address = setting.get("rep_address", self.rep_address)
         self.pub_address = setting.get("pub_address", self.pub_address)
+        self.worker_count = setting.get("worker_count", self.worker_count)
+        self.fast_functions = setting.get("fast_functions", self.fast_functions)
+        self.server.set_workers(self.worker_count, self.fast_functions)
+
+        self.publish_codec = setting.get("publish_codec", self.publish_codec)
+        self.tick_batch_interval = setting.get("tick_batch_interval", self.tick_batch_interval)
+        self.legacy_publish = setting.get("legacy_publish", self.legacy_publish)
+        self.server.set_publish(codec=self.publish_codec,
+                                batch_interval=self.tick_batch_interval,
+                                legacy=self.legacy_publish)
 
     def save_setting(self):
         """"""
         setting = {
             "rep_address": self.rep_address,
-            "pub_address": self.pub_address
+            "pub_address": self.pub_address,
+            "worker_count": self.worker_count,
+            "fast_functions": self.fast_functions,
+            "publish_codec": self.publish_codec,
+            "tick_batch_interval": self.tick_batch_interval,
+            "legacy_publish": self.legacy_publish
         }
         save_json(self.setting_filename, setting)
 
@@ -120,9 +144,17 @@ class RpcEngine(BaseEngine):
         self.event_engine.register_general(self.process_event)
 
     def process_event(self, event: Event):
-        """"""
+        """
+        发布事件，主题为 事件类型 + vt_symbol，订阅端可以只订阅部分合约
+        合约的事件(如 "eTick.rb2105.SHFE")类型已包含vt_symbol，主题与通用事件相同
+        """
         if self.server.is_active():
-            self.server.publish("", event)
+            vt_symbol = getattr(event.data, "vt_symbol", None)
+            if isinstance(vt_symbol, str) and not event.type.endswith(vt_symbol):
+                topic = f"{event.type}{vt_symbol}"
+            else:
+                topic = event.type
+            self.server.publish(topic, event, batch=event.type == EVENT_TICK)
 
     def write_log(self, msg: str) -> None:
         """"""
@@ -22,6 +22,7 @@ from vnpy.api.rest.rest_client import RestClient
 from vnpy.trader.utility import load_json, save_json
 from vnpy.amqp.producer import publisher
 from vnpy.amqp.consumer import worker
+from vnpy.amqp.tick_codec import FORMAT_JSON, FORMAT_BINARY, MAX_BATCH_SIZE
 
 APP_NAME = 'Stock_Publisher'
 REST_HOST = 'http://49.234.35.135:8006'
@@ -381,7 +382,14 @@ class StockTickPublisher(BaseEngine):
             while self.active:
                 try:
                     d = self.pub_queue.get(block=True, timeout=1)
-                    if self.pub:
+                    if isinstance(d, TickData):
+                        # 取出队列中已有的tick，合并为一条消息
+                        ticks = [d]
+                        while len(ticks) < MAX_BATCH_SIZE and not self.pub_queue.empty():
+                            ticks.append(self.pub_queue.get_nowait())
+                        if self.pub:
+                            self.pub.pub_ticks(ticks, tick_format=FORMAT_BINARY)
+                    elif self.pub:
                         self.pub.pub(d)
                 except Exception as ex:  # noqa
                     pass
@@ -489,6 +497,10 @@ class StockTickPublisher(BaseEngine):
 
             # self.symbol_tick_dict[tick.symbol] = tick
             # =》写入本地队列
+            if self.conf.get('tick_format', FORMAT_JSON) == FORMAT_BINARY:
+                # 二进制格式，推送线程合并多个tick发布
+                self.pub_queue.put(tick)
+                continue
             d = copy.copy(tick.__dict__)
             if isinstance(tick.datetime, datetime):
                 d.update({'datetime': tick.datetime.strftime('%Y-%m-%d %H:%M:%S.%f')})
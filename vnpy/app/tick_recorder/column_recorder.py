@@ -0,0 +1,382 @@
+"""
+tick 列式文件记录
+TickFileRecorder 每分钟把每个合约的tick重新打开csv文件，逐个tick格式化字符串写入，记录全市场行情时文件打开和格式化的开销很大。
+TickColumnRecorder:
+    每个合约的tick按字段写入类型化的列缓存(时间为int64纳秒，数值字段为double)；
+    缓存达到行数或时间阈值后，由后台线程压缩(zlib)追加写入列式文件，每个合约的文件在交易日内保持打开，
+    超过close_idle秒没有写入的文件被关闭；
+    文件: {tick_folder}/yyyy/mm/dd/{vt_symbol}_{trading_day}.tcol
+        文件头: 'VTCOL' + 版本号(1字节) + json长度(2字节) + json(合约、交易所、交易日、字段列表、整数字段列表)
+        数据块: 行数(4字节) + 压缩长度(4字节) + zlib压缩的各列数据
+    写入时崩溃，文件末尾的数据块不完整：重新打开文件时截断到最后一个完整的数据块；
+    读取时校验每个数据块(解压后的长度)，跳过损坏的数据块，从后面的完整数据块继续读取
+    export_tick_csv 把列式文件导出为与 TickFileRecorder 格式一致的csv文件
+华富资产
+"""
+import csv
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from queue import Empty, Queue
+from threading import Thread
+from time import monotonic
+from typing import Dict, List
+
+from vnpy.amqp.tick_codec import NUMBER_FIELDS, datetime_to_ns, ns_to_datetime
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+COLUMN_MAGIC = b'VTCOL'
+COLUMN_VERSION = 1
+COLUMN_SUFFIX = '.tcol'
+
+FILE_HEADER_STRUCT = struct.Struct('<5sBH')
+CHUNK_HEADER_STRUCT = struct.Struct('<II')
+
+
+class TickColumnBuffer(object):
+    """单个合约的列缓存"""
+
+    def __init__(self, tick: TickData):
+        self.meta = {
+            'vt_symbol': tick.vt_symbol,
+            'symbol': tick.symbol,
+            'exchange': tick.exchange.value,
+            'gateway_name': tick.gateway_name,
+            'trading_day': tick.trading_day,
+            'name': tick.name,
+            'fields': NUMBER_FIELDS
+        }
+        self.datetimes = array('q')
+        self.columns = [array('d') for _ in NUMBER_FIELDS]
+        self.first_time = monotonic()
+        self.float_mask = 0  # 出现过非整数值的字段(按位)
+
+    def __len__(self):
+        return len(self.datetimes)
+
+    def append(self, tick: TickData):
+        if not self.datetimes:
+            self.first_time = monotonic()
+        self.datetimes.append(datetime_to_ns(tick.datetime))
+        d = tick.__dict__
+        for i, (column, field) in enumerate(zip(self.columns, NUMBER_FIELDS)):
+            value = d.get(field) or 0
+            if not isinstance(value, int):
+                self.float_mask |= 1 << i
+            column.append(value)
+
+    def seal(self) -> tuple:
+        """取出缓存的数据(meta, 行数, 未压缩的列数据)，并清空缓存"""
+        rows = len(self.datetimes)
+        data = self.datetimes.tobytes() + b''.join([c.tobytes() for c in self.columns])
+        self.datetimes = array('q')
+        self.columns = [array('d') for _ in NUMBER_FIELDS]
+        # 整数字段(新建文件时写入文件头，导出时还原为整数)
+        int_fields = [f for i, f in enumerate(NUMBER_FIELDS) if not self.float_mask & (1 << i)]
+        return dict(self.meta, int_fields=int_fields), rows, data
+
+
+class TickColumnRecorder(object):
+    """ Tick 列式文件保存"""
+
+    def __init__(self, tick_folder: str, flush_rows: int = 1000, flush_interval: float = 5,
+                 max_pending: int = 1000, compress_level: int = 1, close_idle: float = 600):
+        """
+        :param tick_folder: 保存目录
+        :param flush_rows: 单个合约缓存达到的行数后写入
+        :param flush_interval: 单个合约缓存超过的秒数后写入
+        :param max_pending: 等待后台线程写入的数据块上限，超过时阻塞记录线程
+        :param compress_level: zlib压缩级别
+        :param close_idle: 文件超过的秒数没有写入时关闭
+        """
+        self.tick_folder = tick_folder
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.compress_level = compress_level
+        self.close_idle = close_idle
+
+        self.buffers: Dict[str, TickColumnBuffer] = {}  # vt_symbol => 列缓存
+        # vt_symbol => [trading_day, 打开的文件, 最后写入时间]，只在写入线程中使用
+        self.files: Dict[str, list] = {}
+
+        self.flush_queue = Queue(maxsize=max_pending)
+        self.thread = Thread(target=self.run, name='TickColumnRecorder', daemon=True)
+        self.thread.start()
+        self.last_check = monotonic()
+
+        # 统计
+        self.recorded_count = 0
+        self.written_count = 0
+        self.chunk_count = 0
+        self.error_count = 0
+
+    def save_tick_data(self, tick_list: list = []):
+        """接收外部的保存tick请求，空列表只检查是否有超时的缓存"""
+        for tick in tick_list:
+            buffer = self.buffers.get(tick.vt_symbol, None)
+            if buffer is not None and buffer.meta['trading_day'] != tick.trading_day:
+                # 交易日切换，先写入上一交易日的数据
+                self.flush_buffer(tick.vt_symbol)
+                buffer = None
+            if buffer is None:
+                buffer = self.buffers[tick.vt_symbol] = TickColumnBuffer(tick)
+            buffer.append(tick)
+            self.recorded_count += 1
+            if len(buffer) >= self.flush_rows:
+                self.flush_buffer(tick.vt_symbol)
+
+        now = monotonic()
+        if now - self.last_check >= 1:
+            self.last_check = now
+            for vt_symbol, buffer in list(self.buffers.items()):
+                if len(buffer) > 0 and now - buffer.first_time >= self.flush_interval:
+                    self.flush_buffer(vt_symbol)
+
+    def flush_buffer(self, vt_symbol: str):
+        """缓存交给后台线程写入"""
+        buffer = self.buffers.get(vt_symbol, None)
+        if buffer is None or len(buffer) == 0:
+            return
+        self.flush_queue.put(buffer.seal())
+
+    def flush(self):
+        """所有缓存交给后台线程写入"""
+        for vt_symbol in list(self.buffers.keys()):
+            self.flush_buffer(vt_symbol)
+
+    def close(self):
+        """写入所有缓存，关闭文件"""
+        self.flush()
+        self.flush_queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        """后台写入线程"""
+        while True:
+            try:
+                task = self.flush_queue.get(timeout=min(self.close_idle, 60))
+            except Empty:
+                self.close_idle_files()
+                continue
+            if task is None:
+                break
+            try:
+                self.write_chunk(*task)
+            except Exception as ex:
+                self.error_count += 1
+                print(f'写入tick列式文件异常:{str(ex)}', file=sys.stderr)
+
+        for trading_day, f, last_write in self.files.values():
+            f.close()
+        self.files.clear()
+
+    def close_idle_files(self):
+        """关闭超过close_idle秒没有写入的文件"""
+        now = monotonic()
+        for vt_symbol, (trading_day, f, last_write) in list(self.files.items()):
+            if now - last_write >= self.close_idle:
+                f.close()
+                self.files.pop(vt_symbol)
+
+    def get_file_name(self, vt_symbol: str, trading_day: str) -> str:
+        file_folder = os.path.abspath(os.path.join(self.tick_folder, trading_day.replace('-', '/')))
+        return os.path.join(file_folder, f'{vt_symbol}_{trading_day}{COLUMN_SUFFIX}')
+
+    def get_file(self, meta: dict):
+        """合约当前交易日的文件，交易日切换时关闭旧文件"""
+        vt_symbol = meta['vt_symbol']
+        trading_day = meta['trading_day']
+        opened = self.files.get(vt_symbol, None)
+        if opened is not None:
+            if opened[0] == trading_day:
+                return opened[1]
+            opened[1].close()
+
+        file_name = self.get_file_name(vt_symbol, trading_day)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        if not os.path.exists(file_name):
+            open(file_name, 'wb').close()
+        f = open(file_name, 'r+b')
+        try:
+            # 截断到最后一个完整的数据块(上次写入时崩溃)
+            valid_size = get_valid_size(f.read())
+            if valid_size == 0:
+                print(f'create and write data into {file_name}')
+                f.seek(0)
+                f.truncate()
+                header = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+                f.write(FILE_HEADER_STRUCT.pack(COLUMN_MAGIC, COLUMN_VERSION, len(header)) + header)
+            else:
+                if valid_size < f.tell():
+                    print(f'{file_name}末尾不完整的数据块被截断:{f.tell()} => {valid_size}', file=sys.stderr)
+                    f.truncate(valid_size)
+                f.seek(valid_size)
+        except Exception:
+            f.close()
+            raise
+        self.files[vt_symbol] = [trading_day, f, monotonic()]
+        return f
+
+    def write_chunk(self, meta: dict, rows: int, data: bytes):
+        """压缩写入一个数据块"""
+        compressed = zlib.compress(data, self.compress_level)
+        f = self.get_file(meta)
+        f.write(CHUNK_HEADER_STRUCT.pack(rows, len(compressed)) + compressed)
+        f.flush()
+        self.files[meta['vt_symbol']][2] = monotonic()
+        self.written_count += rows
+        self.chunk_count += 1
+
+    def get_metrics(self) -> dict:
+        return {
+            'recorded': self.recorded_count,
+            'buffered': sum([len(b) for b in self.buffers.values()]),
+            'pending_chunks': self.flush_queue.qsize(),
+            'written': self.written_count,
+            'chunks': self.chunk_count,
+            'open_files': len(self.files),
+            'errors': self.error_count
+        }
+
+
+def get_valid_size(content: bytes) -> int:
+    """
+    文件头 + 完整数据块的长度(只检查长度，不解压)，文件头不完整时返回0
+    不是tick列式文件时抛出ValueError
+    """
+    if len(content) < FILE_HEADER_STRUCT.size:
+        return 0
+    magic, version, header_len = FILE_HEADER_STRUCT.unpack_from(content, 0)
+    if magic != COLUMN_MAGIC:
+        raise ValueError('不是tick列式文件')
+    pos = FILE_HEADER_STRUCT.size + header_len
+    if pos > len(content):
+        return 0
+    while pos + CHUNK_HEADER_STRUCT.size <= len(content):
+        rows, length = CHUNK_HEADER_STRUCT.unpack_from(content, pos)
+        if pos + CHUNK_HEADER_STRUCT.size + length > len(content):
+            break
+        pos += CHUNK_HEADER_STRUCT.size + length
+    return pos
+
+
+def read_chunk(content: bytes, pos: int, field_count: int):
+    """读取pos位置的数据块，返回(行数, 解压后的数据, 下一个数据块位置)，数据块损坏时返回None"""
+    if pos + CHUNK_HEADER_STRUCT.size > len(content):
+        return None
+    rows, length = CHUNK_HEADER_STRUCT.unpack_from(content, pos)
+    start = pos + CHUNK_HEADER_STRUCT.size
+    if rows == 0 or start + length > len(content):
+        return None
+    try:
+        data = zlib.decompress(content[start:start + length])
+    except zlib.error:
+        return None
+    if len(data) != rows * 8 * (field_count + 1):
+        return None
+    return rows, data, start + length
+
+
+def iter_chunks(content: bytes, pos: int, field_count: int, file_name: str = ''):
+    """逐个读取数据块，跳过损坏的数据块(向后查找下一个完整的数据块)"""
+    while pos + CHUNK_HEADER_STRUCT.size <= len(content):
+        chunk = read_chunk(content, pos, field_count)
+        if chunk is not None:
+            yield chunk[0], chunk[1]
+            pos = chunk[2]
+            continue
+
+        # 损坏的数据块：zlib数据以0x78开头，逐个位置尝试
+        bad_pos = pos
+        pos = content.find(b'\x78', pos + 1 + CHUNK_HEADER_STRUCT.size)
+        while pos >= 0:
+            chunk = read_chunk(content, pos - CHUNK_HEADER_STRUCT.size, field_count)
+            if chunk is not None:
+                break
+            pos = content.find(b'\x78', pos + 1)
+        if pos < 0:
+            if bad_pos + CHUNK_HEADER_STRUCT.size < len(content):
+                print(f'{file_name}位置{bad_pos}之后的数据块损坏，已忽略', file=sys.stderr)
+            return
+        pos -= CHUNK_HEADER_STRUCT.size
+        print(f'{file_name}位置{bad_pos}~{pos}的数据块损坏，已跳过', file=sys.stderr)
+
+
+def load_column_file(file_name: str) -> List[TickData]:
+    """读取列式文件，返回tick列表(损坏、末尾不完整的数据块被忽略)"""
+    ticks = []
+    with open(file_name, 'rb') as f:
+        content = f.read()
+
+    magic, version, header_len = FILE_HEADER_STRUCT.unpack_from(content, 0)
+    if magic != COLUMN_MAGIC:
+        raise ValueError(f'{file_name}不是tick列式文件')
+    if version != COLUMN_VERSION:
+        raise ValueError(f'{file_name}不支持的版本:{version}')
+    pos = FILE_HEADER_STRUCT.size
+    meta = json.loads(content[pos:pos + header_len].decode('utf-8'))
+    pos += header_len
+    fields = meta['fields']
+    int_fields = set(meta.get('int_fields', []))
+    exchange = Exchange(meta['exchange'])
+
+    for rows, data in iter_chunks(content, pos, len(fields), file_name):
+        datetimes = array('q')
+        datetimes.frombytes(data[:rows * 8])
+        columns = []
+        for i, field in enumerate(fields):
+            column = array('d')
+            start = rows * 8 * (i + 1)
+            column.frombytes(data[start:start + rows * 8])
+            if field in int_fields:
+                column = [int(v) if v.is_integer() else v for v in column]
+            columns.append(column)
+
+        for row in range(rows):
+            dt = ns_to_datetime(datetimes[row])
+            tick = TickData(gateway_name=meta['gateway_name'],
+                            symbol=meta['symbol'],
+                            exchange=exchange,
+                            datetime=dt,
+                            date=dt.strftime('%Y-%m-%d'),
+                            time=dt.strftime('%H:%M:%S.%f'),
+                            trading_day=meta['trading_day'],
+                            name=meta['name'])
+            tick.__dict__.update(zip(fields, [c[row] for c in columns]))
+            ticks.append(tick)
+    return ticks
+
+
+def export_tick_csv(file_name: str, csv_file_name: str = None) -> str:
+    """列式文件 => csv文件(字段与TickFileRecorder一致)"""
+    if csv_file_name is None:
+        csv_file_name = file_name[:-len(COLUMN_SUFFIX)] + '.csv' if file_name.endswith(COLUMN_SUFFIX) \
+            else file_name + '.csv'
+    ticks = load_column_file(file_name)
+    if len(ticks) == 0:
+        return csv_file_name
+
+    dict_fieldnames = sorted(list(ticks[0].__dict__))
+    dict_fieldnames.remove('datetime')
+    dict_fieldnames.insert(0, 'datetime')
+
+    with open(csv_file_name, 'w', encoding='utf8', newline='') as csvWriteFile:
+        writer = csv.DictWriter(f=csvWriteFile, fieldnames=dict_fieldnames, dialect='excel', extrasaction='ignore')
+        writer.writeheader()
+        for tick in ticks:
+            d = dict(tick.__dict__)
+            d.update({'datetime': tick.datetime.strftime('%Y-%m-%d %H:%M:%S.%f')})
+            writer.writerow(d)
+    return csv_file_name
+
+
+if __name__ == '__main__':
+    # python column_recorder.py 列式文件 [csv文件]
+    if len(sys.argv) < 2:
+        print(f'usage: python {sys.argv[0]} file.tcol [file.csv]')
+        sys.exit(1)
+    print(export_tick_csv(*sys.argv[1:3]))
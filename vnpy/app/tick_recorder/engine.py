@@ -5,7 +5,7 @@ tick 文件记录
 import os
 import csv
 from threading import Thread
-from queue import Queue, Empty
+from queue import Queue, Empty, Full
 from copy import copy
 from collections import defaultdict
 from datetime import datetime
@@ -22,6 +22,8 @@ from vnpy.trader.event import EVENT_TICK, EVENT_CONTRACT
 from vnpy.trader.utility import load_json, save_json
 from vnpy.app.spread_trading.base import EVENT_SPREAD_DATA, SpreadData
 
+from .column_recorder import TickColumnRecorder
+
 
 APP_NAME = "DataRecorder"
 
@@ -61,6 +63,12 @@ class TickFileRecorder(object):
 
             self.append_ticks_2_file(symbol=vt_symbol, tick_list=tick_list)
 
+    def close(self):
+        """保存所有未写入的数据"""
+        for key in list(self.tick_dict.keys()):
+            vt_symbol = key.split('_')[0]
+            self.append_ticks_2_file(symbol=vt_symbol, tick_list=self.tick_dict.pop(key))
+
     def append_ticks_2_file(self, symbol: str, tick_list: list):
         """创建/追加tick list 到csv文件"""
         if len(tick_list) == 0:
@@ -109,16 +117,23 @@ class TickRecorderEngine(BaseEngine):
         """"""
         super().__init__(main_engine, event_engine, APP_NAME)
 
-        self.queue = Queue()
         self.thread = Thread(target=self.run)
         self.active = False
 
         self.tick_recordings = {}
         self.tick_folder = ''
+        self.tick_format = 'csv'  # csv: TickFileRecorder, column: TickColumnRecorder
+        self.column_setting = {}  # TickColumnRecorder的参数
+        self.queue_size = 0  # 待记录tick的队列上限，0为不限制
+        self.dropped_count = 0  # 队列满时丢弃的tick数量
 
         self.load_setting()
 
-        self.tick_recorder = TickFileRecorder(self.tick_folder)
+        self.queue = Queue(maxsize=self.queue_size)
+        if self.tick_format == 'column':
+            self.tick_recorder = TickColumnRecorder(self.tick_folder, **self.column_setting)
+        else:
+            self.tick_recorder = TickFileRecorder(self.tick_folder)
 
         self.register_event()
         self.start()
@@ -129,12 +144,16 @@ class TickRecorderEngine(BaseEngine):
         setting = load_json(self.setting_filename)
         self.tick_recordings = setting.get("tick", {})
         self.tick_folder = setting.get('tick_folder', os.getcwd())
+        self.tick_format = setting.get('tick_format', 'csv')
+        self.column_setting = setting.get('column_setting', {})
+        self.queue_size = setting.get('queue_size', 0)
 
     def save_setting(self):
         """"""
-        setting = {
+        setting = load_json(self.setting_filename)
+        setting.update({
             "tick": self.tick_recordings
-        }
+        })
         save_json(self.setting_filename, setting)
 
     def run(self):
@@ -148,6 +167,8 @@ class TickRecorderEngine(BaseEngine):
                     self.tick_recorder.save_tick_data([data])
 
             except Empty:
+                # 没有新的tick时，检查超时的缓存
+                self.tick_recorder.save_tick_data([])
                 continue
 
     def close(self):
@@ -157,6 +178,18 @@ class TickRecorderEngine(BaseEngine):
         if self.thread.isAlive():
             self.thread.join()
 
+        self.tick_recorder.close()
+
+    def get_metrics(self) -> dict:
+        """记录状态：排队/丢弃的tick数量，以及记录器的统计"""
+        d = {
+            "queued": self.queue.qsize(),
+            "dropped": self.dropped_count
+        }
+        if isinstance(self.tick_recorder, TickColumnRecorder):
+            d.update(self.tick_recorder.get_metrics())
+        return d
+
     def start(self):
         """"""
         self.active = True
@@ -259,7 +292,10 @@ class TickRecorderEngine(BaseEngine):
     def record_tick(self, tick: TickData):
         """"""
         task = ("tick", copy(tick))
-        self.queue.put(task)
+        try:
+            self.queue.put_nowait(task)
+        except Full:
+            self.dropped_count += 1
 
     def subscribe(self, contract: ContractData):
         """"""
@@ -0,0 +1,129 @@
+# encoding: UTF-8
+
+# 缠论的增量计算
+# CtaLineBar 每根bar都用K线缓存中的全部bar重新生成ChanGraph(分型、笔、线段、中枢)，耗时与max_hold_bars成正比；
+# 已经确认的分型/笔/线段/中枢，之后的bar不会再改变它们，只有末尾未确认的部分会被修正。
+#
+# ChanWindowGraph：窗口重算 + 拼接
+#   窗口: 从上次结果中倒数第window_duan个线段的起点开始，到最新的bar
+#   拼接: 每类结构(分型/笔/线段/中枢)在窗口结果中找到第一个与上次结果相同的元素(同步点)，
+#         同步点之前沿用上次的结果，之后使用窗口的结果(窗口开头几根bar的结构不完整，丢弃)；
+#         中枢等稀疏的结构可能没有相同的元素，以笔的同步点为界：之前沿用上次的结果，之后使用窗口的结果
+#   退回全量计算: 线段不足、窗口起点已移出K线缓存、笔没有同步点、稀疏结构跨越笔的同步点
+#   缠论的规则仍由ChanGraph(chanlun组件)实现，与全量计算的一致性由 tests/component/regression_chan_window.py 校验
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence
+
+CHAN_LIST_NAMES = ['fenxing_list', 'bi_list', 'bi_zhongshu_list', 'duan_list', 'duan_zhongshu_list']
+
+
+def get_chan_start(item: Any) -> str:
+    """结构的开始时间(分型为所在bar的时间)"""
+    start = getattr(item, 'start', None)
+    return item.index if start is None else start
+
+
+def get_chan_end(item: Any) -> str:
+    """结构的结束时间(分型为所在bar的时间)"""
+    end = getattr(item, 'end', None)
+    return item.index if end is None else end
+
+
+def get_chan_key(item: Any) -> tuple:
+    """识别相同结构：开始、结束时间和方向"""
+    return get_chan_start(item), get_chan_end(item), item.direction
+
+
+class ChanWindowGraph(object):
+    """
+    缠论的增量计算
+    chan = ChanWindowGraph(ChanGraph, chan_lib, window_duan=4)
+    chan.update(index, high, low)   # 与 ChanGraph(chan_lib=, index=, high=, low=) 相同的输入
+    chan.lists['bi_list']           # 分型/笔/线段/中枢列表，与ChanGraph的同名属性对应
+    """
+
+    def __init__(self, graph_class: Callable, chan_lib: Any, window_duan: int = 4):
+        """
+        :param graph_class: ChanGraph
+        :param chan_lib: ChanLibrary
+        :param window_duan: 从倒数第几个线段的起点开始重算，0: 每次全量计算
+        """
+        self.graph_class = graph_class
+        self.chan_lib = chan_lib
+        self.window_duan = window_duan
+
+        self.graph = None  # 最近一次生成的ChanGraph(全量或窗口)
+        self.lists: Dict[str, List] = {name: [] for name in CHAN_LIST_NAMES}
+        self.full_count = 0  # 全量计算次数
+        self.window_count = 0  # 窗口计算次数
+
+    def update(self, index: Sequence[str], high: Sequence[float], low: Sequence[float]):
+        """用全部K线(时间、最高价、最低价)更新缠论结构，能增量时只计算窗口内的K线"""
+        start = self.get_window_start(index)
+        if start > 0:
+            graph = self.graph_class(chan_lib=self.chan_lib, index=index[start:], high=high[start:], low=low[start:])
+            lists = self.merge(graph, index[0], index[start])
+            if lists is not None:
+                self.graph = graph
+                self.lists = lists
+                self.window_count += 1
+                return
+
+        self.graph = self.graph_class(chan_lib=self.chan_lib, index=index, high=high, low=low)
+        self.lists = {name: list(getattr(self.graph, name)) for name in CHAN_LIST_NAMES}
+        self.full_count += 1
+
+    def get_window_start(self, index: Sequence[str]) -> int:
+        """窗口起点在index中的位置，0: 需要全量计算"""
+        duan_list = self.lists['duan_list']
+        if self.window_duan <= 0 or len(duan_list) < self.window_duan:
+            return 0
+        window_index = duan_list[-self.window_duan].start
+        start = bisect_left(index, window_index)
+        # 窗口起点已移出K线缓存
+        if start >= len(index) or index[start] != window_index:
+            return 0
+        return start
+
+    def merge(self, graph: Any, first_index: str, window_index: str):
+        """
+        拼接上次的结果与窗口的结果
+        :param first_index: K线缓存中第一根bar的时间，之前的结构被丢弃(与全量计算一致)
+        :param window_index: 窗口第一根bar的时间
+        :return: 拼接后的列表，找不到同步点时返回None
+        """
+        lists = {}
+        sync_index = None  # 笔的同步点
+        for name in ['bi_list'] + [name for name in CHAN_LIST_NAMES if name != 'bi_list']:
+            old = self.lists[name]
+            new = getattr(graph, name)
+            positions = {get_chan_key(item): i for i, item in enumerate(old)}
+            merged = None
+            for i, item in enumerate(new):
+                j = positions.get(get_chan_key(item), None)
+                # 笔的同步点：下一笔也要相同(上次的最后一笔未确认，可能被修正，不比较)
+                if j is not None and name == 'bi_list' and i + 1 < len(new) and j + 2 < len(old) \
+                        and get_chan_key(new[i + 1]) != get_chan_key(old[j + 1]):
+                    continue
+                if j is not None:
+                    merged = old[:j] + list(new[i:])
+                    if sync_index is None:
+                        sync_index = get_chan_start(item)
+                    break
+
+            if merged is None:
+                if sync_index is None:
+                    return None
+                # 没有相同的元素：上次的结构都在笔的同步点之前结束，窗口的结构都在同步点之后开始
+                if any(get_chan_end(item) > sync_index for item in old[-1:]) \
+                        or any(get_chan_start(item) < sync_index for item in new[:1]):
+                    return None
+                merged = list(old) + list(new)
+
+            # 已移出K线缓存的结构
+            n = 0
+            while n < len(merged) and get_chan_start(merged[n]) < first_index:
+                n += 1
+            lists[name] = merged[n:]
+        return lists
@@ -1,8 +1,6 @@
 # encoding: UTF-8
 
-import os
 import sys
-import json
 import uuid
 
 import traceback
@@ -10,7 +8,8 @@ import traceback
 from collections import OrderedDict
 from datetime import datetime
 from vnpy.trader.utility import get_folder_path
-from vnpy.component.base import Direction, CtaComponent,MyEncoder
+from vnpy.component.base import Direction, CtaComponent
+from vnpy.component.cta_state_store import JournalStore
 
 """
 网格交易，用于套利单
@@ -173,6 +172,8 @@ class CtaGridTrade(CtaComponent):
 
         # 网格json文件的路径
         self.json_file_path = str(get_folder_path('data').joinpath(f'{self.json_name}_Grids.json'))
+        # 持久化存储(快照 + 追加日志)
+        self.store = None
 
     def get_volume_rate(self, idx: int = 0):
         """获取网格索引对应的开仓数量比例"""
@@ -893,11 +894,16 @@ class CtaGridTrade(CtaComponent):
 
         data = self.to_json()
 
-        with open(grid_json_file, 'w', encoding='utf8') as f:
-            json_data = json.dumps(data, indent=4, ensure_ascii=False, cls=MyEncoder)
-            f.write(json_data)
+        # 只追加发生变化的网格，没有变化时不写入
+        if self.get_store().save(data) > 0:
+            self.write_log(u'GrideTrade保存文件{}完成'.format(grid_json_file))
 
-        self.write_log(u'GrideTrade保存文件{}完成'.format(grid_json_file))
+    def get_store(self):
+        """网格的持久化存储，策略改名后对应新的文件"""
+        grid_json_file = str(get_folder_path('data').joinpath(u'{}_Grids.json'.format(self.json_name)))
+        if self.store is None or self.store.file_name != grid_json_file:
+            self.store = JournalStore(grid_json_file, on_error=self.write_error)
+        return self.store
 
     def load(self, direction, open_status_filter=[], **kwargs):
         """
@@ -907,31 +913,27 @@ class CtaGridTrade(CtaComponent):
         :return:
         """
         data = {}
-        grids_save_path = get_folder_path('data')
 
         if self.json_name != self.strategy.strategy_name:
             self.write_log(u'JsonName {} 与 上层策略名{} 不一致.'.format(self.json_name, self.strategy.strategy_name))
             self.json_name = self.strategy.strategy_name
 
         # 若json文件不存在，就保存一个；若存在，就优先使用数据文件
-        grid_json_file = str(grids_save_path.joinpath(u'{}_Grids.json'.format(self.json_name)))
-        if not os.path.exists(grid_json_file):
+        store = self.get_store()
+        if not store.exists():
             data['up_grids'] = []
             data['dn_grids'] = []
-            self.write_log(u'{}不存在，新建保存保存'.format(grid_json_file))
+            self.write_log(u'{}不存在，新建保存保存'.format(store.file_name))
             try:
-                with open(grid_json_file, 'w') as f:
-                    json_data = json.dumps(data, indent=4, ensure_ascii=False)
-                    f.write(json_data)
+                store.save(data)
             except Exception as ex:
-                self.write_log(u'写入网格文件{}异常:{}'.format(grid_json_file, str(ex)))
+                self.write_log(u'写入网格文件{}异常:{}'.format(store.file_name, str(ex)))
         else:
-            # 读取json文件
+            # 读取json文件(快照 + 重放日志)
             try:
-                with open(grid_json_file, 'r', encoding='utf8') as f:
-                    data = json.load(f)
+                data = store.load()
             except Exception as ex:
-                self.write_error(u'读取网格文件{}异常:{}'.format(grid_json_file, str(ex)))
+                self.write_error(u'读取网格文件{}异常:{}'.format(store.file_name, str(ex)))
 
         #  从文件获取数据
         json_grids = []
@@ -973,16 +975,18 @@ class CtaGridTrade(CtaComponent):
 
         data_folder = get_folder_path('data')
 
+        # 旧文件(快照和日志)
+        old_store = JournalStore(str(data_folder.joinpath(u'{0}_Grids.json'.format(old_name))))
         self.json_name = new_name
-        # 旧文件
-        old_json_file = str(data_folder.joinpath(u'{0}_Grids.json'.format(old_name)))
 
-        if os.path.isfile(old_json_file):  # 新文件若存在，移除
+        if old_store.exists():  # 新文件若存在，移除
             try:
-                os.remove(old_json_file)
+                old_store.remove()
             except Exception as ex:
-                self.write_error(u'GridTrade.change_strategy_name 删除文件：{}异常:{}'.format(old_json_file, str(ex)))
+                self.write_error(u'GridTrade.change_strategy_name 删除文件：{}异常:{}'.format(old_store.file_name, str(ex)))
 
+        # 新文件重新写入完整快照
+        self.store = None
         self.save()
 
     def get_types_of_opened_grids(self, direction: Direction, include_empty: bool = False):
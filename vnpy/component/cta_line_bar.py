@@ -13,7 +13,6 @@ import traceback
 import talib as ta
 import numpy as np
 import pandas as pd
-import csv
 
 from collections import OrderedDict
 from datetime import datetime, timedelta
@@ -26,10 +25,23 @@ from vnpy.component.base import (
     NIGHT_MARKET_23,
     NIGHT_MARKET_SQ2,
     MARKET_ZJ)
+from vnpy.component.cta_chan_window import ChanWindowGraph
 from vnpy.component.cta_period import CtaPeriod, Period
+from vnpy.component.cta_ring_buffer import RingArray, RingList
+from vnpy.component.cta_stream_indicator import (
+    chained_ema,
+    RollingMean,
+    RollingStd,
+    RollingExtreme,
+    WindowSmoother,
+    WindowAtr,
+    WindowRsi,
+    Macd,
+    WindowMacd)
 from vnpy.trader.object import BarData, TickData
 from vnpy.trader.constant import Interval, Color, ChanSignals
 from vnpy.trader.utility import round_to, get_trading_date, get_underlying_symbol
+from vnpy.trader.util_append_log import get_append_log_service, read_last_line
 from vnpy.component.cta_utility import check_chan_xt, check_chan_xt_three_bi, check_qsbc_2nd
 
 try:
@@ -84,6 +96,30 @@ def get_cta_bar_class(bar_type: str):
     raise Exception('no matched CTA  bar type:{}'.format(bar_type))
 
 
+class LazyIndicator(object):
+    """
+    lazy_count模式下的指标属性(line_xxx/cur_xxx)
+    值仍保存在实例的__dict__中(pickle、restore不变)；读取时存在延迟计算的bar，先计算指标
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        d = instance.__dict__
+        if d.get('pending_context', None) is not None:
+            instance.count_indicators()
+        try:
+            return d[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+
 class CtaLineBar(object):
     """CTA K线"""
 
@@ -146,6 +182,9 @@ class CtaLineBar(object):
     CB_ON_BAR = 'cb_on_bar'
     CB_ON_PERIOD = 'cb_on_period'
 
+    # 行情状态，不是指标，lazy_count模式下读取时不触发计算
+    MARKET_ATTRIBUTES = ['line_bar', 'cur_bar', 'cur_datetime', 'cur_price', 'cur_tick', 'cur_trading_day']
+
     # 参数列表，保存了参数的名称
     param_list = ['vt_symbol']
 
@@ -176,29 +215,30 @@ class CtaLineBar(object):
 
         # K线保存数据
         self.cur_bar = None  # K线数据对象，代表最后一根/未走完的bar
-        self.line_bar = []  # K线缓存数据队列(缓存合成完 以及正在合成的bar)
+        self.line_bar = RingList()  # K线缓存数据队列(缓存合成完 以及正在合成的bar)
         self.bar_len = 0  # 当前K线得真实数量(包含已经合成以及正在合成的bar)
+        self.bar_count = 0  # 累计已合成完毕的bar数量(不受max_hold_bars限制)，增量指标内核据此补充计算
         self.max_hold_bars = 2000
         self.is_first_tick = False  # K线的第一条Tick数据
 
+        # 指标计算
+        # 延迟计算：bar完成时只登记，在读取指标(实时指标、line_xxx/cur_xxx)、下一根bar完成时才计算；
+        # 策略on_bar回调中没有读取指标时，不计算
+        self.lazy_count = False
+        self.pending_bar = None  # 已完成、但尚未计算指标的bar
+        self.pending_context = None  # 延迟计算时，bar完成时刻的行情状态
+        self.count_funcs = None  # 根据指标参数生成的，每根bar需要执行的计算函数清单
+
         # (实时运行时，或者addbar小于bar得周期时，不包含最后一根正在合成的Bar）
         # 目标bar合成成功后，才会更新以下序列
-        self.index_list = []
-        self.open_array = np.zeros(self.max_hold_bars)  # 与lineBar一致得开仓价清单
-        self.open_array[:] = np.nan
-        self.high_array = np.zeros(self.max_hold_bars)  # 与lineBar一致得最高价清单
-        self.high_array[:] = np.nan
-        self.low_array = np.zeros(self.max_hold_bars)  # 与lineBar一致得最低价清单
-        self.low_array[:] = np.nan
-        self.close_array = np.zeros(self.max_hold_bars)  # 与lineBar一致得收盘价清单
-        self.close_array[:] = np.nan
-
-        self.mid3_array = np.zeros(self.max_hold_bars)  # 收盘价/最高/最低价 的平均价
-        self.mid3_array[:] = np.nan
-        self.mid4_array = np.zeros(self.max_hold_bars)  # 收盘价*2/最高/最低价 的平均价
-        self.mid4_array[:] = np.nan
-        self.mid5_array = np.zeros(self.max_hold_bars)  # 收盘价*2/开仓价/最高/最低价 的平均价
-        self.mid5_array[:] = np.nan
+        self.index_list = RingList()
+        self._open_series = RingArray(self.max_hold_bars)  # 与lineBar一致得开仓价清单
+        self._high_series = RingArray(self.max_hold_bars)  # 与lineBar一致得最高价清单
+        self._low_series = RingArray(self.max_hold_bars)  # 与lineBar一致得最低价清单
+        self._close_series = RingArray(self.max_hold_bars)  # 与lineBar一致得收盘价清单
+        self._mid3_series = RingArray(self.max_hold_bars)  # 收盘价/最高/最低价 的平均价
+        self._mid4_series = RingArray(self.max_hold_bars)  # 收盘价*2/最高/最低价 的平均价
+        self._mid5_series = RingArray(self.max_hold_bars)  # 收盘价*2/开仓价/最高/最低价 的平均价
         # 导出到CSV文件 的目录名 和 要导出的 字段
         self.export_filename = None  # 数据要导出的目标文件夹
         self.export_fields = []  # 定义要导出的K线数据字段（包含K线元素，主图指标，附图指标等）
@@ -288,6 +328,7 @@ class CtaLineBar(object):
         self.param_list.append('is_stock')  # 是否为7X24小时运行的bar（一般为数字货币)
         self.param_list.append('price_tick')  # 最小跳动，用于处理指数等不一致的价格
         self.param_list.append('underly_symbol')  # 短合约，
+        self.param_list.append('lazy_count')  # 延迟计算指标
 
         # ----------  下方为指标输入参数     ---------------
         self.param_list.append('para_pre_len')  # 唐其安通道的长度（前高/前低）
@@ -373,6 +414,7 @@ class CtaLineBar(object):
         self.param_list.append('para_bd_len')
 
         self.param_list.append('para_active_chanlun')  # 激活缠论
+        self.param_list.append('para_chanlun_window')  # 缠论增量计算
         self.param_list.append('para_active_chan_xt')  # 激活缠论的形态分析
 
     def init_properties(self):
@@ -394,7 +436,7 @@ class CtaLineBar(object):
         """移除Pickle dump()时不支持的Attribute"""
         state = self.__dict__.copy()
         # Remove the unpicklable entries.
-        remove_keys = ['strategy', 'cb_on_bar', 'cb_on_period', 'chan_lib']
+        remove_keys = ['strategy', 'cb_on_bar', 'cb_on_period', 'chan_lib', 'count_funcs', 'chan_window']
         for key in self.__dict__.keys():
             if key in remove_keys:
                 del state[key]
@@ -402,14 +444,70 @@ class CtaLineBar(object):
 
     def __setstate__(self, state):
         """Pickle load()"""
-        self.__dict__.update(state)
+        self.__dict__.update(self.upgrade_state(state))
+
+    @staticmethod
+    def upgrade_state(state: dict):
+        """兼容旧版本的pickle缓存：numpy定长数组 => RingArray, 指标list => RingList"""
+        for name in ['open', 'high', 'low', 'close', 'mid3', 'mid4', 'mid5']:
+            array = state.pop(f'{name}_array', None)
+            if isinstance(array, np.ndarray):
+                state[f'_{name}_series'] = RingArray.from_array(array)
+        for key, value in state.items():
+            if isinstance(value, list) and (key.startswith('line_') or key == 'index_list'):
+                state[key] = RingList(value)
+        state.setdefault('bar_count', len(state.get('index_list', [])))
+        state.setdefault('indicator_kernels', {})
+        state.setdefault('lazy_count', False)
+        state.setdefault('pending_bar', None)
+        state.setdefault('pending_context', None)
+        state.setdefault('para_chanlun_window', 0)
+        state['count_funcs'] = None
+        state['chan_window'] = None
+        return state
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
-            if key in ['chan_lib']:
+            if key in ['chan_lib', 'count_funcs']:
                 continue
             self.__dict__[key] = state.__dict__[key]
+        self.count_funcs = None
+
+    @property
+    def open_array(self):
+        """开仓价序列(最近max_hold_bars个，不足部分为nan)"""
+        return self._open_series.array
+
+    @property
+    def high_array(self):
+        """最高价序列"""
+        return self._high_series.array
+
+    @property
+    def low_array(self):
+        """最低价序列"""
+        return self._low_series.array
+
+    @property
+    def close_array(self):
+        """收盘价序列"""
+        return self._close_series.array
+
+    @property
+    def mid3_array(self):
+        """(收盘价+最高价+最低价)/3 序列"""
+        return self._mid3_series.array
+
+    @property
+    def mid4_array(self):
+        """(收盘价*2+最高价+最低价)/4 序列"""
+        return self._mid4_series.array
+
+    @property
+    def mid5_array(self):
+        """(收盘价*2+开仓价+最高价+最低价)/5 序列"""
+        return self._mid5_series.array
 
     def init_indicators(self):
         """ 初始化定义所有的指标输入参数，以及指标生成的数据 """
@@ -500,9 +598,12 @@ class CtaLineBar(object):
         self.para_bd_len = 0  # 波段买卖观测长度
 
         # --------------- K 线的指标相关计算结果数据 ----------------
+        # 增量指标内核 {名称(含参数): StreamIndicator}
+        self.indicator_kernels = {}
+
         # 唐其安通道
-        self.line_pre_high = []  # K线的前para_pre_len的的最高
-        self.line_pre_low = []  # K线的前para_pre_len的的最低
+        self.line_pre_high = RingList()  # K线的前para_pre_len的的最高
+        self.line_pre_low = RingList()  # K线的前para_pre_len的的最低
         # 唐其安高点、低点清单（相当于缠论的分型）
         self.tqa_high_list = []  # 所有的创新高的高点(分型）清单 { "price":xxx, "datetime": "yyyy-mm-dd HH:MM:SS"}
         self.tqa_low_list = []  # 所有的创新低的低点（分型）清单 { "price":xxx, "datetime": "yyyy-mm-dd HH:MM:SS"}
@@ -512,15 +613,15 @@ class CtaLineBar(object):
         self.cur_tqa_zs = {}  # 当前唐其安中枢。
         self.tqa_zs_list = []
 
-        self.line_ma1 = []  # K线的MA(para_ma1_len)均线，不包含未走完的bar
-        self.line_ma2 = []  # K线的MA(para_ma2_len)均线，不包含未走完的bar
-        self.line_ma3 = []  # K线的MA(para_ma3_len)均线，不包含未走完的bar
+        self.line_ma1 = RingList()  # K线的MA(para_ma1_len)均线，不包含未走完的bar
+        self.line_ma2 = RingList()  # K线的MA(para_ma2_len)均线，不包含未走完的bar
+        self.line_ma3 = RingList()  # K线的MA(para_ma3_len)均线，不包含未走完的bar
         self._rt_ma1 = None  # K线的实时MA(para_ma1_len)
         self._rt_ma2 = None  # K线的实时MA(para_ma2_len)
         self._rt_ma3 = None  # K线的实时MA(para_ma3_len)
-        self.line_ma1_atan = []  # K线的MA(para_ma2_len)均线斜率
-        self.line_ma2_atan = []  # K线的MA(para_ma2_len)均线斜率
-        self.line_ma3_atan = []  # K线的MA(para_ma2_len)均线斜率
+        self.line_ma1_atan = RingList()  # K线的MA(para_ma2_len)均线斜率
+        self.line_ma2_atan = RingList()  # K线的MA(para_ma2_len)均线斜率
+        self.line_ma3_atan = RingList()  # K线的MA(para_ma2_len)均线斜率
         self._rt_ma1_atan = None
         self._rt_ma2_atan = None
         self._rt_ma3_atan = None
@@ -542,15 +643,15 @@ class CtaLineBar(object):
         self.ma23_cross_price = None  # ma2 与 ma3 ,金叉/死叉时，K线价格数值
 
         self.cur_ama = 0
-        self.line_ama = []  # K线的AMA 均线，周期是para_ema1_len
+        self.line_ama = RingList()  # K线的AMA 均线，周期是para_ema1_len
         self.cur_er = 0  # 当前变动速率
-        self.line_ama_er = []  # 变动速率:=整个周期价格的总体变动/每个周期价格变动的累加, +正数，向上 变动，负数，向下变动
+        self.line_ama_er = RingList()  # 变动速率:=整个周期价格的总体变动/每个周期价格变动的累加, +正数，向上 变动，负数，向下变动
 
-        self.line_ema1 = []  # K线的EMA1均线，周期是para_ema1_len1，不包含当前bar
-        self.line_ema2 = []  # K线的EMA2均线，周期是para_ema1_len2，不包含当前bar
-        self.line_ema3 = []  # K线的EMA3均线，周期是para_ema1_len3，不包含当前bar
-        self.line_ema4 = []  # K线的EMA4均线，周期是para_ema1_len4，不包含当前bar
-        self.line_ema5 = []  # K线的EMA5均线，周期是para_ema1_len5，不包含当前bar
+        self.line_ema1 = RingList()  # K线的EMA1均线，周期是para_ema1_len1，不包含当前bar
+        self.line_ema2 = RingList()  # K线的EMA2均线，周期是para_ema1_len2，不包含当前bar
+        self.line_ema3 = RingList()  # K线的EMA3均线，周期是para_ema1_len3，不包含当前bar
+        self.line_ema4 = RingList()  # K线的EMA4均线，周期是para_ema1_len4，不包含当前bar
+        self.line_ema5 = RingList()  # K线的EMA5均线，周期是para_ema1_len5，不包含当前bar
 
         self._rt_ema1 = None  # K线的实时EMA(para_ema1_len)
         self._rt_ema2 = None  # K线的实时EMA(para_ema2_len)
@@ -562,14 +663,14 @@ class CtaLineBar(object):
         self.cur_pdi = 0  # bar内的升动向指标，即做多的比率
         self.cur_mdi = 0  # bar内的下降动向指标，即做空的比率
 
-        self.line_pdi = []  # 升动向指标，即做多的比率
-        self.line_mdi = []  # 下降动向指标，即做空的比率
+        self.line_pdi = RingList()  # 升动向指标，即做多的比率
+        self.line_mdi = RingList()  # 下降动向指标，即做空的比率
 
-        self.line_dx = []  # 趋向指标列表，最大长度为inputM*2
+        self.line_dx = RingList()  # 趋向指标列表，最大长度为inputM*2
         self.cur_adx = 0  # Bar内计算的平均趋向指标
-        self.line_adx = []  # 平均趋向指标
+        self.line_adx = RingList()  # 平均趋向指标
         self.cur_adxr = 0  # 趋向平均值，为当日ADX值与M日前的ADX值的均值
-        self.line_adxr = []  # 平均趋向变化指标
+        self.line_adxr = RingList()  # 平均趋向变化指标
 
         # K线的基于DMI、ADX计算的结果
         self.cur_adx_trend = 0  # ADX值持续高于前一周期时，市场行情将维持原趋势
@@ -579,28 +680,28 @@ class CtaLineBar(object):
         self.signal_adx_short = False  # 空过滤器条件,做空趋势的判断，ADXR高于前一天，下降动向> inputMM
 
         # K线的ATR技术数据
-        self.line_atr1 = []  # K线的ATR1,周期为para_atr1_len
-        self.line_atr2 = []  # K线的ATR2,周期为para_atr2_len
-        self.line_atr3 = []  # K线的ATR3,周期为para_atr3_len
+        self.line_atr1 = RingList()  # K线的ATR1,周期为para_atr1_len
+        self.line_atr2 = RingList()  # K线的ATR2,周期为para_atr2_len
+        self.line_atr3 = RingList()  # K线的ATR3,周期为para_atr3_len
 
         self.cur_atr1 = 0
         self.cur_atr2 = 0
         self.cur_atr3 = 0
 
         # K线的交易量平均
-        self.line_vol_ma = []  # K 线的交易量平均
+        self.line_vol_ma = RingList()  # K 线的交易量平均
 
         # 机构买、机构卖指标
-        self.line_jb = []  # 机构买
-        self.line_js = []  # 机构卖
+        self.line_jb = RingList()  # 机构买
+        self.line_js = RingList()  # 机构卖
 
         # 均价线指标
-        self.line_tt = []  # 分时均价线
-        self.line_tv = []  # 日内的累计成交量
+        self.line_tt = RingList()  # 分时均价线
+        self.line_tv = RingList()  # 日内的累计成交量
 
         # K线的RSI计算数据
-        self.line_rsi1 = []  # 记录K线对应的RSI数值，只保留para_rsi1_len*8
-        self.line_rsi2 = []  # 记录K线对应的RSI数值，只保留para_rsi2_len*8
+        self.line_rsi1 = RingList()  # 记录K线对应的RSI数值，只保留para_rsi1_len*8
+        self.line_rsi2 = RingList()  # 记录K线对应的RSI数值，只保留para_rsi2_len*8
 
         self.para_rsi_low = 30  # RSI的最低线
         self.para_rsi_high = 70  # RSI的最高线
@@ -610,17 +711,17 @@ class CtaLineBar(object):
         self.cur_rsi_top_buttom = {}  # 最近的一个波峰/波谷
 
         # K线的CMI计算数据
-        self.line_cmi = []  # 记录K线对应的Cmi数值，只保留para_cmi_len*8
+        self.line_cmi = RingList()  # 记录K线对应的Cmi数值，只保留para_cmi_len*8
 
         # K线的布林特计算数据
-        self.line_boll_upper = []  # 上轨
-        self.line_boll_middle = []  # 中线
-        self.line_boll_lower = []  # 下轨
-        self.line_boll_std = []  # 标准差
-
-        self.line_upper_atan = []
-        self.line_middle_atan = []
-        self.line_lower_atan = []
+        self.line_boll_upper = RingList()  # 上轨
+        self.line_boll_middle = RingList()  # 中线
+        self.line_boll_lower = RingList()  # 下轨
+        self.line_boll_std = RingList()  # 标准差
+
+        self.line_upper_atan = RingList()
+        self.line_middle_atan = RingList()
+        self.line_lower_atan = RingList()
         self._rt_upper = None
         self._rt_middle = None
         self._rt_lower = None
@@ -632,14 +733,14 @@ class CtaLineBar(object):
         self.cur_middle = 0  # 最后一根K的Boll中轨数值（与price_tick取整）
         self.cur_lower = 0  # 最后一根K的Boll下轨数值（与price_tick取整+1）
 
-        self.line_boll2_upper = []  # 上轨
-        self.line_boll2_middle = []  # 中线
-        self.line_boll2_lower = []  # 下轨
-        self.line_boll2_std = []  # 标准差
+        self.line_boll2_upper = RingList()  # 上轨
+        self.line_boll2_middle = RingList()  # 中线
+        self.line_boll2_lower = RingList()  # 下轨
+        self.line_boll2_std = RingList()  # 标准差
 
-        self.line_upper2_atan = []
-        self.line_middle2_atan = []
-        self.line_lower2_atan = []
+        self.line_upper2_atan = RingList()
+        self.line_middle2_atan = RingList()
+        self.line_lower2_atan = RingList()
 
         self._rt_upper2 = None
         self._rt_middle2 = None
@@ -653,14 +754,14 @@ class CtaLineBar(object):
         self.cur_lower2 = 0  # 最后一根K的Boll2下轨数值（与price_tick取整+1）
 
         # K线的KDJ指标计算数据
-        self.line_k = []  # K为快速指标
-        self.line_d = []  # D为慢速指标
-        self.line_j = []  #
-        self.line_j_ema1 = []  #
-        self.line_j_ema2 = []  #
+        self.line_k = RingList()  # K为快速指标
+        self.line_d = RingList()  # D为慢速指标
+        self.line_j = RingList()  #
+        self.line_j_ema1 = RingList()  #
+        self.line_j_ema2 = RingList()  #
         self.kdj_top_list = []  # 记录KDJ最高峰，只保留 para_kdj_len个
         self.kdj_buttom_list = []  # 记录KDJ的最低谷，只保留 para_kdj_len个
-        self.line_rsv = []  # RSV
+        self.line_rsv = RingList()  # RSV
         self.cur_kdj_top_buttom = {}  # 最近的一个波峰/波谷
         self.cur_k = 0  # bar内计算时，最后一个未关闭的bar的实时K值
         self.cur_d = 0  # bar内计算时，最后一个未关闭的bar的实时值
@@ -677,10 +778,10 @@ class CtaLineBar(object):
         self.cur_kd_cross_price = 0  # 最近一次发生金叉/死叉的价格
 
         # K线的MACD计算数据(26,12,9)
-        self.line_dif = []  # DIF = EMA12 - EMA26，即为talib-MACD返回值macd
+        self.line_dif = RingList()  # DIF = EMA12 - EMA26，即为talib-MACD返回值macd
         self.dict_dif = {}  # datetime str: dif mapping
-        self.line_dea = []  # DEA = （前一日DEA X 8/10 + 今日DIF X 2/10），即为talib-MACD返回值
-        self.line_macd = []  # (dif-dea)*2，但是talib中MACD的计算是bar = (dif-dea)*1,国内一般是乘以2
+        self.line_dea = RingList()  # DEA = （前一日DEA X 8/10 + 今日DIF X 2/10），即为talib-MACD返回值
+        self.line_macd = RingList()  # (dif-dea)*2，但是talib中MACD的计算是bar = (dif-dea)*1,国内一般是乘以2
         self.dict_macd = {}  # datetime str: macd mapping
         self.macd_segment_list = []  # macd 金叉/死叉的段列表，记录价格的最高/最低，Dif的最高，最低，Macd的最高/最低，Macd面接
         self._rt_dif = None
@@ -697,12 +798,12 @@ class CtaLineBar(object):
         self.macd_top_divergence = False  # mcad 面积 与price 顶背离
         self.macd_buttom_divergence = False  # mcad 面积 与price 底背离
 
-        self.line_macd_chn_upper = []
-        self.line_macd_chn_lower = []
+        self.line_macd_chn_upper = RingList()
+        self.line_macd_chn_lower = RingList()
 
         # K 线的CCI计算数据
-        self.line_cci = []
-        self.line_cci_ema = []
+        self.line_cci = RingList()
+        self.line_cci_ema = RingList()
         self.cur_cci = None
         self.cur_cci_ema = None
         self._rt_cci = None
@@ -711,39 +812,39 @@ class CtaLineBar(object):
         # 卡尔曼过滤器
         self.kf = None
         self.kf2 = None
-        self.line_state_mean = []  # 卡尔曼均线
-        self.line_state_upper = []  # 卡尔曼均线+2标准差
-        self.line_state_lower = []  # 卡尔曼均线-2标准差
-        self.line_state_covar = []  # 方差
+        self.line_state_mean = RingList()  # 卡尔曼均线
+        self.line_state_upper = RingList()  # 卡尔曼均线+2标准差
+        self.line_state_lower = RingList()  # 卡尔曼均线-2标准差
+        self.line_state_covar = RingList()  # 方差
         self.cur_state_std = None
-        self.line_state_mean2 = []  # 卡尔曼均线2
-        self.line_state_covar2 = []  # 方差
+        self.line_state_mean2 = RingList()  # 卡尔曼均线2
+        self.line_state_covar2 = RingList()  # 方差
         self.kf12_count = 0  # 卡尔曼均线金叉死叉
 
         # SAR 抛物线
         self.cur_sar_direction = ''  # up/down
-        self.line_sar = []
-        self.line_sar_top = []
-        self.line_sar_buttom = []
-        self.line_sar_sr_up = []  # 当前得上升抛物线
-        self.line_sar_ep_up = []
-        self.line_sar_af_up = []
-        self.line_sar_sr_down = []  # 当前得下跌抛物线
-        self.line_sar_ep_down = []
-        self.line_sar_af_down = []
+        self.line_sar = RingList()
+        self.line_sar_top = RingList()
+        self.line_sar_buttom = RingList()
+        self.line_sar_sr_up = RingList()  # 当前得上升抛物线
+        self.line_sar_ep_up = RingList()
+        self.line_sar_af_up = RingList()
+        self.line_sar_sr_down = RingList()  # 当前得下跌抛物线
+        self.line_sar_ep_down = RingList()
+        self.line_sar_af_down = RingList()
         self.cur_sar_count = 0  # SAR 上升下降变化后累加
 
         # 周期
         self.cur_atan = None
-        self.line_atan = []
+        self.line_atan = RingList()
         self.cur_period = None  # 当前所在周期
         self.period_list = []
 
         # 优化的多空动量线
-        self.line_skd_rsi = []  # 参照的RSI
-        self.line_skd_sto = []  # 根据RSI演算的STO
-        self.line_sk = []  # 快线
-        self.line_sd = []  # 慢线
+        self.line_skd_rsi = RingList()  # 参照的RSI
+        self.line_skd_sto = RingList()  # 根据RSI演算的STO
+        self.line_sk = RingList()  # 快线
+        self.line_sd = RingList()  # 慢线
 
         self.cur_skd_count = 0  # 当前金叉/死叉后累加
         self._rt_sk = None  # 实时SK值
@@ -758,7 +859,7 @@ class CtaLineBar(object):
         self.rt_skd_cross_price = 0  # 发生实时金叉死叉时的价格
 
         # 多空趋势线
-        self.line_yb = []
+        self.line_yb = RingList()
         self.cur_yb_count = 0  # 当前黄/蓝累加
         self._rt_yb = None
 
@@ -775,9 +876,9 @@ class CtaLineBar(object):
         self.pre_area = None
 
         # BIAS
-        self.line_bias = []  # BIAS1
-        self.line_bias2 = []  # BIAS2
-        self.line_bias3 = []  # BIAS3
+        self.line_bias = RingList()  # BIAS1
+        self.line_bias2 = RingList()  # BIAS2
+        self.line_bias3 = RingList()  # BIAS3
         self.cur_bias = 0  # 最后一个bar的BIAS1值
         self.cur_bias2 = 0  # 最后一个bar的BIAS2值
         self.cur_bias3 = 0  # 最后一个bar的BIAS3值
@@ -786,22 +887,25 @@ class CtaLineBar(object):
         self._rt_bias3 = None
 
         # 波段买卖指标
-        self.line_bd_fast = []  # 波段快线
-        self.line_bd_slow = []  # 波段慢线
+        self.line_bd_fast = RingList()  # 波段快线
+        self.line_bd_slow = RingList()  # 波段慢线
         self.cur_bd_count = 0  # 当前波段快线慢线金叉死叉， +金叉计算， - 死叉技术
 
         self._bd_fast = 0
         self._bd_slow = 0
 
         # SKDJ
-        self.line_skdj_k = []
-        self.line_skdj_d = []
+        self.line_skdj_k = RingList()
+        self.line_skdj_d = RingList()
         self.cur_skdj_k = 0
         self.cur_skdj_d = 0
 
         self.para_active_chanlun = False  # 是否激活缠论
+        # 缠论增量计算：从倒数第N个线段的起点开始重算，与上次结果拼接(0: 每根bar全量计算)
+        self.para_chanlun_window = 0
         self.chan_lib = None
         self.chan_graph = None
+        self.chan_window = None
         self.chanlun_calculated = False  # 当前bar是否计算过
         self._fenxing_list = []  # 分型列表
         self._bi_list = []  # 笔列表
@@ -823,6 +927,8 @@ class CtaLineBar(object):
         for key in self.param_list:
             if key in setting:
                 d[key] = setting[key]
+        # 参数变化后，重新生成指标计算函数清单
+        self.count_funcs = None
 
     def set_mode(self, mode: str):
         """Tick/Bar模式"""
@@ -954,6 +1060,10 @@ class CtaLineBar(object):
     def on_bar(self, bar: BarData):
         """OnBar事件"""
         # 将上一根bar合成完结了，触发本on_bar事件(缓存开高收低等序列，计算各个指标)
+        # 延迟计算模式下，先补算上一根bar的指标(必须在追加新bar之前)
+        if self.pending_bar is not None:
+            self.count_indicators()
+
         if not bar.interval:
             bar.interval = self.interval
             bar.interval_num = self.bar_interval
@@ -963,29 +1073,17 @@ class CtaLineBar(object):
         bar_mid4 = round((2 * bar.close_price + bar.high_price + bar.low_price) / 4, self.round_n)
         bar_mid5 = round((2 * bar.close_price + bar.open_price + bar.high_price + bar.low_price) / 5, self.round_n)
 
-        # 扩展时间索引,open,close,high,low numpy array列表 平移更新序列最新值
+        # 扩展时间索引,open,close,high,low 环形序列，追加最新值
         self.index_list.append(bar.datetime.strftime('%Y-%m-%d %H:%M:%S'))
 
-        self.open_array[:-1] = self.open_array[1:]
-        self.open_array[-1] = bar.open_price
-
-        self.high_array[:-1] = self.high_array[1:]
-        self.high_array[-1] = bar.high_price
-
-        self.low_array[:-1] = self.low_array[1:]
-        self.low_array[-1] = bar.low_price
-
-        self.close_array[:-1] = self.close_array[1:]
-        self.close_array[-1] = bar.close_price
-
-        self.mid3_array[:-1] = self.mid3_array[1:]
-        self.mid3_array[-1] = bar_mid3
-
-        self.mid4_array[:-1] = self.mid4_array[1:]
-        self.mid4_array[-1] = bar_mid4
-
-        self.mid5_array[:-1] = self.mid5_array[1:]
-        self.mid5_array[-1] = bar_mid5
+        self._open_series.append(bar.open_price)
+        self._high_series.append(bar.high_price)
+        self._low_series.append(bar.low_price)
+        self._close_series.append(bar.close_price)
+        self._mid3_series.append(bar_mid3)
+        self._mid4_series.append(bar_mid4)
+        self._mid5_series.append(bar_mid5)
+        self.bar_count += 1
 
         # 计算当前self.line_bar长度，并维持self.line_bar序列在max_hold_bars长度
         self.bar_len = len(self.line_bar)  # 当前K线得真实数量(包含已经合成以及正在合成的bar)
@@ -996,32 +1094,114 @@ class CtaLineBar(object):
             del self.index_list[0]
             self.bar_len = self.bar_len - 1  # 删除了最前面的bar，bar长度少一位
 
-        self.__count_pre_high_low()
-        self.__count_ma()
-        self.__count_ama()
-        self.__count_ema()
-        self.__count_dmi()
-        self.__count_atr()
-        self.__count_vol_ma()
-        self.__count_jb_js()
-        self.__count_time_trend()
-        self.__count_rsi()
-        self.__count_cmi()
-        self.__count_kdj()
-        self.__count_kdj_tb()
-        self.__count_boll()
-        self.__count_macd()
-        self.__count_cci()
-        self.__count_kf()
-        self.__count_period(bar)
-        self.__count_skd()
-        self.__count_yb()
-        self.__count_sar()
-        self.__count_golden_section()
-        self.__count_area(bar)
-        self.__count_bias()
-        self.__count_bd()
-        self.__count_skdj()
+        self.pending_bar = bar
+        if self.lazy_count:
+            # 延迟计算：首次读取实时指标、下一根bar完成或主动调用count_indicators()时，才计算本bar的指标
+            # 部分指标会读取最新价格/时间/正在合成的bar，记录bar完成时刻的状态，计算时还原
+            self.pending_context = (self.cur_datetime, self.cur_price, self.cur_tick, len(self.line_bar),
+                                    copy.copy(self.line_bar[-1]) if self.line_bar else None)
+            self.rt_executed = False
+            self.chanlun_calculated = False
+            self.init_lazy_indicators()
+        else:
+            self.count_indicators()
+
+        # 回调上层调用者，将合成的 x分钟bar，回调给策略 def on_bar_x(self, bar: BarData):函数
+        # 延迟计算模式下，回调中读取指标时才计算
+        if self.cb_on_bar:
+            self.cb_on_bar(bar=bar)
+
+    def init_lazy_indicators(self):
+        """把指标属性(line_xxx/cur_xxx)替换为读取时触发延迟计算的LazyIndicator(每个属性只替换一次)"""
+        for name in list(self.__dict__.keys()):
+            if not name.startswith(('line_', 'cur_')) or name in self.MARKET_ATTRIBUTES:
+                continue
+            if hasattr(CtaLineBar, name):
+                continue
+            setattr(CtaLineBar, name, LazyIndicator(name))
+
+    def init_count_funcs(self):
+        """
+        根据指标参数，生成每根bar需要执行的指标计算函数清单
+        未设置参数的指标不再逐个调用(原来依赖各函数内部判断参数后直接返回)
+        """
+        registry = [
+            (self.__count_pre_high_low, self.para_pre_len > 0),
+            (self.__count_ma, self.para_ma1_len > 0 or self.para_ma2_len > 0 or self.para_ma3_len > 0),
+            (self.__count_ama, self.para_ama_len > 0),
+            (self.__count_ema, self.para_ema1_len > 0 or self.para_ema2_len > 0 or self.para_ema3_len > 0
+             or self.para_ema4_len > 0 or self.para_ema5_len > 0),
+            (self.__count_dmi, self.para_dmi_len > 0),
+            (self.__count_atr, max(self.para_atr1_len, self.para_atr2_len, self.para_atr3_len) > 0),
+            (self.__count_vol_ma, self.para_vol_len > 0),
+            (self.__count_jb_js, self.para_jbjs_threshold > 0),
+            (self.__count_time_trend, self.para_active_tt),
+            (self.__count_rsi, self.para_rsi1_len > 0 or self.para_rsi2_len > 0),
+            (self.__count_cmi, self.para_cmi_len > 0),
+            (self.__count_kdj, self.para_kdj_len > 0),
+            (self.__count_kdj_tb, self.para_kdj_tb_len > 0),
+            (self.__count_boll, self.para_boll_len > 0 or self.para_boll2_len > 0
+             or self.para_boll_tb_len > 0 or self.para_boll2_tb_len > 0),
+            (self.__count_macd, self.para_macd_fast_len > 0 and self.para_macd_slow_len > 0
+             and self.para_macd_signal_len > 0),
+            (self.__count_cci, self.para_cci_len > 0),
+            (self.__count_kf, self.para_active_kf),
+            (self.__count_period, len(self.line_rsi1) > 0 or self.para_rsi1_len > 0 or self.para_rsi2_len > 0),
+            (self.__count_skd, self.para_active_skd),
+            (self.__count_yb, self.para_active_yb),
+            (self.__count_sar, self.para_sar_step > 0 or self.para_sar_limit > self.para_sar_step),
+            (self.__count_golden_section, self.para_golden_n >= 0),
+            (self.__count_area, self.para_active_area),
+            (self.__count_bias, self.para_bias_len > 0 or self.para_bias2_len > 0 or self.para_bias3_len > 0),
+            (self.__count_bd, self.para_bd_len > 0),
+            (self.__count_skdj, self.para_skdj_m > 0 and self.para_skdj_n > 0),
+        ]
+        # __count_period/__count_area 需要传入当前bar
+        with_bar = [self.__count_period, self.__count_area]
+        self.count_funcs = [(func, func in with_bar) for func, active in registry if active]
+
+    def count_indicators(self):
+        """
+        计算最近一根已完成bar的所有指标，并输出csv、更新缠论形态
+        每根bar只执行一次；lazy_count模式下由读取指标(实时指标、line_xxx/cur_xxx)、下一根bar完成时触发
+        """
+        bar = self.pending_bar
+        if bar is None:
+            return
+        self.pending_bar = None
+        context, self.pending_context = self.pending_context, None
+        if context is None:
+            self.__count_bar(bar)
+            return
+
+        # 还原bar完成时刻的行情状态：最新价格/时间/tick，以及当时的line_bar
+        live_state = (self.cur_datetime, self.cur_price, self.cur_tick)
+        self.cur_datetime, self.cur_price, self.cur_tick, bar_num, last_bar = context
+        newer_bars = []
+        while len(self.line_bar) > bar_num:
+            newer_bars.append(self.line_bar.pop())
+        live_bar = None
+        if last_bar is not None:
+            live_bar = self.line_bar[-1]
+            self.line_bar[-1] = last_bar
+        try:
+            self.__count_bar(bar)
+        finally:
+            if live_bar is not None:
+                self.line_bar[-1] = live_bar
+            self.line_bar.extend(reversed(newer_bars))
+            self.cur_datetime, self.cur_price, self.cur_tick = live_state
+
+    def __count_bar(self, bar: BarData):
+        """执行bar的各项指标计算，输出csv，更新缠论形态"""
+        if self.count_funcs is None:
+            self.init_count_funcs()
+        for func, with_bar in self.count_funcs:
+            if with_bar:
+                func(bar)
+            else:
+                func()
+
         # 输出行情K线 =》 csv文件
         self.export_to_csv(bar)
 
@@ -1034,10 +1214,6 @@ class CtaLineBar(object):
         # 识别缠论分笔形态
         self.update_chan_xt()
 
-        # 回调上层调用者，将合成的 x分钟bar，回调给策略 def on_bar_x(self, bar: BarData):函数
-        if self.cb_on_bar:
-            self.cb_on_bar(bar=bar)
-
     def check_rt_funcs(self, func):
         """
         1.检查调用函数名是否在实时计算函数清单中，如果没有，则添加
@@ -1056,6 +1232,10 @@ class CtaLineBar(object):
         根据实时计算得要求，执行实时指标计算
         :return:
         """
+        # 延迟计算模式下，先完成最近一根bar的指标计算
+        if self.pending_bar is not None:
+            self.count_indicators()
+
         if self.rt_executed:
             return
 
@@ -1067,6 +1247,47 @@ class CtaLineBar(object):
 
         self.rt_executed = True
 
+    def get_kernel(self, name: str, factory, source):
+        """
+        获取增量指标内核，并补充计算内核尚未处理的bar
+        :param name: 内核名称(需包含参数，参数变化时使用新的内核)
+        :param factory: 创建内核的函数
+        :param source: source(n)返回最近n根已完成bar的输入数据，每个元素为内核update()的参数tuple
+        :return:
+        """
+        kernel = self.indicator_kernels.get(name, None)
+        if kernel is None:
+            kernel = factory()
+            self.indicator_kernels[name] = kernel
+
+        missing = self.bar_count - kernel.count
+        if missing > 0:
+            history = min(kernel.history or self._close_series.size, self._close_series.size)
+            if kernel.count == 0 or missing > history:
+                # 新建的内核，或者太久没有更新，用缓存的K线序列重新预热
+                kernel.reset()
+                missing = min(self.bar_count, history)
+            for values in source(missing):
+                kernel.update(*values)
+            kernel.count = self.bar_count
+        return kernel
+
+    def close_source(self, n: int):
+        """最近n根bar的收盘价"""
+        return zip(self.close_array[-n:])
+
+    def high_source(self, n: int):
+        """最近n根bar的最高价"""
+        return zip(self.high_array[-n:])
+
+    def low_source(self, n: int):
+        """最近n根bar的最低价"""
+        return zip(self.low_array[-n:])
+
+    def hlc_source(self, n: int):
+        """最近n根bar的最高价、最低价、收盘价"""
+        return zip(self.high_array[-n:], self.low_array[-n:], self.close_array[-n:])
+
     def export_to_csv(self, bar: BarData):
         """ 输出到csv文件"""
         # 将我们配置在self.export_fields的要输出的 bar信息以及指标信息 ==》输出到csv文件
@@ -2156,7 +2377,7 @@ class CtaLineBar(object):
         if self.para_ma1_len > 0:
             count_len = min(self.para_ma1_len, self.bar_len - 1)
 
-            barMa1 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            barMa1 = self.count_sma(self.para_ma1_len, count_len)
             if np.isnan(barMa1):
                 return
             barMa1 = round(barMa1, self.round_n)
@@ -2176,7 +2397,7 @@ class CtaLineBar(object):
         # 计算第二条MA均线
         if self.para_ma2_len > 0:
             count_len = min(self.para_ma2_len, self.bar_len - 1)
-            barMa2 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            barMa2 = self.count_sma(self.para_ma2_len, count_len)
             if np.isnan(barMa2):
                 return
             barMa2 = round(barMa2, self.round_n)
@@ -2196,7 +2417,7 @@ class CtaLineBar(object):
         # 计算第三条MA均线
         if self.para_ma3_len > 0:
             count_len = min(self.para_ma3_len, self.bar_len - 1)
-            barMa3 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            barMa3 = self.count_sma(self.para_ma3_len, count_len)
             if np.isnan(barMa3):
                 return
             barMa3 = round(barMa3, self.round_n)
@@ -2338,6 +2559,28 @@ class CtaLineBar(object):
                 elif self.line_ma1[-1] > self.line_ma3[-1]:
                     self.ma13_count += 1
 
+    def count_sma(self, ma_len: int, count_len: int):
+        """
+        收盘价的简单移动平均(不包含当前未完成的bar)
+        数据充足时使用增量内核，预热阶段(count_len < ma_len)仍使用talib
+        """
+        if count_len < ma_len:
+            return ta.MA(self.close_array[-count_len:], count_len)[-1]
+        return self.get_kernel(f'ma_{ma_len}', lambda: RollingMean(ma_len), self.close_source).value
+
+    def rt_count_sma(self, ma_len: int, count_len: int):
+        """
+        实时的简单移动平均
+        :return: (最后一根已完成bar的均线值, 包含当前未完成bar的实时均线值)
+        """
+        close_price = self.line_bar[-1].close_price
+        if count_len == ma_len and self.bar_count >= ma_len:
+            kernel = self.get_kernel(f'ma_{ma_len}', lambda: RollingMean(ma_len), self.close_source)
+            return kernel.value, kernel.peek(close_price)
+
+        close_ma_array = ta.MA(np.append(self.close_array[-count_len:], [close_price]), count_len)
+        return close_ma_array[-2], close_ma_array[-1]
+
     def check_cross_type(self, cross_list):
         """依据缠论，检测其属于背驰得交叉，还是纠缠得交叉"""
         if len(cross_list) <= 1 or not self.para_active_chanlun or len(self.duan_list) == 0:
@@ -2396,38 +2639,35 @@ class CtaLineBar(object):
         if self.para_ma1_len > 0:
             count_len = min(self.bar_len, self.para_ma1_len)
             if count_len > 0:
-                close_ma_array = ta.MA(np.append(self.close_array[-count_len:], [self.line_bar[-1].close_price]),
-                                       count_len)
-                self._rt_ma1 = round(close_ma_array[-1], self.round_n)
+                pre_ma, rt_ma = self.rt_count_sma(self.para_ma1_len, count_len)
+                self._rt_ma1 = round(rt_ma, self.round_n)
 
                 # 计算斜率
-                if len(close_ma_array) > 2 and close_ma_array[-2] != 0:
+                if count_len > 1 and pre_ma != 0:
                     self._rt_ma1_atan = round(
-                        math.atan((close_ma_array[-1] / close_ma_array[-2] - 1) * 100) * 180 / math.pi, 3)
+                        math.atan((rt_ma / pre_ma - 1) * 100) * 180 / math.pi, 3)
 
         if self.para_ma2_len > 0:
             count_len = min(self.bar_len, self.para_ma2_len)
             if count_len > 0:
-                close_ma_array = ta.MA(np.append(self.close_array[-count_len:], [self.line_bar[-1].close_price]),
-                                       count_len)
-                self._rt_ma2 = round(close_ma_array[-1], self.round_n)
+                pre_ma, rt_ma = self.rt_count_sma(self.para_ma2_len, count_len)
+                self._rt_ma2 = round(rt_ma, self.round_n)
 
                 # 计算斜率
-                if len(close_ma_array) > 2 and close_ma_array[-2] != 0:
+                if count_len > 1 and pre_ma != 0:
                     self._rt_ma2_atan = round(
-                        math.atan((close_ma_array[-1] / close_ma_array[-2] - 1) * 100) * 180 / math.pi, 3)
+                        math.atan((rt_ma / pre_ma - 1) * 100) * 180 / math.pi, 3)
 
         if self.para_ma3_len > 0:
             count_len = min(self.bar_len, self.para_ma3_len)
             if count_len > 0:
-                close_ma_array = ta.MA(np.append(self.close_array[-count_len:], [self.line_bar[-1].close_price]),
-                                       count_len)
-                self._rt_ma3 = round(close_ma_array[-1], self.round_n)
+                pre_ma, rt_ma = self.rt_count_sma(self.para_ma3_len, count_len)
+                self._rt_ma3 = round(rt_ma, self.round_n)
 
                 # 计算斜率
-                if len(close_ma_array) > 2 and close_ma_array[-2] != 0:
+                if count_len > 1 and pre_ma != 0:
                     self._rt_ma3_atan = round(
-                        math.atan((close_ma_array[-1] / close_ma_array[-2] - 1) * 100) * 180 / math.pi, 3)
+                        math.atan((rt_ma / pre_ma - 1) * 100) * 180 / math.pi, 3)
 
     @property
     def rt_ma1(self):
@@ -2562,7 +2802,7 @@ class CtaLineBar(object):
             count_len = min(self.para_ema1_len, self.bar_len - 1)
 
             # 3、获取前InputN周期(不包含当前周期）的K线
-            barEma1 = ta.EMA(self.close_array[-self.para_ema1_len * 4:], count_len)[-1]
+            barEma1 = self.count_window_ema(self.para_ema1_len, count_len)
             if np.isnan(barEma1):
                 return
             barEma1 = round(float(barEma1), self.round_n)
@@ -2577,7 +2817,7 @@ class CtaLineBar(object):
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
 
-            barEma2 = ta.EMA(self.close_array[-self.para_ema2_len * 4:], count_len)[-1]
+            barEma2 = self.count_window_ema(self.para_ema2_len, count_len)
             if np.isnan(barEma2):
                 return
             barEma2 = round(float(barEma2), self.round_n)
@@ -2591,7 +2831,7 @@ class CtaLineBar(object):
             count_len = min(self.bar_len - 1, self.para_ema3_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            barEma3 = ta.EMA(self.close_array[-self.para_ema3_len * 4:], count_len)[-1]
+            barEma3 = self.count_window_ema(self.para_ema3_len, count_len)
             if np.isnan(barEma3):
                 return
             barEma3 = round(float(barEma3), self.round_n)
@@ -2605,7 +2845,7 @@ class CtaLineBar(object):
             count_len = min(self.bar_len - 1, self.para_ema4_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            barEma4 = ta.EMA(self.close_array[-self.para_ema4_len * 4:], count_len)[-1]
+            barEma4 = self.count_window_ema(self.para_ema4_len, count_len)
             if np.isnan(barEma4):
                 return
             barEma4 = round(float(barEma4), self.round_n)
@@ -2619,7 +2859,7 @@ class CtaLineBar(object):
             count_len = min(self.bar_len - 1, self.para_ema5_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            barEma5 = ta.EMA(self.close_array[-self.para_ema5_len * 4:], count_len)[-1]
+            barEma5 = self.count_window_ema(self.para_ema5_len, count_len)
             if np.isnan(barEma5):
                 return
             barEma5 = round(float(barEma5), self.round_n)
@@ -2628,6 +2868,32 @@ class CtaLineBar(object):
                 del self.line_ema5[0]
             self.line_ema5.append(barEma5)
 
+    def count_window_ema(self, ema_len: int, count_len: int, rt_price: float = None):
+        """
+        最近ema_len*4根bar收盘价上的EMA，与talib在同样窗口上的计算结果一致
+        :param ema_len: EMA周期
+        :param count_len: 实际计算周期(预热阶段小于ema_len时，仍使用talib)
+        :param rt_price: 不为空时，计算把该价格作为当前未完成bar收盘价时的实时EMA
+        :return:
+        """
+        window = min(ema_len * 4, self._close_series.size)
+        if count_len != ema_len:
+            close_array = self.close_array[-ema_len * 4:]
+            if rt_price is not None:
+                close_array = np.append(close_array, [rt_price])
+            return ta.EMA(close_array, count_len)[-1]
+
+        if rt_price is None:
+            return self.get_kernel(f'ema_{ema_len}_{window}',
+                                   lambda: WindowSmoother(period=ema_len, window=window),
+                                   self.close_source).value
+
+        # 实时计算时，talib的窗口比bar计算时多一个当前价格
+        kernel = self.get_kernel(f'ema_{ema_len}_{window + 1}',
+                                 lambda: WindowSmoother(period=ema_len, window=window + 1),
+                                 self.close_source)
+        return kernel.peek(rt_price)
+
     def rt_count_ema(self):
         """计算K线的EMA1 和EMA2"""
 
@@ -2650,7 +2916,7 @@ class CtaLineBar(object):
             count_len = min(self.para_ema1_len, self.bar_len)
 
             # 3、获取前InputN周期(不包含当前周期）的K线
-            barEma1 = ta.EMA(np.append(self.close_array[-self.para_ema1_len * 4:], [self.cur_price]), count_len)[-1]
+            barEma1 = self.count_window_ema(self.para_ema1_len, count_len, rt_price=self.cur_price)
             if np.isnan(barEma1):
                 return
             self._rt_ema1 = round(float(barEma1), self.round_n)
@@ -2661,7 +2927,7 @@ class CtaLineBar(object):
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
 
-            barEma2 = ta.EMA(np.append(self.close_array[-self.para_ema2_len * 4:], [self.cur_price]), count_len)[-1]
+            barEma2 = self.count_window_ema(self.para_ema2_len, count_len, rt_price=self.cur_price)
             if np.isnan(barEma2):
                 return
             self._rt_ema2 = round(float(barEma2), self.round_n)
@@ -2671,7 +2937,7 @@ class CtaLineBar(object):
             count_len = min(self.bar_len, self.para_ema3_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            barEma3 = ta.EMA(np.append(self.close_array[-self.para_ema3_len * 4:], [self.cur_price]), count_len)[-1]
+            barEma3 = self.count_window_ema(self.para_ema3_len, count_len, rt_price=self.cur_price)
             if np.isnan(barEma3):
                 return
             self._rt_ema3 = round(float(barEma3), self.round_n)
@@ -2681,7 +2947,7 @@ class CtaLineBar(object):
             count_len = min(self.bar_len, self.para_ema4_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            barEma4 = ta.EMA(np.append(self.close_array[-self.para_ema4_len * 4:], [self.cur_price]), count_len)[-1]
+            barEma4 = self.count_window_ema(self.para_ema4_len, count_len, rt_price=self.cur_price)
             if np.isnan(barEma4):
                 return
             self._rt_ema4 = round(float(barEma4), self.round_n)
@@ -2691,7 +2957,7 @@ class CtaLineBar(object):
             count_len = min(self.bar_len, self.para_ema5_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            barEma5 = ta.EMA(np.append(self.close_array[-self.para_ema5_len * 4:], [self.cur_price]), count_len)[-1]
+            barEma5 = self.count_window_ema(self.para_ema5_len, count_len, rt_price=self.cur_price)
             if np.isnan(barEma5):
                 return
             self._rt_ema5 = round(float(barEma5), self.round_n)
@@ -2882,33 +3148,41 @@ class CtaLineBar(object):
         # 计算 ATR
         if self.para_atr1_len > 0:
             count_len = min(self.bar_len - 1, self.para_atr1_len)
-            cur_atr1 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
-                              self.close_array[-count_len * 2:], count_len)
-            self.cur_atr1 = round(cur_atr1[-1], self.round_n)
+            self.cur_atr1 = round(self.count_atr(self.para_atr1_len, count_len), self.round_n)
             if len(self.line_atr1) > self.max_hold_bars:
                 del self.line_atr1[0]
             self.line_atr1.append(self.cur_atr1)
 
         if self.para_atr2_len > 0:
             count_len = min(self.bar_len - 1, self.para_atr2_len)
-            cur_atr2 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
-                              self.close_array[-count_len * 2:], count_len)
-            self.cur_atr2 = round(cur_atr2[-1], self.round_n)
+            self.cur_atr2 = round(self.count_atr(self.para_atr2_len, count_len), self.round_n)
             if len(self.line_atr2) > self.max_hold_bars:
                 del self.line_atr2[0]
             self.line_atr2.append(self.cur_atr2)
 
         if self.para_atr3_len > 0:
             count_len = min(self.bar_len - 1, self.para_atr3_len)
-            cur_atr3 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
-                              self.close_array[-count_len * 2:], count_len)
-            self.cur_atr3 = round(cur_atr3[-1], self.round_n)
+            self.cur_atr3 = round(self.count_atr(self.para_atr3_len, count_len), self.round_n)
 
             if len(self.line_atr3) > self.max_hold_bars:
                 del self.line_atr3[0]
 
             self.line_atr3.append(self.cur_atr3)
 
+    def count_atr(self, atr_len: int, count_len: int):
+        """
+        最近atr_len*2根bar上的ATR，与talib在同样窗口上的计算结果一致
+        预热阶段(count_len < atr_len)仍使用talib
+        """
+        if count_len < atr_len:
+            return ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
+                          self.close_array[-count_len * 2:], count_len)[-1]
+
+        window = min(atr_len * 2, self._close_series.size)
+        return self.get_kernel(f'atr_{atr_len}_{window}',
+                               lambda: WindowAtr(period=atr_len, window=window),
+                               self.hlc_source).value
+
     def __count_vol_ma(self):
         """计算平均成交量"""
 
@@ -3044,7 +3318,7 @@ class CtaLineBar(object):
         # 计算第1根RSI曲线
         # 3、inputRsi1Len(包含当前周期）的相对强弱
 
-        barRsi = ta.RSI(self.close_array[-2 * self.para_rsi1_len:], self.para_rsi1_len)[-1]
+        barRsi = self.count_rsi(self.para_rsi1_len)
         barRsi = round(float(barRsi), self.round_n)
 
         if len(self.line_rsi1) > self.max_hold_bars:
@@ -3083,7 +3357,7 @@ class CtaLineBar(object):
             if self.bar_len < self.para_rsi2_len + 2:
                 return
 
-            barRsi = ta.RSI(self.close_array[-2 * self.para_rsi2_len:], self.para_rsi2_len)[-1]
+            barRsi = self.count_rsi(self.para_rsi2_len)
             barRsi = round(float(barRsi), self.round_n)
 
             if len(self.line_rsi2) > self.max_hold_bars:
@@ -3091,6 +3365,17 @@ class CtaLineBar(object):
 
             self.line_rsi2.append(barRsi)
 
+    def count_rsi(self, rsi_len: int):
+        """最近rsi_len*2根bar收盘价上的RSI，与talib在同样窗口上的计算结果一致"""
+        if rsi_len < 2:
+            # talib 要求周期>=2，保持原有的异常行为
+            return ta.RSI(self.close_array[-2 * rsi_len:], rsi_len)[-1]
+
+        window = min(rsi_len * 2, self._close_series.size)
+        return self.get_kernel(f'rsi_{rsi_len}_{window}',
+                               lambda: WindowRsi(period=rsi_len, window=window),
+                               self.close_source).value
+
     def __count_cmi(self):
         """市场波动指数（Choppy Market Index，CMI）是一个用来判断市场走势类型的技术分析指标。
         它通过计算当前收盘价与一定周期前的收盘价的差值与这段时间内价格波动的范围的比值，来判断目前的股价走势是趋势还是盘整。
@@ -3142,16 +3427,23 @@ class CtaLineBar(object):
                 boll_len = min(self.bar_len - 1, self.para_boll_len)
 
                 # 不包含当前最新的Bar
-                try:
-                    upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
-                                                                    timeperiod=boll_len,
-                                                                    nbdevup=self.para_boll_std_rate,
-                                                                    nbdevdn=self.para_boll_std_rate, matype=0)
-                except Exception as ex:
-                    self.write_log(f'计算布林异常:{str(ex)}')
-                    self.write_log(''.format(self.close_array[-boll_len:]))
-                    print(f'计算布林异常:{str(ex)}', file=sys.stderr)
-                    return
+                boll = self.count_window_std(boll_len)
+                if boll is not None:
+                    middle, std = boll
+                    upper_list = [middle + self.para_boll_std_rate * std]
+                    middle_list = [middle]
+                    lower_list = [middle - self.para_boll_std_rate * std]
+                else:
+                    try:
+                        upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
+                                                                        timeperiod=boll_len,
+                                                                        nbdevup=self.para_boll_std_rate,
+                                                                        nbdevdn=self.para_boll_std_rate, matype=0)
+                    except Exception as ex:
+                        self.write_log(f'计算布林异常:{str(ex)}')
+                        self.write_log(''.format(self.close_array[-boll_len:]))
+                        print(f'计算布林异常:{str(ex)}', file=sys.stderr)
+                        return
 
                 if np.isnan(upper_list[-1]):
                     return
@@ -3211,9 +3503,17 @@ class CtaLineBar(object):
                 boll2Len = min(self.bar_len - 1, self.para_boll2_len)
 
                 # 不包含当前最新的Bar
-                upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
-                                                                timeperiod=boll2Len, nbdevup=self.para_boll2_std_rate,
-                                                                nbdevdn=self.para_boll2_std_rate, matype=0)
+                boll = self.count_window_std(boll2Len)
+                if boll is not None:
+                    middle, std = boll
+                    upper_list = [middle + self.para_boll2_std_rate * std]
+                    middle_list = [middle]
+                    lower_list = [middle - self.para_boll2_std_rate * std]
+                else:
+                    upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
+                                                                    timeperiod=boll2Len,
+                                                                    nbdevup=self.para_boll2_std_rate,
+                                                                    nbdevdn=self.para_boll2_std_rate, matype=0)
                 if np.isnan(upper_list[-1]):
                     return
                 if len(self.line_boll2_upper) > self.max_hold_bars:
@@ -3283,10 +3583,14 @@ class CtaLineBar(object):
                     del self.line_boll_std[0]
 
                 # 1标准差
-                std = np.std(self.close_array[-2 * boll_len:], ddof=1)
+                boll = self.count_window_std(2 * boll_len, ddof=1)
+                if boll is not None:
+                    middle, std = boll
+                else:
+                    std = np.std(self.close_array[-2 * boll_len:], ddof=1)
+                    middle = np.mean(self.close_array[-2 * boll_len:])
                 self.line_boll_std.append(std)
 
-                middle = np.mean(self.close_array[-2 * boll_len:])
                 self.line_boll_middle.append(middle)  # 中轨
                 self.cur_middle = middle - middle % self.price_tick  # 中轨取整
 
@@ -3337,10 +3641,14 @@ class CtaLineBar(object):
                     del self.line_boll2_std[0]
 
                 # 1标准差
-                std = np.std(self.close_array[-2 * boll2Len:], ddof=1)
+                boll = self.count_window_std(2 * boll2Len, ddof=1)
+                if boll is not None:
+                    middle, std = boll
+                else:
+                    std = np.std(self.close_array[-2 * boll2Len:], ddof=1)
+                    middle = np.mean(self.close_array[-2 * boll2Len:])
                 self.line_boll2_std.append(std)
 
-                middle = np.mean(self.close_array[-2 * boll2Len:])
                 self.line_boll2_middle.append(middle)  # 中轨
                 self.cur_middle2 = middle  # 中轨取整
 
@@ -3375,6 +3683,26 @@ class CtaLineBar(object):
                         del self.line_lower2_atan[0]
                     self.line_lower2_atan.append(low_atan)
 
+    def count_window_std(self, window: int, ddof: int = 0, rt_price: float = None):
+        """
+        最近window根bar收盘价的(均值, 标准差)
+        :param window: 窗口长度
+        :param ddof: 0: 与ta.BBANDS/np.std一致；1: 样本标准差
+        :param rt_price: 实时计算时，最近window-1根bar收盘价 + rt_price
+        :return: K线数量不足时返回None，由调用方使用原有的计算方式
+        """
+        if window < 2 or window > self._close_series.size:
+            return None
+        if self.bar_count < window - (0 if rt_price is None else 1):
+            return None
+
+        kernel = self.get_kernel(f'std_{window}_{ddof}',
+                                 lambda: RollingStd(window=window, ddof=ddof),
+                                 self.close_source)
+        if rt_price is None:
+            return kernel.value
+        return kernel.peek(rt_price)
+
     def rt_count_boll(self):
         """实时计算布林上下轨，斜率"""
         boll_01_len = max(self.para_boll_len, self.para_boll_tb_len)
@@ -3383,7 +3711,8 @@ class CtaLineBar(object):
         if not (boll_01_len > 0 or boll_02_len > 0):  # 不计算
             return
 
-        rt_close_array = np.append(self.close_array, [self.line_bar[-1].close_price])
+        rt_price = self.line_bar[-1].close_price
+        rt_close_array = None
 
         if boll_01_len > 0:
             if self.bar_len < min(14, boll_01_len) + 1:
@@ -3392,9 +3721,18 @@ class CtaLineBar(object):
             bollLen = min(boll_01_len, self.bar_len)
 
             if self.para_boll_tb_len == 0:
-                upper_list, middle_list, lower_list = ta.BBANDS(rt_close_array,
-                                                                timeperiod=bollLen, nbdevup=self.para_boll_std_rate,
-                                                                nbdevdn=self.para_boll_std_rate, matype=0)
+                boll = self.count_window_std(bollLen, rt_price=rt_price)
+                if boll is not None:
+                    middle, std = boll
+                    upper_list = [middle + self.para_boll_std_rate * std]
+                    middle_list = [middle]
+                    lower_list = [middle - self.para_boll_std_rate * std]
+                else:
+                    rt_close_array = np.append(self.close_array, [rt_price])
+                    upper_list, middle_list, lower_list = ta.BBANDS(rt_close_array,
+                                                                    timeperiod=bollLen,
+                                                                    nbdevup=self.para_boll_std_rate,
+                                                                    nbdevdn=self.para_boll_std_rate, matype=0)
 
                 # 1标准差
                 std = (upper_list[-1] - lower_list[-1]) / (self.para_boll_std_rate * 2)
@@ -3403,8 +3741,13 @@ class CtaLineBar(object):
                 self._rt_lower = round(lower_list[-1], self.round_n)
             else:
                 # 1标准差
-                std = np.std(rt_close_array[-boll_01_len:])
-                middle = np.mean(rt_close_array[-boll_01_len:])
+                boll = self.count_window_std(boll_01_len, rt_price=rt_price)
+                if boll is not None:
+                    middle, std = boll
+                else:
+                    rt_close_array = np.append(self.close_array, [rt_price])
+                    std = np.std(rt_close_array[-boll_01_len:])
+                    middle = np.mean(rt_close_array[-boll_01_len:])
                 self._rt_middle = round(middle, self.round_n)
                 upper = middle + self.para_boll_std_rate * std
                 self._rt_upper = round(upper, self.round_n)
@@ -3431,10 +3774,19 @@ class CtaLineBar(object):
             bollLen = min(boll_02_len, self.bar_len)
 
             if self.para_boll2_tb_len == 0:
-                upper_list, middle_list, lower_list = ta.BBANDS(
-                    rt_close_array,
-                    timeperiod=bollLen, nbdevup=self.para_boll2_std_rate,
-                    nbdevdn=self.para_boll2_std_rate, matype=0)
+                boll = self.count_window_std(bollLen, rt_price=rt_price)
+                if boll is not None:
+                    middle, std = boll
+                    upper_list = [middle + self.para_boll2_std_rate * std]
+                    middle_list = [middle]
+                    lower_list = [middle - self.para_boll2_std_rate * std]
+                else:
+                    if rt_close_array is None:
+                        rt_close_array = np.append(self.close_array, [rt_price])
+                    upper_list, middle_list, lower_list = ta.BBANDS(
+                        rt_close_array,
+                        timeperiod=bollLen, nbdevup=self.para_boll2_std_rate,
+                        nbdevdn=self.para_boll2_std_rate, matype=0)
 
                 # 1标准差
                 std = (upper_list[-1] - lower_list[-1]) / (self.para_boll2_std_rate * 2)
@@ -3443,8 +3795,14 @@ class CtaLineBar(object):
                 self._rt_lower2 = round(lower_list[-1], self.round_n)
             else:
                 # 1标准差
-                std = np.std(rt_close_array[-bollLen:], ddof=1)
-                middle = np.mean(rt_close_array[-bollLen:])
+                boll = self.count_window_std(bollLen, ddof=1, rt_price=rt_price)
+                if boll is not None:
+                    middle, std = boll
+                else:
+                    if rt_close_array is None:
+                        rt_close_array = np.append(self.close_array, [rt_price])
+                    std = np.std(rt_close_array[-bollLen:], ddof=1)
+                    middle = np.mean(rt_close_array[-bollLen:])
                 self._rt_middle2 = round(middle, self.round_n)
                 upper = middle + self.para_boll_std_rate * std
                 self._rt_upper2 = round(upper, self.round_n)
@@ -3580,8 +3938,11 @@ class CtaLineBar(object):
 
         inputKdjLen = min(self.para_kdj_len, self.bar_len - 1)
 
-        hhv = max(self.high_array[-inputKdjLen:])
-        llv = min(self.low_array[-inputKdjLen:])
+        if inputKdjLen == self.para_kdj_len and self.bar_count >= inputKdjLen:
+            hhv, llv = self.count_hhv_llv(inputKdjLen)
+        else:
+            hhv = max(self.high_array[-inputKdjLen:])
+            llv = min(self.low_array[-inputKdjLen:])
         if np.isnan(hhv) or np.isnan(llv):
             return
         if len(self.line_k) > 0:
@@ -3664,8 +4025,8 @@ class CtaLineBar(object):
         j_ema1 = j
         j_ema2 = j
         if len(self.line_j) >= 30:
-            j_ema1 = self.__ema(self.__ema(self.__ema(self.line_j[-30:], 2), 2), 2)[-1]
-            j_ema2 = self.__ema(self.__ema(self.__ema(self.line_j[-30:], 4), 2), 2)[-1]
+            j_ema1 = self.__chained_ema(self.line_j[-30:], (2, 2, 2))
+            j_ema2 = self.__chained_ema(self.line_j[-30:], (4, 2, 2))
 
         if len(self.line_j_ema1) > self.max_hold_bars:
             del self.line_j_ema1[0]
@@ -3673,6 +4034,21 @@ class CtaLineBar(object):
         self.line_j_ema1.append(j_ema1)
         self.line_j_ema2.append(j_ema2)
 
+    def count_hhv_llv(self, window: int, rt_high: float = None, rt_low: float = None):
+        """
+        最近window根bar的最高价、最低价
+        实时计算时(提供rt_high/rt_low)，为最近window-1根bar + 当前bar的最高价、最低价
+        """
+        hhv_kernel = self.get_kernel(f'hhv_{window}',
+                                     lambda: RollingExtreme(window=window, is_max=True),
+                                     self.high_source)
+        llv_kernel = self.get_kernel(f'llv_{window}',
+                                     lambda: RollingExtreme(window=window, is_max=False),
+                                     self.low_source)
+        if rt_high is None:
+            return hhv_kernel.value, llv_kernel.value
+        return hhv_kernel.peek(rt_high), llv_kernel.peek(rt_low)
+
     def rt_count_kdj(self):
         """
         (实时）Kdj计算方法：
@@ -3699,8 +4075,13 @@ class CtaLineBar(object):
 
         inputKdjLen = min(self.para_kdj_len, self.bar_len - 1) - 1
 
-        hhv = max(np.append(self.high_array[-inputKdjLen:], [self.line_bar[-1].high_price]))
-        llv = min(np.append(self.low_array[-inputKdjLen:], [self.line_bar[-1].low_price]))
+        if 0 < inputKdjLen == self.para_kdj_len - 1 and self.bar_count >= inputKdjLen:
+            hhv, llv = self.count_hhv_llv(self.para_kdj_len,
+                                          rt_high=self.line_bar[-1].high_price,
+                                          rt_low=self.line_bar[-1].low_price)
+        else:
+            hhv = max(np.append(self.high_array[-inputKdjLen:], [self.line_bar[-1].high_price]))
+            llv = min(np.append(self.low_array[-inputKdjLen:], [self.line_bar[-1].low_price]))
         if np.isnan(hhv) or np.isnan(llv):
             return
 
@@ -3746,8 +4127,8 @@ class CtaLineBar(object):
         j_ema1 = j
         j_ema2 = j
         if len(self.line_j) >= 30:
-            j_ema1 = self.__ema(self.__ema(self.__ema(np.append(self.line_j[-30:], [j]), 2), 2), 2)[-1]
-            j_ema2 = self.__ema(self.__ema(self.__ema(np.append(self.line_j[-30:], [j]), 4), 2), 2)[-1]
+            j_ema1 = self.__chained_ema(self.line_j[-30:] + [j], (2, 2, 2))
+            j_ema2 = self.__chained_ema(self.line_j[-30:] + [j], (4, 2, 2))
 
         self._rt_j_ema1 = j_ema1
         self._rt_j_ema2 = j_ema2
@@ -3961,9 +4342,14 @@ class CtaLineBar(object):
             # self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算MACD需要：{1}'.format(self.bar_len - 1, maxLen))
             return
 
-        dif_list, dea_list, macd_list = ta.MACD(self.close_array, fastperiod=self.para_macd_fast_len,
-                                                slowperiod=self.para_macd_slow_len,
-                                                signalperiod=self.para_macd_signal_len)
+        # 递推计算，与ta.MACD(self.close_array)一致
+        macd_kernel = self.get_kernel(
+            f'macd_{self.para_macd_fast_len}_{self.para_macd_slow_len}_{self.para_macd_signal_len}',
+            lambda: Macd(fast=self.para_macd_fast_len,
+                         slow=self.para_macd_slow_len,
+                         signal=self.para_macd_signal_len),
+            self.close_source)
+        dif_list, dea_list, macd_list = ([v] for v in macd_kernel.value)
         if np.isnan(dif_list[-1]) or np.isnan(dea_list[-1]) or np.isnan(macd_list[-1]):
             return
         # dif, dea, macd = ta.MACDEXT(np.array(listClose, dtype=float),
@@ -4115,9 +4501,21 @@ class CtaLineBar(object):
         if self.bar_len < maxLen:
             return
 
-        dif, dea, macd = ta.MACD(np.append(self.close_array[-maxLen:], [self.line_bar[-1].close_price]),
-                                 fastperiod=self.para_macd_fast_len,
-                                 slowperiod=self.para_macd_slow_len, signalperiod=self.para_macd_signal_len)
+        if self.bar_count >= maxLen and maxLen + 1 <= self._close_series.size:
+            # 与ta.MACD(最近maxLen根bar收盘价 + 当前价)一致，权重预先计算，只需一次点积
+            window = maxLen + 1
+            macd_kernel = self.get_kernel(
+                f'rt_macd_{self.para_macd_fast_len}_{self.para_macd_slow_len}_{self.para_macd_signal_len}',
+                lambda: WindowMacd(fast=self.para_macd_fast_len,
+                                   slow=self.para_macd_slow_len,
+                                   signal=self.para_macd_signal_len,
+                                   window=window),
+                self.close_source)
+            dif, dea, macd = ([v] for v in macd_kernel.peek(self.line_bar[-1].close_price))
+        else:
+            dif, dea, macd = ta.MACD(np.append(self.close_array[-maxLen:], [self.line_bar[-1].close_price]),
+                                     fastperiod=self.para_macd_fast_len,
+                                     slowperiod=self.para_macd_slow_len, signalperiod=self.para_macd_signal_len)
 
         if np.isnan(dif[-1]) or np.isnan(dea[-1]) or np.isnan(macd[-1]):
             return
@@ -4393,7 +4791,7 @@ class CtaLineBar(object):
         if len(self.line_cci) < 30:
             self.cur_cci_ema = self.cur_cci
         else:
-            self.cur_cci_ema = self.__ema(self.__ema(self.__ema(self.line_cci[-30:], 3), 2), 2)[-1]
+            self.cur_cci_ema = self.__chained_ema(self.line_cci[-30:], (3, 2, 2))
 
         if len(self.line_cci_ema) > self.max_hold_bars:
             del self.line_cci_ema[0]
@@ -4420,8 +4818,7 @@ class CtaLineBar(object):
         CCI = (TP[-1] - MA) / (0.015 * MD)
 
         self._rt_cci = CCI
-        rt_line_cci = np.append(self.line_cci[-30:], [CCI])
-        self._rt_cci_ema = self.__ema(self.__ema(self.__ema(rt_line_cci, 3), 2), 2)[-1]
+        self._rt_cci_ema = self.__chained_ema(self.line_cci[-30:] + [CCI], (3, 2, 2))
 
     @property
     def rt_cci(self):
@@ -5492,6 +5889,19 @@ class CtaLineBar(object):
     def __ema(self, data, span):
         return pd.Series(data=data).ewm(span=span, adjust=False).mean().values
 
+    def __chained_ema(self, data, spans: tuple):
+        """
+        连续多次__ema平滑后的最后一个值，如 __ema(__ema(__ema(data, 3), 2), 2)[-1]
+        使用预先计算的权重做一次加权和；数据中含nan/inf时，仍使用pandas计算
+        """
+        value = chained_ema(data, spans)
+        if np.isnan(value):
+            value = data
+            for span in spans:
+                value = self.__ema(value, span)
+            return value[-1]
+        return value
+
     def __iema(self, this_value, prev_value, span):
         return (2 * prev_value + (span - 1) * this_value) / (span + 1)
 
@@ -5628,6 +6038,23 @@ class CtaLineBar(object):
         if self.bar_len <= 3:
             return
 
+        if self.para_chanlun_window > 0:
+            # 增量计算：只重算最近几个线段的K线，与上次结果拼接
+            if self.chan_window is None:
+                self.chan_window = ChanWindowGraph(ChanGraph, self.chan_lib, self.para_chanlun_window)
+            self.chan_window.update(index=self.index_list[-self.bar_len + 1:],
+                                    high=self.high_array[-self.bar_len + 1:],
+                                    low=self.low_array[-self.bar_len + 1:])
+            self.chan_graph = self.chan_window.graph
+            chan_lists = self.chan_window.lists
+            self._fenxing_list = chan_lists['fenxing_list']
+            self._bi_list = chan_lists['bi_list']
+            self._bi_zs_list = chan_lists['bi_zhongshu_list']
+            self._duan_list = chan_lists['duan_list']
+            self._duan_zs_list = chan_lists['duan_zhongshu_list']
+            self.chanlun_calculated = True
+            return
+
         if self.chan_graph is not None:
             del self.chan_graph
             self.chan_graph = None
@@ -6392,27 +6819,10 @@ class CtaLineBar(object):
         try:
             if not os.path.exists(file_name):
                 self.write_log(u'create csv file:{}'.format(file_name))
-                with open(file_name, 'a', encoding='utf8', newline='') as csvWriteFile:
-                    writer = csv.DictWriter(f=csvWriteFile, fieldnames=dict_fieldnames, dialect='excel',
-                                            extrasaction='ignore')
-                    self.write_log(u'write csv header:{}'.format(dict_fieldnames))
-                    writer.writeheader()
-                    writer.writerow(dict_data)
-            else:
-                dt = dict_data.get('datetime', None)
-                if dt is not None:
-                    dt_index = dict_fieldnames.index('datetime')
-                    last_dt = self.get_csv_last_dt(file_name=file_name, dt_index=dt_index,
-                                                   line_length=sys.getsizeof(dict_data) / 8 + 1)
-                    if last_dt is not None and dt < last_dt:
-                        print(u'新增数据时间{}比最后一条记录时间{}早，不插入'.format(dt, last_dt))
-
-                        return
-
-                with open(file_name, 'a', encoding='utf8', newline='') as csvWriteFile:
-                    writer = csv.DictWriter(f=csvWriteFile, fieldnames=dict_fieldnames, dialect='excel',
-                                            extrasaction='ignore')
-                    writer.writerow(dict_data)
+                self.write_log(u'write csv header:{}'.format(dict_fieldnames))
+            # 文件保持打开，批量/定时刷新；最后一行的时间保存在内存中，时间早于最后一行的数据不插入
+            get_append_log_service().append(file_name, dict_data, dict_fieldnames, newline='',
+                                            dt_field='datetime')
         except Exception as ex:
             print(u'{}.append_data exception:{}/{}'.format(self.name, str(ex), traceback.format_exc()))
 
@@ -6425,21 +6835,18 @@ class CtaLineBar(object):
         """
         if not os.path.exists(file_name):
             return None
-        with open(file_name, 'r') as f:
-            f_size = os.path.getsize(file_name)
-            if f_size < line_length:
-                line_length = f_size
-            f.seek(f_size - line_length)  # 移动到最后1000个字节
-            for row in f.readlines()[-1:]:
-
-                datas = row.split(',')
-                if len(datas) > dt_index + 1:
-                    try:
-                        last_dt = datetime.strptime(datas[dt_index], '%Y-%m-%d %H:%M:%S')
-                        return last_dt
-                    except Exception:
-                        return None
-            return None
+        # 先刷新未落盘的数据，再从文件末尾按块反向扫描最后一行
+        get_append_log_service().flush_file(file_name)
+        row = read_last_line(file_name)
+        if row:
+            datas = row.split(',')
+            if len(datas) > dt_index + 1:
+                try:
+                    last_dt = datetime.strptime(datas[dt_index], '%Y-%m-%d %H:%M:%S')
+                    return last_dt
+                except Exception:
+                    return None
+        return None
 
     def is_shadow_line(self, open, high, low, close, direction, shadow_rate, wave_rate):
         """
@@ -6972,14 +7379,15 @@ class CtaMinuteBar(CtaLineBar):
 
     def __setstate__(self, state):
         """Pickle load()"""
-        self.__dict__.update(state)
+        self.__dict__.update(self.upgrade_state(state))
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
-            if key in ['chan_lib']:
+            if key in ['chan_lib', 'count_funcs']:
                 continue
             self.__dict__[key] = state.__dict__[key]
+        self.count_funcs = None
 
     def init_properties(self):
         """
@@ -7233,14 +7641,15 @@ class CtaHourBar(CtaLineBar):
 
     def __setstate__(self, state):
         """Pickle load()"""
-        self.__dict__.update(state)
+        self.__dict__.update(self.upgrade_state(state))
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
-            if key in ['chan_lib']:
+            if key in ['chan_lib', 'count_funcs']:
                 continue
             self.__dict__[key] = state.__dict__[key]
+        self.count_funcs = None
 
     def init_properties(self):
         """
@@ -7475,14 +7884,15 @@ class CtaDayBar(CtaLineBar):
 
     def __setstate__(self, state):
         """Pickle load()"""
-        self.__dict__.update(state)
+        self.__dict__.update(self.upgrade_state(state))
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
-            if key in ['chan_lib']:
+            if key in ['chan_lib', 'count_funcs']:
                 continue
             self.__dict__[key] = state.__dict__[key]
+        self.count_funcs = None
 
     def init_properties(self):
         """
@@ -7679,14 +8089,15 @@ class CtaWeekBar(CtaLineBar):
 
     def __setstate__(self, state):
         """Pickle load()"""
-        self.__dict__.update(state)
+        self.__dict__.update(self.upgrade_state(state))
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
-            if key in ['chan_lib']:
+            if key in ['chan_lib', 'count_funcs']:
                 continue
             self.__dict__[key] = state.__dict__[key]
+        self.count_funcs = None
 
     def init_properties(self):
         """
@@ -0,0 +1,113 @@
+# encoding: UTF-8
+
+# 回测引擎的活动委托索引
+# 原来 cross_limit_order / cross_stop_order 每个bar/tick都遍历所有活动委托，再按vt_symbol过滤，
+# 网格策略每个合约挂着几十个委托时，撮合为O(委托数)
+# OrderBookDict 在保持 OrderedDict 接口(get/pop/del/keys/len/in)不变的同时，
+# 按 vt_symbol + 方向 维护按价格排序的索引，撮合时只取出价格可能成交的委托
+
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from itertools import count
+
+INF = float('inf')
+
+
+class OrderBookDict(OrderedDict):
+    """
+    活动委托字典 {委托编号: 委托}
+    委托需要有 vt_symbol、direction、price 属性(OrderData / StopOrder)，价格在委托有效期内不变
+    索引: {(vt_symbol, direction): [(price, seq, 委托编号)]}，按价格、再按下单顺序排序
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.seq_count = count()
+        self.book = {}  # (vt_symbol, direction) => 排序的 [(price, seq, key)]
+        self.entries = {}  # key => (book_key, (price, seq, key))
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key, order):
+        entry = self.entries.get(key, None)
+        # 同一编号重新赋值，保持原来的下单顺序
+        seq = entry[1][1] if entry else next(self.seq_count)
+        if entry:
+            self._remove_entry(key)
+        super().__setitem__(key, order)
+        book_key = (order.vt_symbol, order.direction)
+        item = (order.price, seq, key)
+        insort(self.book.setdefault(book_key, []), item)
+        self.entries[key] = (book_key, item)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._remove_entry(key)
+
+    def _remove_entry(self, key):
+        """从价格索引中移除"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        book_key, item = entry
+        items = self.book[book_key]
+        i = bisect_left(items, item)
+        if i < len(items) and items[i] == item:
+            del items[i]
+        else:
+            # 价格为nan等无法二分查找时
+            items.remove(item)
+        if len(items) == 0:
+            del self.book[book_key]
+
+    def pop(self, key, *args):
+        if key in self:
+            order = super().__getitem__(key)
+            del self[key]
+            return order
+        if args:
+            return args[0]
+        raise KeyError(key)
+
+    def popitem(self, last=True):
+        key, order = super().popitem(last=last)
+        self._remove_entry(key)
+        return key, order
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, order in dict(*args, **kwargs).items():
+            self[key] = order
+
+    def clear(self):
+        super().clear()
+        self.book.clear()
+        self.entries.clear()
+
+    def __reduce__(self):
+        return self.__class__, (list(self.items()),)
+
+    def copy(self):
+        return self.__class__(self.items())
+
+    def get_orders(self, vt_symbol, direction, min_price: float = None, max_price: float = None) -> list:
+        """
+        获取某合约某方向，价格在[min_price, max_price]内的委托
+        :return: [(seq, 委托编号)]，seq为下单顺序
+        """
+        items = self.book.get((vt_symbol, direction), None)
+        if not items:
+            return []
+        # nan价格，不会满足任何比较条件
+        if (min_price is not None and min_price != min_price) or (max_price is not None and max_price != max_price):
+            return []
+        start = 0 if min_price is None else bisect_left(items, (min_price,))
+        end = len(items) if max_price is None else bisect_right(items, (max_price, INF))
+        return [(seq, key) for _, seq, key in items[start:end]]
+
+    @staticmethod
+    def merge_orders(long_orders: list, short_orders: list) -> list:
+        """合并多空两个方向 get_orders 的结果，按下单顺序返回委托编号"""
+        return [key for _, key in sorted(long_orders + short_orders)]
@@ -1,10 +1,9 @@
 # encoding: UTF-8
 from __future__ import unicode_literals
-import os
-import json
 from datetime import datetime
 from collections import OrderedDict
-from vnpy.component.base import CtaComponent, MyEncoder
+from vnpy.component.base import CtaComponent
+from vnpy.component.cta_state_store import JournalStore
 from vnpy.trader.utility import get_folder_path
 
 TNS_STATUS_OBSERVATE = 'observate'
@@ -30,6 +29,9 @@ class CtaPolicy(CtaComponent):
         self.create_time = None
         self.save_time = None
 
+        # 持久化存储(快照 + 追加日志)
+        self.store = None
+
     def to_json(self):
         """
         将数据转换成dict
@@ -69,21 +71,25 @@ class CtaPolicy(CtaComponent):
                 self.write_error(u'解释save_time异常:{}'.format(str(ex)))
                 self.save_time = datetime.now()
 
+    def get_store(self):
+        """持久化存储，策略改名后对应新的文件"""
+        json_file = str(get_folder_path('data').joinpath(u'{}_Policy.json'.format(self.strategy.strategy_name)))
+        if self.store is None or self.store.file_name != json_file:
+            self.store = JournalStore(json_file, on_error=self.write_error)
+        return self.store
+
     def load(self):
         """
         从持久化文件中获取
         :return:
         """
-        json_file = str(get_folder_path('data').joinpath(u'{}_Policy.json'.format(self.strategy.strategy_name)))
-
-        json_data = {}
-        if os.path.exists(json_file):
+        store = self.get_store()
+        if store.exists():
             try:
-                with open(json_file, 'r', encoding='utf8') as f:
-                    # 解析json文件
-                    json_data = json.load(f)
+                # 快照 + 重放日志
+                json_data = store.load()
             except Exception as ex:
-                self.write_error(u'读取Policy文件{}出错,ex:{}'.format(json_file, str(ex)))
+                self.write_error(u'读取Policy文件{}出错,ex:{}'.format(store.file_name, str(ex)))
                 json_data = {}
 
             # 从持久化文件恢复数据
@@ -92,20 +98,21 @@ class CtaPolicy(CtaComponent):
     def save(self):
         """
         保存至持久化文件
+        只追加发生变化的数据，数据没有变化时不写入
         :return:
         """
-        json_file = str(get_folder_path('data').joinpath(u'{}_Policy.json'.format(self.strategy.strategy_name)))
+        # 修改为：回测时不保存
+        if self.strategy and self.strategy.backtesting:
+            return
 
+        store = self.get_store()
         try:
-            # 修改为：回测时不保存
-            if self.strategy and self.strategy.backtesting:
-                return
-
             json_data = self.to_json()
+            # 只有保存时间变化，不需要保存
+            if store.loaded and len([k for k in store.get_changed_keys(json_data) if k != 'save_time']) == 0:
+                return
             json_data['save_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            with open(json_file, 'w', encoding='utf8') as f:
-                data = json.dumps(json_data, indent=4, ensure_ascii=False, cls=MyEncoder)
-                f.write(data)
+            store.save(json_data)
 
         except IOError as ex:
-            self.write_error(u'写入Policy文件{}出错,ex:{}'.format(json_file, str(ex)))
+            self.write_error(u'写入Policy文件{}出错,ex:{}'.format(store.file_name, str(ex)))
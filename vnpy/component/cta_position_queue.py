@@ -0,0 +1,59 @@
+# encoding: UTF-8
+
+# 回测引擎的开仓成交队列
+# 原来 realtime_calculate 每次平仓都遍历整个 long_position_list / short_position_list 查找同策略、同合约的开仓单，
+# 再从列表中间pop，持仓笔数多时为O(n^2)
+# PositionQueue 按(策略, 合约)维护先进先出的deque，平仓撮合为O(1)；
+# 同时保持原列表的接口(append/len/迭代)和整体顺序(部分平仓的剩余开仓单重新排到队尾)
+
+from collections import deque
+from itertools import count
+
+
+class PositionQueue(object):
+    """
+    开仓成交队列(单一方向)
+    成交需要有 strategy_name、vt_symbol、volume 属性(TradeData)
+    """
+
+    def __init__(self):
+        self.seq_count = count()
+        self.trades = {}  # seq => trade，按进入队列的顺序
+        self.queues = {}  # (strategy_name, vt_symbol) => deque([seq])
+
+    def append(self, trade):
+        """开仓成交(或部分平仓后剩余的开仓成交)放入队尾"""
+        seq = next(self.seq_count)
+        self.trades[seq] = trade
+        key = (trade.strategy_name, trade.vt_symbol)
+        queue = self.queues.get(key, None)
+        if queue is None:
+            queue = self.queues[key] = deque()
+        queue.append(seq)
+
+    def popleft(self, strategy_name: str, vt_symbol: str):
+        """取出某策略某合约最早的开仓成交，没有时返回None"""
+        queue = self.queues.get((strategy_name, vt_symbol), None)
+        if not queue:
+            return None
+        seq = queue.popleft()
+        if len(queue) == 0:
+            del self.queues[(strategy_name, vt_symbol)]
+        return self.trades.pop(seq)
+
+    def get_volumes(self, vt_symbol: str = None) -> list:
+        """持仓数量列表(用于日志)"""
+        return [t.volume for t in self.trades.values() if vt_symbol is None or t.vt_symbol == vt_symbol]
+
+    def clear(self):
+        self.trades.clear()
+        self.queues.clear()
+
+    def __len__(self):
+        return len(self.trades)
+
+    def __bool__(self):
+        return len(self.trades) > 0
+
+    def __iter__(self):
+        return iter(list(self.trades.values()))
@@ -18,6 +18,7 @@ from pykalman import KalmanFilter
 
 from vnpy.trader.object import RenkoBarData
 from vnpy.trader.utility import round_to
+from vnpy.trader.util_append_log import get_append_log_service, read_last_line
 from vnpy.trader.constant import Direction, Color
 from vnpy.component.cta_period import CtaPeriod, Period
 
@@ -4955,26 +4956,10 @@ class CtaRenkoBar(object):
         try:
             if not os.path.exists(file_name):
                 self.write_log(u'create csv file:{}'.format(file_name))
-                with open(file_name, 'a', encoding='utf8', newline='') as csvWriteFile:
-                    writer = csv.DictWriter(f=csvWriteFile, fieldnames=dict_fieldnames, dialect='excel',
-                                            extrasaction='ignore')
-                    self.write_log(u'write csv header:{}'.format(dict_fieldnames))
-                    writer.writeheader()
-                    writer.writerow(dict_data)
-            else:
-                dt = dict_data.get('datetime', None)
-                if dt is not None and isinstance(dt, datetime):
-                    dt_index = dict_fieldnames.index('datetime')
-                    last_dt = self.get_csv_last_dt(file_name=file_name, dt_index=dt_index,
-                                                   line_length=sys.getsizeof(dict_data) / 8 + 1)
-                    if last_dt is not None and dt < last_dt:
-                        print(u'{}新增数据时间{}比csv最后一条记录时间{}早，不插入'.format(self.name, dt, last_dt))
-                        return
-
-                with open(file_name, 'a', encoding='utf8', newline='') as csvWriteFile:
-                    writer = csv.DictWriter(f=csvWriteFile, fieldnames=dict_fieldnames, dialect='excel',
-                                            extrasaction='ignore')
-                    writer.writerow(dict_data)
+                self.write_log(u'write csv header:{}'.format(dict_fieldnames))
+            # 文件保持打开，批量/定时刷新；最后一行的时间保存在内存中，时间早于最后一行的数据不插入
+            get_append_log_service().append(file_name, dict_data, dict_fieldnames, newline='',
+                                            dt_field='datetime')
         except Exception as ex:
             print(u'{}.append_data exception:{}/{}'.format(self.name, str(ex), traceback.format_exc()))
 
@@ -4987,25 +4972,22 @@ class CtaRenkoBar(object):
         """
         if not os.path.exists(file_name):
             return None
-        with open(file_name, 'r') as f:
-            f_size = os.path.getsize(file_name)
-            if f_size < line_length:
-                line_length = f_size
-            f.seek(f_size - line_length)  # 移动到最后1000个字节
-            for row in f.readlines()[-1:]:
-
-                datas = row.split(',')
-                if len(datas) > dt_index + 1:
-                    try:
-                        str_dt = datas[dt_index]
-                        if '.' in str_dt:
-                            last_dt = datetime.strptime(datas[dt_index], '%Y-%m-%d %H:%M:%S.%f')
-                        else:
-                            last_dt = datetime.strptime(datas[dt_index], '%Y-%m-%d %H:%M:%S')
-                        return last_dt
-                    except Exception:
-                        return None
-            return None
+        # 先刷新未落盘的数据，再从文件末尾按块反向扫描最后一行
+        get_append_log_service().flush_file(file_name)
+        row = read_last_line(file_name)
+        if row:
+            datas = row.split(',')
+            if len(datas) > dt_index + 1:
+                try:
+                    str_dt = datas[dt_index]
+                    if '.' in str_dt:
+                        last_dt = datetime.strptime(datas[dt_index], '%Y-%m-%d %H:%M:%S.%f')
+                    else:
+                        last_dt = datetime.strptime(datas[dt_index], '%Y-%m-%d %H:%M:%S')
+                    return last_dt
+                except Exception:
+                    return None
+        return None
 
     def get_data(self):
         """
@@ -0,0 +1,195 @@
+# encoding: UTF-8
+
+# 环形缓冲序列
+# 用于K线的价格序列(open_array/high_array...)，以及指标序列(line_ma1/line_boll_upper...)
+# 替代原来每根bar都平移整个numpy数组、del list[0] 的做法，追加新值为(摊销)O(1)
+
+from itertools import islice
+
+import numpy as np
+
+
+class RingArray(object):
+    """
+    定长的numpy浮点环形序列
+    内部使用2倍长度的缓冲区，新值依次写入尾部，写满后才把最近的size-1个值整体挪回头部，
+    因此append为摊销O(1)；array 属性始终返回最近size个值的连续视图(零拷贝)，可直接传给talib/numpy计算
+    """
+
+    def __init__(self, size: int, fill_value: float = np.nan, dtype=float):
+        self.size = size
+        self._buffer = np.full(size * 2, fill_value, dtype=dtype)
+        self._end = size  # 有效视图为 [_end - size, _end)
+
+    @classmethod
+    def from_array(cls, data: np.ndarray):
+        """从旧版的定长numpy数组(pickle缓存)恢复"""
+        ring = cls(size=len(data), dtype=data.dtype)
+        ring._buffer[:ring.size] = data
+        return ring
+
+    def append(self, value: float):
+        """追加一个新值，最旧的值被挤出"""
+        if self._end == len(self._buffer):
+            # 缓冲区已写满，把最近的size-1个值挪回头部
+            keep = self.size - 1
+            self._buffer[:keep] = self._buffer[self._end - keep:self._end]
+            self._end = keep
+        self._buffer[self._end] = value
+        self._end += 1
+
+    @property
+    def array(self) -> np.ndarray:
+        """最近size个值的连续视图"""
+        return self._buffer[self._end - self.size:self._end]
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, item):
+        return self.array[item]
+
+    def __setitem__(self, key, value):
+        self.array[key] = value
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None:
+            return self.array
+        return self.array.astype(dtype)
+
+    def __repr__(self):
+        return 'RingArray({})'.format(self.array)
+
+
+class RingList(object):
+    """
+    类list的对象序列
+    删除头部元素(del x[0] / pop(0))只是移动起始下标，积累到一半以上才真正压缩底层list，
+    因此保持序列长度的 append + del x[0] 组合为摊销O(1)；读取方式与list一致(下标、切片、len、迭代)
+    """
+
+    def __init__(self, iterable=None):
+        self._data = list(iterable) if iterable is not None else []
+        self._start = 0  # 底层list中第一个有效元素的下标
+
+    def _compact(self):
+        """丢弃底层list中已删除的头部元素"""
+        if self._start > 0:
+            del self._data[:self._start]
+            self._start = 0
+
+    def _index(self, index: int):
+        """转换为底层list的下标"""
+        n = len(self._data) - self._start
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError('RingList index out of range')
+        return self._start + index
+
+    def _popleft(self):
+        """删除并返回第一个元素"""
+        if self._start >= len(self._data):
+            raise IndexError('pop from empty RingList')
+        value = self._data[self._start]
+        self._data[self._start] = None
+        self._start += 1
+        # 已删除的头部超过一半时，才压缩底层list
+        if self._start * 2 >= len(self._data):
+            self._compact()
+        return value
+
+    def append(self, value):
+        self._data.append(value)
+
+    def extend(self, values):
+        self._data.extend(values)
+
+    def insert(self, index, value):
+        self._compact()
+        self._data.insert(index, value)
+
+    def pop(self, index: int = -1):
+        if index == 0:
+            return self._popleft()
+        if index < 0 and -index <= len(self):
+            return self._data.pop(index)
+        return self._data.pop(self._index(index))
+
+    def remove(self, value):
+        self._compact()
+        self._data.remove(value)
+
+    def clear(self):
+        self._data = []
+        self._start = 0
+
+    def index(self, value, *args):
+        self._compact()
+        return self._data.index(value, *args)
+
+    def count(self, value):
+        return sum(1 for v in self if v == value)
+
+    def copy(self):
+        return self._data[self._start:]
+
+    def __len__(self):
+        return len(self._data) - self._start
+
+    def __iter__(self):
+        return islice(self._data, self._start, None)
+
+    def __reversed__(self):
+        for i in range(len(self._data) - 1, self._start - 1, -1):
+            yield self._data[i]
+
+    def __contains__(self, value):
+        return any(v == value for v in self)
+
+    def __getitem__(self, item):
+        data = self._data
+        if item.__class__ is int and self._start - len(data) <= item < 0:
+            # 最常见的 x[-1]/x[-2] 直接取底层list
+            return data[item]
+
+        if isinstance(item, slice):
+            if self._start == 0:
+                return self._data[item]
+            start, stop, step = item.indices(len(self))
+            if step > 0:
+                return self._data[self._start + start:self._start + max(start, stop):step]
+            return self._data[self._start:][item]
+
+        return data[self._index(item)]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            self._compact()
+            self._data[key] = value
+        else:
+            self._data[self._index(key)] = value
+
+    def __delitem__(self, key):
+        if key == 0:
+            self._popleft()
+            return
+        self._compact()
+        del self._data[key]
+
+    def __add__(self, other):
+        return self.copy() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.copy()
+
+    def __eq__(self, other):
+        if isinstance(other, RingList):
+            other = other.copy()
+        return self.copy() == other
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __repr__(self):
+        return 'RingList({})'.format(self.copy())
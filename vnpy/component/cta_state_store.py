@@ -0,0 +1,388 @@
+# encoding: UTF-8
+
+# 策略状态的持久化
+# 原来网格(_Grids.json)、Policy(_Policy.json)每次保存都用indent=4重写整个文件，K线缓存(_klines.pkb2)每次重新bz2压缩全部K线，
+# 一个账号上百个策略时，定时保存会产生I/O尖峰；并且直接覆盖写入，写到一半进程崩溃/断电，文件就损坏了
+#
+# JournalStore：快照 + 追加日志
+#   快照: 原来的json文件(格式不变)，只在压缩时通过 临时文件 + os.replace 原子替换
+#   日志: 快照文件名 + '.journal'，每次保存只追加发生变化的顶层key，一行一个json，没有变化时不写入；
+#         顶层的list(如网格的up_grids/dn_grids)只追加变化的元素，一个网格变化不重写整个方向
+#   加载: 读快照，再按顺序重放日志；最后一行不完整(写入时崩溃)时丢弃该行
+#   压缩: 日志超过快照大小的compact_ratio倍(且超过compact_min_size)时，把当前状态写成新快照，清空日志
+#   日志第一行记录快照内容的md5，快照被外部程序替换后，旧日志作废(复制/还原目录不影响)
+#   fsync: always 每次保存在调用线程fsync；background(缺省) 由后台线程每秒fsync有变化的日志；never 不fsync日志
+#         可在vt_setting.json中配置 "state_store.fsync"；快照的压缩除never外都在调用线程fsync
+# 注意：两次压缩之间，快照文件不是最新状态，最新状态 = 快照 + .journal；
+#   外部程序需要最新状态时，使用 JournalStore(文件名).load() 读取，不能只读json快照
+# save_pkb2_atomic：bz2 pickle的原子写入
+# KlineCacheWriter：K线缓存(_klines.pkb2)的原子写入，没有新bar时不重写
+
+import bz2
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock, Thread
+from time import sleep
+from typing import Any, Callable, Union
+
+from vnpy.component.base import MyEncoder
+from vnpy.trader.setting import SETTINGS
+
+JOURNAL_SUFFIX = '.journal'
+
+FSYNC_ALWAYS = 'always'
+FSYNC_BACKGROUND = 'background'
+FSYNC_NEVER = 'never'
+
+
+def atomic_write(file_name: str, data: bytes, fsync: bool = True):
+    """写入同目录的临时文件，再原子替换目标文件；任何时刻目标文件要么是旧内容，要么是新内容"""
+    folder = os.path.dirname(os.path.abspath(file_name))
+    fd, tmp_file = tempfile.mkstemp(prefix=os.path.basename(file_name) + '.', suffix='.tmp', dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_file, file_name)
+    except Exception:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+def save_pkb2_atomic(data: Any, file_name: str):
+    """bz2 + pickle 原子写入(与 load_data_from_pkb2 兼容)"""
+    atomic_write(file_name, bz2.compress(pickle.dumps(data)))
+
+
+def get_klines_sign(klines: dict) -> dict:
+    """K线缓存的标识 {kline_name: (bar数量, 最后一根bar的开始时间)}"""
+    sign = {}
+    for kline_name, kline in klines.items():
+        line_bar = getattr(kline, 'line_bar', None)
+        if line_bar:
+            sign[kline_name] = (len(line_bar), getattr(line_bar[-1], 'datetime', None))
+        else:
+            sign[kline_name] = (0, None)
+    return sign
+
+
+class KlineCacheWriter(object):
+    """
+    K线缓存写入
+    原子写入，写入中途崩溃不会损坏原有缓存；
+    与上次写入相比，没有新的bar时不重写(正在合成的bar不影响恢复：加载缓存后，会从缓存的最后时间开始补齐行情)
+    """
+
+    def __init__(self):
+        self.signs = {}  # file_name => 上次写入的K线标识
+
+    def save(self, klines: dict, file_name: str, force: bool = False) -> bool:
+        """
+        保存K线
+        :return: 是否写入了文件
+        """
+        sign = get_klines_sign(klines)
+        if not force and self.signs.get(file_name, None) == sign and os.path.exists(file_name):
+            return False
+        save_pkb2_atomic(klines, file_name)
+        self.signs[file_name] = sign
+        return True
+
+
+class JournalSyncer(object):
+    """后台线程定时fsync有变化的日志文件，有待同步的文件时启动，没有时退出"""
+
+    def __init__(self, interval: float = 1):
+        self.interval = interval
+        self.pending = set()
+        self.lock = Lock()
+        self.thread = None
+
+    def add(self, file_name: str):
+        with self.lock:
+            self.pending.add(file_name)
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name='JournalSyncer', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            sleep(self.interval)
+            self.sync()
+            with self.lock:
+                if not self.pending:
+                    self.thread = None
+                    return
+
+    def sync(self):
+        """fsync所有待同步的文件"""
+        with self.lock:
+            pending, self.pending = self.pending, set()
+        for file_name in pending:
+            try:
+                # 不使用O_CREAT：日志已被压缩删除时，不重新创建
+                fd = os.open(file_name, os.O_WRONLY | os.O_APPEND)
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+
+journal_syncer = JournalSyncer()
+
+
+class JournalStore(object):
+    """
+    json快照 + 追加日志的状态存储
+    store = JournalStore(json_file)
+    data = store.load()     # 快照 + 重放日志后的完整数据(dict)
+    store.save(data)        # 只把变化的顶层key(list为变化的元素)追加到日志
+    """
+
+    def __init__(self,
+                 file_name: str,
+                 compact_ratio: float = 2,
+                 compact_min_size: int = 64 * 1024,
+                 fsync: Union[str, bool] = None,
+                 on_error: Callable = None):
+        """
+        :param fsync: always/background/never，True/False 等同于 always/never，缺省使用 SETTINGS['state_store.fsync']
+        """
+        self.file_name = file_name
+        self.journal_file = file_name + JOURNAL_SUFFIX
+        self.compact_ratio = compact_ratio
+        self.compact_min_size = compact_min_size
+        if fsync is None:
+            fsync = SETTINGS.get('state_store.fsync', FSYNC_BACKGROUND)
+        if isinstance(fsync, bool):
+            fsync = FSYNC_ALWAYS if fsync else FSYNC_NEVER
+        self.fsync = fsync
+        self.on_error = on_error
+
+        self.loaded = False  # 是否已加载/写入过快照，之后的保存才能以日志方式追加
+        self.persisted = OrderedDict()  # 已持久化的 key => json字符串(list为各元素的json字符串列表)
+        self.snapshot_hash = ''
+        self.snapshot_size = 0
+        self.journal_size = 0
+
+    def write_error(self, msg: str):
+        if self.on_error:
+            self.on_error(msg)
+
+    @staticmethod
+    def dumps(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, cls=MyEncoder, separators=(',', ':'))
+
+    def dump_value(self, value: Any) -> Union[str, list]:
+        """持久化比较用的json字符串，list逐个元素"""
+        if isinstance(value, list):
+            return [self.dumps(v) for v in value]
+        return self.dumps(value)
+
+    def dump_data(self, data: dict) -> OrderedDict:
+        return OrderedDict((k, self.dump_value(v)) for k, v in data.items())
+
+    @staticmethod
+    def get_hash(content: bytes) -> str:
+        """快照内容的md5，用于识别外部程序替换了快照"""
+        return hashlib.md5(content).hexdigest() if content else ''
+
+    def get_legacy_sign(self) -> list:
+        """旧版本日志头使用的快照 [大小, 修改时间]"""
+        if not os.path.exists(self.file_name):
+            return [0, 0]
+        stat = os.stat(self.file_name)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def exists(self) -> bool:
+        return os.path.exists(self.file_name) or os.path.exists(self.journal_file)
+
+    def load(self) -> dict:
+        """
+        加载快照，并重放日志
+        :return: 数据，快照和日志都不存在时返回空dict
+        """
+        data = OrderedDict()
+        content = b''
+        if os.path.exists(self.file_name):
+            try:
+                with open(self.file_name, 'rb') as f:
+                    content = f.read()
+                data = json.loads(content.decode('utf8'), object_pairs_hook=OrderedDict)
+            except Exception as ex:
+                self.write_error(u'读取{}异常:{}'.format(self.file_name, str(ex)))
+                data = OrderedDict()
+        self.snapshot_hash = self.get_hash(content)
+
+        replayed = self.replay_journal(data)
+
+        self.persisted = self.dump_data(data)
+        self.loaded = True
+
+        # 有日志时，加载后立即压缩，下次加载只需读快照
+        if replayed:
+            self.compact()
+        else:
+            self.snapshot_size = len(content)
+            self.journal_size = os.path.getsize(self.journal_file) if os.path.exists(self.journal_file) else 0
+
+        return data
+
+    def replay_journal(self, data: dict) -> bool:
+        """按顺序把日志应用到data上，返回是否存在日志"""
+        if not os.path.exists(self.journal_file):
+            return False
+
+        with open(self.journal_file, 'rb') as f:
+            lines = f.read().split(b'\n')
+
+        if not lines or not lines[0]:
+            return True
+        try:
+            header = json.loads(lines[0].decode('utf8'))
+        except Exception:
+            header = {}
+        snapshot = header.get('snapshot') if isinstance(header, dict) else None
+        if isinstance(snapshot, list):
+            matched = snapshot == self.get_legacy_sign()
+        else:
+            matched = snapshot == self.snapshot_hash
+        if not matched:
+            self.write_error(u'{}与快照不匹配(快照被替换或日志损坏)，忽略日志'.format(self.journal_file))
+            return True
+
+        for n, line in enumerate(lines[1:], start=2):
+            if not line:
+                continue
+            try:
+                record = json.loads(line.decode('utf8'), object_pairs_hook=OrderedDict)
+            except Exception:
+                # 写入日志时崩溃，最后一行不完整
+                self.write_error(u'{}第{}行不完整，忽略之后的记录'.format(self.journal_file, n))
+                break
+            for k, v in record.get('set', {}).items():
+                data[k] = v
+            for k, (length, items) in record.get('items', {}).items():
+                values = data.get(k, None)
+                if not isinstance(values, list):
+                    values = []
+                del values[length:]
+                values.extend([None] * (length - len(values)))
+                for i, v in items.items():
+                    values[int(i)] = v
+                data[k] = values
+            for k in record.get('del', []):
+                data.pop(k, None)
+        return True
+
+    def save(self, data: dict) -> int:
+        """
+        保存数据
+        未加载过时(首次保存)写入完整快照；之后只把变化的顶层key追加到日志
+        list只追加变化的元素和长度；变化的元素超过一半(如中间插入、删除)时，追加整个list
+        :return: 变化的key数量
+        """
+        if not self.loaded:
+            self.compact(data)
+            return len(data)
+
+        dumped = self.dump_data(data)
+        changed = OrderedDict()  # key => 整个值的json
+        changed_items = OrderedDict()  # key => (长度, {序号: 元素json})
+        for k, new in dumped.items():
+            old = self.persisted.get(k, None)
+            if old == new:
+                continue
+            if isinstance(new, list) and isinstance(old, list):
+                indexes = [i for i, v in enumerate(new) if i >= len(old) or old[i] != v]
+                if len(indexes) * 2 <= len(new):
+                    changed_items[k] = (len(new), indexes)
+                    continue
+            changed[k] = '[{}]'.format(','.join(new)) if isinstance(new, list) else new
+        removed = [k for k in self.persisted.keys() if k not in dumped]
+
+        if not changed and not changed_items and not removed:
+            return 0
+
+        record = '{{"time":{},"set":{{{}}},"items":{{{}}},"del":{}}}\n'.format(
+            self.dumps(datetime.now().strftime('%Y-%m-%d %H:%M:%S')),
+            ','.join('{}:{}'.format(self.dumps(k), s) for k, s in changed.items()),
+            ','.join('{}:[{},{{{}}}]'.format(
+                self.dumps(k), length, ','.join('"{}":{}'.format(i, dumped[k][i]) for i in indexes))
+                for k, (length, indexes) in changed_items.items()),
+            self.dumps(removed))
+        self.append_journal(record.encode('utf8'))
+        self.persisted = dumped
+
+        if self.journal_size > max(self.compact_min_size, self.snapshot_size * self.compact_ratio):
+            self.compact(data)
+
+        return len(changed) + len(changed_items) + len(removed)
+
+    def get_changed_keys(self, data: dict) -> list:
+        """与已持久化的数据相比，发生变化(新增、修改、删除)的key"""
+        keys = [k for k, v in data.items() if self.persisted.get(k, None) != self.dump_value(v)]
+        keys.extend([k for k in self.persisted.keys() if k not in data])
+        return keys
+
+    def append_journal(self, record: bytes):
+        """追加一条日志；日志不存在时，先写入快照标识"""
+        new_file = not os.path.exists(self.journal_file)
+        with open(self.journal_file, 'ab') as f:
+            if new_file:
+                header = self.dumps({'snapshot': self.snapshot_hash}) + '\n'
+                f.write(header.encode('utf8'))
+            f.write(record)
+            f.flush()
+            if self.fsync == FSYNC_ALWAYS:
+                os.fsync(f.fileno())
+            self.journal_size = f.tell()
+        if self.fsync == FSYNC_BACKGROUND:
+            journal_syncer.add(self.journal_file)
+
+    def compact(self, data: dict = None):
+        """
+        把当前状态写成新快照(原子替换)，并删除日志
+        :param data: 当前数据，缺省使用已持久化的数据
+        """
+        if data is None:
+            data = OrderedDict()
+            for k, s in self.persisted.items():
+                if isinstance(s, list):
+                    data[k] = [json.loads(v, object_pairs_hook=OrderedDict) for v in s]
+                else:
+                    data[k] = json.loads(s, object_pairs_hook=OrderedDict)
+        content = json.dumps(data, indent=4, ensure_ascii=False, cls=MyEncoder).encode('utf8')
+        atomic_write(self.file_name, content, fsync=self.fsync != FSYNC_NEVER)
+        # 快照已包含日志的内容；在此处崩溃时，日志头与新快照不匹配，加载时会被忽略
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+        self.persisted = self.dump_data(data)
+        self.loaded = True
+        self.snapshot_hash = self.get_hash(content)
+        self.snapshot_size = len(content)
+        self.journal_size = 0
+
+    def remove(self):
+        """删除快照和日志"""
+        for file_name in [self.file_name, self.journal_file]:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        self.persisted = OrderedDict()
+        self.loaded = False
+        self.snapshot_hash = ''
+        self.snapshot_size = 0
+        self.journal_size = 0
@@ -0,0 +1,505 @@
+# encoding: UTF-8
+
+# 增量(流式)指标内核
+# 每根bar只做O(1)的状态更新，替代CtaLineBar中每根bar都对整个窗口重新调用 ta.MA/ta.EMA/ta.BBANDS 等的做法
+# 计算口径与talib在同样窗口上的输出一致(仅存在浮点误差级别的差异)，并定期用窗口数据重新精确计算，避免误差累积
+# peek(x): 不改变内核状态，返回“假设当前未完成的bar以x收盘”时的指标值，供实时(rt_xxx)指标使用
+
+import math
+from collections import deque
+from functools import lru_cache
+
+NAN = float('nan')
+
+
+def is_zero(value: float):
+    """与talib的 TA_IS_ZERO 一致"""
+    return -0.00000001 < value < 0.00000001
+
+
+@lru_cache(maxsize=None)
+def ewm_weights(spans: tuple, window: int):
+    """
+    对window个值连续做多次 pd.Series.ewm(span=span, adjust=False).mean() 后，最后一个值对应各输入值的权重
+    ewm(adjust=False)以第一个值为种子线性递推，窗口长度固定时，结果为输入值的固定加权和
+    """
+    weights = []
+    for i in range(window):
+        values = [1.0 if i == j else 0.0 for j in range(window)]
+        for span in spans:
+            alpha = 2 / (span + 1)
+            smoothed = values[0]
+            for j in range(window):
+                smoothed = values[j] if j == 0 else (1 - alpha) * smoothed + alpha * values[j]
+                values[j] = smoothed
+        weights.append(values[-1])
+    return tuple(weights)
+
+
+def chained_ema(data, spans: tuple):
+    """连续多次ewm(adjust=False)平滑后的最后一个值，数据中含nan/inf时返回nan"""
+    weights = ewm_weights(spans, len(data))
+    value = sum(w * v for w, v in zip(weights, data))
+    return value if math.isfinite(value) else NAN
+
+
+class StreamIndicator(object):
+    """增量指标基类"""
+
+    # 恢复内核状态所需的最近输入数量，None 代表需要全部历史
+    history = None
+
+    def __init__(self):
+        self.count = 0  # 已经喂入的bar数量(由K线维护，用于补喂缺失的bar)
+
+    def reset(self):
+        """清空状态"""
+        self.count = 0
+
+    def update(self, *values):
+        raise NotImplementedError
+
+    def peek(self, *values):
+        raise NotImplementedError
+
+
+class RollingMean(StreamIndicator):
+    """窗口简单平均(= ta.MA / ta.SMA)"""
+
+    def __init__(self, window: int):
+        super().__init__()
+        self.window = window
+        self.history = window
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.values = deque(maxlen=self.window)
+        self.total = 0
+        self.steps = 0
+
+    def update(self, value):
+        if value != value:
+            return
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+            self.steps += 1
+        self.values.append(value)
+        self.total += value
+        if self.steps >= self.window:
+            # 定期重新求和，消除浮点误差累积
+            self.total = sum(self.values)
+            self.steps = 0
+
+    @property
+    def value(self):
+        if len(self.values) == 0:
+            return NAN
+        return self.total / len(self.values)
+
+    def peek(self, value):
+        if len(self.values) == self.window:
+            return (self.total - self.values[0] + value) / self.window
+        return (self.total + value) / (len(self.values) + 1)
+
+
+class RollingStd(StreamIndicator):
+    """
+    窗口均值+标准差
+    滑动窗口的Welford算法更新均值/离差平方和，ddof=0 对应 ta.STDDEV/ta.BBANDS，ddof=1 对应 np.std(ddof=1)
+    """
+
+    def __init__(self, window: int, ddof: int = 0):
+        super().__init__()
+        self.window = window
+        self.ddof = ddof
+        self.history = window
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.values = deque(maxlen=self.window)
+        self.mean = 0
+        self.m2 = 0
+        self.steps = 0
+
+    def _next(self, value):
+        """返回加入value后的(mean, m2)"""
+        n = len(self.values)
+        if n < self.window:
+            delta = value - self.mean
+            mean = self.mean + delta / (n + 1)
+            return mean, self.m2 + delta * (value - mean)
+
+        oldest = self.values[0]
+        mean = self.mean + (value - oldest) / n
+        return mean, self.m2 + (value - oldest) * (value - mean + oldest - self.mean)
+
+    def _std(self, n, m2):
+        if n - self.ddof <= 0:
+            return NAN
+        return math.sqrt(max(m2, 0) / (n - self.ddof))
+
+    def update(self, value):
+        if value != value:
+            return
+        if len(self.values) == self.window:
+            self.steps += 1
+        self.mean, self.m2 = self._next(value)
+        self.values.append(value)
+        if self.steps >= self.window:
+            # 定期两遍法重新计算，消除浮点误差累积
+            n = len(self.values)
+            self.mean = sum(self.values) / n
+            self.m2 = sum((v - self.mean) ** 2 for v in self.values)
+            self.steps = 0
+
+    @property
+    def value(self):
+        """(均值, 标准差)"""
+        if len(self.values) == 0:
+            return NAN, NAN
+        return self.mean, self._std(len(self.values), self.m2)
+
+    def peek(self, value):
+        mean, m2 = self._next(value)
+        return mean, self._std(min(len(self.values) + 1, self.window), m2)
+
+
+class Ema(StreamIndicator):
+    """
+    递推EMA(不限窗口)，与talib一致：前period个值的简单平均作为种子，之后 s = (x - s) * k + s
+    """
+
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self.k = 2 / (period + 1)
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.seen = 0
+        self.total = 0
+        self.value = NAN
+
+    def _next(self, value):
+        if self.seen + 1 < self.period:
+            return NAN
+        if self.seen + 1 == self.period:
+            return (self.total + value) / self.period
+        return (value - self.value) * self.k + self.value
+
+    def update(self, value):
+        if value != value:
+            return
+        self.value = self._next(value)
+        if self.seen < self.period:
+            self.total += value
+        self.seen += 1
+
+    def peek(self, value):
+        return self._next(value)
+
+
+class WindowSmoother(StreamIndicator):
+    """
+    窗口内的EMA/Wilder平滑，与talib对最近window个数据调用 ta.EMA / ta.ATR / ta.RSI 的结果一致:
+    talib 以窗口内前period个值的简单平均作为种子，再对其余值递推平滑。
+    窗口滑动时，输出是窗口内各值的固定权重线性组合，拆分为 种子部分(简单求和) + 尾部(指数加权和)，均可O(1)更新
+    """
+
+    def __init__(self, period: int, window: int, alpha: float = None, wilder: bool = False):
+        super().__init__()
+        self.period = period
+        self.window = max(window, period)
+        self.history = self.window
+        self.wilder = wilder  # Wilder平滑：s = (s * (n-1) + x) / n
+        self.alpha = alpha if alpha else (1 / period if wilder else 2 / (period + 1))
+        # 窗口已满时，种子部分的衰减系数 (1-alpha)^(window-period)
+        self.decay = (1 - self.alpha) ** (self.window - self.period)
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.values = deque(maxlen=self.window)
+        self.seed_total = 0
+        self.tail = 0
+        self.value = NAN
+        self.steps = 0
+
+    def _smooth(self, pre_value, value):
+        if self.wilder:
+            return (pre_value * (self.period - 1) + value) / self.period
+        return (value - pre_value) * self.alpha + pre_value
+
+    def _next(self, value):
+        """返回加入value后的(seed_total, tail, value)"""
+        n = len(self.values)
+        if n < self.window:
+            # 窗口未满：与talib相同的顺序递推
+            if n + 1 < self.period:
+                return self.seed_total + value, 0, NAN
+            if n + 1 == self.period:
+                seed_total = self.seed_total + value
+                return seed_total, 0, seed_total / self.period
+            return self.seed_total, self.tail * (1 - self.alpha) + self.alpha * value, \
+                self._smooth(self.value, value)
+
+        oldest = self.values[0]
+        if self.period == self.window:
+            seed_total = self.seed_total - oldest + value
+            return seed_total, 0, seed_total / self.period
+
+        moving = self.values[self.period]  # 从尾部移入种子部分的值
+        seed_total = self.seed_total - oldest + moving
+        tail = self.tail * (1 - self.alpha) - self.alpha * self.decay * moving + self.alpha * value
+        return seed_total, tail, self.decay * seed_total / self.period + tail
+
+    def _resync(self):
+        """用窗口数据按talib的顺序重新计算"""
+        values = list(self.values)
+        self.seed_total = sum(values[:self.period])
+        self.value = self.seed_total / self.period
+        self.tail = 0
+        for value in values[self.period:]:
+            self.value = self._smooth(self.value, value)
+            self.tail = self.tail * (1 - self.alpha) + self.alpha * value
+        self.steps = 0
+
+    def update(self, value):
+        if value != value:
+            return
+        if len(self.values) == self.window:
+            self.steps += 1
+        self.seed_total, self.tail, self.value = self._next(value)
+        self.values.append(value)
+        if self.steps >= self.window:
+            self._resync()
+
+    def peek(self, value):
+        return self._next(value)[2]
+
+
+class WindowAtr(StreamIndicator):
+    """最近window根bar上的 ta.ATR(period)，窗口内的真实波幅数量为 window-1"""
+
+    def __init__(self, period: int, window: int):
+        super().__init__()
+        self.history = window
+        self.smoother = WindowSmoother(period=period, window=window - 1, wilder=True)
+        self.pre_close = NAN
+
+    def reset(self):
+        super().reset()
+        self.smoother.reset()
+        self.pre_close = NAN
+
+    def true_range(self, high, low):
+        return max(high, self.pre_close) - min(low, self.pre_close)
+
+    def update(self, high, low, close):
+        if self.pre_close == self.pre_close:
+            self.smoother.update(self.true_range(high, low))
+        self.pre_close = close
+
+    @property
+    def value(self):
+        return self.smoother.value
+
+    def peek(self, high, low):
+        if self.pre_close != self.pre_close:
+            return NAN
+        return self.smoother.peek(self.true_range(high, low))
+
+
+class WindowRsi(StreamIndicator):
+    """最近window个收盘价上的 ta.RSI(period)，窗口内的涨跌数量为 window-1"""
+
+    def __init__(self, period: int, window: int):
+        super().__init__()
+        self.history = window
+        self.gain = WindowSmoother(period=period, window=window - 1, wilder=True)
+        self.loss = WindowSmoother(period=period, window=window - 1, wilder=True)
+        self.pre_close = NAN
+
+    def reset(self):
+        super().reset()
+        self.gain.reset()
+        self.loss.reset()
+        self.pre_close = NAN
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if gain != gain or loss != loss:
+            return NAN
+        total = gain + loss
+        return 0 if is_zero(total) else 100 * (gain / total)
+
+    def update(self, close):
+        if close != close:
+            return
+        if self.pre_close == self.pre_close:
+            diff = close - self.pre_close
+            self.gain.update(diff if diff > 0 else 0)
+            self.loss.update(-diff if diff < 0 else 0)
+        self.pre_close = close
+
+    @property
+    def value(self):
+        return self._rsi(self.gain.value, self.loss.value)
+
+    def peek(self, close):
+        if self.pre_close != self.pre_close:
+            return NAN
+        diff = close - self.pre_close
+        return self._rsi(self.gain.peek(diff if diff > 0 else 0), self.loss.peek(-diff if diff < 0 else 0))
+
+
+class Macd(StreamIndicator):
+    """
+    递推MACD，与talib一致：
+    快线EMA从第(slow-fast)个值开始计算，使快慢线同时产生第一个值；信号线以前signal个dif的平均值为种子
+    """
+
+    def __init__(self, fast: int, slow: int, signal: int):
+        super().__init__()
+        if slow < fast:
+            fast, slow = slow, fast
+        self.fast_ema = Ema(fast)
+        self.slow_ema = Ema(slow)
+        self.signal_ema = Ema(signal)
+        self.skip = slow - fast
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.seen = 0
+        self.fast_ema.reset()
+        self.slow_ema.reset()
+        self.signal_ema.reset()
+
+    def update(self, close):
+        if close != close:
+            return
+        if self.seen >= self.skip:
+            self.fast_ema.update(close)
+        self.slow_ema.update(close)
+        self.seen += 1
+        dif = self.fast_ema.value - self.slow_ema.value
+        if dif == dif:
+            self.signal_ema.update(dif)
+
+    @staticmethod
+    def _macd(dif, dea):
+        """(dif, dea, macd)，其中macd与talib一致为 dif - dea"""
+        return dif, dea, dif - dea
+
+    @property
+    def value(self):
+        return self._macd(self.fast_ema.value - self.slow_ema.value, self.signal_ema.value)
+
+    def peek(self, close):
+        fast = self.fast_ema.peek(close) if self.seen >= self.skip else NAN
+        dif = fast - self.slow_ema.peek(close)
+        dea = self.signal_ema.peek(dif) if dif == dif else NAN
+        return self._macd(dif, dea)
+
+
+class WindowMacd(StreamIndicator):
+    """
+    最近window个收盘价上的 ta.MACD
+    MACD是收盘价的线性组合，窗口固定时，输出就是窗口数据的固定权重加权和。
+    创建时用单位脉冲求出权重，之后每次计算只需一次长度为window的点积，不再重复递推整个窗口
+    """
+
+    def __init__(self, fast: int, slow: int, signal: int, window: int):
+        super().__init__()
+        self.window = window
+        self.history = window
+        self.dif_weights = []
+        self.dea_weights = []
+        for i in range(window):
+            macd = Macd(fast, slow, signal)
+            for j in range(window):
+                macd.update(1.0 if i == j else 0.0)
+            dif, dea, _ = macd.value
+            self.dif_weights.append(dif)
+            self.dea_weights.append(dea)
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.values = deque(maxlen=self.window)
+
+    def update(self, close):
+        if close != close:
+            return
+        self.values.append(close)
+
+    def _macd(self, values):
+        dif = sum(w * v for w, v in zip(self.dif_weights, values))
+        dea = sum(w * v for w, v in zip(self.dea_weights, values))
+        return dif, dea, dif - dea
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return NAN, NAN, NAN
+        return self._macd(self.values)
+
+    def peek(self, close):
+        if len(self.values) < self.window - 1:
+            return NAN, NAN, NAN
+        values = list(self.values)[-(self.window - 1):]
+        values.append(close)
+        return self._macd(values)
+
+
+class RollingExtreme(StreamIndicator):
+    """
+    窗口最高/最低值，单调队列实现，每次更新摊销O(1)
+    """
+
+    def __init__(self, window: int, is_max: bool = True):
+        super().__init__()
+        self.window = window
+        self.history = window
+        self.is_max = is_max
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.seen = 0
+        self.queue = deque()  # (序号, 数值), 数值单调
+
+    def _better(self, a, b):
+        return a >= b if self.is_max else a <= b
+
+    def update(self, value):
+        if value != value:
+            return
+        queue = self.queue
+        while queue and self._better(value, queue[-1][1]):
+            queue.pop()
+        queue.append((self.seen, value))
+        self.seen += 1
+        if queue[0][0] <= self.seen - 1 - self.window:
+            queue.popleft()
+
+    @property
+    def value(self):
+        return self.queue[0][1] if self.queue else NAN
+
+    def peek(self, value):
+        """最近window-1个值，与value一起的最高/最低值"""
+        queue = self.queue
+        oldest = self.seen - self.window
+        best = NAN
+        for index, v in queue:
+            if index > oldest:
+                best = v
+                break
+        if best != best or self._better(value, best):
+            return value
+        return best
@@ -0,0 +1,145 @@
+# encoding: UTF-8
+
+# tick回测的后台预加载
+# run_tick_test 原来逐日同步加载(解压、解析、合并)再回放，加载时CPU不回放，回放时不加载
+# DayTickLoader 在后台线程中提前加载后面N个交易日的数据，回放当前交易日时，后面交易日的数据已在准备
+# bz2/zlib解压、文件读取、pandas的大部分计算都会释放GIL，因此使用线程即可与回放重叠
+
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, List, Set
+
+
+def get_test_days(start_date: datetime, end_date: datetime, trading_dates: Set[str] = None) -> List[datetime]:
+    """
+    回测区间[start_date, end_date)内需要加载的日期
+    剔除周六、周日(不会是交易日)；
+    提供trading_dates(yyyymmdd的集合，例如缓存目录中存在的数据日期)时，只保留其中的日期，剔除节假日
+    """
+    days = []
+    for i in range(0, (end_date - start_date).days):
+        test_day = start_date + timedelta(days=i)
+        if test_day.isoweekday() > 5:
+            continue
+        if trading_dates is not None and test_day.strftime('%Y%m%d') not in trading_dates:
+            continue
+        days.append(test_day)
+    return days
+
+
+def get_memory_size(data) -> int:
+    """DataFrame占用的内存(不含object列指向的对象)"""
+    if data is None:
+        return 0
+    try:
+        return int(data.memory_usage(index=True, deep=False).sum())
+    except Exception:
+        return 0
+
+
+class DayTickLoader(object):
+    """
+    按日预加载tick数据
+    for test_day, df in DayTickLoader(engine.get_day_tick_df, days):
+        ...
+    后台线程依次调用 load_func(day)，最多缓存 prefetch_days 个交易日，
+    并且缓存的DataFrame合计不超过 max_memory_mb(至少缓存一个交易日)；
+    load_func 的异常在迭代到该交易日时重新抛出；
+    迭代结束或中途退出(break/return/异常)时，自动停止后台线程
+    prefetch_days = 0 时，不使用后台线程，与原来的逐日同步加载一致
+    """
+
+    def __init__(self,
+                 load_func: Callable,
+                 days: List[datetime],
+                 prefetch_days: int = 2,
+                 max_memory_mb: float = 1024):
+        self.load_func = load_func
+        self.days = list(days)
+        self.prefetch_days = prefetch_days
+        self.max_memory = max_memory_mb * 1024 * 1024
+
+        self.buffer = deque()  # [(day, data, error, size)]
+        self.buffer_size = 0  # 缓存数据的内存合计
+        self.finished = False  # 后台线程已加载完所有日期
+        self.active = False
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def start(self):
+        """启动后台加载线程"""
+        if self.thread:
+            return
+        self.active = True
+        self.thread = threading.Thread(target=self.run, name='DayTickLoader', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止后台加载线程"""
+        with self.condition:
+            self.active = False
+            self.buffer.clear()
+            self.buffer_size = 0
+            self.condition.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def run(self):
+        """后台线程，逐日加载"""
+        for day in self.days:
+            # 缓存的交易日数量已满，等待回放取走
+            with self.condition:
+                while self.active and len(self.buffer) >= self.prefetch_days:
+                    self.condition.wait()
+                if not self.active:
+                    return
+
+            data, error = None, None
+            try:
+                data = self.load_func(day)
+            except Exception as ex:
+                error = ex
+            size = get_memory_size(data)
+
+            # 超出内存预算，等待回放取走
+            with self.condition:
+                while self.active and len(self.buffer) > 0 and self.buffer_size + size > self.max_memory:
+                    self.condition.wait()
+                if not self.active:
+                    return
+                self.buffer.append((day, data, error, size))
+                self.buffer_size += size
+                self.condition.notify_all()
+
+            if error is not None:
+                break
+
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def __iter__(self):
+        if self.prefetch_days <= 0:
+            for day in self.days:
+                yield day, self.load_func(day)
+            return
+
+        self.start()
+        try:
+            while True:
+                with self.condition:
+                    while len(self.buffer) == 0 and not self.finished:
+                        self.condition.wait()
+                    if len(self.buffer) == 0:
+                        break
+                    day, data, error, size = self.buffer.popleft()
+                    self.buffer_size -= size
+                    self.condition.notify_all()
+
+                if error is not None:
+                    raise error
+                yield day, data
+        finally:
+            self.stop()
@@ -38,6 +38,11 @@ from vnpy.data.tdx.tdx_common import (
     get_cache_json,
     save_cache_json,
     TDX_FUTURE_CONFIG)
+from vnpy.data.tick_cache import (
+    TICK_CACHE_SUFFIX,
+    save_tick_cache,
+    load_tick_cache_list,
+    get_cache_file)
 
 # 每个周期包含多少分钟 (估算值, 没考虑夜盘和10:15的影响)
 NUM_MINUTE_MAPPING: Dict[str, int] = {}
@@ -835,11 +840,10 @@ class TdxFutureData(object):
         cache_folder_year_month = os.path.join(cache_folder, cache_date[:6])
         os.makedirs(cache_folder_year_month, exist_ok=True)
 
-        save_file = os.path.join(cache_folder_year_month, '{}_{}.pkz2'.format(cache_symbol, cache_date))
+        save_file = os.path.join(cache_folder_year_month, '{}_{}{}'.format(cache_symbol, cache_date, TICK_CACHE_SUFFIX))
         try:
-            with bz2.BZ2File(save_file, 'wb') as f:
-                pickle.dump(data_list, f)
-                self.write_log(u'缓存成功:{}'.format(save_file))
+            save_tick_cache(save_file, data_list, symbol=cache_symbol, trading_day=cache_date)
+            self.write_log(u'缓存成功:{}'.format(save_file))
         except Exception as ex:
             self.write_error(u'缓存写入异常:{}'.format(str(ex)))
 
@@ -853,11 +857,15 @@ class TdxFutureData(object):
             self.write_error('缓存目录:{}不存在,不能读取'.format(cache_folder_year_month))
             return None
 
-        cache_file = os.path.join(cache_folder_year_month, '{}_{}.pkz2'.format(cache_symbol, cache_date))
-        if not os.path.isfile(cache_file):
-            self.write_error('缓存文件:{}不存在,不能读取'.format(cache_file))
+        # 优先使用列式缓存，其次旧的pkz2缓存
+        cache_file = get_cache_file(cache_folder, cache_symbol, cache_date)
+        if cache_file is None:
+            self.write_error('缓存文件:{}_{}不存在,不能读取'.format(cache_symbol, cache_date))
             return None
 
+        if cache_file.endswith(TICK_CACHE_SUFFIX):
+            return load_tick_cache_list(cache_file)
+
         with bz2.BZ2File(cache_file, 'rb') as f:
             data = pickle.load(f)
             return data
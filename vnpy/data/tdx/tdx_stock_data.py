@@ -35,6 +35,11 @@ from vnpy.data.tdx.tdx_common import (
     get_stock_type,
     TDX_STOCK_CONFIG,
     TDX_PROXY_CONFIG)
+from vnpy.data.tick_cache import (
+    TICK_CACHE_SUFFIX,
+    save_tick_cache,
+    load_tick_cache_list,
+    get_cache_file)
 
 # 每个周期包含多少分钟
 NUM_MINUTE_MAPPING = {}
@@ -539,10 +544,9 @@ class TdxStockData(object):
         cache_folder_year_month = os.path.join(cache_folder, cache_date[:6])
         os.makedirs(cache_folder_year_month, exist_ok=True)
 
-        save_file = os.path.join(cache_folder_year_month, '{}_{}.pkb2'.format(cache_symbol, cache_date))
-        with bz2.BZ2File(save_file, 'wb') as f:
-            pickle.dump(data_list, f)
-            self.write_log(u'缓存成功:{}'.format(save_file))
+        save_file = os.path.join(cache_folder_year_month, '{}_{}{}'.format(cache_symbol, cache_date, TICK_CACHE_SUFFIX))
+        save_tick_cache(save_file, data_list, symbol=cache_symbol, trading_day=cache_date)
+        self.write_log(u'缓存成功:{}'.format(save_file))
 
     def load_cache(self,
                    cache_folder: str,
@@ -557,10 +561,13 @@ class TdxStockData(object):
             # self.write_error('缓存目录:{}不存在,不能读取'.format(cache_folder_year_month))
             return None
 
-        cache_file = os.path.join(cache_folder_year_month, '{}_{}.pkb2'.format(cache_symbol, cache_date))
-        if not os.path.isfile(cache_file):
+        # 优先使用列式缓存，其次旧的pkb2缓存
+        cache_file = get_cache_file(cache_folder, cache_symbol, cache_date)
+        if cache_file is None:
             # self.write_error('缓存文件:{}不存在,不能读取'.format(cache_file))
             return None
+        if cache_file.endswith(TICK_CACHE_SUFFIX):
+            return load_tick_cache_list(cache_file)
         with bz2.BZ2File(cache_file, 'rb') as f:
             data = pickle.load(f)
             return data
@@ -0,0 +1,324 @@
+# encoding: UTF-8
+
+# 列式二进制tick/bar缓存
+# 替代原来 bz2 + pickle(list[dict]) 的 .pkb2/.pkz2 日缓存文件:
+#   旧格式需要整体bz2解压、逐个unpickle字典，再由 pd.DataFrame(list) 重新推断类型，回测大部分时间耗在这里
+#   新格式按列保存定长numpy数组，读取时直接映射成数组(不压缩时可mmap零拷贝)，再组装DataFrame
+# 文件结构:
+#   MAGIC(4字节) + 头长度(uint32) + 头(json,utf-8) + 按64字节对齐的各列数据块
+#   头包含 版本、合约、交易日、行数、编码方式，以及每一列的名称/dtype/偏移/长度
+# 编码方式: raw(不压缩，可mmap), zlib(标准库), lz4 / zstd (安装了对应包时可用)
+
+import os
+import sys
+import bz2
+import json
+import mmap
+import pickle
+import zlib
+import struct
+from datetime import datetime
+from typing import Union, List
+
+import numpy as np
+import pandas as pd
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TICK_CACHE_MAGIC = b'VTCC'
+TICK_CACHE_VERSION = 1
+TICK_CACHE_SUFFIX = '.tkc'
+# 旧的pickle缓存后缀 (股票:pkb2, 期货:pkz2)
+PICKLE_CACHE_SUFFIXES = ['.pkb2', '.pkz2']
+
+BLOCK_ALIGN = 64
+HEADER_STRUCT = struct.Struct('<I')
+
+CODECS = ['raw', 'zlib']
+if lz4_frame:
+    CODECS.append('lz4')
+if zstandard:
+    CODECS.append('zstd')
+
+# 默认编码：优先使用解压最快的lz4，没有安装时使用zlib
+DEFAULT_CODEC = 'lz4' if lz4_frame else 'zlib'
+
+
+def compress_block(data: bytes, codec: str) -> bytes:
+    """压缩一个列数据块"""
+    if codec == 'raw':
+        return data
+    if codec == 'zlib':
+        return zlib.compress(data, 1)
+    if codec == 'lz4' and lz4_frame:
+        return lz4_frame.compress(data)
+    if codec == 'zstd' and zstandard:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    raise ValueError(f'不支持的缓存编码:{codec}')
+
+
+def decompress_block(data, codec: str):
+    """解压一个列数据块"""
+    if codec == 'raw':
+        return data
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'lz4' and lz4_frame:
+        return lz4_frame.decompress(data)
+    if codec == 'zstd' and zstandard:
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f'不支持的缓存编码:{codec}，请安装对应的压缩包')
+
+
+def to_column_array(values: Union[pd.Series, list]) -> np.ndarray:
+    """
+    把一列数据转换为定长dtype的numpy数组
+    datetime => datetime64[ns]，数值/布尔保持原类型，其余按字符串保存(None => '')
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        if getattr(s.dt, 'tz', None) is not None:
+            s = s.dt.tz_localize(None)
+        return s.values.astype('datetime64[ns]')
+    if pd.api.types.is_bool_dtype(s.dtype) or pd.api.types.is_numeric_dtype(s.dtype):
+        array = s.to_numpy()
+        # 可空整数等扩展类型，转换为float(缺失值为nan)
+        return array if array.dtype != object else s.to_numpy(dtype=float, na_value=np.nan)
+
+    kind = pd.api.types.infer_dtype(s, skipna=True)
+    if kind in ['datetime', 'datetime64', 'date']:
+        return pd.to_datetime(s).values.astype('datetime64[ns]')
+    if kind in ['integer', 'floating', 'mixed-integer-float', 'decimal']:
+        return s.astype(float).values
+    if kind == 'boolean':
+        return s.astype(bool).values
+    return np.array(s.fillna('').astype(str).tolist(), dtype=str)
+
+
+def save_tick_cache(file_path: str,
+                    data: Union[pd.DataFrame, List[dict]],
+                    symbol: str = '',
+                    trading_day: str = '',
+                    codec: str = None):
+    """
+    保存为列式缓存文件
+    :param file_path: 缓存文件
+    :param data: DataFrame 或 list[dict] (tdx分笔数据)
+    :param symbol: 合约
+    :param trading_day: 交易日
+    :param codec: raw/zlib/lz4/zstd, 默认 DEFAULT_CODEC
+    """
+    codec = codec or DEFAULT_CODEC
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+
+    columns, blocks = [], []
+    offset = 0
+    for name in df.columns:
+        array = np.ascontiguousarray(to_column_array(df[name]))
+        raw = array.tobytes()
+        block = compress_block(raw, codec)
+        columns.append({'name': str(name),
+                        'dtype': array.dtype.str,
+                        'offset': offset,
+                        'length': len(block),
+                        'raw_length': len(raw)})
+        padding = -len(block) % BLOCK_ALIGN
+        blocks.append(block + b'\0' * padding)
+        offset += len(block) + padding
+
+    header = {'version': TICK_CACHE_VERSION,
+              'symbol': symbol,
+              'trading_day': trading_day,
+              'rows': len(df),
+              'codec': codec,
+              'columns': columns}
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    # 数据区起点按64字节对齐，便于mmap后直接映射为数组
+    header_bytes += b' ' * (-(len(TICK_CACHE_MAGIC) + HEADER_STRUCT.size + len(header_bytes)) % BLOCK_ALIGN)
+
+    # 先写临时文件再替换，避免读到写了一半的缓存
+    tmp_file = file_path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(TICK_CACHE_MAGIC)
+        f.write(HEADER_STRUCT.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for block in blocks:
+            f.write(block)
+    os.replace(tmp_file, file_path)
+
+
+def read_tick_cache_header(file_path: str) -> dict:
+    """只读取缓存文件头(合约、交易日、行数、列定义)"""
+    with open(file_path, 'rb') as f:
+        magic = f.read(len(TICK_CACHE_MAGIC))
+        if magic != TICK_CACHE_MAGIC:
+            raise ValueError(f'{file_path}不是列式缓存文件')
+        header_len, = HEADER_STRUCT.unpack(f.read(HEADER_STRUCT.size))
+        header = json.loads(f.read(header_len).decode('utf-8'))
+        header['data_offset'] = len(TICK_CACHE_MAGIC) + HEADER_STRUCT.size + header_len
+    if header.get('version', 0) > TICK_CACHE_VERSION:
+        raise ValueError(f'{file_path}缓存版本{header.get("version")}高于当前支持的{TICK_CACHE_VERSION}')
+    return header
+
+
+def load_tick_cache(file_path: str, columns: List[str] = None) -> (dict, dict):
+    """
+    读取列式缓存文件
+    :param file_path: 缓存文件
+    :param columns: 只读取指定的列，None时读取全部
+    :return: 文件头, {列名: numpy数组}
+    raw编码的数组直接映射在文件上(只读)，其余编码解压后映射
+    """
+    header = read_tick_cache_header(file_path)
+    codec = header['codec']
+    data_offset = header['data_offset']
+    rows = header['rows']
+    arrays = {}
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= data_offset:
+            # 空数据
+            mm = b''
+        else:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        for col in header['columns']:
+            if columns is not None and col['name'] not in columns:
+                continue
+            dtype = np.dtype(col['dtype'])
+            if rows == 0:
+                arrays[col['name']] = np.empty(0, dtype=dtype)
+                continue
+            start = data_offset + col['offset']
+            if codec == 'raw':
+                arrays[col['name']] = np.frombuffer(mm, dtype=dtype, count=rows, offset=start)
+            else:
+                raw = decompress_block(mm[start:start + col['length']], codec)
+                arrays[col['name']] = np.frombuffer(raw, dtype=dtype, count=rows)
+    return header, arrays
+
+
+def load_tick_cache_df(file_path: str, columns: List[str] = None) -> pd.DataFrame:
+    """读取列式缓存文件为DataFrame"""
+    header, arrays = load_tick_cache(file_path, columns)
+    return pd.DataFrame(arrays, columns=[c['name'] for c in header['columns']
+                                         if columns is None or c['name'] in columns])
+
+
+def load_tick_cache_list(file_path: str) -> List[dict]:
+    """
+    读取列式缓存文件为 list[dict]，与旧pickle缓存的返回格式一致
+    datetime列转换为python datetime，数值转换为python的int/float
+    """
+    df = load_tick_cache_df(file_path)
+    data = {}
+    for name in df.columns:
+        s = df[name]
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            data[name] = s.dt.to_pydatetime().tolist()
+        else:
+            data[name] = s.tolist()
+    names = list(data.keys())
+    return [dict(zip(names, row)) for row in zip(*data.values())]
+
+
+def get_cache_file(cache_folder: str, cache_symbol: str, cache_date: str) -> str:
+    """
+    获取某合约某交易日的缓存文件，优先列式缓存，其次旧的pickle缓存
+    缓存文件路径: cache_folder/yyyymm/symbol_yyyymmdd.xxx
+    :return: 文件路径，不存在时返回None
+    """
+    cache_folder_year_month = os.path.join(cache_folder, cache_date[:6])
+    for suffix in [TICK_CACHE_SUFFIX] + PICKLE_CACHE_SUFFIXES:
+        cache_file = os.path.join(cache_folder_year_month, '{}_{}{}'.format(cache_symbol, cache_date, suffix))
+        if os.path.isfile(cache_file):
+            return cache_file
+    return None
+
+
+def get_cache_dates(cache_folder: str,
+                    symbols: List[str],
+                    start_date: datetime = None,
+                    end_date: datetime = None,
+                    suffixes: List[str] = None) -> set:
+    """
+    扫描缓存目录(cache_folder/yyyymm/symbol_yyyymmdd.xxx)，返回任一合约存在数据的日期集合(yyyymmdd)
+    只列出每个月份目录一次，代替逐日逐合约探测文件是否存在
+    :param symbols: 合约列表(不区分大小写)
+    :param start_date/end_date: 只扫描该区间涉及的月份目录
+    :param suffixes: 文件后缀，默认为列式缓存与旧pickle缓存
+    """
+    dates = set()
+    if not cache_folder or not os.path.isdir(cache_folder):
+        return dates
+    symbols = set(s.lower() for s in symbols)
+    suffixes = suffixes or [TICK_CACHE_SUFFIX] + PICKLE_CACHE_SUFFIXES
+    start_month = start_date.strftime('%Y%m') if start_date else '000000'
+    end_month = end_date.strftime('%Y%m') if end_date else '999999'
+    for month in os.listdir(cache_folder):
+        if len(month) != 6 or not month.isdigit() or not start_month <= month <= end_month:
+            continue
+        for file_name in os.listdir(os.path.join(cache_folder, month)):
+            base_name, suffix = os.path.splitext(file_name)
+            if suffix not in suffixes:
+                continue
+            symbol, _, cache_date = base_name.rpartition('_')
+            if symbol.lower() in symbols and cache_date.startswith(month):
+                dates.add(cache_date)
+    return dates
+
+
+def convert_pickle_cache(pickle_file: str, codec: str = None, remove_source: bool = False) -> str:
+    """
+    把旧的 .pkb2/.pkz2 缓存文件转换为列式缓存文件(同目录，同名，后缀.tkc)
+    :return: 新文件路径
+    """
+    base_name, _ = os.path.splitext(pickle_file)
+    cache_symbol, _, cache_date = os.path.basename(base_name).rpartition('_')
+    with bz2.BZ2File(pickle_file, 'rb') as f:
+        data = pickle.load(f)
+    cache_file = base_name + TICK_CACHE_SUFFIX
+    save_tick_cache(cache_file, data, symbol=cache_symbol, trading_day=cache_date, codec=codec)
+    if remove_source:
+        os.remove(pickle_file)
+    return cache_file
+
+
+def convert_pickle_cache_folder(cache_folder: str,
+                                codec: str = None,
+                                remove_source: bool = False,
+                                overwrite: bool = False) -> int:
+    """
+    批量转换目录(含子目录)下所有旧的pickle缓存文件
+    :return: 转换的文件数量
+    """
+    count = 0
+    for root, _, files in os.walk(cache_folder):
+        for file_name in sorted(files):
+            base_name, suffix = os.path.splitext(file_name)
+            if suffix not in PICKLE_CACHE_SUFFIXES:
+                continue
+            pickle_file = os.path.join(root, file_name)
+            if not overwrite and os.path.isfile(os.path.join(root, base_name + TICK_CACHE_SUFFIX)):
+                continue
+            try:
+                convert_pickle_cache(pickle_file, codec=codec, remove_source=remove_source)
+                count += 1
+            except Exception as ex:
+                print(f'{pickle_file}转换失败:{str(ex)}', file=sys.stderr)
+    return count
+
+
+if __name__ == '__main__':
+    # 使用方法: python tick_cache.py 缓存目录 [编码]
+    if len(sys.argv) < 2:
+        print('usage: python tick_cache.py cache_folder [raw|zlib|lz4|zstd]')
+        sys.exit(1)
+    n = convert_pickle_cache_folder(sys.argv[1], codec=sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f'完成转换:{n}个文件')
@@ -1 +1,4 @@
 from .engine import Event, EventEngine, EVENT_TIMER
+from .sharded import ShardedEventEngine
+from .conflation import LatestValueHandler
+from .profiler import EventProfiler, EVENT_PROFILE
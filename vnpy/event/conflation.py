@@ -0,0 +1,103 @@
+"""
+Latest-value (conflating) handlers for event engine.
+
+行情突发时，事件队列中堆积同一合约的大量过期tick，界面、风控、只关心最新行情的策略逐个处理，放大了延迟。
+LatestValueHandler 包装一个handler：
+    事件引擎线程中只按key(缺省为vt_symbol)保存最新的事件，O(1)返回，不会阻塞其他handler；
+    独立线程按合约到达的顺序调用handler，handler处理不过来时，同一合约只处理最新的事件，中间的事件被合并；
+    统计收到/处理/合并的事件数量(合计以及按合约)
+需要完整行情的handler(例如tick录制)仍使用 register，接收全部事件。
+注意：handler在独立线程中执行。
+"""
+import sys
+from collections import OrderedDict
+from threading import Condition, Thread
+from typing import Any, Callable, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .engine import Event  # noqa
+
+HandlerType = Callable[["Event"], None]
+
+
+def get_vt_symbol(event: "Event") -> Any:
+    """缺省的合并key"""
+    return getattr(event.data, "vt_symbol", None)
+
+
+class LatestValueHandler:
+    """
+    只处理每个key最新事件的handler
+    """
+
+    def __init__(self, handler: HandlerType, key_func: Callable[["Event"], Any] = get_vt_symbol, name: str = ""):
+        self.handler: HandlerType = handler
+        self.key_func: Callable = key_func
+        self.name: str = name or getattr(handler, "__qualname__", str(handler))
+        self.__qualname__: str = f"LatestValue({self.name})"
+
+        self.latest: OrderedDict = OrderedDict()  # key => 未处理的最新事件，按到达顺序
+        self.condition: Condition = Condition()
+        self.active: bool = False
+        self.thread: Thread = None
+
+        # 统计
+        self.received_count: int = 0
+        self.processed_count: int = 0
+        self.conflated_count: int = 0
+        self.conflated_counts: Dict[Any, int] = {}
+
+    def __call__(self, event: "Event") -> None:
+        """由事件引擎调用，只保存最新的事件"""
+        key = self.key_func(event)
+        with self.condition:
+            self.received_count += 1
+            if key in self.latest:
+                # 未处理的旧事件被合并，保持原来的排队位置
+                self.conflated_count += 1
+                self.conflated_counts[key] = self.conflated_counts.get(key, 0) + 1
+            self.latest[key] = event
+            self.condition.notify()
+
+        if not self.active:
+            self.start()
+
+    def start(self) -> None:
+        with self.condition:
+            if self.active:
+                return
+            self.active = True
+        self.thread = Thread(target=self.run, name=f"LatestValue_{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        with self.condition:
+            self.active = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def run(self) -> None:
+        while True:
+            with self.condition:
+                while self.active and not self.latest:
+                    self.condition.wait(1)
+                if not self.active:
+                    return
+                key, event = self.latest.popitem(last=False)
+
+            try:
+                self.handler(event)
+            except Exception as ex:
+                print(f"运行 {event.type} {self.name} 异常:{str(ex)}", file=sys.stderr)
+            self.processed_count += 1
+
+    def get_metrics(self) -> dict:
+        return {
+            "name": self.name,
+            "pending": len(self.latest),
+            "received": self.received_count,
+            "processed": self.processed_count,
+            "conflated": self.conflated_count,
+        }
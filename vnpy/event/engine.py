@@ -5,8 +5,11 @@ import sys
 from collections import defaultdict
 from queue import Empty, Queue
 from threading import Thread
-from time import sleep, time
-from typing import Any, Callable, List
+from time import sleep, perf_counter_ns
+from typing import Any, Callable, Dict, List, Tuple
+
+from .conflation import LatestValueHandler, get_vt_symbol
+from .profiler import EventProfiler, EVENT_PROFILE
 
 EVENT_TIMER = "eTimer"
 
@@ -55,6 +58,11 @@ class EventEngine:
         self._timer: Thread = Thread(target=self._run_timer)
         self._handlers: defaultdict = defaultdict(list)
         self._general_handlers: List = []
+        self._latest_handlers: Dict[Tuple[str, HandlerType], LatestValueHandler] = {}
+        self._profiler: EventProfiler = None
+        self._profile_interval: int = 60
+        self._profile_push: bool = True
+        self._profile_last_ns: int = 0
 
     def _run(self) -> None:
         """
@@ -63,7 +71,12 @@ class EventEngine:
         while self._active:
             try:
                 event = self._queue.get(block=True, timeout=1)
-                self._process(event) if not self._debug else self._process_debug(event)
+                if self._profiler is not None:
+                    self._process_profile(event)
+                elif self._debug:
+                    self._process_debug(event)
+                else:
+                    self._process(event)
             except Empty:
                 pass
 
@@ -75,7 +88,7 @@ class EventEngine:
 
         """
         for handler in self._handlers[event.type]:
-            t1 = time()
+            t1 = perf_counter_ns()
             handler_name = str(handler.__qualname__)
             try:
                 handler(event)
@@ -83,23 +96,50 @@ class EventEngine:
                 print(f'运行 {event.type} {handler_name} 异常:{str(ex)}',
                       file=sys.stderr)
                 continue
-            t2 = time()
-            execute_ms = (int(round(t2 * 1000))) - (int(round(t1 * 1000)))
+            execute_ms = (perf_counter_ns() - t1) // 1000000
             if execute_ms > self._over_ms:
                 print(f'运行{event.type} {handler_name} 耗时:{execute_ms}ms >{self._over_ms}ms',
                       file=sys.stderr)
 
         if self._general_handlers:
             for handler in self._general_handlers:
-                t1 = time()
+                t1 = perf_counter_ns()
                 handler_name = str(handler.__qualname__)
                 handler(event)
-                t2 = time()
-                execute_ms = (int(round(t2 * 1000))) - (int(round(t1 * 1000)))
+                execute_ms = (perf_counter_ns() - t1) // 1000000
                 if execute_ms > self._over_ms:
                     print(f'运行 general {event.type} {handler_name} 耗时:{execute_ms}ms > {self._over_ms}ms',
                           file=sys.stderr)
 
+    def _process_profile(self, event: Event) -> None:
+        """
+        process event with profiling mode:
+        queue dwell time and execution time of each handler (perf_counter_ns).
+        """
+        profiler = self._profiler
+        if profiler is None:
+            self._process(event)
+            return
+
+        t0 = perf_counter_ns()
+        put_ns = getattr(event, "put_ns", None)
+        profiler.record_event(event.type, t0 - put_ns if put_ns else None)
+
+        handlers = self._handlers[event.type] if event.type in self._handlers else []
+        for handler in handlers + self._general_handlers:
+            handler_name = getattr(handler, "__qualname__", str(handler))
+            t1 = perf_counter_ns()
+            try:
+                handler(event)
+            except Exception as ex:
+                print(f'运行 {event.type} {handler_name} 异常:{str(ex)}',
+                      file=sys.stderr)
+            t2 = perf_counter_ns()
+            profiler.record_handler(event.type, handler_name, t2 - t1)
+            if self._debug and (t2 - t1) // 1000000 > self._over_ms:
+                print(f'运行{event.type} {handler_name} 耗时:{(t2 - t1) // 1000000}ms >{self._over_ms}ms',
+                      file=sys.stderr)
+
     def _process(self, event: Event) -> None:
         """
         First ditribute event to those handlers registered listening
@@ -123,6 +163,9 @@ class EventEngine:
             event = Event(EVENT_TIMER)
             self.put(event)
 
+            if self._profiler is not None:
+                self._check_profile_snapshot()
+
     def start(self) -> None:
         """
         Start event engine to process events and generate timer events.
@@ -138,11 +181,14 @@ class EventEngine:
         self._active = False
         self._timer.join()
         self._thread.join()
+        self._stop_latest_handlers()
 
     def put(self, event: Event) -> None:
         """
         Put an event object into event queue.
         """
+        if self._profiler is not None:
+            event.put_ns = perf_counter_ns()
         self._queue.put(event)
 
     def register(self, type: str, handler: HandlerType) -> None:
@@ -180,3 +226,97 @@ class EventEngine:
         """
         if handler in self._general_handlers:
             self._general_handlers.remove(handler)
+
+    def register_latest(
+        self,
+        type: str,
+        handler: HandlerType,
+        key_func: Callable[[Event], Any] = get_vt_symbol
+    ) -> LatestValueHandler:
+        """
+        Register a handler which only needs the latest event of each key
+        (vt_symbol by default), e.g. UI widgets or risk checks on ticks.
+        The handler runs in its own thread; when it falls behind, pending
+        events of the same key are conflated into the newest one.
+        """
+        latest_handler = self._latest_handlers.get((type, handler), None)
+        if latest_handler is None:
+            latest_handler = LatestValueHandler(handler, key_func=key_func)
+            self._latest_handlers[(type, handler)] = latest_handler
+        self.register(type, latest_handler)
+        return latest_handler
+
+    def unregister_latest(self, type: str, handler: HandlerType) -> None:
+        """
+        Unregister a latest-value handler and stop its thread.
+        """
+        latest_handler = self._latest_handlers.pop((type, handler), None)
+        if latest_handler:
+            self.unregister(type, latest_handler)
+            latest_handler.stop()
+
+    def get_latest_metrics(self) -> List[dict]:
+        """
+        Received/processed/conflated counters of latest-value handlers.
+        """
+        metrics = []
+        for (type, _), latest_handler in self._latest_handlers.items():
+            d = latest_handler.get_metrics()
+            d["type"] = type
+            metrics.append(d)
+        return metrics
+
+    def _stop_latest_handlers(self) -> None:
+        for latest_handler in self._latest_handlers.values():
+            latest_handler.stop()
+
+    def enable_profiling(
+        self,
+        interval: int = 60,
+        push_event: bool = True,
+        csv_file: str = "",
+        json_file: str = ""
+    ) -> EventProfiler:
+        """
+        Start profiling: latency histograms of every (event type, handler),
+        queue dwell time and events per second.
+        Every interval seconds a snapshot is taken, pushed as EVENT_PROFILE
+        event (data: list of dict) and written into csv/json file.
+        """
+        self._profile_interval = interval
+        self._profile_push = push_event
+        self._profile_last_ns = perf_counter_ns()
+        self._profiler = EventProfiler(csv_file=csv_file, json_file=json_file)
+        return self._profiler
+
+    def disable_profiling(self) -> None:
+        """
+        Stop profiling.
+        """
+        self._profiler = None
+
+    def get_profile_snapshot(self, reset: bool = False) -> List[dict]:
+        """
+        Current profiling statistics.
+        """
+        if self._profiler is None:
+            return []
+        return self._profiler.snapshot(reset=reset)
+
+    def _check_profile_snapshot(self) -> None:
+        """
+        Take a snapshot when profiling interval reached (called by timer thread).
+        """
+        profiler = self._profiler
+        now_ns = perf_counter_ns()
+        if profiler is None or now_ns - self._profile_last_ns < self._profile_interval * 1000000000:
+            return
+        self._profile_last_ns = now_ns
+
+        rows = profiler.snapshot(reset=True)
+        try:
+            profiler.dump(rows)
+        except Exception as ex:
+            print(f'保存事件引擎统计异常:{str(ex)}', file=sys.stderr)
+        if self._profile_push:
+            self.put(Event(EVENT_PROFILE, rows))
@@ -0,0 +1,169 @@
+"""
+Latency profiler of event engine.
+
+原来 EventEngine 只在debug模式下用毫秒精度的time()判断单个handler是否超时并打印，没有排队时间和统计。
+EventProfiler 统计(perf_counter_ns，微秒精度)：
+    每个(事件类型, handler)的执行耗时直方图
+    每个事件类型从put到开始分发的排队时间直方图
+    每个事件类型的事件数量/每秒事件数
+事件引擎 enable_profiling() 后，定时生成统计快照，可以写入csv/json文件，或者作为 EVENT_PROFILE 事件推送给界面；
+不启用时，事件引擎只多一次属性判断。
+"""
+import csv
+import json
+import os
+from bisect import bisect_left
+from datetime import datetime
+from threading import Lock
+from time import perf_counter_ns
+from typing import Dict, List, Tuple
+
+EVENT_PROFILE = "eProfile"
+
+# 直方图的桶上限(微秒)，最后一个桶为超过1秒
+BUCKETS_US: List[int] = [
+    1, 2, 5, 10, 20, 50, 100, 200, 500,
+    1000, 2000, 5000, 10000, 20000, 50000,
+    100000, 200000, 500000, 1000000
+]
+
+
+class LatencyHistogram:
+    """
+    耗时直方图
+    """
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * (len(BUCKETS_US) + 1)
+        self.count: int = 0
+        self.total_ns: int = 0
+        self.max_ns: int = 0
+
+    def add(self, ns: int) -> None:
+        self.buckets[bisect_left(BUCKETS_US, ns / 1000)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, p: float) -> float:
+        """百分位数(微秒)，返回所在桶的上限"""
+        if self.count == 0:
+            return 0
+        target = self.count * p
+        cum = 0
+        for i, n in enumerate(self.buckets):
+            cum += n
+            if cum >= target:
+                return BUCKETS_US[i] if i < len(BUCKETS_US) else round(self.max_ns / 1000, 1)
+        return round(self.max_ns / 1000, 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_us": round(self.total_ns / self.count / 1000, 1) if self.count else 0,
+            "max_us": round(self.max_ns / 1000, 1),
+            "p50_us": self.percentile(0.5),
+            "p90_us": self.percentile(0.9),
+            "p99_us": self.percentile(0.99),
+            "buckets": {str(b): n for b, n in zip(BUCKETS_US + ["inf"], self.buckets) if n},
+        }
+
+
+class EventProfiler:
+    """
+    事件引擎的耗时统计
+    """
+
+    def __init__(self, csv_file: str = "", json_file: str = ""):
+        """
+        csv_file: 每次快照追加写入的csv文件
+        json_file: 每次快照覆盖写入的json文件(最近一次快照)
+        """
+        self.csv_file: str = csv_file
+        self.json_file: str = json_file
+
+        self.lock: Lock = Lock()
+        self.handler_histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.dwell_histograms: Dict[str, LatencyHistogram] = {}
+        self.event_counts: Dict[str, int] = {}
+        self.start_ns: int = perf_counter_ns()
+
+    def record_handler(self, type: str, handler_name: str, ns: int) -> None:
+        """记录handler的执行耗时"""
+        with self.lock:
+            histogram = self.handler_histograms.get((type, handler_name), None)
+            if histogram is None:
+                histogram = self.handler_histograms[(type, handler_name)] = LatencyHistogram()
+            histogram.add(ns)
+
+    def record_event(self, type: str, dwell_ns: int = None) -> None:
+        """记录事件数量，以及排队时间"""
+        with self.lock:
+            self.event_counts[type] = self.event_counts.get(type, 0) + 1
+            if dwell_ns is None:
+                return
+            histogram = self.dwell_histograms.get(type, None)
+            if histogram is None:
+                histogram = self.dwell_histograms[type] = LatencyHistogram()
+            histogram.add(dwell_ns)
+
+    def snapshot(self, reset: bool = True) -> List[dict]:
+        """
+        统计快照
+        :param reset: 是否清空统计，重新开始下一个周期
+        :return: [{kind: 'event'/'handler', type, handler, count, rate, mean_us, max_us, p50_us, p90_us, p99_us, buckets}]
+        """
+        now_ns = perf_counter_ns()
+        with self.lock:
+            seconds = max((now_ns - self.start_ns) / 1e9, 1e-9)
+            time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            rows = []
+            for type, count in self.event_counts.items():
+                histogram = self.dwell_histograms.get(type, LatencyHistogram())
+                row = {"time": time_str, "kind": "event", "type": type, "handler": ""}
+                row.update(histogram.to_dict())
+                row["count"] = count
+                row["rate"] = round(count / seconds, 2)
+                rows.append(row)
+            for (type, handler_name), histogram in self.handler_histograms.items():
+                row = {"time": time_str, "kind": "handler", "type": type, "handler": handler_name}
+                row.update(histogram.to_dict())
+                row["rate"] = round(histogram.count / seconds, 2)
+                rows.append(row)
+
+            if reset:
+                self.handler_histograms = {}
+                self.dwell_histograms = {}
+                self.event_counts = {}
+                self.start_ns = now_ns
+
+        return rows
+
+    def dump(self, rows: List[dict]) -> None:
+        """快照写入csv/json文件"""
+        if self.csv_file:
+            self.dump_csv(rows, self.csv_file)
+        if self.json_file:
+            self.dump_json(rows, self.json_file)
+
+    @staticmethod
+    def dump_csv(rows: List[dict], file_name: str) -> None:
+        """追加写入csv"""
+        field_names = ["time", "kind", "type", "handler", "count", "rate",
+                       "mean_us", "max_us", "p50_us", "p90_us", "p99_us", "buckets"]
+        new_file = not os.path.exists(file_name)
+        with open(file_name, "a", encoding="utf8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=field_names)
+            if new_file:
+                writer.writeheader()
+            for row in rows:
+                d = dict(row)
+                d["buckets"] = json.dumps(d["buckets"])
+                writer.writerow(d)
+
+    @staticmethod
+    def dump_json(rows: List[dict], file_name: str) -> None:
+        """覆盖写入json"""
+        with open(file_name, "w", encoding="utf8") as f:
+            json.dump(rows, f, indent=4, ensure_ascii=False)
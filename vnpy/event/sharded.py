@@ -0,0 +1,239 @@
+"""
+Sharded event engine: events are routed to several worker lanes.
+
+EventEngine 只有一个队列和一个处理线程，某个策略的on_tick耗时较长时，
+所有策略的委托/成交回报都要排队等待；行情突发时，无界队列会一直增长。
+ShardedEventEngine 与 EventEngine 的 register/put 接口一致，可以直接替换：
+    优先通道: 委托、成交、持仓、资金事件，单独一个线程，不受行情处理影响
+    行情通道: tick事件按vt_symbol哈希到多个通道，同一合约的tick始终在同一通道内，保持顺序
+    缺省通道: 其他事件(日志、定时器、合约等)
+行情通道可以设置队列上限，以及队列满时的处理方式(阻塞/丢弃最旧/丢弃最新/合并同一合约的tick)；
+优先通道和缺省通道不丢弃事件。
+注意：不同通道的事件在不同线程中并行处理，同时处理多个合约或同时处理行情和回报的handler需要自行保证线程安全。
+"""
+from collections import deque
+from threading import Condition, Thread
+from time import perf_counter_ns
+from typing import Any, Dict, List, Sequence
+
+from .engine import Event, EventEngine
+
+# 行情通道队列满时的处理方式
+POLICY_BLOCK = "block"  # 阻塞put，直到有空位(背压至行情推送线程)
+POLICY_DROP_OLDEST = "drop_oldest"  # 丢弃通道中最旧的事件
+POLICY_DROP_NEWEST = "drop_newest"  # 丢弃新的事件
+POLICY_COALESCE = "coalesce"  # 同一合约已有未处理的tick时，用新tick替换(保持排队位置)；队列满时丢弃最旧的事件
+
+DEFAULT_PRIORITY_TYPES = ("eOrder.", "eTrade.", "ePosition.", "eAccount.")
+DEFAULT_TICK_TYPES = ("eTick.",)
+
+
+class EventLane:
+    """
+    一个处理通道：有界队列 + 工作线程
+    队列元素为 [event, key]，合并时直接替换event，保持排队位置
+    """
+
+    def __init__(self, name: str, maxsize: int = 0, policy: str = POLICY_BLOCK):
+        self.name: str = name
+        self.maxsize: int = maxsize
+        self.policy: str = policy
+
+        self.queue: deque = deque()
+        self.pending: Dict[Any, list] = {}  # 合并key => 队列中的元素
+        self.condition: Condition = Condition()
+        self.active: bool = False
+        self.thread: Thread = None
+
+        # 统计
+        self.put_count: int = 0
+        self.processed_count: int = 0
+        self.dropped_count: int = 0
+        self.coalesced_count: int = 0
+        self.max_depth: int = 0
+
+    def put(self, event: Event, key: Any = None) -> None:
+        """放入事件，key不为空时可合并"""
+        with self.condition:
+            self.put_count += 1
+
+            if self.policy == POLICY_COALESCE and key is not None:
+                item = self.pending.get(key, None)
+                if item is not None:
+                    item[0] = event
+                    self.coalesced_count += 1
+                    return
+
+            if self.maxsize > 0 and len(self.queue) >= self.maxsize:
+                if self.policy == POLICY_DROP_NEWEST:
+                    self.dropped_count += 1
+                    return
+                elif self.policy in (POLICY_DROP_OLDEST, POLICY_COALESCE):
+                    self._pop()
+                    self.dropped_count += 1
+                else:
+                    while self.active and len(self.queue) >= self.maxsize:
+                        self.condition.wait(1)
+
+            item = [event, key]
+            self.queue.append(item)
+            if self.policy == POLICY_COALESCE and key is not None:
+                self.pending[key] = item
+            if len(self.queue) > self.max_depth:
+                self.max_depth = len(self.queue)
+            self.condition.notify_all()
+
+    def _pop(self) -> Event:
+        """取出最旧的事件(需持有condition)"""
+        item = self.queue.popleft()
+        if item[1] is not None and self.pending.get(item[1], None) is item:
+            del self.pending[item[1]]
+        return item[0]
+
+    def get(self, timeout: float = 1) -> Event:
+        """取出事件，超时返回None"""
+        with self.condition:
+            if not self.queue:
+                self.condition.wait(timeout)
+                if not self.queue:
+                    return None
+            event = self._pop()
+            self.condition.notify_all()
+            return event
+
+    def get_metrics(self) -> dict:
+        return {
+            "name": self.name,
+            "depth": len(self.queue),
+            "max_depth": self.max_depth,
+            "put": self.put_count,
+            "processed": self.processed_count,
+            "dropped": self.dropped_count,
+            "coalesced": self.coalesced_count,
+        }
+
+
+class ShardedEventEngine(EventEngine):
+    """
+    按事件类型/合约分通道处理的事件引擎
+    """
+
+    def __init__(
+        self,
+        interval: int = 1,
+        debug: bool = False,
+        over_ms: int = 500,
+        tick_lanes: int = 4,
+        tick_maxsize: int = 0,
+        tick_policy: str = POLICY_BLOCK,
+        priority_types: Sequence[str] = DEFAULT_PRIORITY_TYPES,
+        tick_types: Sequence[str] = DEFAULT_TICK_TYPES,
+    ):
+        """
+        tick_lanes: 行情通道数量
+        tick_maxsize: 每个行情通道的队列上限，0为不限制
+        tick_policy: 行情通道队列满时的处理方式 POLICY_*
+        priority_types: 进入优先通道的事件类型(前缀匹配)
+        tick_types: 按vt_symbol分配行情通道的事件类型(前缀匹配)
+        """
+        super().__init__(interval=interval, debug=debug, over_ms=over_ms)
+
+        self._priority_types: tuple = tuple(priority_types)
+        self._tick_types: tuple = tuple(tick_types)
+
+        self._priority_lane: EventLane = EventLane("priority")
+        self._default_lane: EventLane = EventLane("default")
+        self._tick_lanes: List[EventLane] = [
+            EventLane(f"tick_{i}", maxsize=tick_maxsize, policy=tick_policy)
+            for i in range(max(1, tick_lanes))
+        ]
+        self._lanes: List[EventLane] = [self._priority_lane, self._default_lane] + self._tick_lanes
+
+        # 事件类型 => 通道，vt_symbol => 行情通道
+        self._type_lanes: Dict[str, EventLane] = {}
+        self._symbol_lanes: Dict[str, EventLane] = {}
+
+    def _get_type_lane(self, type: str) -> EventLane:
+        """事件类型对应的通道，行情类型返回None"""
+        if type in self._type_lanes:
+            return self._type_lanes[type]
+
+        if type.startswith(self._tick_types):
+            lane = None
+        elif type.startswith(self._priority_types):
+            lane = self._priority_lane
+        else:
+            lane = self._default_lane
+        self._type_lanes[type] = lane
+        return lane
+
+    def _get_symbol_lane(self, vt_symbol: str) -> EventLane:
+        lane = self._symbol_lanes.get(vt_symbol, None)
+        if lane is None:
+            lane = self._tick_lanes[hash(vt_symbol) % len(self._tick_lanes)]
+            self._symbol_lanes[vt_symbol] = lane
+        return lane
+
+    def put(self, event: Event) -> None:
+        """
+        Put an event object into the lane it belongs to.
+        """
+        if self._profiler is not None:
+            event.put_ns = perf_counter_ns()
+        lane = self._get_type_lane(event.type)
+        if lane is not None:
+            lane.put(event)
+            return
+
+        vt_symbol = getattr(event.data, "vt_symbol", "")
+        self._get_symbol_lane(vt_symbol).put(event, key=(event.type, vt_symbol))
+
+    def _run_lane(self, lane: EventLane) -> None:
+        """
+        Get event from lane and then process it.
+        """
+        while self._active:
+            event = lane.get(timeout=1)
+            if event is None:
+                continue
+            if self._profiler is not None:
+                self._process_profile(event)
+            elif self._debug:
+                self._process_debug(event)
+            else:
+                self._process(event)
+            lane.processed_count += 1
+
+    def start(self) -> None:
+        """
+        Start worker threads of all lanes and the timer.
+        """
+        self._active = True
+        for lane in self._lanes:
+            lane.active = True
+            lane.thread = Thread(target=self._run_lane, args=(lane,), name=f"EventLane_{lane.name}", daemon=True)
+            lane.thread.start()
+        self._timer.start()
+
+    def stop(self) -> None:
+        """
+        Stop event engine.
+        """
+        self._active = False
+        for lane in self._lanes:
+            with lane.condition:
+                lane.active = False
+                lane.condition.notify_all()
+        self._timer.join()
+        for lane in self._lanes:
+            if lane.thread:
+                lane.thread.join()
+        self._stop_latest_handlers()
+
+    def get_queue_depths(self) -> Dict[str, int]:
+        """各通道当前排队的事件数量"""
+        return {lane.name: len(lane.queue) for lane in self._lanes}
+
+    def get_metrics(self) -> List[dict]:
+        """各通道的统计：排队数量、最大排队数量、放入/处理/丢弃/合并的事件数量"""
+        return [lane.get_metrics() for lane in self._lanes]
@@ -87,6 +87,7 @@ from time import sleep
 from threading import Thread
 from pytdx.exhq import TdxExHq_API
 from vnpy.amqp.consumer import subscriber
+from vnpy.amqp.tick_codec import is_binary_tick, decode_ticks
 from vnpy.data.tdx.tdx_common import (
     TDX_FUTURE_HOSTS,
     get_future_contracts,
@@ -2019,6 +2020,13 @@ class SubMdApi():
     def on_message(self, chan, method_frame, _header_frame, body, userdata=None):
         #print(" [x] %r" % body)
         try:
+            # 二进制格式，一条消息包含多个tick
+            if is_binary_tick(getattr(_header_frame, 'content_type', None)):
+                for tick in decode_ticks(body, gateway_name=self.gateway_name):
+                    if tick.symbol in self.registed_symbol_set:
+                        self.on_sub_tick(tick)
+                return
+
             str_tick = body.decode('utf-8')
             d = json.loads(str_tick)
             d.pop('rawData', None)
@@ -2047,22 +2055,26 @@ class SubMdApi():
             if len(tick.trading_day) == 0:
                 tick.trading_day = get_trading_date(dt)
 
-            pre_tick = self.symbol_tick_dict.get(symbol,None)
-            self.symbol_tick_dict[symbol] = tick
-            # 排除指数的异常数据(tdx有些服务器异常，返回数据偏差超过上一tick的20%）
-            if pre_tick:
-                if tick.last_price > pre_tick.last_price * 1.2 or tick.last_price < pre_tick.last_price * 0.8:
-                    return
-
-            self.last_tick_dt = tick.datetime
-
-            self.gateway.on_tick(tick)
-            self.gateway.on_custom_tick(tick)
+            self.on_sub_tick(tick)
 
         except Exception as ex:
             self.gateway.write_error(u'RabbitMQ on_message 异常:{}'.format(str(ex)))
             self.gateway.write_error(traceback.format_exc())
 
+    def on_sub_tick(self, tick):
+        """订阅到的tick"""
+        pre_tick = self.symbol_tick_dict.get(tick.symbol,None)
+        self.symbol_tick_dict[tick.symbol] = tick
+        # 排除指数的异常数据(tdx有些服务器异常，返回数据偏差超过上一tick的20%）
+        if pre_tick:
+            if tick.last_price > pre_tick.last_price * 1.2 or tick.last_price < pre_tick.last_price * 0.8:
+                return
+
+        self.last_tick_dt = tick.datetime
+
+        self.gateway.on_tick(tick)
+        self.gateway.on_custom_tick(tick)
+
     def conver_update(self, d):
         """转换dict， vnpy1 tick dict => vnpy2 tick dict"""
         if 'vtSymbol' not in d:
@@ -83,6 +83,7 @@ from time import sleep
 from threading import Thread
 from pytdx.exhq import TdxExHq_API
 from vnpy.amqp.consumer import subscriber
+from vnpy.amqp.tick_codec import is_binary_tick, decode_ticks
 from vnpy.data.tdx.tdx_common import (
     TDX_FUTURE_HOSTS,
     get_future_contracts,
@@ -1754,6 +1755,13 @@ class SubMdApi():
     def on_message(self, chan, method_frame, _header_frame, body, userdata=None):
         # print(" [x] %r" % body)
         try:
+            # 二进制格式，一条消息包含多个tick
+            if is_binary_tick(getattr(_header_frame, 'content_type', None)):
+                for tick in decode_ticks(body, gateway_name=self.gateway_name):
+                    if tick.symbol in self.registed_symbol_set:
+                        self.on_sub_tick(tick)
+                return
+
             str_tick = body.decode('utf-8')
             d = json.loads(str_tick)
             d.pop('rawData', None)
@@ -1777,14 +1785,18 @@ class SubMdApi():
             d.pop('symbol', None)
             tick.__dict__.update(d)
 
-            self.symbol_tick_dict[symbol] = tick
-            self.gateway.on_tick(tick)
-            self.gateway.on_custom_tick(tick)
+            self.on_sub_tick(tick)
 
         except Exception as ex:
             self.gateway.write_error(u'RabbitMQ on_message 异常:{}'.format(str(ex)))
             self.gateway.write_error(traceback.format_exc())
 
+    def on_sub_tick(self, tick):
+        """订阅到的tick"""
+        self.symbol_tick_dict[tick.symbol] = tick
+        self.gateway.on_tick(tick)
+        self.gateway.on_custom_tick(tick)
+
     def conver_update(self, d):
         """转换dict， vnpy1 tick dict => vnpy2 tick dict"""
         if 'vtSymbol' not in d:
@@ -7,6 +7,15 @@ from vnpy.trader.object import (
     OrderRequest
 )
 from vnpy.trader.constant import Exchange
+from vnpy.trader.event import (
+    EVENT_TICK,
+    EVENT_TRADE,
+    EVENT_ORDER,
+    EVENT_POSITION,
+    EVENT_ACCOUNT,
+    EVENT_CONTRACT,
+    EVENT_LOG
+)
 
 
 class RpcGateway(BaseGateway):
@@ -35,7 +44,9 @@ class RpcGateway(BaseGateway):
         req_address = setting["主动请求地址"]
         pub_address = setting["推送订阅地址"]
 
-        self.client.subscribe_topic("")
+        # 订阅交易相关的事件，行情在subscribe时按合约订阅
+        for topic in [EVENT_TRADE, EVENT_ORDER, EVENT_POSITION, EVENT_ACCOUNT, EVENT_CONTRACT, EVENT_LOG]:
+            self.client.subscribe_topic(topic)
         self.client.start(req_address, pub_address)
 
         self.write_log("服务器连接成功，开始初始化查询")
@@ -45,6 +56,7 @@ class RpcGateway(BaseGateway):
     def subscribe(self, req: SubscribeRequest):
         """"""
         gateway_name = self.symbol_gateway_map.get(req.vt_symbol, "")
+        self.client.subscribe_topic(f"{EVENT_TICK}{req.vt_symbol}")
         self.client.subscribe(req, gateway_name)
 
     def send_order(self, req: OrderRequest):
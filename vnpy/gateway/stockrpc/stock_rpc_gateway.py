@@ -31,6 +31,7 @@ from vnpy.trader.event import (
     EVENT_LOG)
 from vnpy.trader.constant import Exchange, Product
 from vnpy.amqp.consumer import subscriber
+from vnpy.amqp.tick_codec import is_binary_tick, decode_ticks
 from vnpy.amqp.producer import task_creator
 
 from vnpy.data.tdx.tdx_common import get_stock_type_sz, get_stock_type_sh
@@ -87,14 +88,9 @@ class StockRpcGateway(BaseGateway):
 
         self.write_log(f'请求地址:{req_address},订阅地址:{pub_address},远程接口:{self.remote_gw_name}')
 
-        # 订阅事件
-        self.client.subscribe_topic("")
-        # self.client.subscribe_topic(EVENT_TRADE)
-        # self.client.subscribe_topic(EVENT_ORDER)
-        # self.client.subscribe_topic(EVENT_POSITION)
-        # self.client.subscribe_topic(EVENT_ACCOUNT)
-        # self.client.subscribe_topic(EVENT_CONTRACT)
-        # self.client.subscribe_topic(EVENT_LOG)
+        # 订阅交易相关的事件，行情来自通达信/RabbitMQ，不订阅远程的tick
+        for topic in [EVENT_TRADE, EVENT_ORDER, EVENT_POSITION, EVENT_ACCOUNT, EVENT_CONTRACT, EVENT_LOG]:
+            self.client.subscribe_topic(topic)
 
         self.client.start(req_address, pub_address)
         self.status.update({"con":True})
@@ -899,6 +895,12 @@ class SubMdApi():
     def on_message(self, chan, method_frame, _header_frame, body, userdata=None):
         # print(" [x] %r" % body)
         try:
+            # 二进制格式，一条消息包含多个tick
+            if is_binary_tick(getattr(_header_frame, 'content_type', None)):
+                for tick in decode_ticks(body, gateway_name=self.gateway_name):
+                    self.on_sub_tick(tick)
+                return
+
             str_tick = body.decode('utf-8')
             d = json.loads(str_tick)
             d.pop('rawData', None)
@@ -920,14 +922,18 @@ class SubMdApi():
             d.pop('symbol', None)
             tick.__dict__.update(d)
 
-            self.symbol_tick_dict[symbol] = tick
-            self.gateway.on_tick(tick)
-            self.last_tick_dt = tick.datetime
+            self.on_sub_tick(tick)
 
         except Exception as ex:
             self.gateway.write_error(u'RabbitMQ on_message 异常:{}'.format(str(ex)))
             self.gateway.write_error(traceback.format_exc())
 
+    def on_sub_tick(self, tick):
+        """订阅到的tick"""
+        self.symbol_tick_dict[tick.symbol] = tick
+        self.gateway.on_tick(tick)
+        self.last_tick_dt = tick.datetime
+
     def close(self):
         """退出API"""
         self.gateway.write_log(u'退出rabbit行情订阅API')
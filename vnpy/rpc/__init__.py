@@ -1,15 +1,21 @@
+import importlib
 import os
+import pickle
 import signal
+import struct
 import threading
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
 from datetime import datetime, timedelta
 from functools import lru_cache
-from typing import Any, Callable, Dict
+from itertools import count
+from time import monotonic
+from typing import Any, Callable, Dict, List, Sequence
 from pathlib import Path
 
 import zmq
 import zmq.auth
-from zmq.backend.cython.constants import NOBLOCK
+from zmq import NOBLOCK
 from zmq.auth.thread import ThreadAuthenticator
 
 
@@ -21,6 +27,76 @@ KEEP_ALIVE_TOPIC: str = "_keep_alive"
 KEEP_ALIVE_INTERVAL: timedelta = timedelta(seconds=1)
 KEEP_ALIVE_TOLERANCE: timedelta = timedelta(seconds=3)
 
+# 请求/应答的协议：
+#   REQ客户端(旧版本):   [b"", 请求]                     => [b"", 应答]
+#   DEALER客户端:        [b"", RPC_PROTOCOL, 请求id, 请求] => [b"", RPC_PROTOCOL, 请求id, 应答]
+# 服务端使用ROUTER socket，两种客户端都支持；DEALER客户端可以同时发出多个请求，按请求id匹配应答
+RPC_PROTOCOL: bytes = b"RPC1"
+REQUEST_ID_STRUCT: struct.Struct = struct.Struct("<Q")
+
+# 缺省走快速通道的函数(委托、撤单)，不会被耗时的查询阻塞
+DEFAULT_FAST_FUNCTIONS: Sequence[str] = ("send_order", "send_orders", "cancel_order", "cancel_orders")
+
+# 发布消息的协议：[主题, 消息头, 数据]
+#   主题: utf8字符串，订阅端按主题前缀过滤，不需要的消息在libzmq中丢弃，不会被解码
+#   消息头: 编码标识(1字节) + 标志(1字节，PUB_FLAG_BATCH: 数据为同一主题的多条数据)
+# 旧版本的发布消息为单帧 pickle([主题, 数据])，订阅端兼容两种格式
+PUB_HEADER_STRUCT: struct.Struct = struct.Struct("<cB")
+PUB_FLAG_BATCH: int = 1
+
+# 批量发布时，一条消息最多包含的数据数量
+MAX_BATCH_SIZE: int = 1000
+
+
+class PickleCodec:
+    """
+    发布数据的缺省编码(pickle)
+    扩展编码时继承此类，设置不同的tag，调用register_codec注册
+    """
+    tag: bytes = b"P"
+
+    def encode(self, topic: str, data: Any) -> bytes:
+        """"""
+        return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, topic: str, body: bytes) -> Any:
+        """"""
+        return pickle.loads(body)
+
+    def encode_batch(self, topic: str, datas: List[Any]) -> bytes:
+        """同一主题的多条数据 => 一条消息"""
+        return pickle.dumps(datas, pickle.HIGHEST_PROTOCOL)
+
+    def decode_batch(self, topic: str, body: bytes) -> List[Any]:
+        """"""
+        return pickle.loads(body)
+
+
+# 编码标识 => 编码
+PUB_CODECS: Dict[bytes, PickleCodec] = {}
+
+# 按需加载的编码模块: 编码标识 => 模块(模块导入时注册编码)
+CODEC_MODULES: Dict[bytes, str] = {
+    b"E": "vnpy.rpc.event_codec"
+}
+
+
+def register_codec(codec: PickleCodec) -> None:
+    """注册发布数据的编码"""
+    PUB_CODECS[codec.tag] = codec
+
+
+def get_codec(tag: bytes) -> PickleCodec:
+    """编码标识 => 编码，未注册时返回None"""
+    codec = PUB_CODECS.get(tag, None)
+    if codec is None and tag in CODEC_MODULES:
+        importlib.import_module(CODEC_MODULES[tag])
+        codec = PUB_CODECS.get(tag, None)
+    return codec
+
+
+register_codec(PickleCodec())
+
 
 class RemoteException(Exception):
     """
@@ -43,9 +119,11 @@ class RemoteException(Exception):
 class RpcServer:
     """"""
 
-    def __init__(self):
+    def __init__(self, worker_count: int = 0, fast_functions: Sequence[str] = DEFAULT_FAST_FUNCTIONS):
         """
         Constructor
+        :param worker_count: 执行请求的工作线程数，0: 在服务线程中逐个执行(旧模式)
+        :param fast_functions: 快速通道的函数名，使用独立的工作线程执行
         """
         # Save functions dict: key is fuction name, value is fuction object
         self.__functions: Dict[str, Any] = {}
@@ -53,16 +131,39 @@ class RpcServer:
         # Zmq port related
         self.__context: zmq.Context = zmq.Context()
 
-        # Reply socket (Request–reply pattern)
-        self.__socket_rep: zmq.Socket = self.__context.socket(zmq.REP)
+        # Router socket (Request–reply pattern), 兼容REQ客户端和DEALER客户端
+        self.__socket_rep: zmq.Socket = self.__context.socket(zmq.ROUTER)
 
         # Publish socket (Publish–subscribe pattern)
         self.__socket_pub: zmq.Socket = self.__context.socket(zmq.PUB)
+        self.__pub_lock: threading.Lock = threading.Lock()
+
+        # 发布数据的编码，批量发布
+        self.__codec: PickleCodec = PUB_CODECS[PickleCodec.tag]
+        self.__legacy_publish: bool = False
+        self.__batch_interval: float = 0
+        self.__batch_size: int = MAX_BATCH_SIZE
+        self.__batches: Dict[str, List[Any]] = {}      # 主题 => 待发布的数据
+        self.__batch_start: float = 0                   # 最早的待发布数据的时间
+
+        # 工作线程的应答经inproc socket交给服务线程，只有服务线程使用router socket
+        self.__reply_address: str = f"inproc://rpc_reply_{id(self)}"
+        self.__socket_reply_pull: zmq.Socket = self.__context.socket(zmq.PULL)
+        self.__socket_reply_push: zmq.Socket = self.__context.socket(zmq.PUSH)
+        self.__reply_lock: threading.Lock = threading.Lock()
 
         # Worker thread related
         self.__active: bool = False                     # RpcServer status
         self.__thread: threading.Thread = None          # RpcServer thread
 
+        # 工作线程池
+        self.__worker_count: int = 0
+        self.__fast_worker_count: int = 1
+        self.__fast_functions: set = set()
+        self.__executor: ThreadPoolExecutor = None
+        self.__fast_executor: ThreadPoolExecutor = None
+        self.set_workers(worker_count, fast_functions)
+
         # Authenticator used to ensure data security
         self.__authenticator: ThreadAuthenticator = None
 
@@ -72,6 +173,51 @@ class RpcServer:
         """"""
         return self.__active
 
+    def set_workers(
+        self,
+        worker_count: int,
+        fast_functions: Sequence[str] = None,
+        fast_worker_count: int = 1
+    ) -> None:
+        """
+        设置工作线程池(在start之前调用)
+        :param worker_count: 普通请求的工作线程数，0: 所有请求在服务线程中逐个执行
+        :param fast_functions: 快速通道的函数名，None: 不修改
+        :param fast_worker_count: 快速通道的工作线程数，0: 快速通道的函数直接在服务线程中执行
+        """
+        self.__worker_count = max(0, int(worker_count))
+        self.__fast_worker_count = max(0, int(fast_worker_count))
+        if fast_functions is not None:
+            self.__fast_functions = set(fast_functions)
+
+    def set_publish(
+        self,
+        codec: str = None,
+        batch_interval: float = None,
+        batch_size: int = None,
+        legacy: bool = None
+    ) -> None:
+        """
+        设置发布方式，参数为None时不修改
+        :param codec: 编码标识，如 "P": pickle, "E": 事件编码(vnpy.rpc.event_codec)
+        :param batch_interval: 批量发布的间隔(秒)，0: 不批量发布
+        :param batch_size: 同一主题累计的数据达到数量时立即发布
+        :param legacy: 使用旧版本的单帧格式发布(兼容未升级的订阅端，不能按主题过滤)
+        """
+        if codec is not None:
+            if isinstance(codec, str):
+                codec = codec.encode()
+            codec_obj = get_codec(codec)
+            if codec_obj is None:
+                raise ValueError(f"Unknown publish codec {codec}")
+            self.__codec = codec_obj
+        if batch_interval is not None:
+            self.__batch_interval = max(0, batch_interval)
+        if batch_size is not None:
+            self.__batch_size = max(1, int(batch_size))
+        if legacy is not None:
+            self.__legacy_publish = legacy
+
     def start(
         self,
         rep_address: str,
@@ -106,6 +252,15 @@ class RpcServer:
         # Bind socket address
         self.__socket_rep.bind(rep_address)
         self.__socket_pub.bind(pub_address)
+        self.__socket_reply_pull.bind(self.__reply_address)
+        self.__socket_reply_push.connect(self.__reply_address)
+
+        # 创建工作线程池
+        if self.__worker_count > 0:
+            self.__executor = ThreadPoolExecutor(self.__worker_count, thread_name_prefix="RpcWorker")
+            if self.__fast_worker_count > 0 and self.__fast_functions:
+                self.__fast_executor = ThreadPoolExecutor(self.__fast_worker_count,
+                                                          thread_name_prefix="RpcFastWorker")
 
         # Start RpcServer status
         self.__active = True
@@ -136,6 +291,10 @@ class RpcServer:
         """
         start = datetime.utcnow()
 
+        poller = zmq.Poller()
+        poller.register(self.__socket_rep, zmq.POLLIN)
+        poller.register(self.__socket_reply_pull, zmq.POLLIN)
+
         while self.__active:
             # Use poll to wait event arrival, waiting time is 1 second (1000 milliseconds)
             cur = datetime.utcnow()
@@ -143,36 +302,179 @@ class RpcServer:
 
             if delta >= KEEP_ALIVE_INTERVAL:
                 self.publish(KEEP_ALIVE_TOPIC, cur)
+                start = cur
 
-            if not self.__socket_rep.poll(1000):
-                continue
-
-            # Receive request data from Reply socket
-            req = self.__socket_rep.recv_pyobj()
-
-            # Get function name and parameters
-            name, args, kwargs = req
+            # 批量发布时，按批量间隔检查待发布的数据
+            if self.__batch_interval > 0:
+                self.flush_batches(force=False)
+                timeout = min(1000, max(1, int(self.__batch_interval * 1000)))
+            else:
+                timeout = 1000
 
-            # Try to get and execute callable function object; capture exception information if it fails
-            try:
-                func = self.__functions[name]
-                r = func(*args, **kwargs)
-                rep = [True, r]
-            except Exception as e:  # noqa
-                rep = [False, traceback.format_exc()]
+            events = dict(poller.poll(timeout))
+            if not events:
+                continue
 
-            # send callable response by Reply socket
-            self.__socket_rep.send_pyobj(rep)
+            # 发送工作线程完成的应答
+            if self.__socket_reply_pull in events:
+                self.send_replies()
+
+            # Receive request data from Router socket
+            if self.__socket_rep in events:
+                while True:
+                    try:
+                        frames = self.__socket_rep.recv_multipart(flags=NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self.process_request(frames)
+
+        # 等待执行中的请求完成，发送剩余的应答
+        for executor in [self.__executor, self.__fast_executor]:
+            if executor:
+                executor.shutdown(wait=True)
+        self.__executor = None
+        self.__fast_executor = None
+        self.send_replies()
+        self.flush_batches(force=True)
 
         # Unbind socket address
         self.__socket_pub.unbind(self.__socket_pub.LAST_ENDPOINT)
         self.__socket_rep.unbind(self.__socket_rep.LAST_ENDPOINT)
+        self.__socket_reply_push.disconnect(self.__reply_address)
+        self.__socket_reply_pull.unbind(self.__reply_address)
+
+    def process_request(self, frames: List[bytes]) -> None:
+        """
+        处理一个请求(服务线程)
+        frames: [客户端标识, b"", 请求] 或 [客户端标识, b"", RPC_PROTOCOL, 请求id, 请求]
+        """
+        try:
+            i = frames.index(b"")
+        except ValueError:
+            return
+
+        # 应答的前缀：客户端标识 + 分隔帧 (+ 协议 + 请求id)
+        body_frames = frames[i + 1:]
+        if len(body_frames) == 3 and body_frames[0] == RPC_PROTOCOL:
+            prefix = frames[:i + 3]
+        elif len(body_frames) == 1:
+            prefix = frames[:i + 1]
+        else:
+            return
+
+        # Get function name and parameters
+        try:
+            name, args, kwargs = pickle.loads(body_frames[-1])
+        except Exception:  # noqa
+            self.__socket_rep.send_multipart(prefix + [self.dumps([False, traceback.format_exc()])])
+            return
+
+        if name in self.__fast_functions and self.__executor:
+            executor = self.__fast_executor
+        else:
+            executor = self.__executor
+
+        if executor:
+            executor.submit(self.execute_reply, prefix, name, args, kwargs)
+        else:
+            self.__socket_rep.send_multipart(prefix + [self.dumps(self.execute(name, args, kwargs))])
+
+    def execute(self, name: str, args: tuple, kwargs: dict) -> list:
+        """
+        执行函数，返回应答
+        """
+        # Try to get and execute callable function object; capture exception information if it fails
+        try:
+            func = self.__functions[name]
+            r = func(*args, **kwargs)
+            rep = [True, r]
+        except Exception as e:  # noqa
+            rep = [False, traceback.format_exc()]
+        return rep
+
+    def execute_reply(self, prefix: List[bytes], name: str, args: tuple, kwargs: dict) -> None:
+        """
+        执行函数，应答交给服务线程发送(工作线程)
+        """
+        rep = self.execute(name, args, kwargs)
+        try:
+            data = self.dumps(rep)
+        except Exception:  # noqa
+            data = self.dumps([False, traceback.format_exc()])
+
+        with self.__reply_lock:
+            self.__socket_reply_push.send_multipart(prefix + [data])
+
+    def send_replies(self) -> None:
+        """
+        发送工作线程完成的应答(服务线程)
+        """
+        while True:
+            try:
+                frames = self.__socket_reply_pull.recv_multipart(flags=NOBLOCK)
+            except zmq.Again:
+                break
+            self.__socket_rep.send_multipart(frames)
 
-    def publish(self, topic: str, data: Any) -> None:
+    @staticmethod
+    def dumps(rep: list) -> bytes:
+        """"""
+        return pickle.dumps(rep, pickle.DEFAULT_PROTOCOL)
+
+    def publish(self, topic: str, data: Any, batch: bool = False) -> None:
         """
         Publish data
+        :param topic: 主题，订阅端按主题前缀过滤
+        :param batch: 是否批量发布(需设置批量发布的间隔)，同一主题的数据累计后一次发布
+        """
+        if self.__legacy_publish:
+            with self.__pub_lock:
+                self.__socket_pub.send_pyobj([topic, data])
+            return
+
+        if batch and self.__batch_interval > 0:
+            with self.__pub_lock:
+                datas = self.__batches.get(topic, None)
+                if datas is None:
+                    datas = self.__batches[topic] = []
+                if not self.__batch_start:
+                    self.__batch_start = monotonic()
+                datas.append(data)
+                if len(datas) >= self.__batch_size:
+                    self.__send_batch(topic, self.__batches.pop(topic))
+            return
+
+        body = self.__codec.encode(topic, data)
+        header = PUB_HEADER_STRUCT.pack(self.__codec.tag, 0)
+        with self.__pub_lock:
+            self.__socket_pub.send_multipart([topic.encode("utf-8"), header, body])
+
+    def flush_batches(self, force: bool = True) -> None:
+        """
+        发布累计的数据
+        :param force: False: 只在超过批量发布的间隔时发布
         """
-        self.__socket_pub.send_pyobj([topic, data])
+        with self.__pub_lock:
+            if not self.__batches:
+                return
+            if not force and monotonic() - self.__batch_start < self.__batch_interval:
+                return
+            batches = self.__batches
+            self.__batches = {}
+            self.__batch_start = 0
+            for topic, datas in batches.items():
+                self.__send_batch(topic, datas)
+
+    def __send_batch(self, topic: str, datas: List[Any]) -> None:
+        """发布同一主题的多条数据(需持有pub_lock)"""
+        if len(datas) == 1:
+            body = self.__codec.encode(topic, datas[0])
+            flags = 0
+        else:
+            body = self.__codec.encode_batch(topic, datas)
+            flags = PUB_FLAG_BATCH
+        header = PUB_HEADER_STRUCT.pack(self.__codec.tag, flags)
+        self.__socket_pub.send_multipart([topic.encode("utf-8"), header, body])
 
     def register(self, func: Callable) -> None:
         """
@@ -195,17 +497,31 @@ class RpcClient:
         # zmq port related
         self.__context: zmq.Context = zmq.Context()
 
-        # Request socket (Request–reply pattern)
-        self.__socket_req: zmq.Socket = self.__context.socket(zmq.REQ)
+        # Dealer socket (Request–reply pattern), 可以同时发出多个请求
+        self.__socket_req: zmq.Socket = self.__context.socket(zmq.DEALER)
 
         # Subscribe socket (Publish–subscribe pattern)
         self.__socket_sub: zmq.Socket = self.__context.socket(zmq.SUB)
 
+        # 调用线程的请求经inproc socket交给请求线程，只有请求线程使用dealer socket
+        self.__request_address: str = f"inproc://rpc_request_{id(self)}"
+        self.__socket_request_pull: zmq.Socket = self.__context.socket(zmq.PULL)
+        self.__socket_request_push: zmq.Socket = self.__context.socket(zmq.PUSH)
+
         # Worker thread relate, used to process data pushed from server
         self.__active: bool = False                 # RpcClient status
         self.__thread: threading.Thread = None      # RpcClient thread
+        self.__req_thread: threading.Thread = None  # 请求线程，发送请求，接收应答
         self.__lock: threading.Lock = threading.Lock()
 
+        # 等待应答的请求: 请求id => Future
+        self.__request_ids = count(1)
+        self.__futures: Dict[int, Future] = {}
+        self.__futures_lock: threading.Lock = threading.Lock()
+
+        # 同步调用的缺省超时时间(秒)，None: 一直等待
+        self.timeout: float = None
+
         # Authenticator used to ensure data security
         self.__authenticator: ThreadAuthenticator = None
 
@@ -219,22 +535,56 @@ class RpcClient:
 
         # Perform remote call task
         def dorpc(*args, **kwargs):
-            # Generate request
-            req = [name, args, kwargs]
-
             # Send request and wait for response
-            with self.__lock:
-                self.__socket_req.send_pyobj(req)
-                rep = self.__socket_req.recv_pyobj()
-
             # Return response if successed; Trigger exception if failed
-            if rep[0]:
-                return rep[1]
-            else:
-                raise RemoteException(rep[1])
+            return self.call_timeout(name, self.timeout, *args, **kwargs)
 
         return dorpc
 
+    def call_async(self, name: str, *args, **kwargs) -> Future:
+        """
+        异步调用远程函数，返回Future
+        future.result() 返回函数结果，远程执行失败时抛出RemoteException
+        """
+        future = Future()
+        with self.__lock:
+            if not self.__active:
+                future.set_exception(ConnectionError("RpcClient is not active"))
+                return future
+
+            # Generate request
+            req_id = next(self.__request_ids)
+            future.request_id = req_id
+            with self.__futures_lock:
+                self.__futures[req_id] = future
+
+            self.__socket_request_push.send_multipart([
+                REQUEST_ID_STRUCT.pack(req_id),
+                pickle.dumps([name, args, kwargs], pickle.DEFAULT_PROTOCOL)
+            ])
+        return future
+
+    def call_timeout(self, name: str, timeout: float, *args, **kwargs) -> Any:
+        """
+        调用远程函数，等待结果
+        :param timeout: 超时时间(秒)，None: 一直等待；超时抛出TimeoutError，之后到达的应答被丢弃
+        """
+        future = self.call_async(name, *args, **kwargs)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            self.discard(future)
+            raise TimeoutError(f"RpcClient call {name} timeout after {timeout} seconds")
+
+    def discard(self, future: Future) -> None:
+        """
+        放弃等待的请求，之后到达的应答被丢弃
+        """
+        req_id = getattr(future, "request_id", None)
+        with self.__futures_lock:
+            self.__futures.pop(req_id, None)
+        future.cancel()
+
     def start(
         self,
         req_address: str,
@@ -271,6 +621,10 @@ class RpcClient:
         # Connect zmq port
         self.__socket_req.connect(req_address)
         self.__socket_sub.connect(sub_address)
+        # 只订阅部分主题时，也需要接收心跳
+        self.__socket_sub.setsockopt_string(zmq.SUBSCRIBE, KEEP_ALIVE_TOPIC)
+        self.__socket_request_pull.bind(self.__request_address)
+        self.__socket_request_push.connect(self.__request_address)
 
         # Start RpcClient status
         self.__active = True
@@ -279,6 +633,10 @@ class RpcClient:
         self.__thread = threading.Thread(target=self.run)
         self.__thread.start()
 
+        # 请求线程与订阅线程分开，订阅回调中可以同步调用远程函数
+        self.__req_thread = threading.Thread(target=self.run_request)
+        self.__req_thread.start()
+
         self._last_received_ping = datetime.utcnow()
 
     def stop(self) -> None:
@@ -289,13 +647,16 @@ class RpcClient:
             return
 
         # Stop RpcClient status
-        self.__active = False
+        with self.__lock:
+            self.__active = False
 
     def join(self) -> None:
         # Wait for RpcClient thread to exit
-        if self.__thread and self.__thread.is_alive():
-            self.__thread.join()
+        for thread in [self.__thread, self.__req_thread]:
+            if thread and thread.is_alive() and thread is not threading.current_thread():
+                thread.join()
         self.__thread = None
+        self.__req_thread = None
 
     def close(self):
         """close receiver, exit"""
@@ -314,17 +675,117 @@ class RpcClient:
                 continue
 
             # Receive data from subscribe socket
-            topic, data = self.__socket_sub.recv_pyobj(flags=NOBLOCK)
+            while True:
+                try:
+                    frames = self.__socket_sub.recv_multipart(flags=NOBLOCK)
+                except zmq.Again:
+                    break
+                self.on_sub_message(frames)
 
-            if topic == KEEP_ALIVE_TOPIC:
-                self._last_received_ping = data
-            else:
-                # Process data by callable function
-                self.callback(topic, data)
+        # Close socket
+        self.__socket_sub.close()
+
+    def on_sub_message(self, frames: List[bytes]) -> None:
+        """
+        解码发布的消息
+        """
+        if len(frames) == 1:
+            # 旧版本的单帧消息
+            topic, data = pickle.loads(frames[0])
+            self.on_sub_data(topic, data)
+            return
+        if len(frames) != 3:
+            return
+
+        topic = frames[0].decode("utf-8")
+        tag, flags = PUB_HEADER_STRUCT.unpack(frames[1])
+        codec = get_codec(tag)
+        if codec is None:
+            print(f"RpcClient unknown publish codec {tag}, topic {topic}")
+            return
+
+        if flags & PUB_FLAG_BATCH:
+            for data in codec.decode_batch(topic, frames[2]):
+                self.on_sub_data(topic, data)
+        else:
+            self.on_sub_data(topic, codec.decode(topic, frames[2]))
+
+    def on_sub_data(self, topic: str, data: Any) -> None:
+        """"""
+        if topic == KEEP_ALIVE_TOPIC:
+            self._last_received_ping = data
+        else:
+            # Process data by callable function
+            self.callback(topic, data)
+
+    def run_request(self) -> None:
+        """
+        请求线程：发送请求，按请求id把应答交给对应的Future
+        """
+        poller = zmq.Poller()
+        poller.register(self.__socket_req, zmq.POLLIN)
+        poller.register(self.__socket_request_pull, zmq.POLLIN)
+
+        while self.__active:
+            events = dict(poller.poll(500))
+            if not events:
+                continue
+
+            if self.__socket_request_pull in events:
+                while True:
+                    try:
+                        frames = self.__socket_request_pull.recv_multipart(flags=NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self.__socket_req.send_multipart([b"", RPC_PROTOCOL] + frames)
+
+            if self.__socket_req in events:
+                while True:
+                    try:
+                        frames = self.__socket_req.recv_multipart(flags=NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self.on_reply(frames)
+
+        # 未完成的请求
+        with self.__futures_lock:
+            futures = list(self.__futures.values())
+            self.__futures.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(ConnectionError("RpcClient stopped"))
 
         # Close socket
+        with self.__lock:
+            self.__socket_request_push.close()
+        self.__socket_request_pull.close()
         self.__socket_req.close()
-        self.__socket_sub.close()
+
+    def on_reply(self, frames: List[bytes]) -> None:
+        """
+        应答：[b"", RPC_PROTOCOL, 请求id, 应答]
+        """
+        if len(frames) != 4 or frames[1] != RPC_PROTOCOL:
+            return
+
+        req_id = REQUEST_ID_STRUCT.unpack(frames[2])[0]
+        with self.__futures_lock:
+            future = self.__futures.pop(req_id, None)
+
+        # 已超时放弃的请求
+        if future is None or not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            rep = pickle.loads(frames[3])
+        except Exception as ex:  # noqa
+            future.set_exception(ex)
+            return
+
+        if rep[0]:
+            future.set_result(rep[1])
+        else:
+            future.set_exception(RemoteException(rep[1]))
 
     @staticmethod
     def _on_unexpected_disconnected():
@@ -340,9 +801,17 @@ class RpcClient:
     def subscribe_topic(self, topic: str) -> None:
         """
         Subscribe data
+        按主题前缀订阅，""为订阅全部；
+        RpcEngine发布的主题为 事件类型 + vt_symbol，如 "eTick.rb2105.SHFE"，"eTick." 订阅全部tick
         """
         self.__socket_sub.setsockopt_string(zmq.SUBSCRIBE, topic)
 
+    def unsubscribe_topic(self, topic: str) -> None:
+        """
+        Unsubscribe data
+        """
+        self.__socket_sub.setsockopt_string(zmq.UNSUBSCRIBE, topic)
+
 
 def generate_certificates(name: str) -> None:
     """
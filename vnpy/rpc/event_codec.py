@@ -0,0 +1,120 @@
+"""
+RpcServer发布事件的编码(编码标识 "E")
+pickle编码Event时，每条消息都包含类名和全部字段名，订阅端逐个字段还原对象。
+EventCodec:
+    TickData/OrderData/TradeData/PositionData/AccountData: 只编码按固定顺序排列的字段值，
+    订阅端按字段顺序直接还原对象；同一主题的多个事件批量编码为一条消息；
+    其他数据、动态增加了字段的对象: pickle
+"""
+import pickle
+import struct
+from dataclasses import fields
+from typing import Any, Dict, List
+
+from vnpy.event import Event
+from vnpy.trader.object import AccountData, OrderData, PositionData, TickData, TradeData
+
+from . import PickleCodec, register_codec
+
+KIND_PICKLE = 0     # pickle
+KIND_OBJECT = 1     # 字段值
+
+KIND_STRUCT = struct.Struct("<BB")      # 类型, 对象类型序号
+
+
+def get_schema(data_class: type, extra_fields: List[str]) -> tuple:
+    """dataclass的字段 + __post_init__中生成的字段"""
+    return tuple([f.name for f in fields(data_class)] + extra_fields)
+
+
+# 按字段值编码的对象类型，只能在末尾追加
+OBJECT_CLASSES: List[type] = [TickData, OrderData, TradeData, PositionData, AccountData]
+OBJECT_SCHEMAS: List[tuple] = [
+    get_schema(TickData, ["vt_symbol"]),
+    get_schema(OrderData, ["vt_symbol", "vt_orderid", "vt_accountid"]),
+    get_schema(TradeData, ["vt_symbol", "vt_orderid", "vt_tradeid", "vt_accountid"]),
+    get_schema(PositionData, ["vt_symbol", "vt_positionid", "vt_accountid"]),
+    get_schema(AccountData, ["available", "vt_accountid"]),
+]
+OBJECT_INDEX: Dict[type, int] = {data_class: i for i, data_class in enumerate(OBJECT_CLASSES)}
+
+
+def get_values(obj: Any, index: int) -> tuple:
+    """对象 => 字段值，对象的字段与编码的字段不一致时返回None"""
+    d = obj.__dict__
+    schema = OBJECT_SCHEMAS[index]
+    if len(d) != len(schema):
+        return None
+    try:
+        return tuple(map(d.__getitem__, schema))
+    except KeyError:
+        return None
+
+
+def make_object(index: int, values: tuple) -> Any:
+    """字段值 => 对象"""
+    data_class = OBJECT_CLASSES[index]
+    obj = data_class.__new__(data_class)
+    obj.__dict__.update(zip(OBJECT_SCHEMAS[index], values))
+    return obj
+
+
+class EventCodec(PickleCodec):
+    """事件编码"""
+    tag: bytes = b"E"
+
+    def encode(self, topic: str, data: Any) -> bytes:
+        """"""
+        if isinstance(data, Event):
+            index = OBJECT_INDEX.get(type(data.data), None)
+            if index is not None:
+                values = get_values(data.data, index)
+                if values is not None:
+                    return KIND_STRUCT.pack(KIND_OBJECT, index) + pickle.dumps(
+                        (data.type, values), pickle.HIGHEST_PROTOCOL)
+
+        return KIND_STRUCT.pack(KIND_PICKLE, 0) + pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, topic: str, body: bytes) -> Any:
+        """"""
+        kind, index = KIND_STRUCT.unpack_from(body, 0)
+        data = pickle.loads(body[KIND_STRUCT.size:])
+        if kind == KIND_OBJECT:
+            event_type, values = data
+            return Event(event_type, make_object(index, values))
+        return data
+
+    def encode_batch(self, topic: str, datas: List[Any]) -> bytes:
+        """同一事件类型、同一对象类型的事件编码为 (事件类型, [字段值])，其他数据逐条编码"""
+        first = datas[0]
+        if isinstance(first, Event):
+            index = OBJECT_INDEX.get(type(first.data), None)
+            if index is not None:
+                data_class = OBJECT_CLASSES[index]
+                values_list = []
+                for event in datas:
+                    if not isinstance(event, Event) or event.type != first.type \
+                            or type(event.data) is not data_class:
+                        break
+                    values = get_values(event.data, index)
+                    if values is None:
+                        break
+                    values_list.append(values)
+                else:
+                    return KIND_STRUCT.pack(KIND_OBJECT, index) + pickle.dumps(
+                        (first.type, values_list), pickle.HIGHEST_PROTOCOL)
+
+        return KIND_STRUCT.pack(KIND_PICKLE, 0) + pickle.dumps(
+            [self.encode(topic, data) for data in datas], pickle.HIGHEST_PROTOCOL)
+
+    def decode_batch(self, topic: str, body: bytes) -> List[Any]:
+        """"""
+        kind, index = KIND_STRUCT.unpack_from(body, 0)
+        data = pickle.loads(body[KIND_STRUCT.size:])
+        if kind == KIND_OBJECT:
+            event_type, values_list = data
+            return [Event(event_type, make_object(index, values)) for values in values_list]
+        return [self.decode(topic, b) for b in data]
+
+
+register_codec(EventCodec())
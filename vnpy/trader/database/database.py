@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Sequence, List, Dict, TYPE_CHECKING
+from itertools import islice
+from typing import Optional, Sequence, List, Dict, Iterable, Callable, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from vnpy.trader.constant import Interval, Exchange  # noqa
@@ -15,8 +16,25 @@ class Driver(Enum):
     MONGODB = "mongodb"
 
 
+# 批量写入时，每批的默认数量
+DEFAULT_BATCH_SIZE = 1000
+
+
+def iter_batches(datas: Iterable, batch_size: int):
+    """把迭代器按batch_size分批，每批为一个list"""
+    iterator = iter(datas)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
 class BaseDatabaseManager(ABC):
 
+    # 批量写入(save_bar_data/save_tick_data 内部分批、save_*_stream 每次flush)的数量
+    batch_size: int = DEFAULT_BATCH_SIZE
+
     @abstractmethod
     def load_bar_data(
         self,
@@ -109,3 +127,33 @@ class BaseDatabaseManager(ABC):
         delete all records for a symbol
         """
         pass
+
+    def save_bar_data_stream(
+        self,
+        datas: Iterable["BarData"],
+        batch_size: int = None
+    ) -> int:
+        """
+        流式保存bar数据(例如逐行解析的csv生成器)，每累计batch_size条写入一次，不需要一次性载入内存
+        :return: 保存的数量
+        """
+        return self._save_stream(self.save_bar_data, datas, batch_size)
+
+    def save_tick_data_stream(
+        self,
+        datas: Iterable["TickData"],
+        batch_size: int = None
+    ) -> int:
+        """
+        流式保存tick数据，每累计batch_size条写入一次
+        :return: 保存的数量
+        """
+        return self._save_stream(self.save_tick_data, datas, batch_size)
+
+    def _save_stream(self, save_func: Callable, datas: Iterable, batch_size: int = None) -> int:
+        """按批调用save_func"""
+        count = 0
+        for batch in iter_batches(datas, batch_size or self.batch_size):
+            save_func(batch)
+            count += len(batch)
+        return count
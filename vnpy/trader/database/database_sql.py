@@ -1,4 +1,5 @@
 """"""
+import sqlite3
 from datetime import datetime
 from typing import List, Dict, Optional, Sequence, Type
 
@@ -18,7 +19,10 @@ from peewee import (
 from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.object import BarData, TickData
 from vnpy.trader.utility import get_file_path
-from .database import BaseDatabaseManager, Driver
+from .database import BaseDatabaseManager, Driver, DEFAULT_BATCH_SIZE
+
+# sqlite单条语句中绑定参数的上限(3.32之前为999)，多行插入时按字段数限制每批的行数
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
 
 
 def init(driver: Driver, settings: dict):
@@ -29,9 +33,10 @@ def init(driver: Driver, settings: dict):
     }
     assert driver in init_funcs
 
+    batch_size = settings.pop("batch_size", None) or DEFAULT_BATCH_SIZE
     db = init_funcs[driver](settings)
     bar, tick = init_models(db, driver)
-    return SqlManager(bar, tick)
+    return SqlManager(bar, tick, batch_size=batch_size)
 
 
 def init_sqlite(settings: dict):
@@ -61,6 +66,42 @@ class ModelBase(Model):
         return self.__data__
 
 
+def upsert_many(
+    db: Database,
+    driver: Driver,
+    model: Type[Model],
+    dicts: List[Dict],
+    conflict_target: tuple,
+    chunk_size: int = DEFAULT_BATCH_SIZE
+):
+    """
+    多行写入，已存在(唯一索引冲突)时更新
+    PostgreSQL: INSERT ... VALUES (...), (...) ON CONFLICT (...) DO UPDATE SET col = EXCLUDED.col
+    MySQL/SQLite: REPLACE INTO ... VALUES (...), (...)
+    每chunk_size行一条语句，整体在一个事务中
+    """
+    # insert_many 以第一行的key作为字段列表，这里补齐所有字段，避免后面行的字段被丢弃
+    fields = [f for f in model._meta.sorted_fields if not isinstance(f, AutoField)]
+    names = [f.name for f in fields]
+    rows = [{name: d.get(name, None) for name in names} for d in dicts]
+
+    # peewee的字段重载了==，这里按字段名比较
+    target_names = {f.name for f in conflict_target}
+
+    if driver is Driver.SQLITE:
+        chunk_size = max(1, min(chunk_size, SQLITE_MAX_VARIABLES // len(names)))
+
+    with db.atomic():
+        for c in chunked(rows, chunk_size):
+            if driver is Driver.POSTGRESQL:
+                model.insert_many(c).on_conflict(
+                    conflict_target=conflict_target,
+                    preserve=[f for f in fields if f.name not in target_names],
+                ).execute()
+            else:
+                model.insert_many(c).on_conflict_replace().execute()
+
+
 def init_models(db: Database, driver: Driver):
     class DbBarData(ModelBase):
         """
@@ -126,27 +167,24 @@ def init_models(db: Database, driver: Driver):
             return bar
 
         @staticmethod
-        def save_all(objs: List["DbBarData"]):
+        def save_all(objs: List["DbBarData"], chunk_size: int = DEFAULT_BATCH_SIZE):
             """
             save a list of objects, update if exists.
             """
             dicts = [i.to_dict() for i in objs]
-            with db.atomic():
-                if driver is Driver.POSTGRESQL:
-                    for bar in dicts:
-                        DbBarData.insert(bar).on_conflict(
-                            update=bar,
-                            conflict_target=(
-                                DbBarData.symbol,
-                                DbBarData.exchange,
-                                DbBarData.interval,
-                                DbBarData.datetime,
-                            ),
-                        ).execute()
-                else:
-                    for c in chunked(dicts, 50):
-                        DbBarData.insert_many(
-                            c).on_conflict_replace().execute()
+            upsert_many(
+                db,
+                driver,
+                DbBarData,
+                dicts,
+                conflict_target=(
+                    DbBarData.symbol,
+                    DbBarData.exchange,
+                    DbBarData.interval,
+                    DbBarData.datetime,
+                ),
+                chunk_size=chunk_size
+            )
 
     class DbTickData(ModelBase):
         """
@@ -302,22 +340,20 @@ def init_models(db: Database, driver: Driver):
             return tick
 
         @staticmethod
-        def save_all(objs: List["DbTickData"]):
+        def save_all(objs: List["DbTickData"], chunk_size: int = DEFAULT_BATCH_SIZE):
             dicts = [i.to_dict() for i in objs]
-            with db.atomic():
-                if driver is Driver.POSTGRESQL:
-                    for tick in dicts:
-                        DbTickData.insert(tick).on_conflict(
-                            update=tick,
-                            conflict_target=(
-                                DbTickData.symbol,
-                                DbTickData.exchange,
-                                DbTickData.datetime,
-                            ),
-                        ).execute()
-                else:
-                    for c in chunked(dicts, 50):
-                        DbTickData.insert_many(c).on_conflict_replace().execute()
+            upsert_many(
+                db,
+                driver,
+                DbTickData,
+                dicts,
+                conflict_target=(
+                    DbTickData.symbol,
+                    DbTickData.exchange,
+                    DbTickData.datetime,
+                ),
+                chunk_size=chunk_size
+            )
 
     db.connect()
     db.create_tables([DbBarData, DbTickData])
@@ -326,9 +362,10 @@ def init_models(db: Database, driver: Driver):
 
 class SqlManager(BaseDatabaseManager):
 
-    def __init__(self, class_bar: Type[Model], class_tick: Type[Model]):
+    def __init__(self, class_bar: Type[Model], class_tick: Type[Model], batch_size: int = DEFAULT_BATCH_SIZE):
         self.class_bar = class_bar
         self.class_tick = class_tick
+        self.batch_size = batch_size
 
     def load_bar_data(
         self,
@@ -372,11 +409,11 @@ class SqlManager(BaseDatabaseManager):
 
     def save_bar_data(self, datas: Sequence[BarData]):
         ds = [self.class_bar.from_bar(i) for i in datas]
-        self.class_bar.save_all(ds)
+        self.class_bar.save_all(ds, chunk_size=self.batch_size)
 
     def save_tick_data(self, datas: Sequence[TickData]):
         ds = [self.class_tick.from_tick(i) for i in datas]
-        self.class_tick.save_all(ds)
+        self.class_tick.save_all(ds, chunk_size=self.batch_size)
 
     def get_newest_bar_data(
         self, symbol: str, exchange: "Exchange", interval: "Interval"
@@ -2,7 +2,7 @@
 Event type string used in VN Trader.
 """
 
-from vnpy.event import EVENT_TIMER  # noqa
+from vnpy.event import EVENT_TIMER, EVENT_PROFILE  # noqa
 
 EVENT_TICK = "eTick."
 EVENT_TRADE = "eTrade."
@@ -33,6 +33,9 @@ SETTINGS: Dict[str, Any] = {
     "database.user": "root",
     "database.password": "",
     "database.authentication_source": "admin",  # for mongodb
+    "database.batch_size": 1000,  # 批量写入时每批的数量
+
+    "state_store.fsync": "background",  # 策略状态日志的fsync: always/background/never
 
     "huafu.data_source": ""  # 华富资产自建数据源
 }
@@ -0,0 +1,277 @@
+"""
+csv追加日志服务
+原来 append_data 每写一行都重新打开文件、创建DictWriter；CtaLineBar.append_data 每行还要从文件末尾回读1000字节，
+readlines() 找出最后一行的时间，策略每根bar对每个K线输出多个csv文件时，打开/关闭文件的开销很明显。
+AppendLogService:
+    每个文件缓存一个打开的文件和DictWriter，多行写入后批量刷新(行数阈值，或者后台线程定时刷新)；
+    最后写入的时间保存在内存中，只在首次打开已有文件时，从文件末尾按块反向扫描出最后一行的时间；
+    同时打开的文件数量有上限，超过时关闭最久未使用的文件；
+    进程退出时刷新所有文件。
+数据最多延迟 flush_interval 秒才落盘，进程崩溃时会丢失，只用于K线等输出日志；
+外部程序轮询读取的文件(如PB网关的委托/撤单文件)，需要即时落盘的，使用 utility.append_data。
+"""
+import atexit
+import csv
+import os
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock, Thread, Event
+from time import monotonic
+from typing import Any, Dict, List
+
+BLOCK_SIZE = 4096
+
+
+def read_last_line(file_name: str, encoding: str = 'utf8', block_size: int = BLOCK_SIZE) -> str:
+    """
+    从文件末尾按块反向扫描，返回最后一个非空行(不含换行符)
+    行的长度不受块大小限制，文件不存在或为空时返回空字符串
+    """
+    if not os.path.exists(file_name):
+        return ''
+    with open(file_name, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+        while pos > 0:
+            read_size = min(block_size, pos)
+            pos -= read_size
+            f.seek(pos)
+            data = f.read(read_size) + data
+            stripped = data.rstrip(b'\r\n')
+            # 找到最后一行的起始位置
+            i = stripped.rfind(b'\n')
+            if i >= 0:
+                return stripped[i + 1:].decode(encoding, errors='ignore').rstrip('\r')
+        return data.rstrip(b'\r\n').decode(encoding, errors='ignore')
+
+
+def parse_datetime(value: Any, dt_format: str = '%Y-%m-%d %H:%M:%S') -> datetime:
+    """时间/字符串 => datetime，不能转换时返回None"""
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str) or len(value) == 0:
+        return None
+    value = value.strip().strip('"')
+    try:
+        if '.' in value and '.' not in dt_format:
+            # 带毫秒的时间，毫秒不超过6位
+            s, ms = value.split('.', 1)
+            return datetime.strptime(f'{s}.{ms[:6]}', f'{dt_format}.%f')
+        return datetime.strptime(value, dt_format)
+    except ValueError:
+        return None
+
+
+def get_last_line_dt(file_name: str, dt_index: int = 0, dt_format: str = '%Y-%m-%d %H:%M:%S',
+                     encoding: str = 'utf8') -> datetime:
+    """csv文件最后一行第dt_index个字段的时间，没有数据或格式不正确时返回None"""
+    line = read_last_line(file_name, encoding=encoding)
+    if not line:
+        return None
+    datas = next(csv.reader([line]), [])
+    if len(datas) <= dt_index:
+        return None
+    return parse_datetime(datas[dt_index], dt_format)
+
+
+class AppendLogWriter(object):
+    """单个csv文件的追加写入"""
+
+    def __init__(self, file_name: str, field_names: List[str], encoding: str = 'utf8', newline: str = '',
+                 auto_header: bool = True, dt_field: str = None):
+        """
+        :param dt_field: 时间字段，不为空时，不写入时间早于最后一行的数据
+        """
+        self.file_name = file_name
+        self.field_names = list(field_names)
+        self.dt_field = dt_field
+
+        self.last_dt: datetime = None
+        exists = os.path.exists(file_name)
+        if exists and dt_field and dt_field in self.field_names:
+            # 只在打开已有文件时，从文件末尾扫描最后的时间
+            self.last_dt = get_last_line_dt(file_name, dt_index=self.field_names.index(dt_field),
+                                            encoding=encoding)
+
+        self.file = open(file_name, 'a', encoding=encoding, newline=newline)
+        self.writer = csv.DictWriter(f=self.file, fieldnames=self.field_names, dialect='excel',
+                                     extrasaction='ignore')
+        self.pending = 0
+        self.last_flush = monotonic()
+        if not exists and auto_header:
+            self.writer.writeheader()
+            self.pending += 1
+
+    def set_field_names(self, field_names: List[str]):
+        if list(field_names) != self.field_names:
+            self.field_names = list(field_names)
+            self.writer = csv.DictWriter(f=self.file, fieldnames=self.field_names, dialect='excel',
+                                         extrasaction='ignore')
+
+    def write(self, dict_data: dict) -> bool:
+        """写入一行，时间早于最后一行时不写入，返回False"""
+        if self.dt_field:
+            dt = parse_datetime(dict_data.get(self.dt_field, None))
+            if dt is not None:
+                if self.last_dt is not None and dt < self.last_dt:
+                    print(u'{}新增数据时间{}比最后一条记录时间{}早，不插入'.format(self.file_name, dt, self.last_dt))
+                    return False
+                self.last_dt = dt
+        self.writer.writerow(dict_data)
+        self.pending += 1
+        return True
+
+    def flush(self):
+        if self.pending > 0:
+            self.file.flush()
+            self.pending = 0
+        self.last_flush = monotonic()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.file.close()
+
+
+class AppendLogService(object):
+    """
+    csv追加写入服务
+    """
+
+    def __init__(self, flush_rows: int = 100, flush_interval: float = 1, max_open: int = 256):
+        """
+        :param flush_rows: 单个文件未刷新的行数达到时刷新
+        :param flush_interval: 后台线程刷新的间隔(秒)，写入的数据最多延迟这么久才落盘
+        :param max_open: 同时打开的文件上限
+        """
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_open = max_open
+
+        self.writers: Dict[str, AppendLogWriter] = OrderedDict()  # 文件全路径 => writer，按使用先后排序
+        self.lock = Lock()
+        self.stop_event = Event()
+        self.thread: Thread = None
+
+    def get_writer(self, file_name: str, field_names: List[str], encoding: str = 'utf8', newline: str = '',
+                   auto_header: bool = True, dt_field: str = None) -> AppendLogWriter:
+        """(需持有lock)"""
+        key = os.path.abspath(file_name)
+        writer = self.writers.get(key, None)
+        if writer is not None:
+            if writer.file.closed or not os.path.exists(key):
+                # 文件被外部删除，重新创建
+                self.close_file(key)
+                writer = None
+            else:
+                self.writers.move_to_end(key)
+                writer.set_field_names(field_names)
+                if dt_field:
+                    writer.dt_field = dt_field
+                return writer
+
+        while len(self.writers) >= self.max_open:
+            _, old_writer = self.writers.popitem(last=False)
+            old_writer.close()
+
+        writer = AppendLogWriter(file_name, field_names, encoding=encoding, newline=newline,
+                                 auto_header=auto_header, dt_field=dt_field)
+        self.writers[key] = writer
+        self.start()
+        return writer
+
+    def append(self, file_name: str, dict_data: dict, field_names: List[str] = None, encoding: str = 'utf8',
+               newline: str = '', auto_header: bool = True, dt_field: str = None) -> bool:
+        """
+        添加一行数据到csv文件
+        :param dt_field: 时间字段，不为空时，不写入时间早于文件最后一行的数据
+        :return: 是否写入
+        """
+        return self.append_rows(file_name, [dict_data], field_names, encoding, newline, auto_header, dt_field) > 0
+
+    def append_rows(self, file_name: str, rows: List[dict], field_names: List[str] = None, encoding: str = 'utf8',
+                    newline: str = '', auto_header: bool = True, dt_field: str = None) -> int:
+        """添加多行数据到csv文件，返回写入的行数"""
+        if len(rows) == 0:
+            return 0
+        if not field_names:
+            field_names = list(rows[0].keys())
+        with self.lock:
+            writer = self.get_writer(file_name, field_names, encoding, newline, auto_header, dt_field)
+            count = 0
+            for dict_data in rows:
+                if writer.write(dict_data):
+                    count += 1
+            if writer.pending >= self.flush_rows:
+                writer.flush()
+            return count
+
+    def get_last_dt(self, file_name: str) -> datetime:
+        """已打开文件最后写入的时间，未打开时返回None"""
+        with self.lock:
+            writer = self.writers.get(os.path.abspath(file_name), None)
+            return writer.last_dt if writer else None
+
+    def flush_file(self, file_name: str):
+        """刷新指定文件(读取文件前调用)"""
+        with self.lock:
+            writer = self.writers.get(os.path.abspath(file_name), None)
+            if writer:
+                writer.flush()
+
+    def close_file(self, file_name: str):
+        """关闭指定文件(需持有lock)"""
+        writer = self.writers.pop(os.path.abspath(file_name), None)
+        if writer:
+            try:
+                writer.close()
+            except Exception as ex:
+                print(u'close csv file {} exception:{}'.format(file_name, str(ex)), file=sys.stderr)
+
+    def flush_all(self):
+        with self.lock:
+            for writer in self.writers.values():
+                try:
+                    writer.flush()
+                except Exception as ex:
+                    print(u'flush csv file {} exception:{}'.format(writer.file_name, str(ex)), file=sys.stderr)
+
+    def close_all(self):
+        with self.lock:
+            for key in list(self.writers.keys()):
+                self.close_file(key)
+
+    def start(self):
+        """启动后台刷新线程(需持有lock)"""
+        if self.thread is None:
+            self.thread = Thread(target=self.run, name='AppendLogService', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush_all()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.close_all()
+
+
+_service: AppendLogService = None
+_service_lock = Lock()
+
+
+def get_append_log_service() -> AppendLogService:
+    """进程内共享的追加写入服务"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = AppendLogService()
+                atexit.register(_service.close_all)
+    return _service
@@ -0,0 +1,61 @@
+"""
+进程内共享的asyncio事件循环线程
+异步的rest/websocket客户端都在同一个事件循环线程中执行，不再为每个客户端、每个请求创建线程。
+运行在事件循环线程中的回调不能长时间阻塞，否则会影响同一进程中的所有连接。
+"""
+import asyncio
+import atexit
+from concurrent.futures import Future
+from threading import Lock, Thread, get_ident
+from typing import Any, Callable, Coroutine
+
+_loop: asyncio.AbstractEventLoop = None
+_thread: Thread = None
+_lock = Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """共享的事件循环，首次调用时启动事件循环线程"""
+    global _loop, _thread
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                _thread = Thread(target=_run_loop, args=(loop,), name='AsyncLoop', daemon=True)
+                _thread.start()
+                _loop = loop
+                atexit.register(stop_event_loop)
+    return _loop
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def in_loop_thread() -> bool:
+    """当前是否在事件循环线程中"""
+    return _thread is not None and _thread.ident == get_ident()
+
+
+def run_coroutine(coro: Coroutine) -> Future:
+    """在事件循环线程中执行协程(线程安全)，返回concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def call_soon(callback: Callable, *args: Any) -> None:
+    """在事件循环线程中执行函数(线程安全)"""
+    get_event_loop().call_soon_threadsafe(callback, *args)
+
+
+def stop_event_loop(timeout: float = 5) -> None:
+    """停止事件循环线程(进程退出时调用)"""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop, _thread = None, None
+    if loop is None:
+        return
+    loop.call_soon_threadsafe(loop.stop)
+    if thread is not None and thread.ident != get_ident():
+        thread.join(timeout)
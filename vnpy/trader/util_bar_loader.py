@@ -0,0 +1,234 @@
+"""
+bar csv文件的加载服务
+原来 get_bars 逐行 DictReader + strptime 解析，回测引擎每次回测都用pandas重新解析同一个大csv文件。
+load_bar_df:
+    用pandas一次解析csv(时间列矢量化转换)，保证时间索引有序；
+    解析结果以pickle保存为旁路缓存文件(csv所在目录/.bar_cache/)，文件名: csv文件名.字段类型签名.csv修改时间和大小签名.pkl，
+    不同字段类型的调用各自保留一个缓存文件；csv文件更新后自动重新解析，并删除该csv的过期缓存文件；
+    同一进程内保留最近加载的若干个DataFrame；
+    按时间范围返回数据(有序时间索引上二分查找)
+"""
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from .constant import Exchange, Interval
+from .object import BarData
+
+# 回测bar csv文件的字段类型
+BAR_DATA_TYPES: Dict[str, Any] = {
+    "datetime": str,
+    "open": float,
+    "high": float,
+    "low": float,
+    "close": float,
+    "open_interest": float,
+    "volume": float,
+    "instrument_id": str,
+    "symbol": str,
+    "total_turnover": float,
+    "limit_down": float,
+    "limit_up": float,
+    "trading_day": str,
+    "date": str,
+    "time": str
+}
+
+CACHE_FOLDER_NAME = '.bar_cache'
+CACHE_VERSION = 2
+
+# 进程内缓存的DataFrame数量
+MEMORY_CACHE_SIZE = 8
+_memory_cache: OrderedDict = OrderedDict()
+_memory_lock = Lock()
+
+
+def get_md5(text: str) -> str:
+    return hashlib.md5(text.encode('utf-8')).hexdigest()[:16]
+
+
+def get_types_sign(data_types: dict = None) -> str:
+    """字段类型(+缓存版本)的签名"""
+    types_str = ','.join([f'{k}:{getattr(v, "__name__", str(v))}' for k, v in (data_types or {}).items()])
+    return get_md5(f'{CACHE_VERSION}|{types_str}')
+
+
+def get_source_sign(csv_file: str) -> str:
+    """csv文件(修改时间、大小)的签名"""
+    stat = os.stat(csv_file)
+    return get_md5(f'{stat.st_mtime_ns}|{stat.st_size}')
+
+
+def get_cache_sign(csv_file: str, data_types: dict = None) -> str:
+    """缓存文件的签名: 字段类型签名.csv文件签名"""
+    return f'{get_types_sign(data_types)}.{get_source_sign(csv_file)}'
+
+
+def get_cache_file(csv_file: str, sign: str, cache_folder: str = None) -> str:
+    folder = cache_folder or os.path.join(os.path.dirname(os.path.abspath(csv_file)), CACHE_FOLDER_NAME)
+    return os.path.join(folder, f'{os.path.basename(csv_file)}.{sign}.pkl')
+
+
+def parse_bar_csv(csv_file: str, data_types: dict = None) -> pd.DataFrame:
+    """解析csv文件 => 以datetime为有序索引的DataFrame"""
+    df = pd.read_csv(csv_file, dtype=data_types)
+    if len(df) == 0:
+        return df.set_index("datetime")
+
+    first_dt = str(df["datetime"].iloc[0])
+    if '.' in first_dt:
+        datetime_format = "%Y-%m-%d %H:%M:%S.%f"
+    else:
+        datetime_format = "%Y-%m-%d %H:%M:%S"
+    # 转换时间，str =》 datetime
+    df["datetime"] = pd.to_datetime(df["datetime"], format=datetime_format)
+    # 设置时间为索引
+    df = df.set_index("datetime")
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='mergesort')
+    return df
+
+
+def save_cache(df: pd.DataFrame, cache_file: str) -> None:
+    """
+    写入缓存文件(先写临时文件再替换)，并删除同一csv文件的过期缓存
+    其他字段类型的缓存文件，csv文件签名相同时保留(不同字段类型的调用不会互相删除)
+    """
+    folder = os.path.dirname(cache_file)
+    os.makedirs(folder, exist_ok=True)
+    csv_name, types_sign, source_sign, _ = os.path.basename(cache_file).rsplit('.', 3)
+    prefix = csv_name + '.'
+    for file_name in os.listdir(folder):
+        if not file_name.startswith(prefix) or not file_name.endswith('.pkl'):
+            continue
+        signs = file_name[len(prefix):-len('.pkl')].split('.')
+        # 旧版本的缓存文件(只有一个签名)，或csv文件已更新
+        if len(signs) == 1 or (len(signs) == 2 and signs[1] != source_sign):
+            try:
+                os.remove(os.path.join(folder, file_name))
+            except OSError:
+                pass
+
+    tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+
+def load_full_bar_df(csv_file: str, data_types: dict = None, use_cache: bool = True,
+                     cache_folder: str = None) -> pd.DataFrame:
+    """加载csv文件的全部数据(优先使用进程内缓存、缓存文件)"""
+    if data_types is None:
+        data_types = BAR_DATA_TYPES
+    if not use_cache:
+        return parse_bar_csv(csv_file, data_types)
+
+    sign = get_cache_sign(csv_file, data_types)
+    key = (os.path.abspath(csv_file), sign)
+    with _memory_lock:
+        df = _memory_cache.get(key, None)
+        if df is not None:
+            _memory_cache.move_to_end(key)
+            return df
+
+    cache_file = get_cache_file(csv_file, sign, cache_folder)
+    df = None
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                df = pickle.load(f)
+        except Exception as ex:
+            print(f'读取bar缓存文件{cache_file}失败:{str(ex)}')
+            df = None
+
+    if df is None:
+        df = parse_bar_csv(csv_file, data_types)
+        try:
+            save_cache(df, cache_file)
+        except Exception as ex:
+            # 目录不可写时，只使用进程内缓存
+            print(f'写入bar缓存文件{cache_file}失败:{str(ex)}')
+
+    with _memory_lock:
+        _memory_cache[key] = df
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+    return df
+
+
+def slice_bar_df(df: pd.DataFrame, start: Any = None, end: Any = None) -> pd.DataFrame:
+    """
+    按时间范围裁剪(包含start、end)，与 df.loc[start:end] 一致
+    时间索引有序，pandas在索引上二分查找
+    """
+    if start is None and end is None:
+        return df
+    return df.loc[start:end]
+
+
+def load_bar_df(csv_file: str, data_types: dict = None, start: Any = None, end: Any = None,
+                use_cache: bool = True, cache_folder: str = None) -> pd.DataFrame:
+    """
+    加载bar csv文件 => DataFrame(datetime为索引)
+    :param csv_file: csv文件
+    :param data_types: 字段类型，缺省为 BAR_DATA_TYPES
+    :param start: 开始时间(datetime或日期字符串)，包含
+    :param end: 结束时间(datetime或日期字符串)，包含
+    :param use_cache: 是否使用缓存
+    :param cache_folder: 缓存文件目录，缺省为csv所在目录/.bar_cache
+    :return: 返回的DataFrame为副本，可以修改
+    """
+    df = load_full_bar_df(csv_file, data_types, use_cache, cache_folder)
+    return slice_bar_df(df, start, end).copy()
+
+
+def load_bars(csv_file: str,
+              symbol: str,
+              exchange: Exchange,
+              start_date: datetime = None,
+              end_date: datetime = None,
+              interval: Interval = Interval.MINUTE,
+              gateway_name: str = "Tdx") -> List[BarData]:
+    """加载bar csv文件 => BarData列表"""
+    df = slice_bar_df(load_full_bar_df(csv_file), start_date, end_date)
+    if len(df) == 0:
+        return []
+
+    trading_days = df["trading_day"].fillna('').astype(str).tolist()
+    return [
+        BarData(
+            symbol=symbol,
+            exchange=exchange,
+            datetime=dt,
+            interval=interval,
+            volume=volume,
+            open_price=open_price,
+            high_price=high_price,
+            low_price=low_price,
+            close_price=close_price,
+            open_interest=open_interest,
+            trading_day=trading_day,
+            gateway_name=gateway_name,
+        )
+        for dt, volume, open_price, high_price, low_price, close_price, open_interest, trading_day in zip(
+            df.index.to_pydatetime(),
+            df["volume"].astype(float).tolist(),
+            df["open"].astype(float).tolist(),
+            df["high"].astype(float).tolist(),
+            df["low"].astype(float).tolist(),
+            df["close"].astype(float).tolist(),
+            df["open_interest"].astype(float).tolist(),
+            trading_days)
+    ]
+
+
+def clear_memory_cache() -> None:
+    """清除进程内缓存"""
+    with _memory_lock:
+        _memory_cache.clear()
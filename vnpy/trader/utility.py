@@ -351,28 +351,26 @@ def get_csv_last_dt(file_name, dt_index=0, dt_format='%Y-%m-%d %H:%M:%S', line_l
     if not os.path.exists(file_name):
         return False
 
-    with open(file_name, 'r', encoding='utf8') as f:
-        f_size = os.path.getsize(file_name)
-        if f_size < line_length:
-            line_length = f_size
-        f.seek(f_size - line_length)  # 移动到最后1000个字节
-        for row in f.readlines()[-1:]:
-
-            datas = row.split(',')
-            if len(datas) > dt_index + 1:
-                try:
-                    s = datas[dt_index]
-                    # 检查毫秒不要超过6位长度
-                    if '.' in dt_format and '.' in s:
-                        i = s.find('.')
-                        if len(s) - i -1 > 6:
-                            len_ms = len(s) - i -1
-                            s = s[:-(len_ms-6)]
-                    last_dt = datetime.strptime(s, dt_format)
-                    return last_dt
-                except:  # noqa
-                    return None
-        return None
+    # 先刷新追加写入服务中未落盘的数据，再从文件末尾按块反向扫描最后一行(不受行长度限制)
+    from .util_append_log import get_append_log_service, read_last_line
+    get_append_log_service().flush_file(file_name)
+    row = read_last_line(file_name)
+    if row:
+        datas = row.split(',')
+        if len(datas) > dt_index + 1:
+            try:
+                s = datas[dt_index]
+                # 检查毫秒不要超过6位长度
+                if '.' in dt_format and '.' in s:
+                    i = s.find('.')
+                    if len(s) - i -1 > 6:
+                        len_ms = len(s) - i -1
+                        s = s[:-(len_ms-6)]
+                last_dt = datetime.strptime(s, dt_format)
+                return last_dt
+            except:  # noqa
+                return None
+    return None
 
 
 def append_data(file_name: str, dict_data: dict, field_names: list = [], auto_header=True, encoding='utf8'):
@@ -1399,45 +1397,9 @@ def get_bars(csv_file: str,
     :param end_date: datetime
     :return:
     """
-    bars = []
-
-    import csv
-    with open(file=csv_file, mode='r', encoding='utf8', newline='\n') as f:
-        reader = csv.DictReader(f)
-
-        count = 0
-
-        for item in reader:
-
-            dt = datetime.strptime(item['datetime'], '%Y-%m-%d %H:%M:%S')
-            if start_date:
-                if dt < start_date:
-                    continue
-            if end_date:
-                if dt > end_date:
-                    break
-
-            bar = BarData(
-                symbol=symbol,
-                exchange=exchange,
-                datetime=dt,
-                interval=Interval.MINUTE,
-                volume=float(item['volume']),
-                open_price=float(item['open']),
-                high_price=float(item['high']),
-                low_price=float(item['low']),
-                close_price=float(item['close']),
-                open_interest=float(item['open_interest']),
-                trading_day=item['trading_day'],
-                gateway_name="Tdx",
-            )
-
-            bars.append(bar)
-
-            # do some statistics
-            count += 1
-
-    return bars
+    # 解析结果缓存在csv所在目录/.bar_cache，csv文件不变时不再重新解析
+    from .util_bar_loader import load_bars
+    return load_bars(csv_file, symbol, exchange, start_date, end_date)
 
 
 def get_remote_file(remote_ip, remote_file_path, mode='rb'):